@@ -0,0 +1,116 @@
+"""
+Compare the controller cost of driving many sessions with threads and with asyncio.
+
+Every session opens the product page and reads its snapshot a number of times, once with one
+thread per session on the Selenium client and ProductPage, once on a single event loop with
+AsyncWebDriver and AsyncProductPage. Reported are the wall time and the CPU time, peak resident
+memory growth and peak thread count of this process, i.e. of the controller, not of the browsers:
+
+    python -m benchmarks.async_fanout --sessions 30 --command-executor http://localhost:4444/wd/hub \\
+        --base-url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+from selenium import webdriver
+
+from features.pages.async_pages import AsyncProductPage
+from features.pages.async_webdriver import AsyncWebDriver, connection_pool
+from features.pages.product_page import ProductPage
+
+
+class ResourceSampler:
+    """
+    Samples the memory and thread count of the current process in the background.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+            self.peak_threads = max(self.peak_threads, self.process.num_threads())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.cpu = self.process.cpu_times()
+        self.base_rss = self.peak_rss = self.process.memory_info().rss
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.wall = time.perf_counter() - self.started
+        cpu = self.process.cpu_times()
+        self.cpu_seconds = (cpu.user - self.cpu.user) + (cpu.system - self.cpu.system)
+        self._stop.set()
+        self._thread.join()
+
+
+def threaded_session(command_executor, base_url, iterations):
+    browser = webdriver.Remote(options=webdriver.ChromeOptions(), command_executor=command_executor)
+    try:
+        page = ProductPage(browser, base_url)
+        page.load()
+        for _ in range(iterations):
+            page.snapshot()
+    finally:
+        browser.quit()
+
+
+def run_threaded(sessions, command_executor, base_url, iterations):
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = [executor.submit(threaded_session, command_executor, base_url, iterations) for _ in range(sessions)]
+        for future in futures:
+            future.result()
+
+
+async def async_session(http, command_executor, base_url, iterations):
+    browser = await AsyncWebDriver.start(http, command_executor, {'browserName': 'chrome'})
+    try:
+        page = AsyncProductPage(browser, base_url)
+        await page.load()
+        for _ in range(iterations):
+            await page.snapshot()
+    finally:
+        await browser.quit()
+
+
+async def run_async(sessions, command_executor, base_url, iterations):
+    async with connection_pool(limit=sessions) as http:
+        await asyncio.gather(*(async_session(http, command_executor, base_url, iterations) for _ in range(sessions)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--command-executor', default="http://localhost:4444/wd/hub")
+    parser.add_argument('--base-url', default=ProductPage.DEFAULT_BASE_URL)
+    parser.add_argument('--sessions', type=int, default=20, help="concurrent sessions")
+    parser.add_argument('--iterations', type=int, default=20, help="snapshots read per session")
+    args = parser.parse_args()
+
+    runs = [
+        ('threads', lambda: run_threaded(args.sessions, args.command_executor, args.base_url, args.iterations)),
+        ('asyncio', lambda: asyncio.run(run_async(args.sessions, args.command_executor, args.base_url,
+                                                  args.iterations))),
+    ]
+    print(f"{'client':<8} {'wall':>8} {'cpu':>8} {'rss growth':>10} {'threads':>8}")
+    for name, run in runs:
+        with ResourceSampler() as sampler:
+            run()
+        print(f"{name:<8} {sampler.wall:>7.2f}s {sampler.cpu_seconds:>7.2f}s "
+              f"{(sampler.peak_rss - sampler.base_rss) / 2 ** 20:>8.1f}MB {sampler.peak_threads:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Microbenchmarks of page-object operations against the stub WebDriver endpoint.
+
+Every operation in OPERATIONS runs --iterations times, each time with an empty element cache,
+against benchmarks.webdriver_stub. The stub runs in a subprocess so that its work is not
+counted as CPU time of the client, and it delays every command by --latency milliseconds to mimic
+a remote grid. Recorded per operation are the median wall time, the number of WebDriver
+commands sent and the median Python CPU time of this process.
+
+Results are saved as a baseline with --save-baseline and compared to it with --compare, which
+exits with 1 if an operation sends more commands than before or its wall or CPU time grew by
+more than --threshold:
+
+    python -m benchmarks.page_objects --latency 20 --save-baseline
+    python -m benchmarks.page_objects --latency 20 --compare
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from selenium import webdriver
+
+from features.pages.base_page import BasePage
+from features.pages.cart_page import CartPage
+from features.pages.checkout_page import CheckoutPage
+from features.pages.locators import ElementCache
+from features.pages.product_page import ProductPage
+
+DEFAULT_BASELINE = 'reports/benchmarks/page-objects.json'
+# Differences below these are noise, whatever the relative change.
+MIN_WALL_DELTA_MS = 1.0
+MIN_CPU_DELTA_MS = 0.5
+
+OPERATIONS = {
+    'BasePage.find_element': lambda pages: pages['cart'].find_element(CartPage.CART_TITLE),
+    'BasePage.click_element': lambda pages: pages['cart'].click_element(CartPage.UPDATE_CART_BUTTON),
+    'BasePage.enter_text': lambda pages: pages['cart'].enter_text(CartPage.COUPON_INPUT, 'VALIDCOUPON'),
+    'BasePage.is_element_visible (hidden)': lambda pages: pages['cart'].is_element_visible(CartPage.ERROR_MESSAGE, 1),
+    'CartPage.get_unit_price': lambda pages: pages['cart'].get_unit_price(),
+    'CartPage.get_total_price': lambda pages: pages['cart'].get_total_price(),
+    'CartPage.get_quantity': lambda pages: pages['cart'].get_quantity(),
+    'CartPage.snapshot': lambda pages: pages['cart'].snapshot(),
+    'CartPage.load': lambda pages: pages['cart'].load(),
+    'ProductPage.click_accordion_button': lambda pages: pages['product'].click_accordion_button(1),
+    'ProductPage.snapshot': lambda pages: pages['product'].snapshot(),
+    'CheckoutPage.fill_in_checkout_form': lambda pages: pages['checkout'].fill_in_checkout_form(
+        email='test@example.com', first_name='John', last_name='Doe', phone='123456789', address='123 Main St',
+        city='Testville', postcode='12345', country='US'),
+}
+
+
+def count_commands(browser):
+    """
+    Count the commands a session sends, with as little overhead as possible.
+
+    :return: one-element list holding the running count
+    """
+    count = [0]
+    execute = browser.command_executor.execute
+
+    def counted_execute(command, params):
+        count[0] += 1
+        return execute(command, params)
+
+    browser.command_executor.execute = counted_execute
+    return count
+
+
+def start_stub(latency_ms, jitter_ms):
+    """
+    Start benchmarks.webdriver_stub on a free port in a subprocess.
+
+    :return: (process, endpoint URL)
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.webdriver_stub', '--port', '0',
+                                '--latency', str(latency_ms), '--jitter', str(jitter_ms)],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        raise RuntimeError("The WebDriver stub did not start")
+    return process, line.split()[-1]
+
+
+def measure(operation, pages, browser, commands, iterations):
+    """
+    :return: dict with the median wall_ms, cpu_ms and commands of one operation
+    """
+    walls, cpus, counts = [], [], []
+    for _ in range(iterations):
+        ElementCache.for_browser(browser).clear()
+        sent = commands[0]
+        cpu = time.process_time()
+        started = time.perf_counter()
+        operation(pages)
+        walls.append((time.perf_counter() - started) * 1000)
+        cpus.append((time.process_time() - cpu) * 1000)
+        counts.append(commands[0] - sent)
+    return {'wall_ms': round(statistics.median(walls), 3), 'cpu_ms': round(statistics.median(cpus), 3),
+            'commands': int(statistics.median(counts))}
+
+
+def run(endpoint, names, iterations, wait_strategy='event'):
+    """
+    Benchmark operations in one session of an endpoint.
+
+    :param endpoint: WebDriver endpoint URL
+    :param names: keys of OPERATIONS to run
+    :param iterations: measured runs per operation, after one warm-up run
+    :return: dict of operation name to its results
+    """
+    browser = webdriver.Remote(options=webdriver.ChromeOptions(), command_executor=endpoint)
+    commands = count_commands(browser)
+    BasePage.WAIT_STRATEGY = wait_strategy
+    try:
+        pages = {'cart': CartPage(browser), 'product': ProductPage(browser), 'checkout': CheckoutPage(browser)}
+        results = {}
+        for name in names:
+            OPERATIONS[name](pages)
+            results[name] = measure(OPERATIONS[name], pages, browser, commands, iterations)
+        return results
+    finally:
+        browser.quit()
+
+
+def compare(baseline, results, threshold):
+    """
+    :return: list of (operation, baseline result, result, list of regression descriptions)
+    """
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        regressions = []
+        if before:
+            if result['commands'] > before['commands']:
+                regressions.append(f"commands {before['commands']} -> {result['commands']}")
+            for key, floor in (('wall_ms', MIN_WALL_DELTA_MS), ('cpu_ms', MIN_CPU_DELTA_MS)):
+                delta = result[key] - before[key]
+                if delta > floor and delta > before[key] * threshold:
+                    regressions.append(f"{key[:-3]} +{delta / before[key]:.0%}" if before[key] else f"{key[:-3]} +{delta:.1f}ms")
+        rows.append((name, before, result, regressions))
+    return rows
+
+
+def print_results(rows):
+    print(f"{'operation':<40} {'wall':>9} {'Δ':>6} {'commands':>9} {'cpu':>8} {'Δ':>6}")
+    for name, before, result, regressions in rows:
+        def change(key):
+            if not before or not before[key]:
+                return ''
+            return f"{(result[key] - before[key]) / before[key]:+.0%}"
+        commands = f"{result['commands']}" + (f" ({before['commands']})" if before and before['commands'] != result['commands']
+                                              else '')
+        flag = '  REGRESSION: ' + ', '.join(regressions) if regressions else ''
+        print(f"{name:<40} {result['wall_ms']:>7.1f}ms {change('wall_ms'):>6} {commands:>9} "
+              f"{result['cpu_ms']:>6.2f}ms {change('cpu_ms'):>6}{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('operations', nargs='*', help="operations to run, defaults to all of them")
+    parser.add_argument('--latency', type=float, default=20.0, help="milliseconds the stub delays every command by")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra milliseconds per command")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--wait-strategy', choices=('event', 'poll'), default='event')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to --baseline")
+    parser.add_argument('--compare', action='store_true', help="compare the results to --baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative growth of wall or CPU time flagged")
+    args = parser.parse_args(argv)
+    unknown = set(args.operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    settings = {'latency_ms': args.latency, 'jitter_ms': args.jitter, 'wait_strategy': args.wait_strategy}
+    baseline = {}
+    if args.compare:
+        with open(args.baseline) as stored:
+            data = json.load(stored)
+        if data['settings'] != settings:
+            print(f"Warning: the baseline was recorded with {data['settings']}, comparing runs with {settings}")
+        baseline = data['results']
+
+    process, endpoint = start_stub(args.latency, args.jitter)
+    try:
+        results = run(endpoint, args.operations or list(OPERATIONS), args.iterations, args.wait_strategy)
+    finally:
+        process.terminate()
+        process.wait()
+
+    rows = compare(baseline, results, args.threshold)
+    print_results(rows)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        with open(args.baseline, 'w') as output:
+            json.dump({'settings': settings, 'results': results}, output, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    regressions = sum(1 for row in rows if row[-1])
+    if regressions:
+        print(f"{regressions} operations regressed against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Compare the overhead of the 'event' and 'poll' wait strategies of BasePage.
+
+Each sample schedules an element to be inserted into a blank page after a delay and then
+waits for it; the overhead is the time the wait took beyond that delay. Run it against any
+WebDriver endpoint:
+
+    python -m benchmarks.wait_overhead --command-executor http://localhost:4444/wd/hub
+"""
+import argparse
+import statistics
+import time
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+from features.pages.base_page import BasePage
+
+SCHEDULE_INSERT_SCRIPT = """
+document.body.innerHTML = '';
+setTimeout(function () {
+    var el = document.createElement('div');
+    el.className = 'late-element';
+    el.textContent = 'ready';
+    document.body.appendChild(el);
+}, arguments[0]);
+"""
+
+
+def measure(page, strategy, delay, samples):
+    """
+    :return: list of wait overheads in seconds
+    """
+    page.WAIT_STRATEGY = strategy
+    overheads = []
+    for _ in range(samples):
+        page.browser.execute_script(SCHEDULE_INSERT_SCRIPT, int(delay * 1000))
+        started = time.perf_counter()
+        page.find_element((By.CSS_SELECTOR, '.late-element'))
+        overheads.append(time.perf_counter() - started - delay)
+    return overheads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--command-executor', default="http://localhost:4444/wd/hub")
+    parser.add_argument('--delay', type=float, default=0.3, help="seconds before the element appears")
+    parser.add_argument('--samples', type=int, default=20)
+    args = parser.parse_args()
+
+    browser = webdriver.Remote(options=webdriver.ChromeOptions(), command_executor=args.command_executor)
+    try:
+        browser.get("about:blank")
+        page = BasePage(browser)
+        print(f"{'strategy':<8} {'mean':>9} {'median':>9} {'max':>9}")
+        for strategy in ('poll', 'event'):
+            overheads = measure(page, strategy, args.delay, args.samples)
+            print(f"{strategy:<8} {statistics.mean(overheads) * 1000:>7.1f}ms {statistics.median(overheads) * 1000:>7.1f}ms "
+                  f"{max(overheads) * 1000:>7.1f}ms")
+    finally:
+        browser.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+"""
+Stub W3C WebDriver endpoint for measuring the client side of the page objects.
+
+It answers the commands and the scripts of features/pages/scripts.py the page objects send,
+without a browser: every Locator declared on a page object matches one element (three for
+Locators with many=True) whose text, attributes and visibility come from FIELDS, regardless of
+the URL. Typing and selecting update the element's value; nothing else changes state. Each
+command is delayed by --latency milliseconds plus up to --jitter, to mimic a remote grid:
+
+    python -m benchmarks.webdriver_stub --port 4445 --latency 40
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium.webdriver.common.by import By
+
+from features.pages.async_webdriver import ELEMENT_KEY
+from features.pages.cart_page import CartPage
+from features.pages.checkout_page import CheckoutPage
+from features.pages.main_page import MainPage
+from features.pages.product_page import ProductPage
+from features.pages.scripts import (BATCH_SCRIPT, CAPTURE_SCRIPT, PAGE_LOAD_SCRIPT, PERFORMANCE_SCRIPT,
+                                    SNAPSHOT_SCRIPT, WAIT_SCRIPT)
+
+PAGES = (MainPage, ProductPage, CartPage, CheckoutPage)
+
+# Text, attributes and visibility of the elements of Locator fields, by field name.
+FIELDS = {
+    'cart_title': {'text': "Your Shopping Cart"},
+    'product_description': {'text': "Nature's Gift Bone Broth"},
+    'quantity_input': {'tag': 'input', 'attributes': {'value': '3'}},
+    'unit_price': {'text': "£29.99"},
+    'total_price': {'text': "£89.97"},
+    'purchase_type': {'text': "Subscribe & Save"},
+    'success_message': {'text': "Item has been added to cart"},
+    'discount_amount': {'visible': False},
+    'error_message': {'visible': False},
+    'empty_cart_message': {'visible': False},
+    'checkout_error_message': {'visible': False},
+    'faq_title': {'text': "Frequently Asked Questions"},
+    'accordion_sections': {'attributes': {'class': 'accordion-collapse'}},
+    'expanded_sections': {'count': 0},
+    'country_selector': {'tag': 'select', 'attributes': {'value': ''}},
+}
+INPUT_FIELDS = ('email_input', 'first_name_input', 'last_name_input', 'phone_input', 'address_input', 'city_input',
+                'postcode_input', 'coupon_input')
+LINKS = ("Nature's Gift Bone Broth", "Aeons Total Harmony")
+
+
+def fixture():
+    """
+    :return: dict of (strategy, value) to the list of element dicts it matches
+    """
+    elements = {}
+    for page in PAGES:
+        for name, locator in page.locators().items():
+            spec = dict(FIELDS.get(name, {}))
+            if name in INPUT_FIELDS:
+                spec.setdefault('tag', 'input')
+                spec.setdefault('attributes', {'value': ''})
+            count = spec.pop('count', 3 if locator.many else 1)
+            elements[(locator[0], locator[1])] = [
+                {'tag': spec.get('tag', 'div'), 'text': spec.get('text', ''), 'visible': spec.get('visible', True),
+                 'attributes': dict(spec.get('attributes', {}))} for _ in range(count)]
+    for text in LINKS:
+        elements[(By.LINK_TEXT, text)] = [{'tag': 'a', 'text': text, 'visible': True, 'attributes': {}}]
+    return elements
+
+
+class Session:
+    """
+    Elements and URL of one stub session.
+    """
+
+    def __init__(self):
+        self.url = 'about:blank'
+        self.elements = fixture()
+        self.ids = {}
+        self.refs = {}
+        self._counter = itertools.count(1)
+
+    def ref(self, key, index):
+        if (key, index) not in self.ids:
+            element_id = f"stub-{next(self._counter)}"
+            self.ids[(key, index)] = element_id
+            self.refs[element_id] = self.elements[key][index]
+        return {ELEMENT_KEY: self.ids[(key, index)]}
+
+    def locate(self, by, value, condition='present'):
+        matches = self.elements.get((by, value), [])
+        return [self.ref((by, value), index) for index, element in enumerate(matches)
+                if condition == 'present' or element['visible']]
+
+    def element(self, reference):
+        element_id = reference[ELEMENT_KEY] if isinstance(reference, dict) else reference
+        return self.refs[element_id]
+
+    def run_script(self, script, args):
+        """
+        :return: what the script would return in a browser
+        """
+        if script == WAIT_SCRIPT:
+            by, value, condition, many = args[:4]
+            found = self.locate(by, value, condition)
+            return (found or None) if many else (found[0] if found else None)
+        if script == BATCH_SCRIPT:
+            return self._batch(args[0])
+        if script == SNAPSHOT_SCRIPT:
+            return {'url': self.url, 'title': 'Stub', 'fields': {
+                field['name']: [{'text': element['text'], 'visible': element['visible'],
+                                 'attributes': {name: element['attributes'].get(name) for name in field['attributes']}}
+                                for element in self.elements.get((field['by'], field['value']), [])]
+                for field in args[0]}}
+        if script == PAGE_LOAD_SCRIPT:
+            return {'ready': True, 'readyState': 'complete'}
+        if script == PERFORMANCE_SCRIPT:
+            return {'url': self.url, 'timeOrigin': 0, 'ttfb': 50, 'dcl': 200, 'load': 400, 'ready': 300,
+                    'fp': 100, 'fcp': 120, 'lcp': 250, 'requests': 1, 'bytes': 1024, 'resourceBytes': {}}
+        if script == CAPTURE_SCRIPT:
+            return {'url': self.url, 'title': 'Stub', 'readyState': 'complete', 'html': '<html></html>', 'console': []}
+        if script.startswith('/* getAttribute */'):
+            element = self.element(args[0])
+            return element['attributes'].get(args[1], element['text'] if args[1] == 'innerText' else None)
+        if script.startswith('/* isDisplayed */'):
+            return self.element(args[0])['visible']
+        if 'performance.timeOrigin' in script:
+            return 0
+        return None
+
+    def _batch(self, operations):
+        native = []
+        for index, operation in enumerate(operations):
+            found = self.locate(operation['by'], operation['value'])
+            if not found:
+                return {'ok': False, 'index': index, 'error': 'element not found'}
+            element = self.element(found[0])
+            if operation['op'] in ('type', 'select') and not operation.get('native'):
+                previous = '' if operation.get('clear', True) else element['attributes'].get('value', '')
+                element['attributes']['value'] = previous + operation['text']
+            elif operation['op'] == 'clear':
+                element['attributes']['value'] = ''
+            if operation.get('native'):
+                native.append(found[0])
+        return {'ok': True, 'native': native}
+
+
+class WebDriverStubHandler(BaseHTTPRequestHandler):
+    """
+    Routes W3C WebDriver commands to the Session they address.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this, delayed ACKs add 40 ms to every command.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, value, status=200):
+        body = json.dumps({'value': value}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, error, message, status=404):
+        self._send({'error': error, 'message': message, 'stacktrace': ''}, status)
+
+    def _handle(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        self.server.delay()
+        path = re.sub(r'^/wd/hub', '', self.path.split('?')[0]).rstrip('/')
+        if path == '/session' and method == 'POST':
+            session_id = self.server.new_session()
+            return self._send({'sessionId': session_id, 'capabilities': {
+                'browserName': 'stub', 'browserVersion': '1.0', 'platformName': 'any', 'pageLoadStrategy': 'eager'}})
+        match = re.match(r'^/session/([^/]+)(?:/(.*))?$', path)
+        session = match and self.server.sessions.get(match.group(1))
+        if session is None:
+            return self._error('invalid session id', f"No session at {path}")
+        command = match.group(2) or ''
+        if not command and method == 'DELETE':
+            self.server.sessions.pop(match.group(1), None)
+            return self._send(None)
+        with self.server.lock:
+            self.server.commands += 1
+        if command == 'url':
+            if method == 'POST':
+                session.url = body['url']
+                return self._send(None)
+            return self._send(session.url)
+        if command == 'title':
+            return self._send('Stub')
+        if command in ('element', 'elements'):
+            found = session.locate(body['using'], body['value'])
+            if command == 'elements':
+                return self._send(found)
+            return self._send(found[0]) if found else self._error('no such element', f"No element {body}")
+        if command in ('execute/sync', 'execute/async'):
+            return self._send(session.run_script(body['script'], body.get('args', [])))
+        element = re.match(r'^element/([^/]+)/(.+)$', command)
+        if element:
+            try:
+                target = session.element(element.group(1))
+            except KeyError:
+                return self._error('stale element reference', f"Unknown element {element.group(1)}")
+            action = element.group(2)
+            if action == 'text':
+                return self._send(target['text'])
+            if action == 'name':
+                return self._send(target['tag'])
+            if action == 'displayed':
+                return self._send(target['visible'])
+            if action == 'enabled':
+                return self._send(True)
+            if action.startswith(('attribute/', 'property/')):
+                return self._send(target['attributes'].get(action.split('/', 1)[1]))
+            if action == 'rect':
+                return self._send({'x': 0, 'y': 0, 'width': 100, 'height': 20})
+            if action == 'clear':
+                target['attributes']['value'] = ''
+            elif action == 'value':
+                target['attributes']['value'] = target['attributes'].get('value', '') + body.get('text', '')
+            return self._send(None)
+        return self._send(None)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class WebDriverStub(ThreadingHTTPServer):
+    """
+    Stub WebDriver endpoint delaying every command by a configurable latency.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0):
+        """
+        :param latency: seconds every command is delayed by
+        :param jitter: up to this many seconds are added at random to every delay
+        """
+        super().__init__((host, port), WebDriverStubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.sessions = {}
+        self.commands = 0
+        self.lock = threading.Lock()
+        self._session_ids = itertools.count(1)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def new_session(self):
+        session_id = f"stub-session-{next(self._session_ids)}"
+        self.sessions[session_id] = Session()
+        return session_id
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def start(self):
+        """
+        Serve requests from a daemon thread and return immediately.
+        """
+        threading.Thread(target=self.serve_forever, name='webdriver-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4445)
+    parser.add_argument('--latency', type=float, default=0.0, help="milliseconds every command is delayed by")
+    parser.add_argument('--jitter', type=float, default=0.0, help="up to this many extra milliseconds per command")
+    args = parser.parse_args()
+    server = WebDriverStub(args.host, args.port, args.latency / 1000, args.jitter / 1000)
+    print(f"WebDriver stub listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
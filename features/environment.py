@@ -1,23 +1,465 @@
+import asyncio
+import logging
+import os
+import time
+import aiohttp
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.proxy import Proxy, ProxyType
+from features.pages.async_pages import (AsyncCartPage, AsyncCheckoutPage, AsyncMainPage, AsyncProductPage,
+                                       BlockingAdapter)
+from features.pages.async_webdriver import AsyncWebDriver, connection_pool
+from features.pages.base_page import BasePage
 from features.pages.main_page import MainPage
 from features.pages.product_page import ProductPage
 from features.pages.cart_page import CartPage
 from features.pages.checkout_page import CheckoutPage
+from features.pages.locators import ElementCache
+from features.pages.navigation import TRANSITIONS, NavigationPlanner
+from features.pages.performance import PerformanceMonitor, platform_of
+from features.pages.request_blocking import LoadBaseline, RequestBlocker
+from features.pages.wait_stats import AdaptiveTimeouts, LocatorTimings
+from features.support.artifacts import ArtifactPipeline
+from features.support.cart_seeder import AsyncCartSeeder, CartSeeder
+from features.support.checkpoints import CheckpointStore, capture_state, checkpoint_length, restore_state
+from features.support.command_tracer import CommandTracer, histogram
+from features.support.fake_webdriver import FakeWebDriver
+from features.support.filtering_proxy import FilteringProxy
+from features.support.impact import ImpactIndex
+from features.support.metrics_store import MetricsStore, compare, load, print_comparison, summarize
+from features.support.preflight import run_preflight
+from features.support.resource_monitor import ConcurrencyController, ResourceMonitor
+from features.support.session_pool import SessionPool
+from features.support.sharding import TimingStore, current_platform, timing_key
+from features.support.storefront_replay import RecordingProxy, ReplayServer, StorefrontArchive
+from features.support.stub_storefront import StubStorefront
 
-def before_all(context):
-    desired_capabilities = {
-        'browserName': 'chrome'
-    }
-    context.browser = webdriver.Remote(
-        desired_capabilities=desired_capabilities,
-        command_executor="http://localhost:4444/wd/hub"
+logger = logging.getLogger(__name__)
+
+# Options of subsystems that drive the synchronous Selenium client and have no async counterpart.
+SYNC_ONLY_OPTIONS = ('request_blocking', 'adaptive_timeouts', 'performance_metrics', 'navigation_planner',
+                     'resource_monitor', 'checkpoints', 'artifacts', 'trace')
+
+def create_browser(userdata, proxy=None):
+    if userdata.get('driver', 'remote') == 'fake':
+        return FakeWebDriver()
+    options = webdriver.ChromeOptions()
+    # Return from navigation at DOMContentLoaded; BasePage.wait_for_page_to_load decides when a page is ready.
+    options.page_load_strategy = userdata.get('page_load_strategy', 'eager')
+    if proxy is not None:
+        options.proxy = Proxy({'proxyType': ProxyType.MANUAL, 'httpProxy': proxy.address, 'sslProxy': proxy.address})
+    return webdriver.Remote(
+        options=options,
+        command_executor=userdata.get('command_executor', "http://localhost:4444/wd/hub")
     )
 
+def start_storefront(context):
+    userdata = context.config.userdata
+    context.base_url = userdata.get('base_url', BasePage.DEFAULT_BASE_URL)
+    # The fake driver runs no page scripts, so by default it gets the stub storefront rather than the live site.
+    context.storefront_mode = userdata.get('storefront', 'stub' if userdata.get('driver') == 'fake' else 'live')
+    context.storefront_archive = userdata.get('storefront_archive', 'recordings/storefront.zip')
+    host = userdata.get('storefront_host', '127.0.0.1')
+    context.storefront_server = None
+    if context.storefront_mode == 'record':
+        context.storefront_server = RecordingProxy(context.base_url, host=host).start()
+    elif context.storefront_mode == 'replay':
+        archive = StorefrontArchive.load(context.storefront_archive)
+        context.storefront_server = ReplayServer(archive, host=host).start()
+    elif context.storefront_mode == 'stub':
+        context.storefront_server = StubStorefront(host=host).start()
+    elif context.storefront_mode != 'live':
+        raise ValueError(f"Unknown storefront mode '{context.storefront_mode}', expected live, record, replay or stub")
+    if context.storefront_server:
+        context.base_url = context.storefront_server.origin
+        logger.info("Storefront %s via %s", context.storefront_mode, context.base_url)
+
+def stop_storefront(context):
+    if context.storefront_server is None:
+        return
+    if context.storefront_mode == 'record':
+        os.makedirs(os.path.dirname(context.storefront_archive) or '.', exist_ok=True)
+        context.storefront_server.archive.save(context.storefront_archive)
+    context.storefront_server.stop()
+
+async def open_connection_pool(limit):
+    return connection_pool(limit=limit)
+
+def start_async_client(context):
+    """
+    With -D driver=async, give every scenario a session of its own from AsyncWebDriver on one event loop;
+    the async page objects and cart seeder are wrapped in a BlockingAdapter, so the steps stay synchronous.
+    """
+    userdata = context.config.userdata
+    enabled = [name for name in SYNC_ONLY_OPTIONS if userdata.get(name, 'off') != 'off']
+    if enabled:
+        raise ValueError(f"driver=async does not support {', '.join(enabled)}")
+    context.loop = asyncio.new_event_loop()
+    context.async_http = context.loop.run_until_complete(open_connection_pool(userdata.getint('pool_size', 1) * 2))
+
+def start_async_session(context):
+    userdata = context.config.userdata
+    capabilities = {'browserName': 'chrome', 'pageLoadStrategy': userdata.get('page_load_strategy', 'eager')}
+    context.browser = context.loop.run_until_complete(AsyncWebDriver.start(
+        context.async_http, userdata.get('command_executor', "http://localhost:4444/wd/hub"), capabilities))
+    context.main_page = BlockingAdapter(AsyncMainPage(context.browser, context.base_url), context.loop)
+    context.product_page = BlockingAdapter(AsyncProductPage(context.browser, context.base_url), context.loop)
+    context.cart_page = BlockingAdapter(AsyncCartPage(context.browser, context.base_url), context.loop)
+    context.checkout_page = BlockingAdapter(AsyncCheckoutPage(context.browser, context.base_url), context.loop)
+    context.cart_seeder = BlockingAdapter(AsyncCartSeeder(context.base_url, adapter=context.http_adapter), context.loop)
+
+def stop_async_session(context):
+    try:
+        context.loop.run_until_complete(context.browser.quit())
+    except (WebDriverException, aiohttp.ClientError) as error:
+        logger.warning("Could not quit session %s: %s", context.browser.session_id, error)
+
+def before_all(context):
+    userdata = context.config.userdata
+    # after_all also runs when before_all fails; it only cleans up what was started by then.
+    context.storefront_server = context.tracer = context.resource_monitor = context.http_adapter = None
+    context.loop = context.async_http = None
+    context.session_pool, context.owns_session_pool = None, False
+    context.load_baseline = context.locator_timings = context.metrics_store = None
+    context.checkpoints = context.artifacts = context.timing_store = None
+    context.filtering_proxies = []
+    context.navigations = dict.fromkeys(TRANSITIONS, 0)
+    context.blocking_saved = {'loads': 0, 'bytes': 0, 'duration': 0.0}
+    if userdata.get('preflight', 'off') == 'on':
+        # Raising here aborts the run before the storefront, proxies or any session are started.
+        run_preflight(context)
+    if userdata.get('driver', 'remote') not in ('remote', 'fake', 'async'):
+        raise ValueError(f"Unknown driver '{userdata['driver']}', expected remote, fake or async")
+    if userdata.get('driver') == 'async':
+        start_async_client(context)
+    start_storefront(context)
+    BasePage.WAIT_STRATEGY = userdata.get('wait_strategy', BasePage.WAIT_STRATEGY)
+    BasePage.QUIET_PERIOD = userdata.getfloat('quiet_period', BasePage.QUIET_PERIOD)
+    context.tracer = CommandTracer() if userdata.get('trace') else None
+    context.request_blocking = userdata.get('request_blocking', 'off')
+    if context.request_blocking not in ('cdp', 'proxy', 'baseline', 'off'):
+        raise ValueError(f"Unknown request_blocking '{context.request_blocking}', expected cdp, proxy, baseline or off")
+    context.load_baseline = LoadBaseline(userdata.get('load_baseline', 'reports/load-baseline.json'))
+    context.adaptive_timeouts = userdata.get('adaptive_timeouts', 'off')
+    if context.adaptive_timeouts not in ('on', 'record', 'off'):
+        raise ValueError(f"Unknown adaptive_timeouts '{context.adaptive_timeouts}', expected on, record or off")
+    if context.adaptive_timeouts != 'off':
+        context.locator_timings = LocatorTimings(userdata.get('wait_stats', 'reports/wait-stats.json'))
+    if userdata.get('artifacts', 'off') == 'on':
+        context.artifacts = ArtifactPipeline(
+            userdata.get('artifacts_dir', 'reports/artifacts'),
+            workers=userdata.getint('artifact_workers', 2),
+            max_queue=userdata.getint('artifact_queue', 16),
+            max_bytes=userdata.getint('artifact_memory_mb', 64) * 2 ** 20
+        )
+    if userdata.get('timings'):
+        # Under the same platform names as the parallel runner's plans, see sharding.current_platform.
+        context.timing_store = TimingStore(userdata['timings'])
+        context.timing_platform = userdata.get('platform') or current_platform()
+    if userdata.get('checkpoints', 'off') == 'on':
+        context.checkpoints = CheckpointStore(
+            userdata.get('checkpoints_dir', 'reports/checkpoints'),
+            ImpactIndex(),
+            max_age=userdata.getint('checkpoint_max_age', 1800)
+        )
+    if userdata.get('performance_metrics', 'off') == 'on':
+        context.metrics_store = MetricsStore(userdata.get('metrics_dir', 'reports/metrics'), userdata.get('metrics_run'),
+                                             shard=userdata.get('worker'))
+
+    def new_session():
+        started = time.perf_counter()
+        proxy = None
+        if context.request_blocking == 'proxy':
+            # The proxy is part of the session capabilities, so every session gets its own.
+            proxy = FilteringProxy(host=userdata.get('storefront_host', '127.0.0.1')).start()
+            context.filtering_proxies.append(proxy)
+        browser = create_browser(userdata, proxy)
+        if proxy is not None:
+            RequestBlocker.attach(browser, proxy)
+        if context.tracer:
+            context.tracer.record('newSession', time.perf_counter() - started)
+            context.tracer.instrument(browser)
+        return browser
+
+    context.http_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=userdata.getint('pool_size', 1) * 2)
+    if context.loop:
+        return
+    # The parallel runner hands each worker's own pool in through user data.
+    context.session_pool = userdata.get('session_pool')
+    context.owns_session_pool = context.session_pool is None
+    if context.owns_session_pool:
+        context.session_pool = SessionPool(
+            new_session,
+            size=userdata.getint('pool_size', 1),
+            max_uses=userdata.getint('session_max_uses', 20)
+        ).start()
+    if userdata.get('resource_monitor', 'off') == 'on':
+        controller = ConcurrencyController(
+            context.session_pool,
+            session_memory_mb=userdata.getint('session_memory_mb', 1024),
+            memory_high=userdata.getfloat('memory_high_water', 85.0),
+            memory_low=userdata.getfloat('memory_low_water', 70.0)
+        )
+        context.resource_monitor = ResourceMonitor(
+            context.session_pool,
+            userdata.get('resources_dir', 'reports/resources'),
+            userdata.get('metrics_run'),
+            interval=userdata.getfloat('resource_interval', 1.0),
+            controller=controller,
+            shard=userdata.get('worker')
+        ).start()
+
 def before_scenario(context, scenario):
-    context.main_page = MainPage(context.browser)
-    context.product_page = ProductPage(context.browser)
-    context.cart_page = CartPage(context.browser)
-    context.checkout_page = CheckoutPage(context.browser)
+    if context.storefront_mode == 'record':
+        context.storefront_server.current_scenario = scenario.name
+    # Set before leasing, so that after_scenario does not release a session this scenario never got.
+    context.browser = None
+    context.checkpoint = None
+    if context.loop:
+        start_async_session(context)
+        return
+    context.browser = context.session_pool.lease()
+    if context.resource_monitor:
+        context.resource_monitor.label(context.browser, scenario.name)
+    entries = scenario_blocking(scenario)
+    blocker = RequestBlocker.for_browser(context.browser)
+    if blocker is None and (context.request_blocking in ('cdp', 'baseline') or entries):
+        blocker = RequestBlocker.attach(context.browser)
+    if blocker:
+        if context.request_blocking == 'baseline':
+            entries = ()
+        elif context.request_blocking == 'off' and entries is None:
+            # Without request_blocking only the scenarios tagged @block=... block anything.
+            entries = ()
+        blocker.scenario_entries = entries
+    if context.metrics_store:
+        PerformanceMonitor.attach(context.browser, context.config.userdata.get('platform'))
+    if context.config.userdata.get('navigation_planner', 'off') == 'on':
+        NavigationPlanner.attach(context.browser)
+    if context.locator_timings:
+        AdaptiveTimeouts.attach(context.browser, context.locator_timings,
+                                context.config.userdata.get('platform') or platform_of(context.browser),
+                                margin=context.config.userdata.getfloat('timeout_margin', 3.0),
+                                enabled=context.adaptive_timeouts == 'on')
+    context.main_page = MainPage(context.browser, context.base_url)
+    context.product_page = ProductPage(context.browser, context.base_url)
+    context.cart_page = CartPage(context.browser, context.base_url)
+    context.checkout_page = CheckoutPage(context.browser, context.base_url)
+    context.cart_seeder = CartSeeder(context.base_url, adapter=context.http_adapter)
+    prepare_checkpoint(context, scenario)
+
+def before_step(context, step):
+    checkpoint = context.checkpoint
+    if checkpoint and checkpoint['restore'] and step is context.scenario.steps[0]:
+        try:
+            restore_state(context.browser, checkpoint['restore']['state'])
+        except WebDriverException:
+            # The steps are gone from the scenario already; let the next run save a fresh checkpoint.
+            context.checkpoints.discard(checkpoint['steps'], checkpoint['platform'], context.base_url)
+            raise
+        checkpoint['restore'] = None
+    if context.resource_monitor:
+        context.resource_monitor.label(context.browser, context.scenario.name, step.name)
+    if context.storefront_mode == 'record':
+        context.storefront_server.current_step = step.name
+    if context.tracer:
+        context.tracer.scenario, context.tracer.step = context.scenario.name, step.name
+        context.trace_mark = len(context.tracer.records)
+
+def after_step(context, step):
+    if step.status in ('failed', 'error') and context.artifacts:
+        context.artifacts.capture(context.browser, f"{context.scenario.name}/{step.name}",
+                                  {'step': f"{step.keyword} {step.name}", 'location': str(step.location),
+                                   'error': step.error_message, 'session': context.browser.session_id})
+    checkpoint = context.checkpoint
+    if checkpoint and not checkpoint['restored'] and step is checkpoint['steps'][-1]:
+        if all(prefix_step.status == 'passed' for prefix_step in checkpoint['steps']):
+            try:
+                context.checkpoints.save(checkpoint['steps'], checkpoint['platform'], context.base_url,
+                                         capture_state(context.browser))
+            except WebDriverException as error:
+                logger.warning("Could not save the checkpoint after '%s': %s", step.name, error.msg)
+    pages = (context.main_page, context.product_page, context.cart_page, context.checkout_page)
+    saved = sum(page.pop_round_trips_saved() for page in pages)
+    if saved:
+        logger.info("Step '%s': batching saved %d WebDriver round trips", step.name, saved)
+    if context.tracer:
+        records = [record for record in context.tracer.records[context.trace_mark:] if record['step'] == step.name]
+        logger.info("Step '%s': %d WebDriver commands in %.2fs %s", step.name, len(records),
+                    sum(record['duration'] for record in records),
+                    histogram(record['duration'] for record in records))
+        context.tracer.step = None
+
+def prepare_checkpoint(context, scenario):
+    """
+    Drop the steps of a @checkpoint=N prefix from the scenario if a valid checkpoint of it exists;
+    before_step restores it in their place, after_step saves one once the prefix has passed.
+    """
+    context.checkpoint = None
+    length = checkpoint_length(scenario)
+    if not context.checkpoints or not length:
+        return
+    platform = context.config.userdata.get('platform') or platform_of(context.browser)
+    steps = list(scenario.background_steps) + scenario.steps[:length]
+    context.checkpoint = {'steps': steps, 'platform': platform, 'restore': None, 'restored': False}
+    # A recording has to contain the requests of every step.
+    if context.storefront_mode == 'record' or len(scenario.steps) <= length:
+        return
+    saved = context.checkpoints.load(steps, platform, context.base_url)
+    if saved:
+        scenario.steps = scenario.steps[length:]
+        context.checkpoint.update(restore=saved, restored=True)
+        context.checkpoints.restored(saved, length)
+        logger.info("Scenario '%s': restored the checkpoint after '%s' instead of running %d steps",
+                    scenario.name, steps[-1].name, length)
+
+def scenario_blocking(scenario):
+    """
+    :return: resource classes and URL patterns from a @block=image,stub:analytics tag; () for @block=none;
+        None to use the BLOCKED_RESOURCES of the page objects
+    """
+    for tag in scenario.effective_tags:
+        if tag.startswith('block='):
+            value = tag[len('block='):]
+            return () if value == 'none' else tuple(entry for entry in value.split(',') if entry)
+    return None
+
+def report_page_loads(context, blocker):
+    for page_load in blocker.loads:
+        if not page_load['blocked']:
+            context.load_baseline.add(page_load)
+            continue
+        saved = context.load_baseline.saved(page_load)
+        if saved is None:
+            logger.info("%s load: %.1f KB in %.2fs, no unblocked baseline yet", page_load['page'],
+                        page_load['bytes'] / 1024, page_load['duration'])
+            continue
+        context.blocking_saved['loads'] += 1
+        context.blocking_saved['bytes'] += saved[0]
+        context.blocking_saved['duration'] += saved[1]
+        logger.info("%s load: %.1f KB in %.2fs, saved %.1f KB and %.2fs against the unblocked baseline",
+                    page_load['page'], page_load['bytes'] / 1024, page_load['duration'], saved[0] / 1024, saved[1])
+    blocker.loads.clear()
+
+def report_metrics(context):
+    baseline = context.config.userdata.get('metrics_baseline')
+    store = context.metrics_store
+    # The parallel runner compares a run once it merged the files of its workers.
+    if not store or store.shard or not baseline or not os.path.exists(store.path):
+        return
+    rows = compare(summarize(load(store.directory, baseline)), summarize(load(store.directory, store.run)),
+                   context.config.userdata.getfloat('metrics_threshold', 0.2))
+    print_comparison(rows)
+    regressions = sum(1 for row in rows if row[-1])
+    if regressions:
+        logger.warning("%d page timings regressed against run '%s'", regressions, baseline)
+
+def report_locator_timings(context):
+    timings = context.locator_timings
+    timings.save()
+    summary_path = context.config.userdata.get('wait_stats_summary', 'reports/wait-stats-summary.json')
+    timings.export(summary_path)
+    for row in timings.summary()[:5]:
+        if row['count']:
+            logger.info("Slow locator %s.%s %s=%s (%s): p50 %.0f ms, p99 %.0f ms over %d waits, %d timeouts",
+                        row['page'], row['field'] or '-', row['by'], row['value'], row['condition'], row['p50_ms'],
+                        row['p99_ms'], row['count'], row['timeouts'])
+    logger.info("Locator wait statistics written to %s", summary_path)
+
+def after_scenario(context, scenario):
+    if context.timing_store and scenario.status.name in ('passed', 'failed'):
+        context.timing_store.update(context.timing_platform, timing_key(scenario.feature.name, scenario.name),
+                                    scenario.duration)
+    if context.browser is None:
+        return
+    if context.loop:
+        stop_async_session(context)
+        return
+    blocker = RequestBlocker.for_browser(context.browser)
+    if blocker:
+        report_page_loads(context, blocker)
+        blocker.reset()
+    monitor = PerformanceMonitor.for_browser(context.browser)
+    if monitor:
+        context.metrics_store.append(monitor.drain())
+    planner = NavigationPlanner.for_browser(context.browser)
+    if planner:
+        counts = planner.pop_counts()
+        for transition, count in counts.items():
+            context.navigations[transition] += count
+        if sum(counts.values()) > counts['get']:
+            logger.info("Navigations in '%s': %d pages reused, %d anchor and %d history navigations instead of %d "
+                        "loads", scenario.name, counts['reuse'], counts['anchor'], counts['history'], counts['get'])
+    stats = ElementCache.for_browser(context.browser).stats()
+    logger.info("Element cache after '%s': %d hits, %d misses, %d stale evictions",
+                scenario.name, stats['hits'], stats['misses'], stats['stale'])
+    errored = any(step.exception is not None and not isinstance(step.exception, AssertionError)
+                  for step in scenario.steps)
+    oversized = False
+    monitor = context.resource_monitor
+    if monitor:
+        monitor.label()
+        peaks = monitor.scenario_peaks(scenario.name)
+        if peaks['samples']:
+            logger.info("Resources of '%s': mean CPU %.0f%%, peak %.0f MB in the browser processes, host memory at "
+                        "up to %.0f%%", scenario.name, peaks['cpu_mean'], peaks['peak_rss_mb'],
+                        peaks['peak_memory_percent'])
+        oversized = monitor.controller.should_recycle(context.browser)
+        if oversized:
+            logger.warning("Recycling the session of '%s': its processes use more than %d MB", scenario.name,
+                           monitor.controller.session_memory_mb)
+    context.session_pool.release(context.browser, failed=errored, recycle=oversized)
 
 def after_all(context):
-    context.browser.quit()
+    if context.tracer:
+        context.tracer.log_rankings()
+        context.tracer.export(context.config.userdata['trace'])
+    if context.resource_monitor:
+        context.resource_monitor.stop()
+        logger.info("Resource samples written to %s", context.resource_monitor.path)
+    if context.session_pool and context.owns_session_pool:
+        metrics = context.session_pool.metrics()
+        logger.info("Session pool: %d leases, mean wait %.2fs, max wait %.2fs, reuse ratio %.0f%%, %d created, "
+                    "%d recycled, %d given up under load", metrics['leases'], metrics['lease_wait_mean'],
+                    metrics['lease_wait_max'], metrics['reuse_ratio'] * 100, metrics['sessions_created'],
+                    metrics['sessions_recycled'], metrics['sessions_throttled'])
+        context.session_pool.shutdown()
+    if context.http_adapter:
+        context.http_adapter.close()
+    if context.loop:
+        if context.async_http:
+            context.loop.run_until_complete(context.async_http.close())
+        context.loop.close()
+    if context.load_baseline and context.load_baseline.added:
+        context.load_baseline.save()
+    if context.timing_store:
+        context.timing_store.save()
+    if context.blocking_saved['loads']:
+        logger.info("Request blocking saved %.1f KB and %.2fs over %d page loads",
+                    context.blocking_saved['bytes'] / 1024, context.blocking_saved['duration'],
+                    context.blocking_saved['loads'])
+    avoided = sum(context.navigations.values()) - context.navigations['get']
+    if avoided:
+        logger.info("Navigation planner avoided %d of %d page loads", avoided, sum(context.navigations.values()))
+    if context.locator_timings:
+        report_locator_timings(context)
+    report_metrics(context)
+    if context.checkpoints and any(context.checkpoints.stats.values()):
+        stats = context.checkpoints.stats
+        logger.info("Checkpoints: %d restored, skipping %d steps that took %.1fs when saved, %d saved, %d invalidated",
+                    stats['restored'], stats['steps_skipped'], stats['seconds_skipped'], stats['saved'],
+                    stats['invalidated'])
+    if context.artifacts:
+        context.artifacts.close()
+        # The parallel runner keeps the manifests of every attempt of a scenario with its failures.
+        manifests = context.config.userdata.get('artifact_manifests')
+        if manifests is not None:
+            manifests.extend(context.artifacts.manifests)
+        stats = context.artifacts.stats
+        logger.info("Failure artifacts: %d captured in %.2fs, %d dropped, %d objects written, %d deduplicated, "
+                    "%.1f KB stored for %.1f KB raw", stats['captured'], stats['capture_seconds'], stats['dropped'],
+                    stats['written'], stats['deduplicated'], stats['stored_bytes'] / 1024, stats['raw_bytes'] / 1024)
+    for proxy in context.filtering_proxies:
+        proxy.stop()
+    stop_storefront(context)
@@ -0,0 +1,200 @@
+import logging
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from .scripts import BATCH_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+
+class ActionBatch:
+    """
+    Queue of element interactions that is flushed to the browser as a single script.
+
+    Filling a form through BasePage.enter_text costs a lookup, a clear and a send_keys per
+    field. A batch resolves and drives every queued element inside the page,
+    so the whole sequence costs one WebDriver round trip. Operations flagged as native are
+    still located, scrolled and cleared in the page, but the key events or click are sent
+    through WebDriver for sites that ignore synthetic events.
+
+    Use it as a context manager so the queue is flushed on exit:
+
+        with self.batch() as batch:
+            batch.type(EMAIL_INPUT, email)
+            batch.click(SUBMIT_BUTTON)
+    """
+
+    # Round trips the equivalent BasePage helper calls would cost for each operation.
+    UNBATCHED_COST = {'find': 1, 'scroll': 2, 'clear': 2, 'type': 3, 'select': 6, 'click': 2}
+
+    def __init__(self, page, timeout=10):
+        """
+        Initialize an empty batch for a page object.
+
+        :param page: BasePage instance whose browser executes the batch
+        :param timeout: seconds to wait for each queued element to appear
+        """
+        self.page = page
+        self.timeout = timeout
+        self.operations = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.operations = []
+
+    def _queue(self, op, by_locator, **options):
+        by, value = by_locator
+        self.operations.append(dict(options, op=op, by=by, value=value))
+        return self
+
+    def find(self, by_locator):
+        """
+        Require an element to be present before the following operations run.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        """
+        return self._queue('find', by_locator)
+
+    def scroll(self, by_locator):
+        """
+        Scroll an element into view.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        """
+        return self._queue('scroll', by_locator)
+
+    def clear(self, by_locator):
+        """
+        Clear the value of an input field.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        """
+        return self._queue('clear', by_locator)
+
+    def type(self, by_locator, text, clear=True, native=False):
+        """
+        Enter text into an input field, the batched equivalent of BasePage.enter_text.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param text: string to be entered into the input field
+        :param clear: clear the field before typing
+        :param native: send real key events through WebDriver instead of setting the value
+        """
+        return self._queue('type', by_locator, text=str(text), clear=clear, native=native)
+
+    def select(self, by_locator, option):
+        """
+        Select a dropdown option by its visible text or value.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param option: visible text or value of the option to select
+        """
+        return self._queue('select', by_locator, text=str(option))
+
+    def click(self, by_locator, native=False):
+        """
+        Click an element, the batched equivalent of BasePage.click_element.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param native: click through WebDriver instead of dispatching the click in the page
+        """
+        return self._queue('click', by_locator, native=native)
+
+    @staticmethod
+    def _segments(operations):
+        """
+        Split queued operations so that every native operation ends a segment.
+        """
+        segment = []
+        for operation in operations:
+            segment.append(operation)
+            if operation.get('native'):
+                yield segment
+                segment = []
+        if segment:
+            yield segment
+
+    def flush(self):
+        """
+        Execute the queued operations in the browser and empty the queue.
+
+        :return: number of WebDriver round trips saved compared to the unbatched helpers
+        :raises: TimeoutException if a queued element is not found within the timeout
+        """
+        operations, self.operations = self.operations, []
+        if not operations:
+            return 0
+        round_trips = 0
+        for segment in self._segments(operations):
+            result = self.page.browser.execute_async_script(BATCH_SCRIPT, segment, int(self.timeout * 1000))
+            round_trips += 1
+            self._check(segment, result)
+            for element in result['native']:
+                if segment[-1]['op'] == 'type':
+                    element.send_keys(segment[-1]['text'])
+                else:
+                    element.click()
+                round_trips += 1
+        return self._account(operations, round_trips)
+
+    @staticmethod
+    def _check(segment, result):
+        if not result.get('ok'):
+            failed = segment[result['index']]
+            message = f"Batched '{failed['op']}' on {(failed['by'], failed['value'])} failed: {result['error']}"
+            if result['error'] == 'element not found':
+                raise TimeoutException(message)
+            raise WebDriverException(message)
+
+    def _account(self, operations, round_trips):
+        saved = sum(self.UNBATCHED_COST[operation['op']] for operation in operations) - round_trips
+        self.page.round_trips_saved += saved
+        logger.debug("%s: flushed %d batched operations in %d round trips (%d saved)",
+                     type(self.page).__name__, len(operations), round_trips, saved)
+        return saved
+
+
+class AsyncActionBatch(ActionBatch):
+    """
+    ActionBatch for the async page objects, flushed on exit of an async with block:
+
+        async with self.batch() as batch:
+            batch.type(EMAIL_INPUT, email)
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.flush()
+        else:
+            self.operations = []
+
+    async def flush(self):
+        """
+        Execute the queued operations in the browser and empty the queue.
+
+        :return: number of WebDriver round trips saved compared to the unbatched helpers
+        :raises: TimeoutException if a queued element is not found within the timeout
+        """
+        operations, self.operations = self.operations, []
+        if not operations:
+            return 0
+        round_trips = 0
+        for segment in self._segments(operations):
+            result = await self.page.browser.execute_async_script(BATCH_SCRIPT, segment, int(self.timeout * 1000))
+            round_trips += 1
+            self._check(segment, result)
+            for element in result['native']:
+                if segment[-1]['op'] == 'type':
+                    await element.send_keys(segment[-1]['text'])
+                else:
+                    await element.click()
+                round_trips += 1
+        return self._account(operations, round_trips)
@@ -0,0 +1,373 @@
+"""
+Async counterparts of BasePage and the four page objects, driven by an AsyncWebDriver.
+
+Each async page takes its PATH and locator constants from the synchronous page object named
+in PAGE, and builds the same typed snapshots through its build_snapshot, so the two variants
+cannot drift apart on selectors. Waits always run inside the page (the 'event' wait strategy),
+which keeps every helper to one WebDriver round trip where the synchronous one can poll.
+"""
+import inspect
+from contextlib import asynccontextmanager
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+from selenium.webdriver.common.by import By
+
+from .action_batch import AsyncActionBatch
+from .base_page import SCRIPT_TIMEOUT, BasePage
+from .cart_page import CartPage
+from .checkout_page import CheckoutPage
+from .main_page import MainPage
+from .product_page import ProductPage
+from .scripts import PAGE_LOAD_SCRIPT, SCROLL_INTO_VIEW_SCRIPT, SNAPSHOT_SCRIPT, WAIT_SCRIPT
+from .snapshots import PageSnapshot
+
+
+class AsyncBasePage:
+    """
+    Base class for the async page objects. Provides the BasePage helpers as coroutines.
+    """
+
+    PAGE = BasePage
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        for name in cls.PAGE.locators():
+            if name.upper() not in vars(cls):
+                setattr(cls, name.upper(), getattr(cls.PAGE, name.upper()))
+
+    def __init__(self, browser, base_url=None):
+        """
+        Initialize the page with an async browser.
+
+        :param browser: AsyncWebDriver instance
+        :param base_url: storefront base URL, defaults to BasePage.DEFAULT_BASE_URL
+        """
+        self.browser = browser
+        self.base_url = (base_url or BasePage.DEFAULT_BASE_URL).rstrip('/')
+        self.round_trips_saved = 0
+
+    @property
+    def URL(self):
+        """
+        Absolute URL of the page on the configured storefront.
+
+        :return: string containing the page URL
+        """
+        return self.base_url + self.PAGE.PATH
+
+    async def open(self, url):
+        """
+        Navigate the browser to a URL.
+
+        :param url: URL to navigate to
+        """
+        await self.browser.get(url)
+
+    async def get_current_url(self):
+        return await self.browser.current_url()
+
+    async def get_title(self):
+        return await self.browser.title()
+
+    async def get_page_source(self):
+        return await self.browser.page_source()
+
+    @asynccontextmanager
+    async def script_timeout(self, timeout):
+        """
+        Let async scripts run for a wait of timeout seconds within the block, see BasePage.script_timeout.
+        """
+        if timeout < SCRIPT_TIMEOUT - 1:
+            yield
+            return
+        previous = await self.browser.get_script_timeout()
+        await self.browser.set_script_timeout(timeout + 1)
+        try:
+            yield
+        finally:
+            await self.browser.set_script_timeout(previous)
+
+    async def wait_for_element(self, by_locator, condition='present', timeout=10, many=False):
+        """
+        Wait inside the page until an element identified by the provided locator meets a condition.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param condition: 'present', 'visible', 'enabled', or 'stable'
+        :param timeout: maximum time to wait in seconds
+        :param many: return every matching element instead of the first one
+        :return: AsyncWebElement, or list of AsyncWebElements if many is True
+        :raises: TimeoutException if the condition is not met within the timeout
+        """
+        by, value = by_locator
+        async with self.script_timeout(timeout):
+            result = await self.browser.execute_async_script(WAIT_SCRIPT, by, value, condition, many,
+                                                             int(timeout * 1000))
+        if not result:
+            raise TimeoutException(f"No element matching {by_locator} was {condition} within {timeout} seconds")
+        return result
+
+    async def find_element(self, by_locator, timeout=10):
+        return await self.wait_for_element(by_locator, 'present', timeout)
+
+    async def find_elements(self, by_locator, timeout=10):
+        return await self.wait_for_element(by_locator, 'present', timeout, many=True)
+
+    async def scroll_to_element(self, element):
+        await self.browser.execute_script(SCROLL_INTO_VIEW_SCRIPT, element)
+
+    async def click_element(self, by_locator):
+        """
+        Click on a web element identified by the provided locator once it is scrolled into view and stable.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        """
+        element = await self.wait_for_element(by_locator, 'stable')
+        await element.click()
+
+    async def enter_text(self, by_locator, text):
+        """
+        Enter text into an input field identified by the provided locator.
+
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param text: string to be entered into the input field
+        """
+        element = await self.wait_for_element(by_locator, 'stable')
+        await element.clear()
+        await element.send_keys(text)
+
+    async def wait_for_page_to_load(self, timeout=10, quiet_period=None):
+        """
+        Wait until the page is ready, see BasePage.wait_for_page_to_load. Without CDP the readiness
+        tracker is installed when the wait starts, so requests made before are not counted.
+
+        :param timeout: maximum time to wait in seconds
+        :param quiet_period: seconds of quiet required, defaults to BasePage.QUIET_PERIOD
+        :raises: TimeoutException if the page is not ready within the timeout
+        """
+        quiet_period = BasePage.QUIET_PERIOD if quiet_period is None else quiet_period
+        arguments = (PAGE_LOAD_SCRIPT, int(timeout * 1000), int(quiet_period * 1000))
+        async with self.script_timeout(timeout):
+            try:
+                state = await self.browser.execute_async_script(*arguments)
+            except JavascriptException:
+                # The document was replaced while waiting, e.g. by a form submission; wait for the new one.
+                state = await self.browser.execute_async_script(*arguments)
+        if not state or not state.get('ready'):
+            raise TimeoutException(f"Page was not ready within {timeout} seconds: {state}")
+
+    async def get_element_text(self, by_locator):
+        element = await self.find_element(by_locator)
+        return await element.text()
+
+    async def get_element_attribute(self, by_locator, attribute):
+        element = await self.find_element(by_locator)
+        return await element.get_attribute(attribute)
+
+    async def is_element_present(self, by_locator, timeout=10):
+        try:
+            await self.wait_for_element(by_locator, 'present', timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    async def is_element_visible(self, by_locator, timeout=10):
+        try:
+            await self.wait_for_element(by_locator, 'visible', timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    async def check_element(self, by_locator, condition='visible'):
+        """
+        Check once, without waiting, whether an element meets a condition, see BasePage.check_element.
+
+        :return: True if a matching element meets the condition, False otherwise
+        """
+        by, value = by_locator
+        return bool(await self.browser.execute_async_script(WAIT_SCRIPT, by, value, condition, False, 0))
+
+    async def is_element_absent(self, by_locator, condition='visible'):
+        return not await self.check_element(by_locator, condition)
+
+    async def select_dropdown_option(self, by_locator, option_text):
+        async with self.batch() as batch:
+            batch.select(by_locator, option_text)
+
+    def batch(self, timeout=10):
+        """
+        Start a batch of element interactions that is executed in a single WebDriver round trip.
+
+        :param timeout: seconds to wait for each queued element to appear
+        :return: AsyncActionBatch to be used as an async context manager
+        """
+        return AsyncActionBatch(self, timeout=timeout)
+
+    async def read_fields(self):
+        """
+        Read every Locator field of the synchronous page object in a single call, see BasePage.read_fields.
+
+        :return: PageSnapshot
+        """
+        fields = [{'name': name, 'by': locator[0], 'value': locator[1], 'attributes': list(locator.attributes)}
+                  for name, locator in self.PAGE.locators().items()]
+        return PageSnapshot.from_script_result(await self.browser.execute_script(SNAPSHOT_SCRIPT, fields))
+
+    async def snapshot(self):
+        """
+        :return: the snapshot the synchronous page object would return
+        """
+        return self.PAGE.build_snapshot(await self.read_fields())
+
+    def pop_round_trips_saved(self):
+        """
+        :return: the number of round trips saved by batching since the last call, see BasePage.pop_round_trips_saved
+        """
+        saved, self.round_trips_saved = self.round_trips_saved, 0
+        return saved
+
+
+class AsyncMainPage(AsyncBasePage):
+
+    PAGE = MainPage
+
+    async def click_shop_now(self):
+        await self.click_element(self.SHOP_NOW_BUTTON)
+
+
+class AsyncProductPage(AsyncBasePage):
+
+    PAGE = ProductPage
+
+    async def load(self):
+        await self.open(self.URL)
+        await self.wait_for_page_to_load()
+
+    async def add_to_cart(self):
+        await self.click_element(self.ADD_TO_CART_BUTTON)
+
+    async def select_size(self, size_option):
+        """
+        :param size_option: string, either '250ml' or '3bottles'
+        :raises ValueError: if an invalid size option is provided
+        """
+        locators = {'250ml': self.SIZE_RADIO_BUTTON_250ML, '3bottles': self.SIZE_RADIO_BUTTON_3BOTTLES}
+        if size_option not in locators:
+            raise ValueError("Invalid size option")
+        await self.click_element(locators[size_option])
+
+    async def click_to_subscribe(self):
+        await self.click_element(self.SUBSCRIBE_BUTTON)
+
+    async def click_accordion_button(self, index):
+        """
+        :param index: zero-based index of the accordion button to click
+        :raises ValueError: if the provided index is out of range
+        """
+        buttons = await self.find_elements(self.ACCORDION_BUTTONS)
+        if not 0 <= index < len(buttons):
+            raise ValueError("Invalid accordion button index")
+        await self.scroll_to_element(buttons[index])
+        await buttons[index].click()
+
+    async def select_product_by_name(self, product_name):
+        await self.click_element((By.LINK_TEXT, product_name))
+
+
+class AsyncCartPage(AsyncBasePage):
+
+    PAGE = CartPage
+
+    async def load(self):
+        await self.open(self.URL)
+        await self.wait_for_page_to_load()
+
+    async def is_url_matches(self):
+        return await self.get_current_url() == self.URL
+
+    async def update_quantity(self, quantity):
+        await self.enter_text(self.QUANTITY_INPUT, str(quantity))
+
+    async def update_cart(self):
+        await self.click_element(self.UPDATE_CART_BUTTON)
+
+    async def wait_for_cart_to_update(self, timeout=10):
+        await self.wait_for_page_to_load(timeout=timeout, quiet_period=0.25)
+
+    async def remove_item(self):
+        await self.click_element(self.REMOVE_ITEM_BUTTON)
+
+    async def is_message_displayed(self, by_locator):
+        await self.wait_for_page_to_load()
+        return await self.check_element(by_locator, 'visible')
+
+    async def is_cart_empty(self):
+        return await self.is_message_displayed(self.EMPTY_CART_MESSAGE)
+
+    async def apply_coupon(self, coupon_code, native_keys=False):
+        async with self.batch() as batch:
+            batch.type(self.COUPON_INPUT, coupon_code, native=native_keys)
+            batch.click(self.APPLY_COUPON_BUTTON)
+
+    async def is_discount_applied(self):
+        return await self.is_message_displayed(self.DISCOUNT_AMOUNT)
+
+    async def is_error_message_displayed(self):
+        return await self.is_message_displayed(self.ERROR_MESSAGE)
+
+    async def proceed_to_checkout(self):
+        await self.click_element(self.CHECKOUT_BUTTON)
+
+    async def is_prevented_from_checkout(self):
+        return await self.is_message_displayed(self.CHECKOUT_ERROR_MESSAGE)
+
+
+class AsyncCheckoutPage(AsyncBasePage):
+
+    PAGE = CheckoutPage
+
+    async def is_url_matches(self):
+        return await self.get_current_url() == self.URL
+
+    async def is_checkout_page(self):
+        return await self.is_element_visible(self.CHECKOUT_HEADER)
+
+    async def fill_in_checkout_form(self, email, first_name, last_name, phone, address, city, postcode, country):
+        async with self.batch() as batch:
+            batch.type(self.EMAIL_INPUT, email)
+            batch.type(self.FIRST_NAME_INPUT, first_name)
+            batch.type(self.LAST_NAME_INPUT, last_name)
+            batch.type(self.PHONE_INPUT, phone)
+            batch.type(self.ADDRESS_INPUT, address)
+            batch.type(self.CITY_INPUT, city)
+            batch.type(self.POSTCODE_INPUT, postcode)
+            batch.select(self.COUNTRY_SELECTOR, country)
+
+
+class BlockingAdapter:
+    """
+    Synchronous front of an async page object or AsyncCartSeeder. environment.py wraps them in one
+    for -D driver=async, so that the steps call them like the synchronous page objects.
+
+    Coroutines run to completion on the given event loop. A method that returns the wrapped object
+    returns the adapter instead, so that chained calls stay synchronous.
+    """
+
+    def __init__(self, target, loop):
+        """
+        :param target: async page object or AsyncCartSeeder
+        :param loop: event loop the target's AsyncWebDriver session runs on
+        """
+        self._target = target
+        self._loop = loop
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            if inspect.iscoroutine(result):
+                result = self._loop.run_until_complete(result)
+            return self if result is self._target else result
+        return call
@@ -0,0 +1,203 @@
+import json
+
+import aiohttp
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.errorhandler import ErrorHandler
+
+# Key of a web element reference in W3C WebDriver JSON.
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+
+_error_handler = ErrorHandler()
+
+
+def connection_pool(limit=100, timeout=300):
+    """
+    HTTP session whose keep-alive connections are shared by every AsyncWebDriver created with it.
+
+    :param limit: maximum number of open connections to the WebDriver endpoint
+    :param timeout: seconds after which a command is abandoned
+    :return: aiohttp.ClientSession, to be closed by the caller
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit, keepalive_timeout=60),
+                                 timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+def w3c_locator(by, value):
+    """
+    Translate the locator strategies W3C WebDriver dropped into CSS selectors, as Selenium does.
+
+    :return: (strategy, value) tuple accepted by a W3C endpoint
+    """
+    if by == By.ID:
+        return By.CSS_SELECTOR, f'[id="{value}"]'
+    if by == By.CLASS_NAME:
+        return By.CSS_SELECTOR, f'.{value}'
+    if by == By.NAME:
+        return By.CSS_SELECTOR, f'[name="{value}"]'
+    return by, value
+
+
+async def _request(http, method, url, payload=None):
+    if payload is None and method == 'POST':
+        payload = {}
+    async with http.request(method, url, json=payload) as response:
+        text = await response.text()
+        status = response.status
+    if status >= 400:
+        _error_handler.check_response({'status': status, 'value': text})
+        raise WebDriverException(f"HTTP {status}: {text[:200]}")
+    return json.loads(text).get('value') if text else None
+
+
+class AsyncWebDriver:
+    """
+    Minimal W3C WebDriver client on asyncio, covering the commands the async page objects use.
+
+    All drivers created with the same HTTP session share its connection pool, so one process can
+    keep dozens of sessions busy from a single thread. Errors are raised as the same Selenium
+    exceptions the synchronous client raises.
+    """
+
+    def __init__(self, http, command_executor, session_id, capabilities):
+        """
+        :param http: aiohttp.ClientSession from connection_pool()
+        :param command_executor: WebDriver endpoint, e.g. http://localhost:4444/wd/hub
+        :param session_id: id of the running WebDriver session
+        :param capabilities: capabilities the session was created with
+        """
+        self.http = http
+        self.command_executor = command_executor.rstrip('/')
+        self.session_id = session_id
+        self.capabilities = capabilities
+
+    @classmethod
+    async def start(cls, http, command_executor, capabilities=None):
+        """
+        Create a new WebDriver session.
+
+        :param capabilities: alwaysMatch capabilities, defaults to Chrome
+        :return: AsyncWebDriver
+        """
+        command_executor = command_executor.rstrip('/')
+        payload = {'capabilities': {'alwaysMatch': capabilities or {'browserName': 'chrome'}, 'firstMatch': [{}]}}
+        value = await _request(http, 'POST', f"{command_executor}/session", payload)
+        return cls(http, command_executor, value['sessionId'], value.get('capabilities', {}))
+
+    async def execute(self, method, path, payload=None):
+        """
+        Send a command of the session.
+
+        :param method: HTTP method
+        :param path: command path below /session/{id}, e.g. '/url'
+        :param payload: JSON payload
+        :return: the command's value with element references wrapped as AsyncWebElement
+        """
+        url = f"{self.command_executor}/session/{self.session_id}{path}"
+        return self._wrap(await _request(self.http, method, url, payload))
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if isinstance(value, dict):
+            if ELEMENT_KEY in value:
+                return AsyncWebElement(self, value[ELEMENT_KEY])
+            return {key: self._wrap(item) for key, item in value.items()}
+        return value
+
+    @staticmethod
+    def _unwrap(value):
+        if isinstance(value, AsyncWebElement):
+            return {ELEMENT_KEY: value.id}
+        if isinstance(value, (list, tuple)):
+            return [AsyncWebDriver._unwrap(item) for item in value]
+        if isinstance(value, dict):
+            return {key: AsyncWebDriver._unwrap(item) for key, item in value.items()}
+        return value
+
+    async def quit(self):
+        await _request(self.http, 'DELETE', f"{self.command_executor}/session/{self.session_id}")
+
+    async def get(self, url):
+        await self.execute('POST', '/url', {'url': url})
+
+    async def current_url(self):
+        return await self.execute('GET', '/url')
+
+    async def title(self):
+        return await self.execute('GET', '/title')
+
+    async def page_source(self):
+        return await self.execute('GET', '/source')
+
+    async def find_element(self, by, value):
+        """
+        :raises: NoSuchElementException if nothing matches
+        """
+        by, value = w3c_locator(by, value)
+        return await self.execute('POST', '/element', {'using': by, 'value': value})
+
+    async def find_elements(self, by, value):
+        by, value = w3c_locator(by, value)
+        return await self.execute('POST', '/elements', {'using': by, 'value': value})
+
+    async def execute_script(self, script, *args):
+        return await self.execute('POST', '/execute/sync', {'script': script, 'args': self._unwrap(args)})
+
+    async def execute_async_script(self, script, *args):
+        return await self.execute('POST', '/execute/async', {'script': script, 'args': self._unwrap(args)})
+
+    async def get_script_timeout(self):
+        return (await self.execute('GET', '/timeouts'))['script'] / 1000
+
+    async def set_script_timeout(self, seconds):
+        await self.execute('POST', '/timeouts', {'script': int(seconds * 1000)})
+
+    async def get_cookies(self):
+        return await self.execute('GET', '/cookie')
+
+    async def add_cookie(self, cookie):
+        await self.execute('POST', '/cookie', {'cookie': cookie})
+
+    async def delete_all_cookies(self):
+        await self.execute('DELETE', '/cookie')
+
+
+class AsyncWebElement:
+    """
+    Reference to an element of an AsyncWebDriver session.
+    """
+
+    def __init__(self, driver, element_id):
+        self.driver = driver
+        self.id = element_id
+
+    def __eq__(self, other):
+        return isinstance(other, AsyncWebElement) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f"<AsyncWebElement {self.id}>"
+
+    async def _execute(self, method, path, payload=None):
+        return await self.driver.execute(method, f"/element/{self.id}{path}", payload)
+
+    async def click(self):
+        await self._execute('POST', '/click')
+
+    async def clear(self):
+        await self._execute('POST', '/clear')
+
+    async def send_keys(self, text):
+        await self._execute('POST', '/value', {'text': str(text)})
+
+    async def text(self):
+        return await self._execute('GET', '/text')
+
+    async def get_attribute(self, name):
+        return await self._execute('GET', f'/attribute/{name}')
+
+    async def get_property(self, name):
+        return await self._execute('GET', f'/property/{name}')
@@ -1,40 +1,298 @@
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import time
+import weakref
+from contextlib import contextmanager
+from urllib.parse import urldefrag
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, JavascriptException, WebDriverException
+from .action_batch import ActionBatch
+from .cdp import execute_cdp, supports_cdp
+from .locators import CachedElement, ElementCache, Locator
+from .navigation import NavigationPlanner
+from .performance import PerformanceMonitor
+from .request_blocking import RequestBlocker
+from .scripts import (ANCHOR_SCRIPT, CONSOLE_TRACKER_JS, IDENTITY_TRACKER_JS, PAGE_LOAD_SCRIPT, PERFORMANCE_SCRIPT, READINESS_TRACKER_JS,
+                      SCROLL_INTO_VIEW_SCRIPT, SNAPSHOT_SCRIPT, TIME_ORIGIN_SCRIPT, WAIT_SCRIPT)
+from .snapshots import PageSnapshot
+from .wait_stats import AdaptiveTimeouts
+
+def matching_elements(matches):
+    """
+    Expected condition for the elements of a locator that pass a check, like WAIT_SCRIPT returns them with many.
+
+    :param matches: callable checking a WebElement
+    :return: callable taking a locator and returning the expected condition
+    """
+    def located(by_locator):
+        def condition(driver):
+            try:
+                return [element for element in driver.find_elements(*by_locator) if matches(element)] or False
+            except StaleElementReferenceException:
+                return False
+        return condition
+    return located
+
+# WebDriverWait equivalents of the wait conditions, used by the 'poll' wait strategy.
+POLLING_CONDITIONS = {
+    ('present', False): EC.presence_of_element_located,
+    ('present', True): EC.presence_of_all_elements_located,
+    ('visible', False): EC.visibility_of_element_located,
+    ('visible', True): EC.visibility_of_all_elements_located,
+    ('enabled', False): EC.element_to_be_clickable,
+    ('enabled', True): matching_elements(lambda element: element.is_displayed() and element.is_enabled()),
+    ('stable', False): EC.visibility_of_element_located,
+    ('stable', True): matching_elements(lambda element: element.is_displayed()),
+}
+
+# WebDriver aborts async scripts after 30 seconds unless the session's script timeout is raised.
+SCRIPT_TIMEOUT = 30
+
+# Browsers that inject the readiness tracker into every new document.
+_tracked_browsers = weakref.WeakSet()
 
 class BasePage:
     """
     Base class for all page objects. Provides common methods for interacting with web elements.
     """
 
-    def __init__(self, browser):
+    DEFAULT_BASE_URL = "https://aeonstest.info"
+    PATH = "/"
+    # 'event' resolves waits inside the page with a MutationObserver, 'poll' uses WebDriverWait.
+    WAIT_STRATEGY = 'event'
+    # Resource classes or URL patterns not loaded when the page is opened, see request_blocking.
+    BLOCKED_RESOURCES = ()
+    # Whether the page shows server-side state, e.g. the cart; such a page is never returned to through the
+    # history, where the browser may restore a copy from before the state changed.
+    SERVER_STATE = False
+    # Seconds without pending requests, animations or DOM mutations after which a page counts as ready.
+    QUIET_PERIOD = 0.1
+    # Seconds an element wait without an explicit timeout may take; AdaptiveTimeouts can shorten it.
+    DEFAULT_TIMEOUT = 10
+
+    def __init__(self, browser, base_url=None):
         """
         Initialize the BasePage with a browser instance.
         
         :param browser: Selenium WebDriver instance
+        :param base_url: storefront base URL, defaults to DEFAULT_BASE_URL
         """
         self.browser = browser
+        self.base_url = (base_url or self.DEFAULT_BASE_URL).rstrip('/')
+        self.round_trips_saved = 0
+
+    @property
+    def URL(self):
+        """
+        Absolute URL of the page on the configured storefront.
+        
+        :return: string containing the page URL
+        """
+        return self.base_url + self.PATH
+
+    @property
+    def element_cache(self):
+        """
+        Cache of elements resolved through the Locator attributes of the page objects.
+        
+        :return: ElementCache shared by all page objects of the browser
+        """
+        return ElementCache.for_browser(self.browser)
 
-    def find_element(self, by_locator):
+    def open(self, url):
+        """
+        Navigate the browser to a URL and drop the elements cached for the previous page.
+        
+        If request blocking is enabled for the browser, the BLOCKED_RESOURCES of the page are not
+        loaded. The metrics of the load are recorded by record_navigation once the page is ready.
+        If a NavigationPlanner is attached to the browser, the current page is kept when it is
+        still the unchanged page at the URL, and an anchor or, unless the page shows SERVER_STATE,
+        a history navigation replaces the get where one leads there.
+        
+        :param url: URL to navigate to
+        :return: transition taken, 'reuse', 'anchor', 'history' or 'get'
+        """
+        planner = NavigationPlanner.for_browser(self.browser)
+        transition = planner.plan(url, history=not self.SERVER_STATE) if planner else 'get'
+        if transition in ('get', 'history'):
+            blocker = RequestBlocker.for_browser(self.browser)
+            if blocker:
+                blocker.apply(self.BLOCKED_RESOURCES)
+            self.install_readiness_tracker()
+            self.element_cache.clear()
+        if transition == 'get':
+            self.browser.get(url)
+        elif transition == 'history':
+            self.browser.back()
+        elif transition == 'anchor':
+            self.browser.execute_script(ANCHOR_SCRIPT, urldefrag(url)[1])
+        if planner:
+            planner.record(self, url, transition)
+        return transition
+
+    def load(self):
+        """
+        Navigate to the page URL, see open, and wait until the page is ready.
+        """
+        transition = self.open(self.URL)
+        self.wait_for_page_to_load()
+        if transition == 'get':
+            self.record_navigation()
+        planner = NavigationPlanner.for_browser(self.browser)
+        if planner and transition != 'reuse':
+            planner.loaded()
+
+    def record_navigation(self, trigger='load'):
+        """
+        Collect the timing, transfer and paint metrics of the current document in a single call and
+        hand them to the request blocker and the performance monitor of the browser, if attached.
+        
+        :param trigger: what caused the navigation, 'load' or the name of the page object action
+        :return: dict of metrics, or None if nothing is attached or the browser cannot provide them
+        """
+        blocker = RequestBlocker.for_browser(self.browser)
+        monitor = PerformanceMonitor.for_browser(self.browser)
+        if not blocker and not monitor:
+            return None
+        try:
+            metrics = self.browser.execute_async_script(PERFORMANCE_SCRIPT)
+        except WebDriverException:
+            return None
+        if blocker:
+            blocker.record_load(self, metrics)
+        if monitor:
+            monitor.add(self, trigger, metrics)
+        return metrics
+
+    @contextmanager
+    def measured_navigation(self, trigger):
+        """
+        Record the metrics of the navigation an action causes, e.g. a click on a link. If the
+        document was not replaced by the end of the block, nothing is recorded.
+        
+        :param trigger: name of the action, used as the trigger of the record
+        """
+        if not PerformanceMonitor.for_browser(self.browser):
+            yield
+            return
+        origin = self.browser.execute_script(TIME_ORIGIN_SCRIPT)
+        yield
+        self.wait_for_page_to_load()
+        if self.browser.execute_script(TIME_ORIGIN_SCRIPT) != origin:
+            self.record_navigation(trigger)
+
+    def get_current_url(self):
+        """
+        Get the URL of the current page.
+        
+        :return: string containing the current URL
+        """
+        return self.browser.current_url
+
+    def get_title(self):
+        """
+        Get the title of the current page.
+        
+        :return: string containing the page title
+        """
+        return self.browser.title
+
+    def get_page_source(self):
+        """
+        Get the source of the current page.
+        
+        :return: string containing the page source
+        """
+        return self.browser.page_source
+
+    def wait_for_element(self, by_locator, condition='present', timeout=None, many=False):
+        """
+        Wait until an element identified by the provided locator meets a condition.
+        
+        With the 'event' wait strategy the wait runs inside the page and resolves as soon as a DOM
+        mutation makes the condition true, costing a single WebDriver round trip. If AdaptiveTimeouts
+        are attached to the browser, the time the wait took is recorded, and without an explicit
+        timeout the wait gives up after the one derived from the locator's earlier waits.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param condition: 'present', 'visible', 'enabled', or 'stable' (visible, scrolled into view
+                          and no longer moving)
+        :param timeout: maximum time to wait in seconds, defaults to the adaptive timeout or DEFAULT_TIMEOUT
+        :param many: return every matching element instead of the first one
+        :return: WebElement, or list of WebElements if many is True
+        :raises: TimeoutException if the condition is not met within the timeout
+        """
+        adaptive = AdaptiveTimeouts.for_browser(self.browser)
+        if adaptive is None:
+            timeout = self.DEFAULT_TIMEOUT if timeout is None else timeout
+            return self._wait_for_element(by_locator, condition, timeout, many)
+        if timeout is None:
+            timeout = adaptive.timeout(self, by_locator, condition, self.DEFAULT_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            result = self._wait_for_element(by_locator, condition, timeout, many, adaptive)
+        except TimeoutException:
+            adaptive.record(self, by_locator, condition, time.perf_counter() - started, found=False)
+            raise
+        adaptive.record(self, by_locator, condition, time.perf_counter() - started, found=True)
+        return result
+
+    def _wait_for_element(self, by_locator, condition, timeout, many, adaptive=None):
+        if self.WAIT_STRATEGY == 'poll':
+            if (condition, many) not in POLLING_CONDITIONS:
+                raise ValueError(f"Unsupported wait condition '{condition}'")
+            poll_frequency = adaptive.poll_interval(self, by_locator, condition) if adaptive else 0.5
+            element = WebDriverWait(self.browser, timeout, poll_frequency).until(
+                POLLING_CONDITIONS[(condition, many)](by_locator))
+            if condition == 'stable':
+                self.scroll_to_element(element[0] if many else element)
+            return element
+        by, value = by_locator
+        with self.script_timeout(timeout):
+            result = self.browser.execute_async_script(WAIT_SCRIPT, by, value, condition, many, int(timeout * 1000))
+        if not result:
+            raise TimeoutException(f"No element matching {by_locator} was {condition} within {timeout} seconds")
+        return result
+
+    @contextmanager
+    def script_timeout(self, timeout):
+        """
+        Let async scripts run for a wait of timeout seconds within the block, restoring the session's
+        script timeout afterwards if it had to be raised.
+
+        :param timeout: seconds the script may wait
+        """
+        if timeout < SCRIPT_TIMEOUT - 1:
+            yield
+            return
+        previous = self.browser.timeouts.script
+        self.browser.set_script_timeout(timeout + 1)
+        try:
+            yield
+        finally:
+            self.browser.set_script_timeout(previous)
+
+    def find_element(self, by_locator, timeout=None):
         """
         Find and return a web element using the provided locator.
         
         :param by_locator: tuple containing Selenium By strategy and locator
+        :param timeout: maximum time to wait in seconds, see wait_for_element
         :return: WebElement if found
-        :raises: TimeoutException if element is not found within 10 seconds
+        :raises: TimeoutException if element is not found within the timeout
         """
-        return WebDriverWait(self.browser, 10).until(EC.presence_of_element_located(by_locator))
+        return self.wait_for_element(by_locator, 'present', timeout)
 
-    def find_elements(self, by_locator):
+    def find_elements(self, by_locator, timeout=None):
         """
         Find and return a list of web elements using the provided locator.
         
         :param by_locator: tuple containing Selenium By strategy and locator
+        :param timeout: maximum time to wait in seconds, see wait_for_element
         :return: list of WebElements if found
-        :raises: TimeoutException if no elements are found within 10 seconds
+        :raises: TimeoutException if no elements are found within the timeout
         """
-        return WebDriverWait(self.browser, 10).until(EC.presence_of_all_elements_located(by_locator))
+        return self.wait_for_element(by_locator, 'present', timeout, many=True)
 
     def scroll_to_element(self, element):
         """
@@ -42,17 +300,21 @@ class BasePage:
         
         :param element: WebElement to scroll to
         """
-        self.browser.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", element)
+        try:
+            self.browser.execute_script(SCROLL_INTO_VIEW_SCRIPT, element)
+        except StaleElementReferenceException:
+            if not isinstance(element, CachedElement):
+                raise
+            element.refresh()
+            self.browser.execute_script(SCROLL_INTO_VIEW_SCRIPT, element)
 
     def click_element(self, by_locator):
         """
-        Click on a web element identified by the provided locator.
+        Click on a web element identified by the provided locator once it is scrolled into view and stable.
         
         :param by_locator: tuple containing Selenium By strategy and locator
         """
-        element = self.find_element(by_locator)
-        self.scroll_to_element(element)
-        element.click()
+        self.wait_for_element(by_locator, 'stable').click()
 
     def enter_text(self, by_locator, text):
         """
@@ -61,9 +323,188 @@ class BasePage:
         :param by_locator: tuple containing Selenium By strategy and locator
         :param text: string to be entered into the input field
         """
-        element = self.find_element(by_locator)
-        self.scroll_to_element(element)
+        element = self.wait_for_element(by_locator, 'stable')
         element.clear()
         element.send_keys(text)
 
-    # ... existing methods remain unchanged ...
\ No newline at end of file
+    def install_readiness_tracker(self):
+        """
+        Have the browser run the readiness, console and identity trackers before the scripts of every new
+        document, so that requests and errors during the page load are recorded. Only possible
+        over CDP; elsewhere wait_for_page_to_load installs them when it is first called on a document.
+        """
+        if self.browser in _tracked_browsers:
+            return
+        _tracked_browsers.add(self.browser)
+        if supports_cdp(self.browser):
+            try:
+                execute_cdp(self.browser, 'Page.addScriptToEvaluateOnNewDocument',
+                            {'source': READINESS_TRACKER_JS + CONSOLE_TRACKER_JS + IDENTITY_TRACKER_JS})
+            except WebDriverException:
+                pass
+
+    def wait_for_page_to_load(self, timeout=10, quiet_period=None):
+        """
+        Wait until the page is ready: the DOM is interactive, no fetch or XHR call is pending, no
+        finite animation is running and none of these nor a DOM mutation happened for a quiet period.
+        
+        The full load event is not awaited, so with the 'eager' page load strategy steps continue
+        while images and other subresources are still loading. If the document was replaced since
+        the last wait, e.g. by a click that navigated, the elements cached for the old one are dropped.
+        
+        :param timeout: maximum time to wait in seconds
+        :param quiet_period: seconds of quiet required, defaults to QUIET_PERIOD
+        :raises: TimeoutException if the page is not ready within the timeout
+        """
+        quiet_period = self.QUIET_PERIOD if quiet_period is None else quiet_period
+        with self.script_timeout(timeout):
+            try:
+                state = self.browser.execute_async_script(PAGE_LOAD_SCRIPT, int(timeout * 1000),
+                                                          int(quiet_period * 1000))
+            except JavascriptException:
+                # The document was replaced while waiting, e.g. by a form submission; wait for the new one.
+                state = self.browser.execute_async_script(PAGE_LOAD_SCRIPT, int(timeout * 1000),
+                                                          int(quiet_period * 1000))
+        if not state or not state.get('ready'):
+            raise TimeoutException(f"Page was not ready within {timeout} seconds: {state}")
+        self.element_cache.track_document(state.get('document'))
+
+    def get_element_text(self, by_locator):
+        """
+        Get the visible text of a web element identified by the provided locator.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :return: string containing the element text
+        """
+        return self.find_element(by_locator).text
+
+    def get_element_attribute(self, by_locator, attribute):
+        """
+        Get an attribute or property value of a web element identified by the provided locator.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param attribute: name of the attribute
+        :return: attribute value, or None if it is not set
+        """
+        return self.find_element(by_locator).get_attribute(attribute)
+
+    def is_element_present(self, by_locator, timeout=None):
+        """
+        Check if a web element identified by the provided locator is present in the DOM.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param timeout: maximum time to wait in seconds, see wait_for_element
+        :return: True if the element is present, False otherwise
+        """
+        try:
+            self.wait_for_element(by_locator, 'present', timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    def is_element_visible(self, by_locator, timeout=None):
+        """
+        Check if a web element identified by the provided locator is visible.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param timeout: maximum time to wait in seconds, see wait_for_element
+        :return: True if the element is visible, False otherwise
+        """
+        try:
+            self.wait_for_element(by_locator, 'visible', timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    def check_element(self, by_locator, condition='visible'):
+        """
+        Check once, without waiting, whether an element identified by the provided locator meets a
+        condition. Meant for assertions on a page that is known to be ready, where waiting for an
+        element that is not there only delays the result.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param condition: 'present' or 'visible'
+        :return: True if a matching element meets the condition, False otherwise
+        """
+        by, value = by_locator
+        return bool(self.browser.execute_async_script(WAIT_SCRIPT, by, value, condition, False, 0))
+
+    def is_element_absent(self, by_locator, condition='visible'):
+        """
+        Check once, without waiting, that no element identified by the provided locator meets a condition.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param condition: 'present' or 'visible'
+        :return: True if no matching element meets the condition, False otherwise
+        """
+        return not self.check_element(by_locator, condition)
+
+    def select_dropdown_option(self, by_locator, option_text):
+        """
+        Select an option of a dropdown identified by the provided locator.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param option_text: visible text of the option to select
+        """
+        Select(self.wait_for_element(by_locator, 'stable')).select_by_visible_text(option_text)
+
+    def batch(self, timeout=10):
+        """
+        Start a batch of element interactions that is executed in a single WebDriver round trip.
+        
+        :param timeout: seconds to wait for each queued element to appear
+        :return: ActionBatch to be used as a context manager
+        """
+        return ActionBatch(self, timeout=timeout)
+
+    @classmethod
+    def locators(cls):
+        """
+        Return the Locator declarations of the page class and its base classes.
+        
+        :return: dict mapping attribute name to Locator
+        """
+        declared = {}
+        for klass in reversed(cls.__mro__):
+            declared.update((name, value) for name, value in vars(klass).items() if isinstance(value, Locator))
+        return declared
+
+    def read_fields(self):
+        """
+        Read the text, visibility and declared attributes of every element matched by the page's
+        Locators in a single execute_script call, without waiting for any of them.
+        
+        :return: PageSnapshot
+        """
+        fields = [{'name': name, 'by': locator[0], 'value': locator[1], 'attributes': list(locator.attributes)}
+                  for name, locator in self.locators().items()]
+        return PageSnapshot.from_script_result(self.browser.execute_script(SNAPSHOT_SCRIPT, fields))
+
+    def snapshot(self):
+        """
+        Capture the current state of the page for assertions that read several fields.
+        Page objects override this to return a typed record built from read_fields().
+        
+        :return: immutable snapshot of the page
+        """
+        return self.build_snapshot(self.read_fields())
+
+    @staticmethod
+    def build_snapshot(fields):
+        """
+        Build the snapshot returned by snapshot() from the result of read_fields(), so that
+        other clients reading the same fields can produce the same record.
+        
+        :param fields: PageSnapshot of the page's Locator fields
+        :return: immutable snapshot of the page
+        """
+        return fields
+
+    def pop_round_trips_saved(self):
+        """
+        Return the number of round trips saved by batching since the last call and reset the counter.
+        
+        :return: number of WebDriver round trips saved
+        """
+        saved, self.round_trips_saved = self.round_trips_saved, 0
+        return saved
\ No newline at end of file
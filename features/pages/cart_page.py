@@ -1,4 +1,6 @@
 from .base_page import BasePage
+from .locators import Locator
+from .snapshots import CartSnapshot, parse_price
 from selenium.webdriver.common.by import By
 
 class CartPage(BasePage):
@@ -6,91 +8,81 @@ class CartPage(BasePage):
     Page object for the cart page, containing specific elements and methods.
     """
 
-    URL = "https://aeonstest.info/cart/"
-
-    def __init__(self, browser):
+    PATH = "/cart/"
+    # Images stay enabled: the cart steps assert that the product image is displayed.
+    BLOCKED_RESOURCES = ('font', 'media', 'analytics')
+    SERVER_STATE = True
+
+    cart_title = Locator(By.CSS_SELECTOR, ".cart-title h1")
+    product_image = Locator(By.CSS_SELECTOR, ".product-image-and-description img")
+    product_description = Locator(By.CSS_SELECTOR, ".product-description h3")
+    quantity_input = Locator(By.ID, "sylius_cart_items_0_quantity", attributes=('value',))
+    unit_price = Locator(By.CSS_SELECTOR, "td.numbers span")
+    total_price = Locator(By.CSS_SELECTOR, "td.numbers:nth-child(4)")
+    remove_item_button = Locator(By.CSS_SELECTOR, ".remove-item-button")
+    coupon_input = Locator(By.ID, "sylius_cart_promotionCoupon")
+    apply_coupon_button = Locator(By.CSS_SELECTOR, ".coupon-section button[type=submit]")
+    update_cart_button = Locator(By.CSS_SELECTOR, ".update-cart-button")
+    checkout_button = Locator(By.CSS_SELECTOR, ".checkout-btn")
+    # Additional locators for elements not in the provided correct selectors list
+    discount_amount = Locator(By.CSS_SELECTOR, ".discount-amount")
+    error_message = Locator(By.CSS_SELECTOR, ".alert-danger")
+    empty_cart_message = Locator(By.CSS_SELECTOR, ".empty-cart-message")
+    success_message = Locator(By.CSS_SELECTOR, '.alert-success')
+    purchase_type = Locator(By.XPATH, "//td[contains(text(), 'Purchase type:')]//following-sibling::td")
+    checkout_error_message = Locator(By.CSS_SELECTOR, ".checkout-error-message")
+
+    def __init__(self, browser, base_url=None):
         """
         Initialize the CartPage with a browser instance.
         
         :param browser: Selenium WebDriver instance
+        :param base_url: storefront base URL, defaults to DEFAULT_BASE_URL
         """
-        super().__init__(browser)
-
-    @property
-    def cart_title(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".cart-title h1")
-
-    @property
-    def product_image(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".product-image-and-description img")
-
-    @property
-    def product_description(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".product-description h3")
-
-    @property
-    def quantity_input(self):
-        return self.browser.find_element(By.ID, "sylius_cart_items_0_quantity")
-
-    @property
-    def unit_price(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "td.numbers span")
-
-    @property
-    def total_price(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "td.numbers:nth-child(4)")
-
-    @property
-    def remove_item_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".remove-item-button")
-
-    @property
-    def coupon_input(self):
-        return self.browser.find_element(By.ID, "sylius_cart_promotionCoupon")
-
-    @property
-    def apply_coupon_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".coupon-section button[type=submit]")
-
-    @property
-    def update_cart_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".update-cart-button")
-
-    @property
-    def checkout_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".checkout-btn")
+        super().__init__(browser, base_url)
 
-    # Additional properties for elements not in the provided correct selectors list
-    @property
-    def discount_amount(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".discount-amount")
-
-    @property
-    def error_message(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".alert-danger")
-
-    @property
-    def empty_cart_message(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".empty-cart-message")
-
-    @property
-    def success_message(self):
-        return self.browser.find_element(By.CSS_SELECTOR, '.alert-success')
-
-    @property
-    def purchase_type(self):
-        return self.browser.find_element(By.XPATH, "//td[contains(text(), 'Purchase type:')]//following-sibling::td")
-
-    @property
-    def checkout_error_message(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".checkout-error-message")
+    def snapshot(self):
+        """
+        Read the cart's title, product, quantity, prices and messages in a single call.
+        
+        :return: CartSnapshot with prices parsed as floats
+        """
+        return self.build_snapshot(self.read_fields())
 
-    def load(self):
+    @staticmethod
+    def build_snapshot(fields):
         """
-        Navigate to the cart page URL.
+        Build the typed snapshot of the cart page from its read_fields() result.
+        
+        :param fields: PageSnapshot of the page's Locator fields
+        :return: CartSnapshot with prices parsed as floats
+        """
+        quantity = fields['quantity_input'].attribute('value')
+        return CartSnapshot(
+            title=fields['cart_title'].text,
+            product_name=fields['product_description'].text,
+            product_image_visible=fields['product_image'].visible,
+            quantity=int(quantity) if quantity else None,
+            unit_price=parse_price(fields['unit_price'].text),
+            total_price=parse_price(fields['total_price'].text),
+            purchase_type=fields['purchase_type'].text,
+            success_message=fields['success_message'].text if fields['success_message'].visible else None,
+            discount_applied=fields['discount_amount'].visible,
+            error_displayed=fields['error_message'].visible,
+            cart_empty=fields['empty_cart_message'].visible,
+            checkout_error_displayed=fields['checkout_error_message'].visible,
+        )
+
+    def is_message_displayed(self, by_locator):
+        """
+        Check whether a message the storefront renders with the page is displayed. Once the page is
+        ready the message is either there or not, so it is checked once instead of waited for.
+        
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :return: True if the message is visible, False otherwise
         """
-        self.browser.get(self.URL)
         self.wait_for_page_to_load()
+        return self.check_element(by_locator, 'visible')
 
     def is_url_matches(self):
         """
@@ -106,7 +98,7 @@ class CartPage(BasePage):
         
         :return: string containing the cart title
         """
-        return self.get_element_text(self.CART_TITLE).strip()
+        return self.cart_title.text.strip()
 
     def is_product_displayed(self, product_name):
         """
@@ -115,9 +107,8 @@ class CartPage(BasePage):
         :param product_name: Name of the product
         :return: True if product is displayed, False otherwise
         """
-        if self.is_element_present(self.PRODUCT_DESCRIPTION):
-            displayed_name = self.get_element_text(self.PRODUCT_DESCRIPTION).strip()
-            return displayed_name == product_name
+        if self.is_element_present(CartPage.product_description):
+            return self.product_description.text.strip() == product_name
         return False
 
     def is_product_image_displayed(self):
@@ -126,7 +117,7 @@ class CartPage(BasePage):
         
         :return: True if product image is displayed, False otherwise
         """
-        return self.is_element_visible(self.PRODUCT_IMAGE)
+        return self.is_element_visible(CartPage.product_image)
 
     def update_quantity(self, quantity):
         """
@@ -134,7 +125,9 @@ class CartPage(BasePage):
         
         :param quantity: Desired quantity as integer
         """
-        self.enter_text(self.QUANTITY_INPUT, str(quantity))
+        self.scroll_to_element(self.quantity_input)
+        self.quantity_input.clear()
+        self.quantity_input.send_keys(str(quantity))
 
     def get_quantity(self):
         """
@@ -142,7 +135,7 @@ class CartPage(BasePage):
         
         :return: Quantity as integer
         """
-        return int(self.get_element_attribute(self.QUANTITY_INPUT, 'value'))
+        return int(self.quantity_input.get_attribute('value'))
 
     def get_unit_price(self):
         """
@@ -150,7 +143,7 @@ class CartPage(BasePage):
         
         :return: Unit price as float
         """
-        price_text = self.get_element_text(self.UNIT_PRICE).strip('£').replace(',', '')
+        price_text = self.unit_price.text.strip('£').replace(',', '')
         return float(price_text)
 
     def get_total_price(self):
@@ -159,14 +152,15 @@ class CartPage(BasePage):
         
         :return: Total price as float
         """
-        price_text = self.get_element_text(self.TOTAL_PRICE).strip('£').replace(',', '')
+        price_text = self.total_price.text.strip('£').replace(',', '')
         return float(price_text)
 
     def remove_item(self):
         """
         Remove the item from the cart.
         """
-        self.click_element(self.REMOVE_ITEM_BUTTON)
+        self.scroll_to_element(self.remove_item_button)
+        self.remove_item_button.click()
 
     def is_remove_button_displayed(self):
         """
@@ -174,16 +168,18 @@ class CartPage(BasePage):
         
         :return: True if displayed, False otherwise
         """
-        return self.is_element_visible(self.REMOVE_ITEM_BUTTON)
+        return self.is_element_visible(CartPage.remove_item_button)
 
-    def apply_coupon(self, coupon_code):
+    def apply_coupon(self, coupon_code, native_keys=False):
         """
         Apply a coupon code to the cart.
         
         :param coupon_code: Coupon code as string
+        :param native_keys: type the code with real key events instead of setting the value in the page
         """
-        self.enter_text(self.COUPON_INPUT, coupon_code)
-        self.click_element(self.APPLY_COUPON_BUTTON)
+        with self.batch() as batch:
+            batch.type(CartPage.coupon_input, coupon_code, native=native_keys)
+            batch.click(CartPage.apply_coupon_button)
 
     def is_discount_applied(self):
         """
@@ -191,7 +187,7 @@ class CartPage(BasePage):
         
         :return: True if discount amount is displayed, False otherwise
         """
-        return self.is_element_visible(self.DISCOUNT_AMOUNT)
+        return self.is_message_displayed(CartPage.discount_amount)
 
     def is_error_message_displayed(self):
         """
@@ -199,21 +195,22 @@ class CartPage(BasePage):
         
         :return: True if error message is displayed, False otherwise
         """
-        return self.is_element_visible(self.ERROR_MESSAGE)
+        return self.is_message_displayed(CartPage.error_message)
 
     def update_cart(self):
         """
         Click the update cart button to update the cart details.
         """
-        self.click_element(self.UPDATE_CART_BUTTON)
+        self.scroll_to_element(self.update_cart_button)
+        self.update_cart_button.click()
 
     def wait_for_cart_to_update(self, timeout=10):
         """
-        Wait for the cart to update.
+        Wait for the cart to update, i.e. the updated cart has loaded and stopped changing.
         
         :param timeout: Maximum time to wait in seconds
         """
-        self.wait_for_page_to_load(timeout=timeout)
+        self.wait_for_page_to_load(timeout=timeout, quiet_period=0.25)
 
     def wait_for_cart_to_load(self, timeout=10):
         """
@@ -229,7 +226,7 @@ class CartPage(BasePage):
         
         :return: True if cart is empty, False otherwise
         """
-        return self.is_element_visible(self.EMPTY_CART_MESSAGE)
+        return self.is_message_displayed(CartPage.empty_cart_message)
 
     def is_empty_cart_message_displayed(self):
         """
@@ -237,13 +234,15 @@ class CartPage(BasePage):
         
         :return: True if message is displayed, False otherwise
         """
-        return self.is_element_visible(self.EMPTY_CART_MESSAGE)
+        return self.is_message_displayed(CartPage.empty_cart_message)
 
     def proceed_to_checkout(self):
         """
         Click the checkout button to proceed to the checkout page.
         """
-        self.click_element(self.CHECKOUT_BUTTON)
+        self.scroll_to_element(self.checkout_button)
+        with self.measured_navigation('proceed_to_checkout'):
+            self.checkout_button.click()
 
     def is_success_message_displayed(self):
         """
@@ -251,7 +250,7 @@ class CartPage(BasePage):
         
         :return: True if the success message is displayed and contains the expected text, False otherwise
         """
-        return self.is_element_visible(self.SUCCESS_MESSAGE) and "Item has been added to cart" in self.get_element_text(self.SUCCESS_MESSAGE)
+        return self.is_element_visible(CartPage.success_message) and "Item has been added to cart" in self.success_message.text
 
     def get_purchase_type(self):
         """
@@ -259,7 +258,7 @@ class CartPage(BasePage):
         
         :return: string containing the purchase type
         """
-        return self.get_element_text(self.PURCHASE_TYPE).strip()
+        return self.purchase_type.text.strip()
 
     def is_prevented_from_checkout(self):
         """
@@ -267,4 +266,4 @@ class CartPage(BasePage):
         
         :return: True if prevented with an error message, False otherwise
         """
-        return self.is_element_visible(self.CHECKOUT_ERROR_MESSAGE)
\ No newline at end of file
+        return self.is_message_displayed(CartPage.checkout_error_message)
\ No newline at end of file
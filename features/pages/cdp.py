@@ -0,0 +1,43 @@
+import weakref
+
+from selenium.common.exceptions import WebDriverException
+
+CHROMIUM_BROWSERS = ('chrome', 'chromium', 'msedge', 'microsoftedge')
+
+_supported = weakref.WeakKeyDictionary()
+
+
+def supports_cdp(browser):
+    """
+    Tell whether a session accepts Chrome DevTools Protocol commands, registering the
+    executeCdpCommand endpoint on its connection if needed.
+
+    :param browser: Selenium WebDriver instance
+    :return: True for Chromium-based browsers whose CDP commands have not failed before
+    """
+    supported = _supported.get(browser)
+    if supported is None:
+        name = str(browser.capabilities.get('browserName', '')).lower()
+        supported = name in CHROMIUM_BROWSERS
+        if supported and not browser.command_executor.get_command('executeCdpCommand'):
+            vendor = 'ms' if 'edge' in name else 'goog'
+            browser.command_executor.add_command('executeCdpCommand', 'POST', f'/session/$sessionId/{vendor}/cdp/execute')
+        _supported[browser] = supported
+    return supported
+
+
+def execute_cdp(browser, command, params=None):
+    """
+    Send a CDP command; a session that rejects it is no longer considered to support CDP.
+
+    :param browser: Selenium WebDriver instance
+    :param command: CDP method, e.g. 'Network.setBlockedURLs'
+    :param params: dict of command parameters
+    :return: command result
+    :raises: WebDriverException if the command failed
+    """
+    try:
+        return browser.execute('executeCdpCommand', {'cmd': command, 'params': params or {}})['value']
+    except WebDriverException:
+        _supported[browser] = False
+        raise
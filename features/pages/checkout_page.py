@@ -1,57 +1,58 @@
+from types import MappingProxyType
 from .base_page import BasePage
+from .locators import Locator
+from .snapshots import CheckoutSnapshot
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
 
 class CheckoutPage(BasePage):
     """
     Page object for the checkout page, containing specific elements and methods.
     """
 
-    URL = "https://aeonstest.info/checkout/"
+    PATH = "/checkout/"
+    BLOCKED_RESOURCES = ('image', 'font', 'media', 'analytics')
+    SERVER_STATE = True
 
-    def __init__(self, browser):
+    checkout_header = Locator(By.CSS_SELECTOR, "h1.checkout-title")
+    email_input = Locator(By.ID, "app_one_page_checkout_customer_email", attributes=('value',))
+    first_name_input = Locator(By.ID, "app_one_page_checkout_billingAddress_firstName", attributes=('value',))
+    last_name_input = Locator(By.ID, "app_one_page_checkout_billingAddress_lastName", attributes=('value',))
+    phone_input = Locator(By.ID, "app_one_page_checkout_billingAddress_phoneNumber", attributes=('value',))
+    address_input = Locator(By.ID, "app_one_page_checkout_billingAddress_street", attributes=('value',))
+    city_input = Locator(By.ID, "app_one_page_checkout_billingAddress_city", attributes=('value',))
+    postcode_input = Locator(By.ID, "app_one_page_checkout_billingAddress_postcode", attributes=('value',))
+    country_selector = Locator(By.ID, "app_one_page_checkout_billingAddress_countryCode", attributes=('value',))
+
+    def __init__(self, browser, base_url=None):
         """
         Initialize the CheckoutPage with a browser instance.
         
         :param browser: Selenium WebDriver instance
+        :param base_url: storefront base URL, defaults to DEFAULT_BASE_URL
         """
-        super().__init__(browser)
-
-    @property
-    def checkout_header(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "h1.checkout-title")
-
-    @property
-    def email_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_customer_email")
-
-    @property
-    def first_name_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_firstName")
-
-    @property
-    def last_name_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_lastName")
-
-    @property
-    def phone_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_phoneNumber")
-
-    @property
-    def address_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_street")
+        super().__init__(browser, base_url)
 
-    @property
-    def city_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_city")
-
-    @property
-    def postcode_input(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_postcode")
+    def snapshot(self):
+        """
+        Read the checkout header and the current value of every form field in a single call.
+        
+        :return: CheckoutSnapshot
+        """
+        return self.build_snapshot(self.read_fields())
 
-    @property
-    def country_selector(self):
-        return self.browser.find_element(By.ID, "app_one_page_checkout_billingAddress_countryCode")
+    @staticmethod
+    def build_snapshot(fields):
+        """
+        Build the typed snapshot of the checkout page from its read_fields() result.
+        
+        :param fields: PageSnapshot of the page's Locator fields
+        :return: CheckoutSnapshot
+        """
+        return CheckoutSnapshot(
+            is_checkout_page=fields['checkout_header'].visible,
+            values=MappingProxyType({name: field.attribute('value')
+                                     for name, field in fields.fields.items() if name != 'checkout_header'}),
+        )
 
     def is_url_matches(self):
         """
@@ -67,7 +68,7 @@ class CheckoutPage(BasePage):
         
         :return: True if on the checkout page, False otherwise
         """
-        return self.is_element_visible((By.CSS_SELECTOR, "h1.checkout-title"))
+        return self.is_element_visible(CheckoutPage.checkout_header)
 
     def fill_in_checkout_form(self, email, first_name, last_name, phone, address, city, postcode, country):
         """
@@ -82,11 +83,12 @@ class CheckoutPage(BasePage):
         :param postcode: string, customer's postal code
         :param country: string, customer's country (must match an option in the dropdown)
         """
-        self.enter_text((By.ID, "app_one_page_checkout_customer_email"), email)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_firstName"), first_name)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_lastName"), last_name)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_phoneNumber"), phone)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_street"), address)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_city"), city)
-        self.enter_text((By.ID, "app_one_page_checkout_billingAddress_postcode"), postcode)
-        self.select_dropdown_option((By.ID, "app_one_page_checkout_billingAddress_countryCode"), country)
\ No newline at end of file
+        with self.batch() as batch:
+            batch.type(CheckoutPage.email_input, email)
+            batch.type(CheckoutPage.first_name_input, first_name)
+            batch.type(CheckoutPage.last_name_input, last_name)
+            batch.type(CheckoutPage.phone_input, phone)
+            batch.type(CheckoutPage.address_input, address)
+            batch.type(CheckoutPage.city_input, city)
+            batch.type(CheckoutPage.postcode_input, postcode)
+            batch.select(CheckoutPage.country_selector, country)
\ No newline at end of file
@@ -0,0 +1,499 @@
+"""
+Offline parsers for the CSS selectors and XPath expressions used in locators.
+
+The parsers follow the Selectors Level 4 and XPath 1.0 grammars closely enough to reject what a
+browser would reject with 'invalid selector', without a browser. They return plain tuples and
+dicts that can be walked to evaluate a locator against a parsed document:
+
+    parse_css("td.numbers:nth-child(4)")
+    # [[(None, {'tag': 'td', 'ids': [], 'classes': ['numbers'], 'attributes': [],
+    #           'pseudos': [('nth-child', (0, 4, None))]})]]
+"""
+import re
+
+from selenium.webdriver.common.by import By
+
+
+class SelectorError(ValueError):
+    """
+    Raised for a locator a browser would reject as an invalid selector.
+    """
+
+
+# ---------------------------------------------------------------------------- CSS
+
+_ESCAPE = r'\\(?:[0-9a-fA-F]{1,6}\s?|[^\n0-9a-fA-F])'
+_IDENT = rf'-?(?:[_a-zA-Z\u0080-\uffff]|{_ESCAPE}|-)(?:[\w\-\u0080-\uffff]|{_ESCAPE})*'
+_STRING = r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\''
+_CSS_TOKEN = re.compile(rf"""
+    (?P<space>\s+)
+  | (?P<string>{_STRING})
+  | (?P<hash>\#(?:[\w\-\u0080-\uffff]|{_ESCAPE})+)
+  | (?P<ident>{_IDENT})
+  | (?P<number>[+-]?(?:\d+\.?\d*|\.\d+))
+  | (?P<match>[~|^$*]=)
+  | (?P<delim>::|[.:\[\]()=,>+~*|])
+""", re.VERBOSE)
+
+# Pseudo-classes whose argument is a selector list, and those taking an+b.
+SELECTOR_PSEUDOS = ('not', 'is', 'where', 'has')
+NTH_PSEUDOS = ('nth-child', 'nth-last-child', 'nth-of-type', 'nth-last-of-type')
+PSEUDO_CLASSES = (
+    'root', 'empty', 'first-child', 'last-child', 'only-child', 'first-of-type', 'last-of-type', 'only-of-type',
+    'link', 'any-link', 'visited', 'hover', 'active', 'focus', 'focus-within', 'focus-visible', 'target',
+    'enabled', 'disabled', 'checked', 'indeterminate', 'required', 'optional', 'read-only', 'read-write',
+    'placeholder-shown', 'default', 'valid', 'invalid', 'in-range', 'out-of-range', 'defined', 'scope',
+)
+ARGUMENT_PSEUDOS = ('lang', 'dir')
+PSEUDO_ELEMENTS = ('before', 'after', 'first-line', 'first-letter', 'placeholder', 'selection', 'marker')
+
+
+def _unescape(text):
+    return re.sub(_ESCAPE, lambda match: (chr(int(match.group()[1:].strip(), 16))
+                                          if re.match(r'\\[0-9a-fA-F]', match.group()) else match.group()[1]), text)
+
+
+def _tokenize_css(selector):
+    tokens, position = [], 0
+    while position < len(selector):
+        match = _CSS_TOKEN.match(selector, position)
+        if not match or match.end() == position:
+            raise SelectorError(f"Unexpected {selector[position]!r} at {position} in CSS selector {selector!r}")
+        tokens.append((match.lastgroup, match.group(), position))
+        position = match.end()
+    tokens.append(('end', '', position))
+    return tokens
+
+
+class _CssParser:
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.tokens = _tokenize_css(selector)
+        self.index = 0
+
+    def error(self, expected):
+        kind, value, position = self.tokens[self.index]
+        found = repr(value) if kind != 'end' else 'end of selector'
+        return SelectorError(f"Expected {expected} but found {found} at {position} in CSS selector {self.selector!r}")
+
+    def peek(self, skip_space=False):
+        index = self.index
+        if skip_space and self.tokens[index][0] == 'space':
+            index += 1
+        return self.tokens[index]
+
+    def take(self, kind=None, value=None):
+        token = self.tokens[self.index]
+        if (kind and token[0] != kind) or (value is not None and token[1] != value):
+            raise self.error(value or kind)
+        self.index += 1
+        return token
+
+    def skip_space(self):
+        if self.peek()[0] == 'space':
+            self.index += 1
+
+    def selector_list(self, closing=None):
+        selectors = []
+        while True:
+            self.skip_space()
+            selectors.append(self.complex_selector())
+            self.skip_space()
+            kind, value, _ = self.peek()
+            if value == ',':
+                self.take()
+                continue
+            if (closing is None and kind == 'end') or (closing is not None and value == closing):
+                return selectors
+            raise self.error("',' or a combinator")
+
+    def complex_selector(self):
+        parts = [(None, self.compound_selector())]
+        while True:
+            space = self.peek()[0] == 'space'
+            kind, value, _ = self.peek(skip_space=True)
+            if value in ('>', '+', '~'):
+                self.skip_space()
+                self.take()
+                self.skip_space()
+                parts.append((value, self.compound_selector()))
+            elif space and kind != 'end' and value not in (',', ')'):
+                self.skip_space()
+                parts.append((' ', self.compound_selector()))
+            else:
+                return parts
+
+    def compound_selector(self):
+        compound = {'tag': None, 'ids': [], 'classes': [], 'attributes': [], 'pseudos': []}
+        kind, value, _ = self.peek()
+        if kind == 'ident' or value == '*':
+            self.take()
+            compound['tag'] = _unescape(value).lower() if kind == 'ident' else '*'
+        while True:
+            kind, value, _ = self.peek()
+            if kind == 'hash':
+                self.take()
+                compound['ids'].append(_unescape(value[1:]))
+            elif value == '.':
+                self.take()
+                compound['classes'].append(_unescape(self.take('ident')[1]))
+            elif value == '[':
+                compound['attributes'].append(self.attribute())
+            elif value in (':', '::'):
+                compound['pseudos'].append(self.pseudo())
+            else:
+                break
+        if compound == {'tag': None, 'ids': [], 'classes': [], 'attributes': [], 'pseudos': []}:
+            raise self.error("a selector")
+        return compound
+
+    def attribute(self):
+        self.take(value='[')
+        self.skip_space()
+        name = _unescape(self.take('ident')[1]).lower()
+        self.skip_space()
+        operator = value = flags = None
+        if self.peek()[0] == 'match' or self.peek()[1] == '=':
+            operator = self.take()[1]
+            self.skip_space()
+            kind, token, _ = self.peek()
+            if kind == 'string':
+                value = _unescape(token[1:-1])
+            elif kind == 'ident':
+                value = _unescape(token)
+            else:
+                raise self.error("an attribute value")
+            self.take()
+            self.skip_space()
+            if self.peek()[0] == 'ident' and self.peek()[1].lower() in ('i', 's'):
+                flags = self.take()[1].lower()
+                self.skip_space()
+        self.take(value=']')
+        return name, operator, value, flags
+
+    def pseudo(self):
+        element = self.take()[1] == '::'
+        name = self.take('ident')[1].lower()
+        if element:
+            if name not in PSEUDO_ELEMENTS:
+                raise SelectorError(f"Unknown pseudo-element '::{name}' in CSS selector {self.selector!r}")
+            return '::' + name, None
+        if self.peek()[1] != '(':
+            if name not in PSEUDO_CLASSES + PSEUDO_ELEMENTS[:4]:
+                raise SelectorError(f"Unknown pseudo-class ':{name}' in CSS selector {self.selector!r}")
+            return name, None
+        self.take(value='(')
+        self.skip_space()
+        if name in SELECTOR_PSEUDOS:
+            argument = self.selector_list(closing=')')
+        elif name in NTH_PSEUDOS:
+            argument = self.nth()
+        elif name in ARGUMENT_PSEUDOS:
+            argument = self.take('ident')[1]
+        else:
+            raise SelectorError(f"Unknown functional pseudo-class ':{name}()' in CSS selector {self.selector!r}")
+        self.skip_space()
+        self.take(value=')')
+        return name, argument
+
+    def nth(self):
+        """
+        :return: (a, b, selector list of an 'of S' clause or None)
+        """
+        text = ''
+        while self.peek()[0] in ('ident', 'number', 'space') or self.peek()[1] == '+':
+            if self.peek()[0] == 'ident' and self.peek()[1] == 'of' and text.strip():
+                break
+            text += self.take()[1]
+        text = text.strip().lower().replace(' ', '')
+        if text in ('odd', 'even'):
+            a, b = 2, 1 if text == 'odd' else 0
+        else:
+            match = re.fullmatch(r'(?:([+-]?\d*)n)?([+-]?\d+)?', text)
+            if not text or not match:
+                raise self.error("an+b, odd or even")
+            a = match.group(1)
+            a = 0 if a is None else int(a + '1' if a in ('', '+', '-') else a)
+            b = int(match.group(2) or 0)
+        of = None
+        if self.peek()[1] == 'of':
+            self.take()
+            of = self.selector_list(closing=')')
+        return a, b, of
+
+
+def parse_css(selector):
+    """
+    Parse a CSS selector list.
+
+    :param selector: CSS selector, e.g. ".cart-title h1, h1.checkout-title"
+    :return: list of complex selectors; each a list of (combinator, compound) from left to right,
+        the combinator one of None (first), ' ', '>', '+' or '~'
+    :raises: SelectorError if the selector is invalid
+    """
+    return _CssParser(selector).selector_list()
+
+
+# -------------------------------------------------------------------------- XPath
+
+AXES = ('ancestor', 'ancestor-or-self', 'attribute', 'child', 'descendant', 'descendant-or-self', 'following',
+        'following-sibling', 'namespace', 'parent', 'preceding', 'preceding-sibling', 'self')
+NODE_TYPES = ('node', 'text', 'comment', 'processing-instruction')
+XPATH_FUNCTIONS = {
+    # name: (minimum, maximum) number of arguments
+    'last': (0, 0), 'position': (0, 0), 'count': (1, 1), 'id': (1, 1), 'local-name': (0, 1),
+    'namespace-uri': (0, 1), 'name': (0, 1), 'string': (0, 1), 'concat': (2, None), 'starts-with': (2, 2),
+    'contains': (2, 2), 'substring-before': (2, 2), 'substring-after': (2, 2), 'substring': (2, 3),
+    'string-length': (0, 1), 'normalize-space': (0, 1), 'translate': (3, 3), 'boolean': (1, 1), 'not': (1, 1),
+    'true': (0, 0), 'false': (0, 0), 'lang': (1, 1), 'number': (0, 1), 'sum': (1, 1), 'floor': (1, 1),
+    'ceiling': (1, 1), 'round': (1, 1),
+}
+_NAME = r'[A-Za-z_\u00c0-\uffff][\w.\-\u00b7\u00c0-\uffff]*'
+_XPATH_TOKEN = re.compile(rf"""
+    (?P<space>\s+)
+  | (?P<literal>"[^"]*"|'[^']*')
+  | (?P<number>\d+(?:\.\d*)?|\.\d+)
+  | (?P<operator>//|::|\.\.|!=|<=|>=|[/()\[\]@,|+\-=<>.*$])
+  | (?P<name>{_NAME}(?::(?:{_NAME}|\*))?)
+""", re.VERBOSE)
+_OPERATOR_NAMES = ('and', 'or', 'mod', 'div')
+
+
+def _tokenize_xpath(expression):
+    tokens, position = [], 0
+    while position < len(expression):
+        match = _XPATH_TOKEN.match(expression, position)
+        if not match:
+            raise SelectorError(f"Unexpected {expression[position]!r} at {position} in XPath {expression!r}")
+        if match.lastgroup != 'space':
+            kind, value = match.lastgroup, match.group()
+            # XPath 1.0, 3.7: '*' and names are operators unless they start an expression.
+            previous = tokens[-1] if tokens else None
+            operand_before = previous and not (previous[0] == 'operator' and previous[1] not in (')', ']', '.', '..', '*')
+                                               or previous[0] == 'operatorname')
+            if operand_before and (value == '*' or (kind == 'name' and value in _OPERATOR_NAMES)):
+                kind = 'operatorname'
+            tokens.append((kind, value, position))
+        position = match.end()
+    tokens.append(('end', '', position))
+    return tokens
+
+
+class _XPathParser:
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = _tokenize_xpath(expression)
+        self.index = 0
+
+    def error(self, expected):
+        kind, value, position = self.tokens[self.index]
+        found = repr(value) if kind != 'end' else 'end of expression'
+        return SelectorError(f"Expected {expected} but found {found} at {position} in XPath {self.expression!r}")
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.index + offset, len(self.tokens) - 1)]
+
+    def take(self, value=None, kind=None):
+        token = self.tokens[self.index]
+        if (value is not None and token[1] != value) or (kind and token[0] != kind):
+            raise self.error(repr(value) if value is not None else kind)
+        self.index += 1
+        return token
+
+    def binary(self, operand, operators):
+        left = operand()
+        while self.peek()[1] in operators and self.peek()[0] in ('operator', 'operatorname'):
+            operator = self.take()[1]
+            left = ('binary', operator, left, operand())
+        return left
+
+    def expr(self):
+        return self.binary(self.and_expr, ('or',))
+
+    def and_expr(self):
+        return self.binary(self.equality, ('and',))
+
+    def equality(self):
+        return self.binary(self.relational, ('=', '!='))
+
+    def relational(self):
+        return self.binary(self.additive, ('<', '>', '<=', '>='))
+
+    def additive(self):
+        return self.binary(self.multiplicative, ('+', '-'))
+
+    def multiplicative(self):
+        return self.binary(self.unary, ('*', 'div', 'mod'))
+
+    def unary(self):
+        if self.peek()[1] == '-' and self.peek()[0] == 'operator':
+            self.take()
+            return ('negate', self.unary())
+        return self.union()
+
+    def union(self):
+        paths = [self.path_expr()]
+        while self.peek()[1] == '|':
+            self.take()
+            paths.append(self.path_expr())
+        return paths[0] if len(paths) == 1 else ('union', paths)
+
+    def path_expr(self):
+        kind, value, _ = self.peek()
+        is_primary = (kind in ('literal', 'number') or value in ('(', '$')
+                      or (kind == 'name' and self.peek(1)[1] == '(' and value not in NODE_TYPES))
+        if not is_primary:
+            return self.location_path()
+        primary = self.primary()
+        predicates = self.predicates()
+        steps = []
+        while self.peek()[1] in ('/', '//'):
+            steps.extend(self.separator())
+            steps.append(self.step())
+        if not predicates and not steps:
+            return primary
+        return ('filter', primary, predicates, steps)
+
+    def separator(self):
+        # '//' is short for /descendant-or-self::node()/
+        if self.take()[1] == '//':
+            return [('step', 'descendant-or-self', ('type', 'node'), [])]
+        return []
+
+    def location_path(self):
+        steps = []
+        absolute = self.peek()[1] in ('/', '//')
+        if absolute:
+            steps.extend(self.separator())
+            if not steps and not self.starts_step():
+                return ('path', True, [])
+        steps.append(self.step())
+        while self.peek()[1] in ('/', '//'):
+            steps.extend(self.separator())
+            steps.append(self.step())
+        return ('path', absolute, steps)
+
+    def starts_step(self):
+        kind, value, _ = self.peek()
+        return kind == 'name' or value in ('*', '@', '.', '..') or kind == 'operatorname' and value == '*'
+
+    def step(self):
+        kind, value, _ = self.peek()
+        if value == '.':
+            self.take()
+            return ('step', 'self', ('type', 'node'), [])
+        if value == '..':
+            self.take()
+            return ('step', 'parent', ('type', 'node'), [])
+        axis = 'child'
+        if value == '@':
+            self.take()
+            axis = 'attribute'
+        elif kind == 'name' and self.peek(1)[1] == '::':
+            axis = self.take()[1]
+            if axis not in AXES:
+                raise SelectorError(f"Unknown axis '{axis}' in XPath {self.expression!r}")
+            self.take('::')
+        return ('step', axis, self.node_test(), self.predicates())
+
+    def node_test(self):
+        kind, value, _ = self.peek()
+        if value == '*' and kind in ('operator', 'operatorname'):
+            self.take()
+            return ('name', '*')
+        if kind != 'name':
+            raise self.error("a node test")
+        self.take()
+        if value in NODE_TYPES and self.peek()[1] == '(':
+            self.take('(')
+            argument = None
+            if value == 'processing-instruction' and self.peek()[0] == 'literal':
+                argument = self.take()[1][1:-1]
+            self.take(')')
+            return ('type', value) if argument is None else ('type', value, argument)
+        return ('name', value)
+
+    def predicates(self):
+        predicates = []
+        while self.peek()[1] == '[':
+            self.take('[')
+            predicates.append(self.expr())
+            self.take(']')
+        return predicates
+
+    def primary(self):
+        kind, value, _ = self.peek()
+        if kind == 'literal':
+            self.take()
+            return ('literal', value[1:-1])
+        if kind == 'number':
+            self.take()
+            return ('number', float(value))
+        if value == '$':
+            self.take()
+            return ('variable', self.take(kind='name')[1])
+        if value == '(':
+            self.take()
+            expression = self.expr()
+            self.take(')')
+            return expression
+        name = self.take(kind='name')[1]
+        self.take('(')
+        arguments = []
+        if self.peek()[1] != ')':
+            arguments.append(self.expr())
+            while self.peek()[1] == ',':
+                self.take()
+                arguments.append(self.expr())
+        self.take(')')
+        if name not in XPATH_FUNCTIONS:
+            raise SelectorError(f"Unknown function '{name}()' in XPath {self.expression!r}")
+        minimum, maximum = XPATH_FUNCTIONS[name]
+        if len(arguments) < minimum or (maximum is not None and len(arguments) > maximum):
+            raise SelectorError(f"Wrong number of arguments to '{name}()' in XPath {self.expression!r}")
+        return ('call', name, arguments)
+
+
+def parse_xpath(expression):
+    """
+    Parse an XPath 1.0 expression.
+
+    :param expression: XPath, e.g. "//td[contains(text(), 'Purchase type:')]"
+    :return: expression tree of tuples: ('path', absolute, steps) with steps ('step', axis, node test,
+        predicates), ('filter', primary, predicates, steps), ('binary', operator, left, right),
+        ('negate', operand), ('union', paths), ('call', name, arguments), ('literal', text),
+        ('number', value) and ('variable', name)
+    :raises: SelectorError if the expression is invalid
+    """
+    parser = _XPathParser(expression)
+    tree = parser.expr()
+    if parser.peek()[0] != 'end':
+        raise parser.error("end of expression")
+    return tree
+
+
+# ----------------------------------------------------------------------- Locators
+
+def check_locator(by, value):
+    """
+    Check a (By strategy, value) locator the way the browser would before searching.
+
+    :raises: SelectorError if the strategy is unknown or the value is invalid for it
+    """
+    if not isinstance(value, str) or not value:
+        raise SelectorError(f"Empty {by} locator")
+    if by == By.CSS_SELECTOR:
+        parse_css(value)
+    elif by == By.XPATH:
+        parse_xpath(value)
+    elif by == By.CLASS_NAME:
+        if re.search(r'\s', value):
+            raise SelectorError(f"Compound class name {value!r} is not permitted, use a CSS selector")
+        parse_css('.' + value)
+    elif by == By.TAG_NAME:
+        if not re.fullmatch(_IDENT, value):
+            raise SelectorError(f"Invalid tag name {value!r}")
+    elif by not in (By.ID, By.NAME, By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        raise SelectorError(f"Unknown locator strategy {by!r}")
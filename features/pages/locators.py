@@ -0,0 +1,178 @@
+import weakref
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.remote.webelement import WebElement
+
+
+class Locator(tuple):
+    """
+    Class-level declaration of a page element.
+
+    A Locator is a (By strategy, value) tuple, so it can be passed anywhere a by_locator is
+    expected. Declaring one on a page object also defines an upper-case constant holding the
+    plain tuple, and reading the attribute from a page instance returns the resolved
+    WebElement from the browser's ElementCache:
+
+        class CartPage(BasePage):
+            cart_title = Locator(By.CSS_SELECTOR, ".cart-title h1")
+
+        page.cart_title          # cached WebElement
+        CartPage.cart_title      # the Locator, for checks and batches that must not resolve it
+        page.CART_TITLE          # (By.CSS_SELECTOR, ".cart-title h1")
+    """
+
+    def __new__(cls, by, value, many=False, cache=True, attributes=()):
+        """
+        Declare a locator.
+
+        :param by: Selenium By strategy
+        :param value: locator value
+        :param many: resolve to a list of WebElements instead of a single one
+        :param cache: keep the resolved element(s) until the next navigation; disable for
+                      locators whose matches change while the page is open
+        :param attributes: attributes or properties read for the element by BasePage.snapshot
+        """
+        locator = super().__new__(cls, (by, value))
+        locator.many = many
+        locator.cache = cache
+        locator.attributes = tuple(attributes)
+        locator.name = None
+        return locator
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        if name.upper() != name and name.upper() not in vars(owner):
+            setattr(owner, name.upper(), (self[0], self[1]))
+
+    def __get__(self, page, owner=None):
+        if page is None:
+            return self
+        return ElementCache.for_browser(page.browser).resolve(page, self)
+
+    def __repr__(self):
+        return f"Locator({self[0]!r}, {self[1]!r})"
+
+
+class CachedElement(WebElement):
+    """
+    WebElement resolved through the ElementCache.
+
+    When the browser reports the element as stale, the cache entry is dropped and the element
+    is looked up again once before the command is retried.
+    """
+
+    def __init__(self, element, page, locator, index=None):
+        super().__init__(element.parent, element.id)
+        self._page = page
+        self._locator = locator
+        self._index = index
+
+    def refresh(self):
+        """
+        Resolve the element again after it went stale.
+        """
+        cache = ElementCache.for_browser(self._page.browser)
+        cache.evict(self._locator)
+        if self._index is None:
+            self._id = self._page.find_element(self._locator).id
+            if getattr(self._locator, 'cache', False):
+                cache.elements[(self._locator[0], self._locator[1], False)] = self
+        else:
+            elements = self._page.find_elements(self._locator)
+            if self._index >= len(elements):
+                raise StaleElementReferenceException(
+                    f"{self._locator!r} matches {len(elements)} elements now, element {self._index} is gone")
+            self._id = elements[self._index].id
+
+    def _execute(self, command, params=None):
+        try:
+            return super()._execute(command, params)
+        except StaleElementReferenceException:
+            self.refresh()
+            return super()._execute(command, params)
+
+
+class ElementCache:
+    """
+    Resolved WebElements of the current page load, shared by all page objects of a browser.
+
+    Entries are dropped on navigation through BasePage.open, when a readiness wait finds another
+    document than the one they were resolved on, and whenever an element goes stale. Hits are
+    lookups that did not need a round trip to the browser.
+    """
+
+    _caches = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self.elements = {}
+        self.document = None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @classmethod
+    def for_browser(cls, browser):
+        """
+        Return the cache of a browser, creating it on first use.
+
+        :param browser: Selenium WebDriver instance
+        :return: ElementCache
+        """
+        cache = cls._caches.get(browser)
+        if cache is None:
+            cache = cls._caches[browser] = cls()
+        return cache
+
+    def resolve(self, page, locator):
+        """
+        Return the cached element(s) for a locator, looking them up on a miss.
+
+        :param page: BasePage instance used to find the element
+        :param locator: Locator declared on the page class
+        :return: CachedElement or list of CachedElements
+        """
+        key = (locator[0], locator[1], locator.many)
+        if locator.cache and key in self.elements:
+            self.hits += 1
+            return self.elements[key]
+        self.misses += 1
+        if locator.many:
+            resolved = [CachedElement(element, page, locator, index)
+                        for index, element in enumerate(page.find_elements(locator))]
+        else:
+            resolved = CachedElement(page.find_element(locator), page, locator)
+        if locator.cache:
+            self.elements[key] = resolved
+        return resolved
+
+    def evict(self, locator):
+        """
+        Drop the entries of a locator whose elements went stale.
+
+        :param locator: locator tuple
+        """
+        for many in (False, True):
+            if self.elements.pop((locator[0], locator[1], many), None) is not None:
+                self.stale += 1
+
+    def clear(self):
+        """
+        Drop every entry, typically because the browser navigated away.
+        """
+        self.elements.clear()
+
+    def track_document(self, token):
+        """
+        Drop every entry if the browser shows another document than before, e.g. after a click that navigated.
+
+        :param token: identity token of the current document, see IDENTITY_TRACKER_JS
+        """
+        if token != self.document:
+            self.clear()
+            self.document = token
+
+    def stats(self):
+        """
+        :return: dict with hit, miss and stale-eviction counts
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
@@ -1,4 +1,6 @@
 from .base_page import BasePage
+from .locators import Locator
+from .snapshots import MainSnapshot
 from selenium.webdriver.common.by import By
 
 class MainPage(BasePage):
@@ -6,21 +8,42 @@ class MainPage(BasePage):
     Page object for the main page, containing specific elements and methods.
     """
 
-    def __init__(self, browser):
+    PATH = "/"
+    BLOCKED_RESOURCES = ('image', 'font', 'media', 'analytics')
+
+    shop_now_button = Locator(By.CSS_SELECTOR, "a.btn[href='/range']")
+
+    def __init__(self, browser, base_url=None):
         """
         Initialize the MainPage with a browser instance.
         
         :param browser: Selenium WebDriver instance
+        :param base_url: storefront base URL, defaults to DEFAULT_BASE_URL
         """
-        super().__init__(browser)
+        super().__init__(browser, base_url)
 
-    @property
-    def shop_now_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "a.btn[href='/range']")
+    def snapshot(self):
+        """
+        Read the state of the main page in a single call.
+        
+        :return: MainSnapshot
+        """
+        return self.build_snapshot(self.read_fields())
+
+    @staticmethod
+    def build_snapshot(fields):
+        """
+        Build the typed snapshot of the main page from its read_fields() result.
+        
+        :param fields: PageSnapshot of the page's Locator fields
+        :return: MainSnapshot
+        """
+        return MainSnapshot(shop_now_visible=fields['shop_now_button'].visible)
 
     def click_shop_now(self):
         """
         Click on the 'SHOP NOW' button on the main page.
         """
-        self.scroll_to_element(self.shop_now_button)
-        self.shop_now_button.click()
\ No newline at end of file
+        with self.measured_navigation('click_shop_now'):
+            self.scroll_to_element(self.shop_now_button)
+            self.shop_now_button.click()
\ No newline at end of file
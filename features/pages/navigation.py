@@ -0,0 +1,138 @@
+import logging
+import weakref
+from urllib.parse import urldefrag
+
+from selenium.common.exceptions import WebDriverException
+
+from .scripts import PAGE_IDENTITY_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+# Transitions NavigationPlanner chooses from, cheapest first.
+TRANSITIONS = ('reuse', 'anchor', 'history', 'get')
+
+
+class NavigationPlanner:
+    """
+    Decides how BasePage.open gets a browser onto a URL.
+
+    A page is identified by its URL and the token and interaction count (generation) the identity
+    tracker keeps in the document. The current page is reused if it is at the URL and nobody
+    clicked, typed or submitted anything on it since it loaded. Otherwise an unchanged page is
+    left for another part of itself by setting the anchor, or for the page it was loaded from by
+    going back in the history, and anything else is a fresh get. Going back is ruled out for pages
+    showing server-side state, which the back/forward cache may restore as it was.
+    """
+
+    _planners = weakref.WeakKeyDictionary()
+
+    def __init__(self, browser):
+        """
+        :param browser: Selenium WebDriver instance
+        """
+        self.browser = browser
+        # Identity of the page after the planner's last navigation, and of the page before it
+        # if that was left unchanged through a get.
+        self.current = None
+        self.previous = None
+        # Token of a document invalidate() ruled out.
+        self.stale = None
+        self.counts = dict.fromkeys(TRANSITIONS, 0)
+
+    @classmethod
+    def attach(cls, browser):
+        """
+        Plan the navigations of a browser, keeping the state of an already attached planner.
+
+        :return: NavigationPlanner
+        """
+        planner = cls._planners.get(browser)
+        if planner is None:
+            planner = cls._planners[browser] = cls(browser)
+        return planner
+
+    @classmethod
+    def for_browser(cls, browser):
+        """
+        :return: the NavigationPlanner attached to a browser, or None
+        """
+        return cls._planners.get(browser)
+
+    def identity(self):
+        """
+        :return: dict with the url, token, generation and whether the document was tracked before,
+            or None if the browser cannot run the script
+        """
+        try:
+            return self.browser.execute_script(PAGE_IDENTITY_SCRIPT)
+        except WebDriverException:
+            return None
+
+    def plan(self, url, history=True):
+        """
+        Choose the transition to a URL.
+
+        A document the planner did not load itself, e.g. one a form submission led to, counts as
+        unchanged if the identity tracker was installed before any interaction and saw none.
+
+        :param url: absolute URL to navigate to
+        :param history: whether a copy of the page from the history may stand in for loading it
+        :return: 'reuse', 'anchor', 'history' or 'get'
+        """
+        state = self.identity()
+        known = bool(state and self.current and state['token'] == self.current['token'])
+        if known:
+            unchanged = state['generation'] == self.current['generation']
+        else:
+            unchanged = bool(state and state['tracked'] and not state['generation']
+                             and state['token'] != self.stale)
+        if not unchanged:
+            self.current = self.previous = None
+            return 'get'
+        if state['url'] == url:
+            self.current = state
+            return 'reuse'
+        page, fragment = urldefrag(url)
+        if fragment and urldefrag(state['url'])[0] == page:
+            self.previous = None
+            return 'anchor'
+        if history and known and self.previous and self.previous['url'] == url:
+            self.previous = None
+            return 'history'
+        # Only a page the planner loaded is known to be safe to go back to, not e.g. a form result.
+        self.previous = state if known else None
+        return 'get'
+
+    def record(self, page, url, transition):
+        """
+        Count a transition and log the navigations it avoided.
+
+        :param page: BasePage instance that navigated
+        """
+        self.counts[transition] += 1
+        if transition != 'get':
+            logger.info("%s: %s instead of loading %s", type(page).__name__,
+                        {'reuse': "reused the current page", 'anchor': "moved to the anchor",
+                         'history': "went back in the history"}[transition], url)
+
+    def loaded(self):
+        """
+        Remember the identity of the page the browser is on once a navigation is complete.
+        """
+        self.current = self.identity()
+
+    def invalidate(self):
+        """
+        Treat the page the browser is on and the one before it as changed, e.g. because the
+        cookies of the session were replaced.
+        """
+        state = self.identity()
+        self.stale = state and state['token']
+        self.current = self.previous = None
+
+    def pop_counts(self):
+        """
+        :return: dict of transition to the number of times it was taken since the last call
+        """
+        counts, self.counts = self.counts, dict.fromkeys(TRANSITIONS, 0)
+        return counts
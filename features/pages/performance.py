@@ -0,0 +1,88 @@
+import time
+import weakref
+
+# Timings of PERFORMANCE_SCRIPT kept per navigation, in milliseconds since the navigation started.
+TIMINGS = ('ttfb', 'dcl', 'load', 'ready', 'fp', 'fcp', 'lcp')
+
+
+def platform_of(browser):
+    """
+    :param browser: Selenium WebDriver instance
+    :return: readable platform of a session, e.g. 'chrome 120.0 linux'
+    """
+    capabilities = browser.capabilities
+    parts = (capabilities.get('browserName'), capabilities.get('browserVersion'), capabilities.get('platformName'))
+    return ' '.join(str(part) for part in parts if part) or 'unknown'
+
+
+class PerformanceMonitor:
+    """
+    Collects the Navigation Timing, resource timing, paint and largest contentful paint metrics
+    of every navigation a page object makes, keyed by the page object and what triggered it.
+    """
+
+    _monitors = weakref.WeakKeyDictionary()
+
+    def __init__(self, browser, platform=None):
+        """
+        :param browser: Selenium WebDriver instance
+        :param platform: platform name the records are keyed by, defaults to the session capabilities
+        """
+        self.browser = browser
+        self.platform = platform or platform_of(browser)
+        self.records = []
+
+    @classmethod
+    def attach(cls, browser, platform=None):
+        """
+        Enable metrics collection for a browser, keeping the records of an already attached monitor.
+
+        :return: PerformanceMonitor
+        """
+        monitor = cls._monitors.get(browser)
+        if monitor is None:
+            monitor = cls._monitors[browser] = cls(browser, platform)
+        elif platform:
+            monitor.platform = platform
+        return monitor
+
+    @classmethod
+    def for_browser(cls, browser):
+        """
+        :return: the PerformanceMonitor attached to a browser, or None
+        """
+        return cls._monitors.get(browser)
+
+    def add(self, page, trigger, metrics):
+        """
+        Record the metrics of a navigation.
+
+        :param page: BasePage instance that made the navigation
+        :param trigger: what caused it, 'load' for the load() of the page object or the name of the action
+        :param metrics: result of PERFORMANCE_SCRIPT
+        :return: dict record
+        """
+        record = {'ts': round(time.time(), 3), 'platform': self.platform, 'page': type(page).__name__,
+                  'trigger': trigger, 'url': metrics['url'], 'requests': metrics['requests'],
+                  'bytes': metrics['bytes'], 'resource_bytes': metrics.get('resourceBytes') or {}}
+        record.update((name, round(metrics[name], 1) if metrics.get(name) else None) for name in TIMINGS)
+        self.records.append(record)
+        return record
+
+    def latest(self, page_name=None, trigger=None):
+        """
+        :param page_name: page object class name, or None for any page
+        :param trigger: trigger to match, or None for any
+        :return: the most recent matching record, or None
+        """
+        for record in reversed(self.records):
+            if page_name in (None, record['page']) and trigger in (None, record['trigger']):
+                return record
+        return None
+
+    def drain(self):
+        """
+        :return: the records collected since the last call
+        """
+        records, self.records = self.records, []
+        return records
@@ -1,8 +1,6 @@
-import signal
-from typing import Self
-
-from yaml import scan
 from .base_page import BasePage
+from .locators import Locator
+from .snapshots import ProductSnapshot
 from selenium.webdriver.common.by import By
 
 class ProductPage(BasePage):
@@ -10,49 +8,50 @@ class ProductPage(BasePage):
     Page object for the product page, containing specific elements and methods.
     """
 
-    def __init__(self, browser):
+    PATH = "/products/aeons-total-harmony"
+    BLOCKED_RESOURCES = ('image', 'font', 'media', 'analytics')
+
+    add_to_cart_button = Locator(By.CSS_SELECTOR, "button.add-to-cart")
+    size_radio_button_250ml = Locator(By.ID, "sylius_add_to_cart_cartItem_variant_0")
+    size_radio_button_3bottles = Locator(By.ID, "sylius_add_to_cart_cartItem_variant_1")
+    subscribe_button = Locator(By.CSS_SELECTOR, ".purchase-option[data-variant-option-subscription='yes']")
+    faq_title = Locator(By.CSS_SELECTOR, "p.h1")
+    accordion_buttons = Locator(By.CSS_SELECTOR, ".accordion-button", many=True)
+    expanded_sections = Locator(By.CSS_SELECTOR, ".accordion-collapse.show", many=True, cache=False)
+    accordion_sections = Locator(By.CSS_SELECTOR, ".accordion-collapse", many=True, cache=False, attributes=('class',))
+
+    def __init__(self, browser, base_url=None):
         """
-        Initialize the ProductPage with a browser instance and set the URL.
+        Initialize the ProductPage with a browser instance.
         
         :param browser: Selenium WebDriver instance
+        :param base_url: storefront base URL, defaults to DEFAULT_BASE_URL
         """
-        super().__init__(browser)
-        self.url = "https://aeonstest.info/products/aeons-total-harmony"
-
-    @property
-    def add_to_cart_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "button.add-to-cart")
-
-    @property
-    def size_radio_button_250ml(self):
-        return self.browser.find_element(By.ID, "sylius_add_to_cart_cartItem_variant_0")
-
-    @property
-    def size_radio_button_3bottles(self):
-        return self.browser.find_element(By.ID, "sylius_add_to_cart_cartItem_variant_1")
-
-    @property
-    def subscribe_button(self):
-        return self.browser.find_element(By.CSS_SELECTOR, ".purchase-option[data-variant-option-subscription='yes']")
+        super().__init__(browser, base_url)
 
-    @property
-    def faq_title(self):
-        return self.browser.find_element(By.CSS_SELECTOR, "p.h1")
-
-    @property
-    def accordion_buttons(self):
-        return self.browser.find_elements(By.CSS_SELECTOR, ".accordion-button")
-
-    @property
-    def expanded_sections(self):
-        return self.browser.find_elements(By.CSS_SELECTOR, ".accordion-collapse.show")
+    def snapshot(self):
+        """
+        Read the FAQ title and the state of every accordion section in a single call.
+        
+        :return: ProductSnapshot
+        """
+        return self.build_snapshot(self.read_fields())
 
-    def load(self):
+    @staticmethod
+    def build_snapshot(fields):
         """
-        Navigate to the product page URL.
+        Build the typed snapshot of the product page from its read_fields() result.
+        
+        :param fields: PageSnapshot of the page's Locator fields
+        :return: ProductSnapshot
         """
-        self.browser.get(self.url)
-        self.wait_for_page_to_load()
+        return ProductSnapshot(
+            faq_title=fields['faq_title'].text,
+            accordion_count=fields['accordion_buttons'].count,
+            expanded_count=fields['expanded_sections'].count,
+            expanded=tuple('show' in (section.attributes.get('class') or '').split()
+                           for section in fields['accordion_sections'].elements),
+        )
 
     def add_to_cart(self):
         """
@@ -113,8 +112,7 @@ class ProductPage(BasePage):
         :param index: zero-based index of the accordion section to check
         :return: True if the section is expanded, False otherwise
         """
-        expanded_sections = self.expanded_sections
-        return len(expanded_sections) > index
+        return self.snapshot().is_section_expanded(index)
 
     def select_product_by_name(self, product_name):
         """
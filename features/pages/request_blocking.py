@@ -0,0 +1,211 @@
+import fnmatch
+import logging
+import threading
+import weakref
+
+from selenium.common.exceptions import WebDriverException
+from .cdp import execute_cdp, supports_cdp
+from features.support.json_files import locked, read_json, write_atomic
+
+logger = logging.getLogger(__name__)
+
+# URL patterns per resource class, in the wildcard syntax of CDP Network.setBlockedURLs.
+RESOURCE_PATTERNS = {
+    'image': ('*.png', '*.png?*', '*.jpg', '*.jpg?*', '*.jpeg', '*.jpeg?*', '*.gif', '*.gif?*', '*.webp', '*.webp?*',
+              '*.avif', '*.avif?*', '*.svg', '*.svg?*', '*.ico', '*.ico?*'),
+    'font': ('*.woff', '*.woff?*', '*.woff2', '*.woff2?*', '*.ttf', '*.ttf?*', '*.otf', '*.otf?*', '*.eot', '*.eot?*',
+             '*fonts.googleapis.com/*', '*fonts.gstatic.com/*'),
+    'media': ('*.mp4', '*.mp4?*', '*.webm', '*.webm?*', '*.mp3', '*.mp3?*', '*.m3u8', '*.m3u8?*'),
+    'analytics': ('*google-analytics.com/*', '*googletagmanager.com/*', '*doubleclick.net/*', '*connect.facebook.net/*',
+                  '*hotjar.com/*', '*clarity.ms/*', '*bat.bing.com/*', '*segment.com/*', '*klaviyo.com/*'),
+}
+
+# Bodies served instead of a stubbed resource, so that e.g. an analytics loader finds a valid script.
+STUB_RESPONSES = {
+    'image': ('image/gif', b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+                           b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'),
+    'font': ('font/woff2', b''),
+    'media': ('video/mp4', b''),
+    'analytics': ('application/javascript', b''),
+}
+
+def parse_rules(entries):
+    """
+    Turn resource classes and URL patterns into blocking rules.
+
+    An entry is a resource class of RESOURCE_PATTERNS ('image'), a URL pattern ('*/widgets/*.js'),
+    or either of them prefixed with 'stub:' to answer the requests with an empty response
+    instead of failing them.
+
+    :param entries: iterable of entries
+    :return: tuple of (pattern, stub) pairs, stub being the resource class or 'empty' for stubbed patterns
+    """
+    rules = []
+    for entry in entries:
+        stubbed = entry.startswith('stub:')
+        name = entry[len('stub:'):] if stubbed else entry
+        if name in RESOURCE_PATTERNS:
+            rules.extend((pattern, name if stubbed else None) for pattern in RESOURCE_PATTERNS[name])
+        elif '*' in name or '/' in name or '.' in name:
+            rules.append((name, 'empty' if stubbed else None))
+        else:
+            raise ValueError(f"Unknown resource class '{name}', expected one of {', '.join(RESOURCE_PATTERNS)} "
+                             f"or a URL pattern")
+    return tuple(dict.fromkeys(rules))
+
+
+def match_rule(rules, url):
+    """
+    :return: the first rule whose pattern matches the URL, or None
+    """
+    for rule in rules:
+        if fnmatch.fnmatchcase(url, rule[0]):
+            return rule
+    return None
+
+
+class RequestBlocker:
+    """
+    Blocks the requests of a browser that no step asserts on, per page load.
+
+    The rules of a load come from the BLOCKED_RESOURCES of the page object being opened,
+    unless the running scenario overrides them. On Chromium they are applied with the CDP
+    command Network.setBlockedURLs, which cannot stub, so stubbed resources are blocked. Other
+    browsers need a filtering proxy set up with the session; without one nothing is blocked.
+    After every load the transferred bytes and the load time are recorded.
+    """
+
+    _blockers = weakref.WeakKeyDictionary()
+
+    def __init__(self, browser, proxy=None):
+        """
+        :param browser: Selenium WebDriver instance
+        :param proxy: FilteringProxy the browser was configured with, if any
+        """
+        self.browser = browser
+        self.proxy = proxy
+        self.scenario_entries = None
+        self.rules = ()
+        self.loads = []
+        self._cdp = None
+
+    @classmethod
+    def attach(cls, browser, proxy=None):
+        """
+        Enable request blocking for a browser.
+
+        :return: RequestBlocker
+        """
+        blocker = cls._blockers[browser] = cls(browser, proxy)
+        return blocker
+
+    @classmethod
+    def for_browser(cls, browser):
+        """
+        :return: the RequestBlocker attached to a browser, or None
+        """
+        return cls._blockers.get(browser)
+
+    @property
+    def cdp(self):
+        """
+        :return: True if the browser accepts CDP commands
+        """
+        if self._cdp is None:
+            self._cdp = self.proxy is None and supports_cdp(self.browser)
+            if not self._cdp and self.proxy is None:
+                logger.warning("%s does not support CDP and no filtering proxy is configured, nothing is blocked",
+                               self.browser.capabilities.get('browserName') or 'The browser')
+        return self._cdp
+
+    def apply(self, page_entries):
+        """
+        Install the rules for the next page load, if they differ from the installed ones.
+
+        :param page_entries: BLOCKED_RESOURCES of the page object being opened
+        """
+        entries = page_entries if self.scenario_entries is None else self.scenario_entries
+        rules = parse_rules(entries)
+        if rules == self.rules:
+            return
+        if self.proxy is not None:
+            self.proxy.rules = rules
+        elif not self.cdp:
+            return
+        else:
+            try:
+                if not self.rules:
+                    execute_cdp(self.browser, 'Network.enable')
+                execute_cdp(self.browser, 'Network.setBlockedURLs', {'urls': [pattern for pattern, _ in rules]})
+            except WebDriverException as error:
+                logger.warning("CDP request blocking is not available: %s", error.msg)
+                self._cdp = False
+                return
+        self.rules = rules
+
+    def record_load(self, page, metrics):
+        """
+        Record the transferred bytes and the load time of the page just opened.
+
+        :param page: BasePage instance that was opened
+        :param metrics: result of PERFORMANCE_SCRIPT for the load
+        :return: dict with page, url, blocked rule count, bytes, requests and duration in seconds
+        """
+        load = {'page': type(page).__name__, 'url': metrics['url'], 'blocked': len(self.rules),
+                'bytes': metrics['bytes'], 'requests': metrics['requests'], 'duration': (metrics['ready'] or 0) / 1000}
+        self.loads.append(load)
+        return load
+
+    def reset(self):
+        """
+        Drop the scenario override, e.g. when the session goes back to the pool.
+        """
+        self.scenario_entries = None
+
+
+class LoadBaseline:
+    """
+    Mean bytes and load time per page object of loads without any blocking, kept in a JSON file.
+    The loads added since the file was read are merged into it on save.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = read_json(path, {})
+        # Means of the loads added since the last save, per page object.
+        self.added = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fold(entry, loads, means):
+        entry['loads'] += loads
+        for key in ('bytes', 'duration'):
+            entry[key] += (means[key] - entry[key]) * loads / entry['loads']
+
+    def add(self, load):
+        """
+        Fold an unblocked load into the baseline of its page object.
+        """
+        with self._lock:
+            for pages in (self.pages, self.added):
+                self._fold(pages.setdefault(load['page'], {'loads': 0, 'bytes': 0.0, 'duration': 0.0}), 1, load)
+
+    def saved(self, load):
+        """
+        :return: (bytes saved, seconds saved) of a blocked load against the baseline, or None without a baseline
+        """
+        entry = self.pages.get(load['page'])
+        if not entry:
+            return None
+        return entry['bytes'] - load['bytes'], entry['duration'] - load['duration']
+
+    def save(self):
+        """
+        Merge the loads added since the last save into the file.
+        """
+        with locked(self.path), self._lock:
+            pages = read_json(self.path, {})
+            for page, added in self.added.items():
+                self._fold(pages.setdefault(page, {'loads': 0, 'bytes': 0.0, 'duration': 0.0}), added['loads'], added)
+            write_atomic(self.path, pages, indent=2, sort_keys=True)
+            self.pages, self.added = pages, {}
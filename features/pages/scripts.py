@@ -0,0 +1,353 @@
+"""
+JavaScript snippets executed in the browser by the page objects.
+
+Every snippet that needs to resolve Selenium locators inside the page shares the
+LOCATE_JS helper, so a locator tuple such as (By.ID, "foo") can be passed to the
+browser unchanged as [by, value].
+"""
+
+LOCATE_JS = """
+function locate(by, value, root) {
+    root = root || document;
+    var list = function (nodes) { return Array.prototype.slice.call(nodes); };
+    switch (by) {
+        case 'id':
+            return list(root.querySelectorAll('[id="' + CSS.escape(value) + '"]'));
+        case 'name':
+            return list(root.querySelectorAll('[name="' + CSS.escape(value) + '"]'));
+        case 'class name':
+            return list(root.getElementsByClassName(value));
+        case 'tag name':
+            return list(root.getElementsByTagName(value));
+        case 'css selector':
+            return list(root.querySelectorAll(value));
+        case 'xpath':
+            var found = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            var nodes = [];
+            for (var i = 0; i < found.snapshotLength; i++) { nodes.push(found.snapshotItem(i)); }
+            return nodes;
+        case 'link text':
+        case 'partial link text':
+            return list(root.getElementsByTagName('a')).filter(function (a) {
+                var text = (a.innerText || a.textContent || '').trim();
+                return by === 'link text' ? text === value : text.indexOf(value) !== -1;
+            });
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+}
+"""
+
+SCROLL_INTO_VIEW_SCRIPT = "arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});"
+
+# Changes whenever the document is replaced, e.g. by a navigation a click caused.
+TIME_ORIGIN_SCRIPT = "return performance.timeOrigin;"
+
+VISIBLE_JS = """
+function visible(el) {
+    var rect = el.getBoundingClientRect(), style = window.getComputedStyle(el);
+    return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none'
+        && parseFloat(style.opacity) > 0;
+}
+"""
+
+BATCH_SCRIPT = LOCATE_JS + """
+var ops = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+var deadline = Date.now() + timeout, native = [], index = 0;
+
+function setValue(el, text) {
+    var proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, text);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+}
+
+function apply(op, el) {
+    switch (op.op) {
+        case 'find':
+            return;
+        case 'scroll':
+            el.scrollIntoView({block: 'center'});
+            return;
+        case 'clear':
+            el.scrollIntoView({block: 'center'});
+            setValue(el, '');
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            return;
+        case 'type':
+            el.scrollIntoView({block: 'center'});
+            el.focus();
+            if (op.clear) { setValue(el, ''); }
+            if (op.native) { native.push(el); return; }
+            setValue(el, (op.clear ? '' : el.value) + op.text);
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            el.blur();
+            return;
+        case 'select':
+            el.scrollIntoView({block: 'center'});
+            var option = Array.prototype.filter.call(el.options, function (o) {
+                return o.text.trim() === op.text || o.value === op.text;
+            })[0];
+            if (!option) { throw new Error('No option "' + op.text + '"'); }
+            el.value = option.value;
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            return;
+        case 'click':
+            el.scrollIntoView({block: 'center'});
+            if (op.native) { native.push(el); return; }
+            el.click();
+            return;
+    }
+    throw new Error('Unsupported batch operation: ' + op.op);
+}
+
+(function next() {
+    while (index < ops.length) {
+        var op = ops[index], el = locate(op.by, op.value)[0];
+        if (!el) {
+            if (Date.now() < deadline) { return setTimeout(next, 50); }
+            return done({ok: false, index: index, error: 'element not found'});
+        }
+        try {
+            apply(op, el);
+        } catch (e) {
+            return done({ok: false, index: index, error: String(e && e.message || e)});
+        }
+        index++;
+    }
+    done({ok: true, native: native});
+})();
+"""
+
+WAIT_SCRIPT = LOCATE_JS + VISIBLE_JS + """
+var by = arguments[0], value = arguments[1], condition = arguments[2], many = arguments[3], timeout = arguments[4];
+var done = arguments[arguments.length - 1];
+var observer, timer, settled = false, stabilising = false;
+
+function matches(el) {
+    switch (condition) {
+        case 'present': return true;
+        case 'visible': return visible(el);
+        case 'enabled': return visible(el) && !el.disabled;
+        case 'stable': return visible(el);
+    }
+    throw new Error('Unsupported wait condition: ' + condition);
+}
+
+function finish(result) {
+    if (settled) { return; }
+    settled = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    document.removeEventListener('transitionend', evaluate, true);
+    document.removeEventListener('animationend', evaluate, true);
+    done(result);
+}
+
+function stabilise(el, result) {
+    stabilising = true;
+    el.scrollIntoView({block: 'center'});
+    var previous = null;
+    (function frame() {
+        var rect = el.getBoundingClientRect(), current = [rect.top, rect.left, rect.width, rect.height].join();
+        if (current === previous) { return finish(result); }
+        previous = current;
+        window.requestAnimationFrame(frame);
+    })();
+}
+
+function evaluate() {
+    if (settled || stabilising) { return; }
+    var found = locate(by, value).filter(matches);
+    if (!found.length) { return; }
+    var result = many ? found : found[0];
+    if (condition === 'stable') { return stabilise(found[0], result); }
+    finish(result);
+}
+
+observer = new MutationObserver(evaluate);
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+document.addEventListener('transitionend', evaluate, true);
+document.addEventListener('animationend', evaluate, true);
+timer = setTimeout(function () { finish(null); }, timeout);
+evaluate();
+"""
+
+# Installed before any page script where the browser supports it (CDP), otherwise on the first
+# readiness wait. Counts pending fetch and XHR calls and timestamps the last DOM mutation or request.
+READINESS_TRACKER_JS = """
+(function () {
+    if (window.__readiness) { return; }
+    var state = window.__readiness = {pending: 0, lastActivity: Date.now()};
+    function activity() { state.lastActivity = Date.now(); }
+    function settle() { state.pending = Math.max(0, state.pending - 1); activity(); }
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            state.pending++;
+            activity();
+            try {
+                return fetch.apply(this, arguments).then(
+                    function (response) { settle(); return response; },
+                    function (error) { settle(); throw error; });
+            } catch (error) {
+                settle();
+                throw error;
+            }
+        };
+    }
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        state.pending++;
+        activity();
+        this.addEventListener('loadend', settle);
+        try {
+            return send.apply(this, arguments);
+        } catch (error) {
+            settle();
+            throw error;
+        }
+    };
+    function observe() {
+        new MutationObserver(activity).observe(document.documentElement,
+            {childList: true, subtree: true, attributes: true, characterData: true});
+    }
+    if (document.documentElement) { observe(); } else { document.addEventListener('readystatechange', observe, {once: true}); }
+})();
+"""
+
+# Installed together with the readiness tracker. Keeps the last console errors and warnings and
+# uncaught errors of the document for the failure artifacts.
+CONSOLE_TRACKER_JS = """
+(function () {
+    if (window.__consoleEntries) { return; }
+    var entries = window.__consoleEntries = [];
+    function record(level, args) {
+        var message = Array.prototype.map.call(args, function (arg) {
+            if (typeof arg === 'string') { return arg; }
+            try { return JSON.stringify(arg); } catch (error) { return String(arg); }
+        }).join(' ');
+        entries.push({level: level, time: Date.now(), message: message});
+        if (entries.length > 200) { entries.shift(); }
+    }
+    ['error', 'warn'].forEach(function (level) {
+        var original = console[level];
+        console[level] = function () {
+            record(level, arguments);
+            return original.apply(console, arguments);
+        };
+    });
+    window.addEventListener('error', function (event) {
+        record('uncaught', [event.message + ' (' + event.filename + ':' + event.lineno + ')']);
+    });
+    window.addEventListener('unhandledrejection', function (event) { record('unhandled rejection', [event.reason]); });
+})();
+"""
+
+# Installed together with the readiness tracker. Gives the document a random token and counts the
+# user interactions with it, so that NavigationPlanner can tell whether a page is still as loaded.
+IDENTITY_TRACKER_JS = """
+(function () {
+    if (window.__pageIdentity) { return; }
+    var identity = window.__pageIdentity = {
+        token: Date.now().toString(36) + Math.random().toString(36).slice(2), generation: 0
+    };
+    ['click', 'input', 'change', 'submit', 'reset'].forEach(function (type) {
+        window.addEventListener(type, function () { identity.generation++; }, true);
+    });
+})();
+"""
+
+# tracked is false if the identity tracker was only installed now, i.e. earlier interactions are unknown.
+PAGE_IDENTITY_SCRIPT = """
+var tracked = !!window.__pageIdentity;
+""" + IDENTITY_TRACKER_JS + """
+var identity = window.__pageIdentity;
+return {url: window.location.href, token: identity.token, generation: identity.generation, tracked: tracked};
+"""
+
+ANCHOR_SCRIPT = "window.location.hash = arguments[0];"
+
+PAGE_LOAD_SCRIPT = READINESS_TRACKER_JS + CONSOLE_TRACKER_JS + IDENTITY_TRACKER_JS + """
+var timeout = arguments[0], quietPeriod = arguments[1], done = arguments[arguments.length - 1];
+var started = Date.now(), state = window.__readiness;
+
+function animations() {
+    if (!document.getAnimations) { return 0; }
+    return document.getAnimations().filter(function (animation) {
+        var timing = animation.effect ? animation.effect.getComputedTiming() : {};
+        return animation.playState === 'running' && timing.iterations !== Infinity;
+    }).length;
+}
+
+(function check() {
+    var running = animations();
+    if (running) { state.lastActivity = Date.now(); }
+    var quietFor = Date.now() - state.lastActivity, busy = document.readyState === 'loading' || state.pending || running;
+    if (!busy && quietFor >= quietPeriod) {
+        return done({ready: true, waited: Date.now() - started, document: window.__pageIdentity.token});
+    }
+    if (Date.now() - started > timeout) {
+        return done({ready: false, readyState: document.readyState, pending: state.pending, animations: running});
+    }
+    setTimeout(check, busy ? 25 : Math.max(10, quietPeriod - quietFor));
+})();
+"""
+
+SNAPSHOT_SCRIPT = LOCATE_JS + VISIBLE_JS + """
+var fields = arguments[0], result = {};
+
+function read(el, attributes) {
+    var values = {};
+    attributes.forEach(function (name) {
+        values[name] = name in el && typeof el[name] !== 'object' ? el[name] : el.getAttribute(name);
+    });
+    return {text: (el.innerText || el.textContent || '').trim(), visible: visible(el), attributes: values};
+}
+
+fields.forEach(function (field) {
+    var elements = locate(field.by, field.value);
+    result[field.name] = elements.map(function (el) { return read(el, field.attributes); });
+});
+return {url: window.location.href, title: document.title, fields: result};
+"""
+
+PERFORMANCE_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var navigation = performance.getEntriesByType('navigation')[0] || {}, resources = performance.getEntriesByType('resource');
+var bytes = navigation.transferSize || 0, resourceBytes = {}, paints = {};
+resources.forEach(function (resource) {
+    bytes += resource.transferSize || 0;
+    resourceBytes[resource.initiatorType] = (resourceBytes[resource.initiatorType] || 0) + (resource.transferSize || 0);
+});
+performance.getEntriesByType('paint').forEach(function (paint) { paints[paint.name] = paint.startTime; });
+var metrics = {
+    url: window.location.href, timeOrigin: performance.timeOrigin, ttfb: navigation.responseStart,
+    dcl: navigation.domContentLoadedEventEnd, load: navigation.loadEventEnd, ready: performance.now(),
+    fp: paints['first-paint'], fcp: paints['first-contentful-paint'], lcp: null,
+    requests: resources.length + 1, bytes: bytes, resourceBytes: resourceBytes
+};
+// Largest contentful paint entries are only exposed through a buffered PerformanceObserver.
+function largest(entries) {
+    if (entries.length) { metrics.lcp = entries[entries.length - 1].startTime; }
+}
+try {
+    var observer = new PerformanceObserver(function (list) { largest(list.getEntries()); });
+    observer.observe({type: 'largest-contentful-paint', buffered: true});
+    setTimeout(function () {
+        largest(observer.takeRecords());
+        observer.disconnect();
+        done(metrics);
+    }, 0);
+} catch (e) {
+    done(metrics);
+}
+"""
+
+# Everything a failure artifact needs from the page besides the screenshot, in one call.
+CAPTURE_SCRIPT = """
+return {
+    url: window.location.href, title: document.title, readyState: document.readyState,
+    html: document.documentElement ? document.documentElement.outerHTML : '',
+    console: (window.__consoleEntries || []).slice()
+};
+"""
@@ -0,0 +1,140 @@
+import re
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+
+def parse_price(text):
+    """
+    Parse a displayed price such as '£1,234.50' or '-£9.00'.
+
+    :param text: price text, or None
+    :return: price as float, or None if there is no number in the text
+    """
+    digits = re.sub(r'[^\d.\-]', '', text or '')
+    return float(digits) if re.search(r'\d', digits) else None
+
+
+@dataclass(frozen=True)
+class ElementState:
+    """
+    State of one element matched by a locator at snapshot time.
+    """
+
+    text: str
+    visible: bool
+    attributes: Mapping[str, object]
+
+
+@dataclass(frozen=True)
+class FieldSnapshot:
+    """
+    Every element matched by one declared Locator at snapshot time.
+    """
+
+    elements: Tuple[ElementState, ...]
+
+    @property
+    def count(self):
+        return len(self.elements)
+
+    @property
+    def present(self):
+        return bool(self.elements)
+
+    @property
+    def visible(self):
+        return bool(self.elements) and self.elements[0].visible
+
+    @property
+    def text(self):
+        return self.elements[0].text if self.elements else None
+
+    def attribute(self, name):
+        """
+        :param name: attribute name declared on the Locator
+        :return: value of the attribute on the first matched element, or None
+        """
+        return self.elements[0].attributes.get(name) if self.elements else None
+
+
+@dataclass(frozen=True)
+class PageSnapshot:
+    """
+    State of all Locator fields of a page object, read in a single execute_script call.
+    """
+
+    url: str
+    title: str
+    fields: Mapping[str, FieldSnapshot]
+
+    @classmethod
+    def from_script_result(cls, result):
+        fields = {
+            name: FieldSnapshot(tuple(ElementState(element['text'], element['visible'],
+                                                   MappingProxyType(dict(element['attributes'])))
+                                      for element in elements))
+            for name, elements in result['fields'].items()
+        }
+        return cls(result['url'], result['title'], MappingProxyType(fields))
+
+    def __getitem__(self, name):
+        return self.fields[name]
+
+
+@dataclass(frozen=True)
+class CartSnapshot:
+    """
+    Typed state of the cart page.
+    """
+
+    title: Optional[str]
+    product_name: Optional[str]
+    product_image_visible: bool
+    quantity: Optional[int]
+    unit_price: Optional[float]
+    total_price: Optional[float]
+    purchase_type: Optional[str]
+    success_message: Optional[str]
+    discount_applied: bool
+    error_displayed: bool
+    cart_empty: bool
+    checkout_error_displayed: bool
+
+
+@dataclass(frozen=True)
+class ProductSnapshot:
+    """
+    Typed state of the product page.
+    """
+
+    faq_title: Optional[str]
+    accordion_count: int
+    expanded_count: int
+    expanded: Tuple[bool, ...]
+
+    def is_section_expanded(self, index):
+        """
+        :param index: zero-based index of the accordion section
+        :return: True if the section is expanded, False otherwise
+        """
+        return 0 <= index < len(self.expanded) and self.expanded[index]
+
+
+@dataclass(frozen=True)
+class CheckoutSnapshot:
+    """
+    Typed state of the checkout page.
+    """
+
+    is_checkout_page: bool
+    values: Mapping[str, Optional[str]]
+
+
+@dataclass(frozen=True)
+class MainSnapshot:
+    """
+    Typed state of the main page.
+    """
+
+    shop_now_visible: bool
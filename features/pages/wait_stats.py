@@ -0,0 +1,177 @@
+import math
+import threading
+import weakref
+
+from features.support.json_files import locked, read_json, write_atomic
+
+# Samples of a locator needed before its timeout is derived from them instead of the default.
+MIN_SAMPLES = 20
+# Resolve times kept per locator; older ones are dropped first.
+MAX_SAMPLES = 200
+
+
+def quantile(samples, q):
+    """
+    :param samples: sorted list of numbers
+    :param q: quantile between 0 and 1
+    :return: nearest-rank quantile of the samples
+    """
+    return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+
+class LocatorTimings:
+    """
+    Resolve times of the element waits of the page objects, per platform, page object, locator and
+    condition, kept in a JSON file across runs. Waits that timed out are counted but not sampled.
+    The waits recorded since the file was read are merged into it on save, so that parallel
+    workers sharing it do not lose each other's samples.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._read()
+        self._added = {}
+        self._lock = threading.Lock()
+
+    def _read(self):
+        return {self._key(entry): entry for entry in read_json(self.path, [])}
+
+    @staticmethod
+    def _key(entry):
+        return entry['platform'], entry['page'], entry['by'], entry['value'], entry['condition']
+
+    def add(self, platform, page, field, by_locator, condition, seconds, found):
+        """
+        Record a wait.
+
+        :param platform: platform the wait ran on
+        :param page: page object class name
+        :param field: name of the Locator field of the page, or None for other locators
+        :param by_locator: tuple containing Selenium By strategy and locator
+        :param condition: wait condition, e.g. 'present' or 'visible'
+        :param seconds: time the wait took, round trip included
+        :param found: False if the wait timed out
+        """
+        entry = {'platform': platform, 'page': page, 'by': by_locator[0], 'value': by_locator[1],
+                 'condition': condition, 'field': field}
+        key = self._key(entry)
+        with self._lock:
+            for entries in (self.entries, self._added):
+                self._fold(entries.setdefault(key, dict(entry, samples=[], timeouts=0)),
+                           [round(seconds, 4)] if found else [], 0 if found else 1)
+
+    @staticmethod
+    def _fold(entry, samples, timeouts):
+        entry['samples'].extend(samples)
+        del entry['samples'][:-MAX_SAMPLES]
+        entry['timeouts'] += timeouts
+
+    def samples(self, platform, page, by_locator, condition):
+        """
+        :return: sorted resolve times in seconds, empty if the locator was never found
+        """
+        entry = self.entries.get((platform, page, by_locator[0], by_locator[1], condition))
+        return sorted(entry['samples']) if entry else []
+
+    def summary(self):
+        """
+        :return: list of dicts with the sample count, timeouts and p50/p90/p99/max resolve times in
+            milliseconds of every locator, slowest p99 first
+        """
+        rows = []
+        for entry in list(self.entries.values()):
+            samples = sorted(entry['samples'])
+            row = {key: entry[key] for key in ('platform', 'page', 'field', 'by', 'value', 'condition', 'timeouts')}
+            row['count'] = len(samples)
+            for name, q in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0)):
+                row[f"{name}_ms"] = round(quantile(samples, q) * 1000, 1) if samples else None
+            rows.append(row)
+        return sorted(rows, key=lambda row: row['p99_ms'] or 0, reverse=True)
+
+    def save(self):
+        """
+        Merge the waits recorded since the last save into the file, and take in the ones other
+        processes merged meanwhile.
+        """
+        with locked(self.path), self._lock:
+            entries = self._read()
+            for key, added in self._added.items():
+                entry = entries.setdefault(key, dict(added, samples=[], timeouts=0))
+                self._fold(entry, added['samples'], added['timeouts'])
+            write_atomic(self.path, list(entries.values()), indent=1)
+            self.entries, self._added = entries, {}
+
+    def export(self, path):
+        """
+        Write the summary() of every locator to a JSON file.
+        """
+        write_atomic(path, self.summary(), indent=2)
+
+
+class AdaptiveTimeouts:
+    """
+    Derives the timeout and poll interval of an element wait from the LocatorTimings of the
+    locator on the platform of a browser: the p99 resolve time times a margin, within
+    [min_timeout, the default timeout]. Locators with fewer than MIN_SAMPLES keep the default.
+    """
+
+    _browsers = weakref.WeakKeyDictionary()
+
+    def __init__(self, timings, platform, margin=3.0, min_timeout=1.0, enabled=True):
+        """
+        :param timings: LocatorTimings the waits are recorded to
+        :param platform: platform name the timings are keyed by
+        :param margin: factor applied to the p99 resolve time
+        :param min_timeout: lower bound of a derived timeout in seconds
+        :param enabled: record waits only, without deriving timeouts from them
+        """
+        self.timings = timings
+        self.platform = platform
+        self.margin = margin
+        self.min_timeout = min_timeout
+        self.enabled = enabled
+
+    @classmethod
+    def attach(cls, browser, timings, platform, **options):
+        """
+        Record the waits of a browser to timings, replacing a previous attachment.
+
+        :return: AdaptiveTimeouts
+        """
+        adaptive = cls._browsers[browser] = cls(timings, platform, **options)
+        return adaptive
+
+    @classmethod
+    def for_browser(cls, browser):
+        """
+        :return: the AdaptiveTimeouts attached to a browser, or None
+        """
+        return cls._browsers.get(browser)
+
+    def timeout(self, page, by_locator, condition, default):
+        """
+        :param page: BasePage instance waiting
+        :param default: timeout in seconds used without enough samples, and the upper bound otherwise
+        :return: timeout in seconds
+        """
+        samples = self.timings.samples(self.platform, type(page).__name__, by_locator, condition)
+        if not self.enabled or len(samples) < MIN_SAMPLES:
+            return default
+        return min(default, max(self.min_timeout, quantile(samples, 0.99) * self.margin))
+
+    def poll_interval(self, page, by_locator, condition, default=0.5):
+        """
+        :return: seconds between two polls, a fifth of the median resolve time within [0.05, default]
+        """
+        samples = self.timings.samples(self.platform, type(page).__name__, by_locator, condition)
+        if not self.enabled or len(samples) < MIN_SAMPLES:
+            return default
+        return min(default, max(0.05, quantile(samples, 0.5) / 5))
+
+    def record(self, page, by_locator, condition, seconds, found):
+        """
+        Record a wait of a page object, see LocatorTimings.add.
+        """
+        field = next((name for name, locator in type(page).locators().items()
+                      if (locator[0], locator[1]) == tuple(by_locator)), None)
+        self.timings.add(self.platform, type(page).__name__, field, by_locator, condition, seconds, found)
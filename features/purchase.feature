@@ -23,7 +23,8 @@ Feature: Purchase a product
 
         @cart
         Scenario: Verify Cart Functionality
-            Given user is on the cart page
+            Given the cart contains 1 x "Nature's Gift Bone Broth"
+              And user is on the cart page
              Then user should see the cart title "Your Shopping Cart"
               And user should see the product "Nature's Gift Bone Broth" with correct image and description
              When user increases the quantity to 3
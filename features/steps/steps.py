@@ -1,10 +1,5 @@
-import time
-from selenium.webdriver.common.by import By
-from behave import given, when, then, step
-from features.pages.main_page import MainPage
-from features.pages.product_page import ProductPage
-from features.pages.cart_page import CartPage
-from features.pages.checkout_page import CheckoutPage
+from behave import step
+from features.pages.performance import PerformanceMonitor
 
 # Remove these steps as they're not using the POM:
 # @step('visit url "{url}"')
@@ -14,7 +9,7 @@ from features.pages.checkout_page import CheckoutPage
 
 @step('title contains "{title}"')
 def check_title(context, title):
-    assert title in context.browser.title
+    assert title in context.main_page.get_title()
 
 @step('user clicks on the SHOP NOW button')
 def click_shop_now(context):
@@ -39,7 +34,7 @@ def step_user_fills_checkout_form(context):
 
 @step('the purchase should be successfully completed')
 def step_purchase_completed(context):
-    assert "Thank you for your purchase!" in context.browser.page_source
+    assert "Thank you for your purchase!" in context.checkout_page.get_page_source()
 
 @step('user is on the product page')
 def step_user_is_on_product_page(context):
@@ -55,16 +50,19 @@ def step_user_adds_product_to_cart(context):
 
 @step('user is on the cart page')
 def step_user_is_on_cart_page(context):
-    context.cart_page.load()
+    # Adding to the cart lands on the cart page; loading it again would drop the one-time success message.
+    if not context.cart_page.is_url_matches():
+        context.cart_page.load()
     assert context.cart_page.is_url_matches(), "User is not on the cart page"
 
 @step('user sees the message "Item has been added to cart"')
 def step_user_sees_success_message(context):
-    assert context.cart_page.is_success_message_displayed(), "Success message is not displayed"
+    message = context.cart_page.snapshot().success_message
+    assert message and "Item has been added to cart" in message, "Success message is not displayed"
 
 @step('the purchase type is "Subscribe & Save"')
 def step_purchase_type_is_subscribe_and_save(context):
-    purchase_type = context.cart_page.get_purchase_type()
+    purchase_type = context.cart_page.snapshot().purchase_type
     assert purchase_type == "Subscribe & Save", f"Purchase type is {purchase_type}, expected 'Subscribe & Save'"
 
 @step('user is on the FAQ section')
@@ -75,7 +73,7 @@ def step_user_is_on_faq_section(context):
 
 @step('the FAQ title is "{expected_title}"')
 def step_check_faq_title(context, expected_title):
-    actual_title = context.product_page.get_faq_title()
+    actual_title = context.product_page.snapshot().faq_title
     assert actual_title == expected_title, f"Expected FAQ title '{expected_title}', but got '{actual_title}'"
 
 @step('user clicks on accordion button {index}')
@@ -84,26 +82,27 @@ def step_click_accordion_button(context, index):
 
 @step('accordion section {index} should be expanded')
 def step_check_accordion_section_expanded(context, index):
-    assert context.product_page.is_section_expanded(int(index) - 1), f"Accordion section {index} is not expanded"
+    assert context.product_page.snapshot().is_section_expanded(int(index) - 1), f"Accordion section {index} is not expanded"
 
 @step('only one accordion section should be expanded')
 def step_check_only_one_section_expanded(context):
-    expanded_sections = context.product_page.get_expanded_sections()
-    assert len(expanded_sections) == 1, f"Expected 1 expanded section, but found {len(expanded_sections)}"
+    expanded_count = context.product_page.snapshot().expanded_count
+    assert expanded_count == 1, f"Expected 1 expanded section, but found {expanded_count}"
 
 @step('accordion section {index} should be collapsed')
 def step_check_accordion_section_collapsed(context, index):
-    assert not context.product_page.is_section_expanded(int(index) - 1), f"Accordion section {index} is not collapsed"
+    assert not context.product_page.snapshot().is_section_expanded(int(index) - 1), f"Accordion section {index} is not collapsed"
 
 @step('user should see the cart title "{expected_title}"')
 def step_user_should_see_cart_title(context, expected_title):
-    actual_title = context.cart_page.get_cart_title()
+    actual_title = context.cart_page.snapshot().title
     assert actual_title == expected_title, f"Expected cart title '{expected_title}', but got '{actual_title}'"
 
 @step('user should see the product "{product_name}" with correct image and description')
 def step_user_sees_product_in_cart(context, product_name):
-    assert context.cart_page.is_product_displayed(product_name), f"Product '{product_name}' is not displayed in the cart"
-    assert context.cart_page.is_product_image_displayed(), "Product image is not displayed"
+    cart = context.cart_page.snapshot()
+    assert cart.product_name == product_name, f"Product '{product_name}' is not displayed in the cart"
+    assert cart.product_image_visible, "Product image is not displayed"
 
 @step('user increases the quantity to {quantity:d}')
 def step_user_increases_quantity(context, quantity):
@@ -113,10 +112,9 @@ def step_user_increases_quantity(context, quantity):
 
 @step('the total price should be updated correctly')
 def step_total_price_updated_correctly(context):
-    unit_price = context.cart_page.get_unit_price()
-    quantity = context.cart_page.get_quantity()
-    expected_total = unit_price * quantity
-    actual_total = context.cart_page.get_total_price()
+    cart = context.cart_page.snapshot()
+    expected_total = round(cart.unit_price * cart.quantity, 2)
+    actual_total = cart.total_price
     assert actual_total == expected_total, f"Total price is {actual_total}, expected {expected_total}"
 
 @step('user decreases the quantity to {quantity:d}')
@@ -134,8 +132,16 @@ def step_user_removes_item(context):
 def step_cart_should_be_empty(context):
     assert context.cart_page.is_cart_empty(), "Cart is not empty"
 
+@step('the cart contains {quantity:d} x "{product_name}"')
+def step_cart_contains(context, quantity, product_name):
+    context.cart_seeder.adopt(context.browser).add_item(product_name, quantity).inject(context.browser)
+
 @step('user adds the product "{product_name}" to the cart')
 def step_user_adds_specific_product_to_cart(context, product_name):
+    if context.config.userdata.get('cart_seeding') == 'http':
+        context.cart_seeder.adopt(context.browser).add_item(product_name).inject(context.browser)
+        context.cart_page.load()
+        return
     context.product_page.load()
     # Assuming a method to select product by name exists
     context.product_page.select_product_by_name(product_name)
@@ -165,8 +171,41 @@ def step_user_should_be_on_checkout_page(context):
 
 @step('user tries to proceed to checkout with an empty cart')
 def step_user_tries_proceed_checkout_empty_cart(context):
+    # Scenarios reach this step with items still in the cart, e.g. after checking out with a coupon.
+    context.cart_seeder.adopt(context.browser).clear().inject(context.browser)
+    context.cart_page.load()
     context.cart_page.proceed_to_checkout()
 
 @step('user should be prevented from proceeding')
 def step_user_prevented_from_proceeding(context):
-    assert context.cart_page.is_prevented_from_checkout(), "User was not prevented from proceeding with an empty cart"
\ No newline at end of file
+    assert context.cart_page.is_prevented_from_checkout(), "User was not prevented from proceeding with an empty cart"
+
+def page_class_name(context, page_name):
+    page = getattr(context, f"{page_name}_page", None)
+    assert page is not None, f"Unknown page '{page_name}'"
+    return type(page).__name__
+
+def latest_navigation(context, page_name=None, trigger=None):
+    monitor = PerformanceMonitor.for_browser(context.browser)
+    record = monitor.latest(page_name, trigger) if monitor else None
+    assert record, f"No navigation of {page_name or 'any page'} was measured; run with -D performance_metrics=on"
+    return record
+
+@step('the {page_name} page should load within {ms:d} ms')
+def step_page_should_load_within(context, page_name, ms):
+    page = page_class_name(context, page_name)
+    record = latest_navigation(context, page, 'load')
+    assert record['ready'] <= ms, f"The {page_name} page was ready after {record['ready']:.0f} ms, budget {ms} ms"
+
+@step('the largest contentful paint of the {page_name} page should be within {ms:d} ms')
+def step_largest_contentful_paint_within(context, page_name, ms):
+    page = page_class_name(context, page_name)
+    record = latest_navigation(context, page)
+    assert record['lcp'] is not None, f"The browser reported no largest contentful paint for the {page_name} page"
+    assert record['lcp'] <= ms, f"Largest contentful paint of the {page_name} page at {record['lcp']:.0f} ms, budget {ms} ms"
+
+@step('the last navigation should complete within {ms:d} ms')
+def step_last_navigation_within(context, ms):
+    record = latest_navigation(context)
+    assert record['ready'] <= ms, \
+        f"{record['page']} {record['trigger']} was ready after {record['ready']:.0f} ms, budget {ms} ms"
@@ -0,0 +1,219 @@
+"""
+Capture failure artifacts without holding up the scenario that failed.
+
+capture() costs two WebDriver calls: the screenshot, which stays base64 encoded, and one
+execute_script for URL, title, page source and the console entries recorded by the console
+tracker. Everything else happens on background threads: the screenshot is decoded, text parts
+are gzipped, and every part is stored once under reports/artifacts/objects/ by its SHA-256,
+so that e.g. identical page sources of repeated failures take no extra space. Each capture
+gets a manifest.json in its own directory with the paths of its objects relative to the
+artifact directory.
+
+Captures wait in a bounded queue, and the raw bytes held by queued and in-flight captures are
+capped. When either limit is reached, capture() waits up to wait_timeout seconds for room and
+then drops the capture with a warning rather than stall the run.
+"""
+import base64
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from features.pages.scripts import CAPTURE_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def slug(text, length=60):
+    """
+    :return: text reduced to a file-name safe form, e.g. 'Add_product_to_cart'
+    """
+    return re.sub(r'[^\w.-]+', '_', text).strip('_')[:length] or 'artifact'
+
+
+class ArtifactPipeline:
+    """
+    Bounded queue of raw captures processed by a pool of writer threads.
+    """
+
+    def __init__(self, directory='reports/artifacts', workers=2, max_queue=16, max_bytes=64 * 2 ** 20,
+                 wait_timeout=2.0):
+        """
+        :param directory: directory the objects and manifests are written to
+        :param workers: writer threads
+        :param max_queue: captures that may wait for a writer
+        :param max_bytes: raw bytes that queued and in-flight captures may hold in memory
+        :param wait_timeout: seconds capture() waits for room before dropping a capture
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.wait_timeout = wait_timeout
+        self.pending_bytes = 0
+        # Paths of the manifests written so far.
+        self.manifests = []
+        self.stats = {'captured': 0, 'dropped': 0, 'written': 0, 'deduplicated': 0, 'raw_bytes': 0,
+                      'stored_bytes': 0, 'capture_seconds': 0.0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sequence = itertools.count(1)
+        # Objects written or being written by a worker.
+        self._stored = set()
+        self._room = threading.Condition()
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, name=f'ArtifactWriter-{index}', daemon=True)
+                         for index in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def capture(self, browser, name, details=None):
+        """
+        Grab a screenshot and the page state of a browser and queue them for writing.
+
+        :param browser: Selenium WebDriver instance
+        :param name: name of the capture, e.g. '<scenario>/<step>'
+        :param details: JSON-serialisable dict stored in the manifest, e.g. the error message
+        :return: True if the capture was queued, False if it failed or was dropped
+        """
+        started = time.perf_counter()
+        parts = {}
+        try:
+            parts['screenshot'] = browser.get_screenshot_as_base64()
+        except WebDriverException as error:
+            logger.warning("No screenshot for '%s': %s", name, error.msg)
+        try:
+            parts['page'] = browser.execute_script(CAPTURE_SCRIPT)
+        except WebDriverException as error:
+            logger.warning("No page state for '%s': %s", name, error.msg)
+        with self._lock:
+            self.stats['capture_seconds'] += time.perf_counter() - started
+        if not parts:
+            return False
+        return self.submit(name, parts, details)
+
+    def submit(self, name, parts, details=None):
+        """
+        Queue raw parts for processing, waiting up to wait_timeout for room.
+
+        :param name: name of the capture
+        :param parts: dict with the base64 'screenshot' and/or the CAPTURE_SCRIPT result as 'page'
+        :param details: JSON-serialisable dict stored in the manifest
+        :return: True if queued, False if dropped
+        """
+        page = parts.get('page') or {}
+        size = len(parts.get('screenshot') or '') + len(page.get('html') or '')
+        deadline = time.monotonic() + self.wait_timeout
+        with self._room:
+            while self.pending_bytes and self.pending_bytes + size > self.max_bytes:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._room.wait(remaining):
+                    return self._drop(name, "memory cap reached")
+            self.pending_bytes += size
+        item = (name, parts, details or {}, size, time.time(), next(self._sequence))
+        try:
+            self._queue.put(item, timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            self._release(size)
+            return self._drop(name, "queue full")
+        with self._lock:
+            self.stats['captured'] += 1
+        return True
+
+    def _drop(self, name, reason):
+        with self._lock:
+            self.stats['dropped'] += 1
+        logger.warning("Dropped failure artifacts of '%s': %s", name, reason)
+        return False
+
+    def _release(self, size):
+        with self._room:
+            self.pending_bytes -= size
+            self._room.notify_all()
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write(*item)
+            except Exception:
+                logger.exception("Could not write failure artifacts")
+            finally:
+                if item is not _STOP:
+                    self._release(item[3])
+                self._queue.task_done()
+
+    def _store(self, data, extension, compress):
+        """
+        Write a blob once under its content hash.
+
+        :return: path of the object relative to the artifact directory
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        relative = os.path.join('objects', digest[:2], f"{digest}{extension}{'.gz' if compress else ''}")
+        path = os.path.join(self.directory, relative)
+        with self._lock:
+            self.stats['raw_bytes'] += len(data)
+            exists = path in self._stored or os.path.exists(path)
+            self._stored.add(path)
+            self.stats['deduplicated' if exists else 'written'] += 1
+        if exists:
+            return relative
+        stored = gzip.compress(data, compresslevel=6) if compress else data
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary, 'wb') as output:
+                output.write(stored)
+            os.replace(temporary, path)
+        except OSError:
+            with self._lock:
+                self._stored.discard(path)
+            raise
+        with self._lock:
+            self.stats['stored_bytes'] += len(stored)
+        return relative
+
+    def _write(self, name, parts, details, size, captured_at, sequence):
+        manifest = {'name': name, 'captured_at': captured_at, 'details': details, 'objects': {}}
+        if parts.get('screenshot'):
+            # PNG data is already compressed.
+            manifest['objects']['screenshot'] = self._store(base64.b64decode(parts['screenshot']), '.png', False)
+        page = parts.get('page')
+        if page:
+            manifest.update(url=page.get('url'), title=page.get('title'), ready_state=page.get('readyState'))
+            manifest['objects']['page_source'] = self._store((page.get('html') or '').encode('utf-8'), '.html', True)
+            manifest['objects']['console'] = self._store(
+                json.dumps(page.get('console') or [], indent=1).encode('utf-8'), '.json', True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(captured_at))
+        target = os.path.join(self.directory, *(slug(part) for part in name.split('/')), f"{stamp}-{os.getpid()}-{sequence}")
+        os.makedirs(target, exist_ok=True)
+        with open(os.path.join(target, 'manifest.json'), 'w') as output:
+            json.dump(manifest, output, indent=2)
+        with self._lock:
+            self.manifests.append(os.path.join(target, 'manifest.json'))
+        logger.info("Failure artifacts of '%s' written to %s", name, target)
+
+    def drain(self):
+        """
+        Block until every queued capture has been written.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Write the remaining captures and stop the writer threads.
+        """
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
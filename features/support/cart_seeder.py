@@ -0,0 +1,260 @@
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from features.pages.cart_page import CartPage
+from features.pages.locators import ElementCache
+from features.pages.navigation import NavigationPlanner
+from features.pages.product_page import ProductPage
+
+logger = logging.getLogger(__name__)
+
+
+class SeedingError(Exception):
+    """
+    Raised when the storefront does not accept a seeding request.
+    """
+
+
+class FormParser(HTMLParser):
+    """
+    Collect the forms and links of an HTML page with the values a browser would submit.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.links = []
+        self._form = None
+        self._link = None
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._form = {'name': attrs.get('name'), 'action': attrs.get('action', ''),
+                          'method': attrs.get('method', 'get').lower(), 'fields': {}}
+            self.forms.append(self._form)
+        elif tag == 'a' and 'href' in attrs:
+            self._link = [attrs['href'], '']
+        elif self._form is None or 'name' not in attrs:
+            return
+        elif tag == 'input':
+            kind = attrs.get('type', 'text').lower()
+            if kind in ('radio', 'checkbox'):
+                if 'checked' in attrs:
+                    self._form['fields'][attrs['name']] = attrs.get('value', 'on')
+            elif kind not in ('submit', 'button', 'image', 'file'):
+                self._form['fields'][attrs['name']] = attrs.get('value', '')
+        elif tag == 'select':
+            self._select = attrs['name']
+        elif tag == 'option' and self._select:
+            fields = self._form['fields']
+            if self._select not in fields or 'selected' in attrs:
+                fields[self._select] = attrs.get('value', '')
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+        elif tag == 'select':
+            self._select = None
+        elif tag == 'a' and self._link:
+            self.links.append((self._link[0], self._link[1].strip()))
+            self._link = None
+
+    def handle_data(self, data):
+        if self._link:
+            self._link[1] += data
+
+    def form(self, name):
+        """
+        :param name: value of the form's name attribute
+        :return: dict with the form's action, method and default field values
+        :raises: SeedingError if the page has no such form
+        """
+        for form in self.forms:
+            if form['name'] == name:
+                return form
+        raise SeedingError(f"No form named '{name}' on the page")
+
+
+class CartSeeder:
+    """
+    Puts the storefront cart into a given state with direct HTTP requests.
+
+    The seeder submits the same Sylius forms the page objects fill in through the browser
+    (add to cart, cart quantities, promotion coupon, item removal), then hands the resulting
+    session cookie to the WebDriver session with inject(). Use adopt() first to seed the cart
+    the browser already has instead of a new one.
+    """
+
+    ADD_TO_CART_FORM = 'sylius_add_to_cart'
+    CART_FORM = 'sylius_cart'
+
+    def __init__(self, base_url, adapter=None, product_path=ProductPage.PATH, cart_path=CartPage.PATH):
+        """
+        Initialize the seeder with a new HTTP session.
+
+        :param base_url: storefront base URL, e.g. https://aeonstest.info
+        :param adapter: requests HTTPAdapter shared between seeders to reuse pooled connections
+        :param product_path: product page whose add-to-cart form is used by default
+        :param cart_path: path of the cart page
+        """
+        self.base_url = base_url.rstrip('/')
+        self.product_path = product_path
+        self.cart_path = cart_path
+        self.session = requests.Session()
+        adapter = adapter or HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests_sent = 0
+
+    def _request(self, method, url, **kwargs):
+        response = self.session.request(method, urljoin(self.base_url + '/', url), timeout=30, **kwargs)
+        self.requests_sent += 1
+        if response.status_code >= 400:
+            raise SeedingError(f"{method} {response.url} returned HTTP {response.status_code}")
+        return response
+
+    def _parse(self, path):
+        response = self._request('GET', path)
+        parser = FormParser()
+        parser.feed(response.text)
+        return response.url, parser
+
+    def _submit(self, page_url, form, overrides=None):
+        fields = dict(form['fields'], **(overrides or {}))
+        action = urljoin(page_url, form['action'] or page_url)
+        return self._request(form['method'].upper(), action, data=fields)
+
+    def add_item(self, product_name=None, quantity=1, fields=None):
+        """
+        Add a product to the cart through the product page's add-to-cart form.
+
+        :param product_name: link text of the product to add, as in ProductPage.select_product_by_name;
+                             None adds the product of product_path
+        :param quantity: quantity to add
+        :param fields: extra form fields, e.g. {'sylius_add_to_cart[purchaseType]': 'subscription'}
+        """
+        page_url, page = self._parse(self.product_path)
+        if product_name is not None:
+            href = next((href for href, text in page.links if text == product_name), None)
+            if href is None:
+                raise SeedingError(f"No link to product '{product_name}' on {page_url}")
+            page_url, page = self._parse(urljoin(page_url, href))
+        form = page.form(self.ADD_TO_CART_FORM)
+        overrides = {f'{self.ADD_TO_CART_FORM}[cartItem][quantity]': str(quantity)}
+        overrides.update(fields or {})
+        self._submit(page_url, form, overrides)
+        logger.debug("Seeded %d x %s into the cart", quantity, product_name or self.product_path)
+        return self
+
+    def set_quantity(self, quantity, item_index=0):
+        """
+        Change the quantity of a cart item through the cart form.
+
+        :param quantity: new quantity
+        :param item_index: zero-based position of the item in the cart
+        """
+        page_url, page = self._parse(self.cart_path)
+        self._submit(page_url, page.form(self.CART_FORM),
+                     {f'{self.CART_FORM}[items][{item_index}][quantity]': str(quantity)})
+        return self
+
+    def apply_coupon(self, coupon_code):
+        """
+        Apply a promotion coupon through the cart form.
+
+        :param coupon_code: coupon code as string
+        """
+        page_url, page = self._parse(self.cart_path)
+        self._submit(page_url, page.form(self.CART_FORM), {f'{self.CART_FORM}[promotionCoupon]': coupon_code})
+        return self
+
+    def clear(self):
+        """
+        Remove every item from the cart through the remove forms of the cart page.
+        """
+        page_url, page = self._parse(self.cart_path)
+        for form in page.forms:
+            if form['action'].endswith('/remove'):
+                self._submit(page_url, form)
+        return self
+
+    def _visit_origin(self, browser):
+        if urlsplit(browser.current_url)[:2] != urlsplit(self.base_url)[:2]:
+            ElementCache.for_browser(browser).clear()
+            browser.get(self.base_url + '/favicon.ico')
+
+    def _adopt_cookies(self, cookies):
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'], path=cookie.get('path', '/'))
+        return self
+
+    def _seeded_cookies(self):
+        return [{
+            'name': cookie.name,
+            'value': cookie.value,
+            'path': cookie.path or '/',
+            'secure': bool(cookie.secure),
+            'httpOnly': cookie.has_nonstandard_attr('HttpOnly'),
+        } for cookie in self.session.cookies]
+
+    def adopt(self, browser):
+        """
+        Continue with the cart of a WebDriver session by copying its cookies.
+
+        :param browser: Selenium WebDriver instance
+        """
+        self._visit_origin(browser)
+        return self._adopt_cookies(browser.get_cookies())
+
+    def inject(self, browser):
+        """
+        Hand the seeded cart to a WebDriver session by replacing its cookies with the seeder's.
+        The page the session is on no longer shows the cart, so its NavigationPlanner may not reuse it.
+
+        :param browser: Selenium WebDriver instance
+        """
+        self._visit_origin(browser)
+        browser.delete_all_cookies()
+        for cookie in self._seeded_cookies():
+            browser.add_cookie(cookie)
+        planner = NavigationPlanner.for_browser(browser)
+        if planner:
+            planner.invalidate()
+        return self
+
+
+class AsyncCartSeeder(CartSeeder):
+    """
+    CartSeeder for an AsyncWebDriver session. The seeding requests are the same; adopt() and inject()
+    are coroutines, since they talk to the WebDriver session.
+    """
+
+    async def _visit_origin(self, browser):
+        if urlsplit(await browser.current_url())[:2] != urlsplit(self.base_url)[:2]:
+            await browser.get(self.base_url + '/favicon.ico')
+
+    async def adopt(self, browser):
+        """
+        Continue with the cart of a WebDriver session by copying its cookies.
+
+        :param browser: AsyncWebDriver instance
+        """
+        await self._visit_origin(browser)
+        return self._adopt_cookies(await browser.get_cookies())
+
+    async def inject(self, browser):
+        """
+        Hand the seeded cart to a WebDriver session by replacing its cookies with the seeder's.
+
+        :param browser: AsyncWebDriver instance
+        """
+        await self._visit_origin(browser)
+        await browser.delete_all_cookies()
+        for cookie in self._seeded_cookies():
+            await browser.add_cookie(cookie)
+        return self
@@ -0,0 +1,223 @@
+"""
+Skip the steps scenarios share by restoring the browser state they leave behind.
+
+With -D checkpoints=on, a scenario tagged @checkpoint=3 declares its first three steps (after
+the background) as a prefix other scenarios start with too. The first run that passes those
+steps saves the cookies, localStorage, sessionStorage and URL of the browser to
+reports/checkpoints/<key>.json, keyed by the background and prefix steps, the platform and the
+storefront. Later scenarios with the same
+prefix drop those steps and restore the state instead: with CDP the cookies are set in one
+Network.setCookies call, and the storage, if any, is written on the storefront's favicon before
+the saved URL is opened.
+
+A checkpoint records the fingerprint ImpactIndex computes from the source of the step
+functions and page-object members the prefix reaches. It is discarded when the fingerprint
+changed, i.e. when a step definition or page object the prefix depends on was edited, and
+when it is older than max_age, as server-side sessions expire.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import WebDriverException
+
+from features.pages.cdp import execute_cdp, supports_cdp
+from features.pages.locators import ElementCache
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TAG = 'checkpoint='
+
+STORAGE_SCRIPT = """
+function dump(storage) {
+    var items = {};
+    try {
+        for (var i = 0; i < storage.length; i++) { items[storage.key(i)] = storage.getItem(storage.key(i)); }
+    } catch (e) {}
+    return items;
+}
+return {url: window.location.href, local: dump(window.localStorage), session: dump(window.sessionStorage)};
+"""
+
+RESTORE_STORAGE_SCRIPT = """
+var saved = [[window.localStorage, arguments[0]], [window.sessionStorage, arguments[1]]];
+saved.forEach(function (pair) {
+    pair[0].clear();
+    Object.keys(pair[1]).forEach(function (key) { pair[0].setItem(key, pair[1][key]); });
+});
+"""
+
+
+def checkpoint_length(scenario):
+    """
+    :param scenario: behave Scenario
+    :return: number of steps from a @checkpoint=N tag, None if the scenario has none
+    """
+    for tag in scenario.effective_tags:
+        if tag.startswith(CHECKPOINT_TAG):
+            return int(tag[len(CHECKPOINT_TAG):])
+    return None
+
+
+def step_key(step):
+    """
+    :return: what identifies a step within a prefix: its type, text, doc string and table
+    """
+    table = [step.table.headings] + [row.cells for row in step.table] if step.table else None
+    return [step.step_type, step.name, step.text, table]
+
+
+def capture_state(browser):
+    """
+    Read the state a checkpoint restores, in two WebDriver calls.
+
+    :param browser: Selenium WebDriver instance
+    :return: dict with url, cookies, local and session
+    """
+    state = browser.execute_script(STORAGE_SCRIPT)
+    state['cookies'] = browser.get_cookies()
+    return state
+
+
+def _cdp_cookie(cookie, url):
+    converted = {key: cookie[key] for key in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite')
+                 if key in cookie}
+    if 'expiry' in cookie:
+        converted['expires'] = cookie['expiry']
+    if 'domain' not in converted:
+        converted['url'] = url
+    return converted
+
+
+def _visit_origin(browser, origin):
+    # Storage and WebDriver cookies can only be set on a document of the storefront's origin.
+    if urlsplit(browser.current_url)[:2] != urlsplit(origin)[:2]:
+        browser.get(origin + '/favicon.ico')
+
+
+def _set_cookies(browser, state):
+    try:
+        execute_cdp(browser, 'Network.setCookies',
+                    {'cookies': [_cdp_cookie(cookie, state['url']) for cookie in state['cookies']]})
+    except WebDriverException as error:
+        logger.debug("Network.setCookies failed, adding cookies one by one: %s", error.msg)
+        return False
+    return True
+
+
+def restore_state(browser, state):
+    """
+    Replace the cookies and storage of a session with a captured state and open its URL.
+
+    :param browser: Selenium WebDriver instance, reset by the session pool
+    :param state: dict returned by capture_state
+    """
+    ElementCache.for_browser(browser).clear()
+    origin = '{0}://{1}'.format(*urlsplit(state['url'])[:2])
+    if not (supports_cdp(browser) and _set_cookies(browser, state)):
+        _visit_origin(browser, origin)
+        browser.delete_all_cookies()
+        for cookie in state['cookies']:
+            browser.add_cookie(cookie)
+    if state['local'] or state['session']:
+        _visit_origin(browser, origin)
+        browser.execute_script(RESTORE_STORAGE_SCRIPT, state['local'], state['session'])
+    browser.get(state['url'])
+
+
+class CheckpointStore:
+    """
+    Checkpoint files of one directory, validated against the current step and page-object code.
+    """
+
+    def __init__(self, directory='reports/checkpoints', index=None, max_age=1800):
+        """
+        :param directory: directory of the checkpoint files
+        :param index: ImpactIndex whose fingerprint invalidates checkpoints; None to never invalidate them
+        :param max_age: seconds after which a checkpoint is no longer restored
+        """
+        self.directory = directory
+        self.index = index
+        self.max_age = max_age
+        self.stats = {'saved': 0, 'restored': 0, 'invalidated': 0, 'steps_skipped': 0, 'seconds_skipped': 0.0}
+
+    @staticmethod
+    def key(steps, platform, base_url):
+        """
+        :param steps: behave Steps of the background and the prefix
+        :param platform: platform name, e.g. 'chrome 120.0 linux'
+        :param base_url: storefront base URL
+        :return: file name stem of the checkpoint
+        """
+        data = json.dumps([platform, base_url, [step_key(step) for step in steps]])
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _fingerprint(self, steps):
+        return self.index.fingerprint(steps) if self.index else None
+
+    def load(self, steps, platform, base_url):
+        """
+        :return: the checkpoint dict with its state, or None if there is no valid one
+        """
+        path = self._path(self.key(steps, platform, base_url))
+        if not os.path.exists(path):
+            return None
+        with open(path) as stored:
+            checkpoint = json.load(stored)
+        reason = None
+        if checkpoint['fingerprint'] != self._fingerprint(steps):
+            reason = "the code of its steps changed"
+        elif time.time() - checkpoint['saved_at'] > self.max_age:
+            reason = "it expired"
+        if reason:
+            self.stats['invalidated'] += 1
+            logger.info("Checkpoint after '%s' discarded: %s", checkpoint['steps'][-1], reason)
+            self.discard(steps, platform, base_url)
+            return None
+        return checkpoint
+
+    def save(self, steps, platform, base_url, state):
+        """
+        Store the state reached after steps, replacing an older checkpoint of the same prefix.
+
+        :param steps: behave Steps of the background and the prefix, all passed
+        :param state: dict returned by capture_state
+        """
+        checkpoint = {'platform': platform, 'base_url': base_url, 'steps': [step.name for step in steps],
+                      'durations': [step.duration for step in steps], 'fingerprint': self._fingerprint(steps),
+                      'saved_at': time.time(), 'state': state}
+        path = self._path(self.key(steps, platform, base_url))
+        os.makedirs(self.directory, exist_ok=True)
+        # Parallel workers may save the same prefix; replace the file atomically.
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w') as output:
+            json.dump(checkpoint, output, indent=1)
+        os.replace(temporary, path)
+        self.stats['saved'] += 1
+        logger.info("Checkpoint saved after '%s'", steps[-1].name)
+
+    def discard(self, steps, platform, base_url):
+        """
+        Remove the checkpoint of a prefix, e.g. after it could not be restored.
+        """
+        try:
+            os.remove(self._path(self.key(steps, platform, base_url)))
+        except FileNotFoundError:
+            pass
+
+    def restored(self, checkpoint, skipped):
+        """
+        Account for the steps a restored checkpoint skipped.
+
+        :param checkpoint: checkpoint dict returned by load
+        :param skipped: number of prefix steps dropped from the scenario, the background ones still run
+        """
+        self.stats['restored'] += 1
+        self.stats['steps_skipped'] += skipped
+        self.stats['seconds_skipped'] += sum(checkpoint['durations'][len(checkpoint['durations']) - skipped:])
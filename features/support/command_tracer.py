@@ -0,0 +1,163 @@
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from features.pages.base_page import BasePage
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+
+
+def histogram(durations):
+    """
+    Count durations per latency bucket.
+
+    :param durations: iterable of durations in seconds
+    :return: dict mapping bucket label (upper bound in ms) to count
+    """
+    counts = [0] * len(HISTOGRAM_BUCKETS_MS)
+    for duration in durations:
+        counts[bisect.bisect_left(HISTOGRAM_BUCKETS_MS, duration * 1000)] += 1
+    return {f"<={bound:g}ms" if bound != float('inf') else '>10000ms': count
+            for bound, count in zip(HISTOGRAM_BUCKETS_MS, counts) if count}
+
+
+class CommandTracer:
+    """
+    Records every W3C command sent to the WebDriver sessions it instruments.
+
+    Each record holds the command name, its duration, the behave scenario and step that were
+    running and the outermost page-object method on the call stack. Commands issued from other
+    threads, e.g. session pool resets, are attributed to '(background)'.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.scenario = None
+        self.step = None
+        self._lock = threading.Lock()
+
+    def instrument(self, browser):
+        """
+        Wrap the command executor of a WebDriver session so that its commands are recorded.
+
+        :param browser: Selenium WebDriver instance
+        :return: the same browser
+        """
+        executor = browser.command_executor
+        execute = executor.execute
+
+        def traced_execute(command, params):
+            started = time.perf_counter()
+            try:
+                return execute(command, params)
+            finally:
+                self.record(command, time.perf_counter() - started)
+
+        executor.execute = traced_execute
+        return browser
+
+    @staticmethod
+    def _page_method():
+        frame, method = sys._getframe(2), None
+        while frame is not None:
+            owner = frame.f_locals.get('self')
+            if isinstance(owner, BasePage):
+                method = f"{type(owner).__name__}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        return method
+
+    def record(self, command, duration):
+        """
+        Add a command record attributed to the current step.
+
+        :param command: W3C command name
+        :param duration: duration in seconds
+        """
+        if threading.current_thread() is threading.main_thread():
+            scenario, step, method = self.scenario, self.step, self._page_method()
+        else:
+            scenario, step, method = None, '(background)', None
+        with self._lock:
+            self.records.append({'command': command, 'duration': duration, 'scenario': scenario,
+                                 'step': step, 'method': method})
+
+    def step_records(self, step):
+        """
+        :param step: step name
+        :return: records attributed to a step
+        """
+        with self._lock:
+            return [record for record in self.records if record['step'] == step]
+
+    def summary(self, key):
+        """
+        Aggregate records per value of a record field.
+
+        :param key: record field to group by, e.g. 'step' or 'method'
+        :return: dict mapping each value to its command count, total time, histogram and per-command totals
+        """
+        groups = defaultdict(list)
+        with self._lock:
+            for record in self.records:
+                groups[record[key] or '(none)'].append(record)
+        result = {}
+        for name, records in groups.items():
+            commands = defaultdict(lambda: {'count': 0, 'total': 0.0})
+            for record in records:
+                commands[record['command']]['count'] += 1
+                commands[record['command']]['total'] += record['duration']
+            result[name] = {
+                'count': len(records),
+                'total': sum(record['duration'] for record in records),
+                'histogram': histogram(record['duration'] for record in records),
+                'commands': dict(commands),
+            }
+        return result
+
+    def folded_stacks(self):
+        """
+        Render the records in the folded-stack format read by flamegraph.pl and speedscope.
+
+        :return: list of 'scenario;step;method;command microseconds' lines
+        """
+        totals = defaultdict(float)
+        with self._lock:
+            for record in self.records:
+                frames = [record['scenario'], record['step'], record['method'], record['command']]
+                stack = ';'.join((frame or '(none)').replace(';', ',') for frame in frames)
+                totals[stack] += record['duration']
+        return [f"{stack} {round(total * 1e6)}" for stack, total in sorted(totals.items())]
+
+    def export(self, directory):
+        """
+        Write trace.json with per-step and per-method summaries and trace.folded for flamegraphs.
+
+        :param directory: output directory, created if missing
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'trace.json'), 'w') as output:
+            json.dump({'steps': self.summary('step'), 'methods': self.summary('method'), 'records': self.records},
+                      output, indent=2)
+        with open(os.path.join(directory, 'trace.folded'), 'w') as output:
+            output.write('\n'.join(self.folded_stacks()) + '\n')
+
+    def log_rankings(self, top=5):
+        """
+        Log the slowest steps and the page-object methods that sent the most commands.
+
+        :param top: number of entries per ranking
+        """
+        steps = sorted(self.summary('step').items(), key=lambda item: item[1]['total'], reverse=True)
+        for name, stats in steps[:top]:
+            logger.info("Slow step: %.2fs in %d commands - %s", stats['total'], stats['count'], name)
+        methods = sorted(self.summary('method').items(), key=lambda item: item[1]['count'], reverse=True)
+        for name, stats in methods[:top]:
+            logger.info("Chatty method: %d commands, %.2fs - %s", stats['count'], stats['total'], name)
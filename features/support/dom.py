@@ -0,0 +1,798 @@
+"""
+Parsed HTML documents and locator evaluation for the fake WebDriver.
+
+parse_html builds a tree of Nodes from markup with the recovery rules a storefront page needs:
+void elements, implied end tags of p, li, option and table cells, and stray end tags. locate
+resolves a (By strategy, value) locator on it the way LOCATE_JS does in a browser. CSS
+selectors and XPath expressions are evaluated on the trees parse_css and parse_xpath of
+features.pages.locator_syntax return. Every CSS pseudo-class is supported except the ones that
+depend on user interaction, such as :hover. All of XPath 1.0 is supported except namespaces
+and variables.
+
+No stylesheet is applied, so an element counts as hidden when it or an ancestor matches
+HIDDEN_SELECTORS or is never rendered, such as <head> or <script>.
+"""
+import html
+import math
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from selenium.webdriver.common.by import By
+
+from features.pages.locator_syntax import SelectorError, parse_css, parse_xpath
+
+VOID_ELEMENTS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param',
+                           'source', 'track', 'wbr'))
+NOT_RENDERED = frozenset(('head', 'script', 'style', 'title', 'meta', 'link', 'template', 'noscript'))
+BLOCK_ELEMENTS = frozenset(('address', 'article', 'aside', 'blockquote', 'div', 'dl', 'fieldset', 'figure', 'footer',
+                            'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol',
+                            'p', 'pre', 'section', 'table', 'tr', 'ul', 'br'))
+# Open elements a start tag closes when one of them is the current element.
+IMPLIED_END = {'li': ('li',), 'option': ('option',), 'tr': ('tr', 'td', 'th'), 'td': ('td', 'th'), 'th': ('td', 'th'),
+               'dt': ('dt', 'dd'), 'dd': ('dt', 'dd')}
+IMPLIED_END.update((tag, ('p',)) for tag in BLOCK_ELEMENTS if tag not in ('br', 'li', 'tr'))
+# Rules of the storefront's stylesheets that hide elements.
+HIDDEN_SELECTORS = "[hidden], input[type=hidden], .collapse:not(.show), .d-none"
+FORM_CONTROLS = ('button', 'input', 'select', 'textarea', 'option', 'optgroup', 'fieldset')
+
+
+class Node:
+    """
+    Element, text, comment or document node of a parsed page.
+
+    Form controls carry their state apart from their attributes, as in a browser: value for
+    input, textarea and select elements, checked for inputs and selected for options.
+    """
+
+    __slots__ = ('kind', 'tag', 'attributes', 'children', 'parent', 'data', 'order', 'value', 'checked', 'selected')
+
+    def __init__(self, kind, tag=None, attributes=None, data=''):
+        self.kind = kind
+        self.tag = tag
+        self.attributes = attributes if attributes is not None else {}
+        self.children = []
+        self.parent = None
+        self.data = data
+        self.order = 0
+        self.value = None
+        self.checked = False
+        self.selected = False
+
+    def __repr__(self):
+        if self.kind == 'element':
+            return f"<{self.tag}{''.join(f' {name}={value!r}' for name, value in self.attributes.items())}>"
+        return f"<{self.kind} {self.data[:20]!r}>"
+
+    def append(self, child):
+        child.parent = self
+        self.children.append(child)
+
+    @property
+    def element_children(self):
+        return [child for child in self.children if child.kind == 'element']
+
+    @property
+    def classes(self):
+        return self.attributes.get('class', '').split()
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def descendants(self):
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def root(self):
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
+    def closest(self, tag):
+        """
+        :return: this element or its nearest ancestor with the tag, None if there is none
+        """
+        node = self
+        while node is not None and not (node.kind == 'element' and node.tag == tag):
+            node = node.parent
+        return node
+
+    @property
+    def text_content(self):
+        if self.kind in ('text', 'comment'):
+            return self.data
+        return ''.join(node.data for node in self.descendants() if node.kind == 'text')
+
+    @property
+    def disabled(self):
+        return self.tag in FORM_CONTROLS and ('disabled' in self.attributes
+                                              or any(a.tag == 'fieldset' and 'disabled' in a.attributes
+                                                     for a in self.ancestors()))
+
+    def get_property(self, name):
+        """
+        :return: the DOM property of an element where it differs from the attribute, else the attribute
+        """
+        if name == 'value' and self.value is not None:
+            return self.value
+        if name == 'checked':
+            return self.checked
+        if name == 'selected':
+            return self.selected
+        if name in ('className', 'class'):
+            return self.attributes.get('class', '')
+        if name in ('textContent', 'innerText'):
+            return self.text_content if name == 'textContent' else inner_text(self)
+        if name == 'tagName':
+            return self.tag.upper()
+        return self.attributes.get(name)
+
+
+class _TreeBuilder(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.document = Node('document')
+        self.stack = [self.document]
+
+    def handle_starttag(self, tag, attrs):
+        while len(self.stack) > 1 and self.stack[-1].tag in IMPLIED_END.get(tag, ()):
+            self.stack.pop()
+        node = Node('element', tag, {name: '' if value is None else value for name, value in attrs})
+        self.stack[-1].append(node)
+        if tag not in VOID_ELEMENTS:
+            self.stack.append(node)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS and self.stack[-1].tag == tag:
+            self.stack.pop()
+
+    def handle_endtag(self, tag):
+        for index in range(len(self.stack) - 1, 0, -1):
+            if self.stack[index].tag == tag:
+                del self.stack[index:]
+                return
+
+    def handle_data(self, data):
+        self.stack[-1].append(Node('text', data=data))
+
+    def handle_comment(self, data):
+        self.stack[-1].append(Node('comment', data=data))
+
+
+def parse_html(markup):
+    """
+    Parse a page into a document tree with its form controls initialised.
+
+    :param markup: HTML source
+    :return: document Node
+    """
+    builder = _TreeBuilder()
+    builder.feed(markup)
+    builder.close()
+    document = builder.document
+    for order, node in enumerate(document.descendants(), 1):
+        node.order = order
+        if node.kind != 'element':
+            continue
+        if node.tag == 'input':
+            node.value = node.attributes.get('value', '')
+            node.checked = 'checked' in node.attributes
+        elif node.tag == 'textarea':
+            node.value = node.text_content
+        elif node.tag == 'option':
+            node.selected = 'selected' in node.attributes
+    for select in elements(document, 'select'):
+        sync_select(select)
+    return document
+
+
+def elements(root, tag=None):
+    """
+    :return: list of the descendant elements of a node, optionally only those with a tag
+    """
+    return [node for node in root.descendants() if node.kind == 'element' and (tag is None or node.tag == tag)]
+
+
+def option_value(option):
+    return option.attributes.get('value', option.text_content.strip())
+
+
+def sync_select(select):
+    """
+    Recompute the value of a select element from its options; a single select without a
+    selected option selects its first one.
+    """
+    options = elements(select, 'option')
+    selected = [option for option in options if option.selected]
+    if not selected and options and 'multiple' not in select.attributes:
+        options[0].selected = True
+        selected = options[:1]
+    select.value = option_value(selected[0]) if selected else ''
+
+
+def serialize(node):
+    """
+    :return: the outer HTML of a node, or the markup of a whole document
+    """
+    if node.kind == 'document':
+        return '<!DOCTYPE html>' + ''.join(serialize(child) for child in node.children)
+    if node.kind == 'text':
+        return node.data if node.parent and node.parent.tag in ('script', 'style') else html.escape(node.data, False)
+    if node.kind == 'comment':
+        return f"<!--{node.data}-->"
+    attributes = ''.join(f' {name}="{html.escape(value)}"' if value != '' else f' {name}'
+                         for name, value in node.attributes.items())
+    if node.tag in VOID_ELEMENTS:
+        return f"<{node.tag}{attributes}>"
+    return f"<{node.tag}{attributes}>{''.join(serialize(child) for child in node.children)}</{node.tag}>"
+
+
+# --------------------------------------------------------------------- Rendering
+
+def is_hidden(node):
+    """
+    :return: True if the element itself is not rendered, regardless of its ancestors
+    """
+    style = node.attributes.get('style', '').replace(' ', '').lower()
+    return (node.tag in NOT_RENDERED or 'display:none' in style or 'visibility:hidden' in style
+            or matches(node, HIDDEN_SELECTORS))
+
+
+def is_visible(node):
+    """
+    :return: True if neither the element nor any of its ancestors is hidden
+    """
+    if node.kind != 'element' or node.root().kind != 'document':
+        return False
+    return not any(is_hidden(element) for element in [node, *node.ancestors()] if element.kind == 'element')
+
+
+def inner_text(node):
+    """
+    Approximate the rendered text of an element: the text of its visible descendants with
+    whitespace collapsed and a line break around block elements, as WebDriver reports it.
+    """
+    if node.kind == 'text':
+        return ' '.join(node.data.split())
+    if not is_visible(node):
+        return ''
+    parts = []
+
+    def walk(current):
+        for child in current.children:
+            if child.kind == 'text':
+                parts.append(child.data)
+            elif child.kind == 'element' and not is_hidden(child):
+                block = child.tag in BLOCK_ELEMENTS or child.tag in ('td', 'th')
+                if block:
+                    parts.append('\n')
+                walk(child)
+                if block:
+                    parts.append('\n')
+
+    walk(node)
+    lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+# --------------------------------------------------------------------------- CSS
+
+@lru_cache(maxsize=512)
+def _css(selector):
+    return parse_css(selector)
+
+
+def matches(node, selector):
+    """
+    :param node: element Node
+    :param selector: CSS selector list
+    :return: True if the element matches any selector of the list
+    :raises: SelectorError if the selector is invalid
+    """
+    return node.kind == 'element' and any(_match_complex(node, parts, len(parts) - 1) for parts in _css(selector))
+
+
+def select(root, selector):
+    """
+    :return: list of the descendant elements of root matching a CSS selector list, in document order
+    """
+    selectors = _css(selector)
+    return [node for node in root.descendants()
+            if node.kind == 'element' and any(_match_complex(node, parts, len(parts) - 1) for parts in selectors)]
+
+
+def _previous_elements(node):
+    siblings = node.parent.element_children if node.parent is not None else [node]
+    return reversed(siblings[:siblings.index(node)])
+
+
+def _match_complex(node, parts, index):
+    combinator, compound = parts[index]
+    if not _match_compound(node, compound):
+        return False
+    if index == 0:
+        return True
+    if combinator == ' ':
+        return any(_match_complex(ancestor, parts, index - 1) for ancestor in node.ancestors()
+                   if ancestor.kind == 'element')
+    if combinator == '>':
+        return node.parent is not None and node.parent.kind == 'element' and _match_complex(node.parent, parts,
+                                                                                              index - 1)
+    previous = _previous_elements(node)
+    if combinator == '+':
+        sibling = next(previous, None)
+        return sibling is not None and _match_complex(sibling, parts, index - 1)
+    return any(_match_complex(sibling, parts, index - 1) for sibling in previous)
+
+
+def _match_attribute(node, name, operator, expected, flags):
+    actual = node.attributes.get(name)
+    if actual is None:
+        return False
+    if operator is None:
+        return True
+    if flags == 'i' or (name == 'type' and node.tag == 'input' and flags != 's'):
+        actual, expected = actual.lower(), expected.lower()
+    if operator == '=':
+        return actual == expected
+    if operator == '~=':
+        return expected in actual.split()
+    if operator == '|=':
+        return actual == expected or actual.startswith(expected + '-')
+    if not expected:
+        return False
+    if operator == '^=':
+        return actual.startswith(expected)
+    if operator == '$=':
+        return actual.endswith(expected)
+    return expected in actual
+
+
+def _match_compound(node, compound):
+    if compound['tag'] not in (None, '*') and node.tag != compound['tag']:
+        return False
+    if any(node.attributes.get('id') != identifier for identifier in compound['ids']):
+        return False
+    classes = node.classes
+    if any(name not in classes for name in compound['classes']):
+        return False
+    if not all(_match_attribute(node, *attribute) for attribute in compound['attributes']):
+        return False
+    return all(_match_pseudo(node, name, argument) for name, argument in compound['pseudos'])
+
+
+def _nth(node, a, b, of_type=False, from_end=False, of=None):
+    siblings = node.parent.element_children if node.parent is not None else [node]
+    if of_type:
+        siblings = [sibling for sibling in siblings if sibling.tag == node.tag]
+    if of is not None:
+        if not any(_match_complex(node, parts, len(parts) - 1) for parts in of):
+            return False
+        siblings = [sibling for sibling in siblings if any(_match_complex(sibling, parts, len(parts) - 1)
+                                                            for parts in of)]
+    position = siblings.index(node) + 1
+    if from_end:
+        position = len(siblings) - position + 1
+    if a == 0:
+        return position == b
+    return (position - b) % a == 0 and (position - b) // a >= 0
+
+
+def _match_pseudo(node, name, argument):
+    if name.startswith('::'):
+        return False
+    if name in ('not', 'is', 'where'):
+        matched = any(_match_complex(node, parts, len(parts) - 1) for parts in argument)
+        return not matched if name == 'not' else matched
+    if name == 'has':
+        return any(descendant.kind == 'element' and _match_complex(descendant, parts, len(parts) - 1)
+                   for descendant in node.descendants() for parts in argument)
+    if name in ('nth-child', 'nth-last-child', 'nth-of-type', 'nth-last-of-type'):
+        a, b, of = argument
+        return _nth(node, a, b, of_type='of-type' in name, from_end='last' in name, of=of)
+    simple = {
+        'first-child': lambda: _nth(node, 0, 1), 'last-child': lambda: _nth(node, 0, 1, from_end=True),
+        'only-child': lambda: _nth(node, 0, 1) and _nth(node, 0, 1, from_end=True),
+        'first-of-type': lambda: _nth(node, 0, 1, of_type=True),
+        'last-of-type': lambda: _nth(node, 0, 1, of_type=True, from_end=True),
+        'only-of-type': lambda: _nth(node, 0, 1, of_type=True) and _nth(node, 0, 1, of_type=True, from_end=True),
+        'root': lambda: node.parent is not None and node.parent.kind == 'document',
+        'scope': lambda: node.parent is not None and node.parent.kind == 'document',
+        'empty': lambda: not any(child.kind == 'element' or (child.kind == 'text' and child.data)
+                                 for child in node.children),
+        'link': lambda: node.tag in ('a', 'area') and 'href' in node.attributes,
+        'any-link': lambda: node.tag in ('a', 'area') and 'href' in node.attributes,
+        'checked': lambda: node.checked if node.tag == 'input' else node.selected,
+        'default': lambda: 'checked' in node.attributes or 'selected' in node.attributes,
+        'disabled': lambda: node.disabled,
+        'enabled': lambda: node.tag in FORM_CONTROLS and not node.disabled,
+        'required': lambda: node.tag in ('input', 'select', 'textarea') and 'required' in node.attributes,
+        'optional': lambda: node.tag in ('input', 'select', 'textarea') and 'required' not in node.attributes,
+        'read-only': lambda: not (node.tag in ('input', 'textarea') and 'readonly' not in node.attributes
+                                  and not node.disabled),
+        'read-write': lambda: node.tag in ('input', 'textarea') and 'readonly' not in node.attributes
+                              and not node.disabled,
+        'placeholder-shown': lambda: 'placeholder' in node.attributes and not node.value,
+        'defined': lambda: True,
+        'lang': lambda: any((element.attributes.get('lang') or '').lower().split('-')[0] == argument.lower()
+                            for element in [node, *node.ancestors()] if element.kind == 'element'),
+    }
+    # Pseudo-classes of user interaction and validation never match a page nobody interacts with.
+    return simple[name]() if name in simple else False
+
+
+# ------------------------------------------------------------------------- XPath
+
+class Attribute:
+    """
+    Attribute node returned by the attribute axis.
+    """
+
+    __slots__ = ('owner', 'name', 'value', 'index')
+    kind = 'attribute'
+
+    def __init__(self, owner, name, value, index):
+        self.owner = owner
+        self.name = name
+        self.value = value
+        self.index = index
+
+    @property
+    def parent(self):
+        return self.owner
+
+    def __eq__(self, other):
+        return isinstance(other, Attribute) and other.owner is self.owner and other.name == self.name
+
+    def __hash__(self):
+        return hash((id(self.owner), self.name))
+
+
+def _order(node):
+    if isinstance(node, Attribute):
+        return node.owner.order, node.index + 1
+    return node.order, 0
+
+
+def _sorted(nodes):
+    unique = {id(node) if not isinstance(node, Attribute) else (id(node.owner), node.name): node for node in nodes}
+    return sorted(unique.values(), key=_order)
+
+
+def string_value(node):
+    if isinstance(node, Attribute):
+        return node.value
+    return node.text_content
+
+
+def _string(value):
+    if isinstance(value, list):
+        return string_value(value[0]) if value else ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return str(int(value)) if value == int(value) else repr(value)
+    return value
+
+
+def _number(value):
+    if isinstance(value, float):
+        return value
+    if isinstance(value, bool):
+        return 1.0 if value else 0.0
+    try:
+        return float(_string(value).strip())
+    except ValueError:
+        return float('nan')
+
+
+def _boolean(value):
+    if isinstance(value, list):
+        return bool(value)
+    if isinstance(value, float):
+        return value != 0 and not math.isnan(value)
+    if isinstance(value, str):
+        return bool(value)
+    return value
+
+
+def _axis(node, axis):
+    if isinstance(node, Attribute):
+        if axis in ('parent', 'ancestor', 'ancestor-or-self'):
+            chain = [node.owner, *node.owner.ancestors()]
+            return ([node] if axis == 'ancestor-or-self' else []) + (chain[:1] if axis == 'parent' else chain)
+        return [node] if axis in ('self', 'descendant-or-self') else []
+    if axis == 'child':
+        return node.children
+    if axis == 'descendant':
+        return list(node.descendants())
+    if axis == 'descendant-or-self':
+        return [node, *node.descendants()]
+    if axis == 'parent':
+        return [node.parent] if node.parent is not None else []
+    if axis == 'ancestor':
+        return list(node.ancestors())
+    if axis == 'ancestor-or-self':
+        return [node, *node.ancestors()]
+    if axis == 'self':
+        return [node]
+    if axis == 'attribute':
+        return [Attribute(node, name, value, index) for index, (name, value) in enumerate(node.attributes.items())] \
+            if node.kind == 'element' else []
+    siblings = node.parent.children if node.parent is not None else [node]
+    position = next(index for index, sibling in enumerate(siblings) if sibling is node)
+    if axis == 'following-sibling':
+        return siblings[position + 1:]
+    if axis == 'preceding-sibling':
+        return list(reversed(siblings[:position]))
+    ancestors = set(map(id, node.ancestors()))
+    everything = list(node.root().descendants())
+    if axis == 'following':
+        last = node
+        while last.children:
+            last = last.children[-1]
+        return [other for other in everything if other.order > last.order]
+    if axis == 'preceding':
+        return [other for other in reversed(everything) if other.order < node.order and id(other) not in ancestors]
+    return []  # namespace
+
+
+def _node_test(node, axis, test):
+    if test[0] == 'name':
+        principal = 'attribute' if axis == 'attribute' else 'element'
+        if node.kind != principal:
+            return False
+        name = node.name if principal == 'attribute' else node.tag
+        return test[1] == '*' or name == test[1].lower()
+    kind = test[1]
+    return kind == 'node' or node.kind == kind
+
+
+class _XPathEvaluator:
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    def error(self, message):
+        return SelectorError(f"{message} in XPath {self.expression!r}")
+
+    def evaluate(self, tree, node, position=1, size=1):
+        kind = tree[0]
+        if kind == 'path':
+            _, absolute, steps = tree
+            return self.steps([node.root()] if absolute else [node], steps)
+        if kind == 'filter':
+            _, primary, predicates, steps = tree
+            nodes = self.evaluate(primary, node, position, size)
+            if not isinstance(nodes, list):
+                raise self.error("Predicates and steps need a node-set")
+            nodes = self.predicates(_sorted(nodes), predicates)
+            return self.steps(nodes, steps)
+        if kind == 'literal':
+            return tree[1]
+        if kind == 'number':
+            return tree[1]
+        if kind == 'negate':
+            return -_number(self.evaluate(tree[1], node, position, size))
+        if kind == 'union':
+            nodes = []
+            for path in tree[1]:
+                result = self.evaluate(path, node, position, size)
+                if not isinstance(result, list):
+                    raise self.error("'|' needs node-sets")
+                nodes.extend(result)
+            return _sorted(nodes)
+        if kind == 'binary':
+            return self.binary(tree, node, position, size)
+        if kind == 'call':
+            return self.call(tree[1], tree[2], node, position, size)
+        raise self.error(f"Variables are not supported: ${tree[1]}")
+
+    def steps(self, nodes, steps):
+        for _, axis, test, predicates in steps:
+            selected = []
+            for node in nodes:
+                candidates = [candidate for candidate in _axis(node, axis) if _node_test(candidate, axis, test)]
+                selected.extend(self.predicates(candidates, predicates))
+            nodes = _sorted(selected)
+        return nodes
+
+    def predicates(self, nodes, predicates):
+        for predicate in predicates:
+            size = len(nodes)
+            kept = []
+            for position, node in enumerate(nodes, 1):
+                value = self.evaluate(predicate, node, position, size)
+                if (value == position) if isinstance(value, float) else _boolean(value):
+                    kept.append(node)
+            nodes = kept
+        return nodes
+
+    def binary(self, tree, node, position, size):
+        _, operator, left, right = tree
+        if operator == 'or':
+            return (_boolean(self.evaluate(left, node, position, size))
+                    or _boolean(self.evaluate(right, node, position, size)))
+        if operator == 'and':
+            return (_boolean(self.evaluate(left, node, position, size))
+                    and _boolean(self.evaluate(right, node, position, size)))
+        left, right = self.evaluate(left, node, position, size), self.evaluate(right, node, position, size)
+        if operator in ('=', '!=', '<', '>', '<=', '>='):
+            return self.compare(operator, left, right)
+        left, right = _number(left), _number(right)
+        if operator == '+':
+            return left + right
+        if operator == '-':
+            return left - right
+        if operator == '*':
+            return left * right
+        if operator == 'div':
+            if right == 0:
+                return float('nan') if left == 0 or math.isnan(left) else math.copysign(float('inf'), left) * (
+                    math.copysign(1, right))
+            return left / right
+        return math.fmod(left, right) if right else float('nan')
+
+    @staticmethod
+    def compare(operator, left, right):
+        # XPath 1.0, 3.4: a node-set compares true if any of its string values does.
+        if isinstance(left, list):
+            return any(_XPathEvaluator.compare(operator, string_value(node), right) for node in left)
+        if isinstance(right, list):
+            return any(_XPathEvaluator.compare(operator, left, string_value(node)) for node in right)
+        if operator in ('=', '!='):
+            if isinstance(left, bool) or isinstance(right, bool):
+                left, right = _boolean(left), _boolean(right)
+            elif isinstance(left, float) or isinstance(right, float):
+                left, right = _number(left), _number(right)
+            return (left == right) == (operator == '=')
+        left, right = _number(left), _number(right)
+        return {'<': left < right, '>': left > right, '<=': left <= right, '>=': left >= right}[operator]
+
+    def call(self, name, arguments, node, position, size):
+        if name == 'last':
+            return float(size)
+        if name == 'position':
+            return float(position)
+        values = [self.evaluate(argument, node, position, size) for argument in arguments]
+        if name in ('count', 'sum', 'local-name', 'name', 'namespace-uri') and values and not isinstance(values[0],
+                                                                                                         list):
+            raise self.error(f"{name}() needs a node-set")
+        if name == 'count':
+            return float(len(values[0]))
+        if name == 'sum':
+            return float(sum(_number(string_value(item)) for item in values[0]))
+        if name in ('local-name', 'name'):
+            target = (values[0][:1] or [None])[0] if values else node
+            if target is None:
+                return ''
+            return target.name if isinstance(target, Attribute) else (target.tag or '')
+        if name == 'namespace-uri':
+            return ''
+        if name == 'id':
+            wanted = set(' '.join(string_value(item) for item in values[0]).split() if isinstance(values[0], list)
+                         else _string(values[0]).split())
+            return [element for element in elements(node.root()) if element.attributes.get('id') in wanted]
+        strings = [_string(value) for value in values]
+        if name == 'string':
+            return strings[0] if strings else string_value(node)
+        if name == 'concat':
+            return ''.join(strings)
+        if name == 'starts-with':
+            return strings[0].startswith(strings[1])
+        if name == 'contains':
+            return strings[1] in strings[0]
+        if name == 'substring-before':
+            return strings[0].partition(strings[1])[0] if strings[1] in strings[0] else ''
+        if name == 'substring-after':
+            return strings[0].partition(strings[1])[2] if strings[1] in strings[0] else ''
+        if name == 'substring':
+            return self.substring(strings[0], *(_number(value) for value in values[1:]))
+        if name == 'string-length':
+            return float(len(strings[0] if strings else string_value(node)))
+        if name == 'normalize-space':
+            return ' '.join((strings[0] if strings else string_value(node)).split())
+        if name == 'translate':
+            source, replacement = strings[1], strings[2]
+            table = {}
+            for index, character in enumerate(source):
+                table.setdefault(ord(character), replacement[index] if index < len(replacement) else None)
+            return strings[0].translate(table)
+        if name == 'boolean':
+            return _boolean(values[0])
+        if name == 'not':
+            return not _boolean(values[0])
+        if name in ('true', 'false'):
+            return name == 'true'
+        if name == 'lang':
+            element = node if not isinstance(node, Attribute) else node.owner
+            for candidate in [element, *element.ancestors()]:
+                if candidate.kind == 'element' and 'lang' in candidate.attributes:
+                    language = candidate.attributes['lang'].lower()
+                    return language == strings[0].lower() or language.startswith(strings[0].lower() + '-')
+            return False
+        if name == 'number':
+            return _number(values[0] if values else string_value(node))
+        number = _number(values[0])
+        if math.isnan(number) or math.isinf(number):
+            return number
+        if name == 'floor':
+            return float(math.floor(number))
+        if name == 'ceiling':
+            return float(math.ceil(number))
+        return float(math.floor(number + 0.5))  # round
+
+    @staticmethod
+    def substring(text, start, length=None):
+        # XPath 1.0, 4.2: characters at positions p with round(start) <= p < round(start) + round(length).
+        def rounded(value):
+            return value if math.isnan(value) or math.isinf(value) else math.floor(value + 0.5)
+        first = rounded(start)
+        last = float('inf') if length is None else first + rounded(length)
+        return ''.join(character for position, character in enumerate(text, 1) if first <= position < last)
+
+
+@lru_cache(maxsize=512)
+def _xpath(expression):
+    return parse_xpath(expression)
+
+
+def evaluate_xpath(expression, context):
+    """
+    :param expression: XPath 1.0 expression
+    :param context: context Node
+    :return: list of nodes in document order, or the string, float or bool the expression returns
+    :raises: SelectorError if the expression is invalid or uses an unsupported feature
+    """
+    return _XPathEvaluator(expression).evaluate(_xpath(expression), context)
+
+
+# ----------------------------------------------------------------------- Locators
+
+def link_text(node):
+    return ' '.join(inner_text(node).split()) or node.text_content.strip()
+
+
+def locate(root, by, value):
+    """
+    Resolve a locator below a document or element the way LOCATE_JS does.
+
+    :param root: document or element Node to search in
+    :param by: Selenium By strategy
+    :param value: locator value
+    :return: list of matching element Nodes in document order
+    :raises: SelectorError if the locator is invalid or, for XPath, does not select elements
+    """
+    if by == By.ID:
+        return [node for node in elements(root) if node.attributes.get('id') == value]
+    if by == By.NAME:
+        return [node for node in elements(root) if node.attributes.get('name') == value]
+    if by == By.CLASS_NAME:
+        return [node for node in elements(root) if value in node.classes]
+    if by == By.TAG_NAME:
+        return elements(root, value.lower())
+    if by == By.CSS_SELECTOR:
+        return select(root, value)
+    if by == By.XPATH:
+        result = evaluate_xpath(value, root)
+        if not isinstance(result, list) or any(node.kind != 'element' for node in result):
+            raise SelectorError(f"The result of the XPath {value!r} is not a set of elements")
+        return result
+    if by in (By.LINK_TEXT, By.PARTIAL_LINK_TEXT):
+        links = elements(root, 'a')
+        if by == By.LINK_TEXT:
+            return [link for link in links if link_text(link) == value]
+        return [link for link in links if value in link_text(link)]
+    raise SelectorError(f"Unknown locator strategy {by!r}")
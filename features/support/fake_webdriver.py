@@ -0,0 +1,611 @@
+"""
+In-process WebDriver over the HTML the storefront serves, for running the steps without a browser.
+
+FakeWebDriver is a selenium Remote WebDriver whose command executor answers the W3C commands
+itself instead of sending them to a server. Pages are fetched with requests, parsed by
+features.support.dom and queried with the same CSS and XPath parsers the preflight uses. The
+session keeps cookies, localStorage, sessionStorage and history like a browser would. The page
+objects work on it unchanged: find_element(s), click, send_keys, clear, Select, page_source,
+title and cookies, and the scripts of features/pages/scripts.py, which SCRIPT_HANDLERS
+implements in Python, keyed by the script constant.
+
+No page JavaScript runs. The default actions of links, forms, labels, radio buttons, checkboxes
+and options are performed; what the storefront's scripts do on a click is scripted with
+CLICK_BEHAVIOURS, e.g. toggling the FAQ accordion. The DOM does not change while a step waits,
+so a wait for a missing element fails at once instead of after its timeout.
+
+environment.py creates it for -D driver=fake, and then serves the stub storefront in-process by
+default, so the whole suite runs in seconds without a Selenium server:
+
+    behave -D driver=fake
+"""
+import base64
+import itertools
+import logging
+import time
+from urllib.parse import urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from selenium import webdriver
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.file_detector import UselessFileDetector
+
+from features.pages.async_webdriver import ELEMENT_KEY
+from features.pages.scripts import (ANCHOR_SCRIPT, BATCH_SCRIPT, CAPTURE_SCRIPT, PAGE_IDENTITY_SCRIPT, PAGE_LOAD_SCRIPT,
+                                    PERFORMANCE_SCRIPT, SCROLL_INTO_VIEW_SCRIPT, SNAPSHOT_SCRIPT, TIME_ORIGIN_SCRIPT,
+                                    WAIT_SCRIPT)
+from features.pages.locator_syntax import SelectorError
+from features.support.checkpoints import RESTORE_STORAGE_SCRIPT, STORAGE_SCRIPT
+from features.support.dom import (elements, inner_text, is_visible, locate, matches, option_value, parse_html,
+                                  serialize, sync_select)
+from features.support.session_pool import RESET_STORAGE_SCRIPT
+
+logger = logging.getLogger(__name__)
+
+BLANK_PAGE = '<html><head></head><body></body></html>'
+# 1x1 transparent PNG returned for screenshots.
+SCREENSHOT = base64.b64encode(bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000005000101ad1ddb0000000049454e44ae426082')).decode('ascii')
+SUBMIT_TYPES = ('submit', 'image')
+
+_session_ids = itertools.count(1)
+
+
+class FakeDriverError(Exception):
+    """
+    W3C error a command of the fake session ends with, e.g. 'no such element'.
+    """
+
+    def __init__(self, error, message):
+        super().__init__(message)
+        self.error = error
+
+
+def toggle_accordion(session, button):
+    """
+    Bootstrap accordion: show the button's target section and collapse the others.
+    """
+    target = locate(session.document, 'css selector', button.attributes['data-bs-target'])
+    if not target:
+        return
+    opened = 'show' in target[0].classes
+    for section in locate(session.document, 'css selector', '.accordion-collapse.show'):
+        section.attributes['class'] = ' '.join(name for name in section.classes if name != 'show')
+    if not opened:
+        target[0].attributes['class'] = ' '.join(target[0].classes + ['show'])
+
+
+# What the storefront's scripts do when an element is clicked: (CSS selector, function(session, element)).
+# A function returning True prevents the element's default action.
+CLICK_BEHAVIOURS = [
+    ('.accordion-button[data-bs-target]', toggle_accordion),
+]
+
+
+class FakeSession:
+    """
+    Documents, history, cookies and storage of one fake browser session.
+    """
+
+    def __init__(self, adapter=None):
+        """
+        :param adapter: requests HTTPAdapter to share pooled storefront connections between sessions
+        """
+        self.http = requests.Session()
+        if adapter is not None:
+            self.http.mount('http://', adapter)
+            self.http.mount('https://', adapter)
+        self.url = 'about:blank'
+        self.document = parse_html(BLANK_PAGE)
+        self.history = []
+        self.position = -1
+        self.storage = {}
+        self.load = {'started': time.time() * 1000, 'ttfb': 0.0, 'duration': 0.0, 'bytes': 0}
+        self.documents_loaded = 0
+        # Clicks, typing and selections on the current document, what the identity tracker counts.
+        self.generation = 0
+        self._nodes = {}
+        self._ids = {}
+        self._stale = set()
+        self._counter = itertools.count(1)
+
+    # ---------------------------------------------------------------- Elements
+
+    def reference(self, node):
+        """
+        :return: W3C element reference of a node of the current document
+        """
+        key = id(node)
+        if key not in self._ids:
+            element_id = f"fake-{next(self._counter)}"
+            self._ids[key] = element_id
+            self._nodes[element_id] = node
+        return {ELEMENT_KEY: self._ids[key]}
+
+    def element(self, reference):
+        """
+        :param reference: element id or W3C element reference
+        :return: the Node it refers to
+        :raises: FakeDriverError if the element belongs to a previous document
+        """
+        element_id = reference[ELEMENT_KEY] if isinstance(reference, dict) else reference
+        node = self._nodes.get(element_id)
+        if node is None or node.root() is not self.document:
+            if element_id in self._stale or node is not None:
+                raise FakeDriverError('stale element reference', f"Element {element_id} is no longer attached")
+            raise FakeDriverError('no such element', f"Unknown element {element_id}")
+        return node
+
+    def find(self, by, value, root=None):
+        try:
+            return locate(root or self.document, by, value)
+        except SelectorError as error:
+            raise FakeDriverError('invalid selector', str(error))
+
+    # -------------------------------------------------------------- Navigation
+
+    @property
+    def origin(self):
+        scheme, host = urlsplit(self.url)[:2]
+        return f"{scheme}://{host}"
+
+    def _replace_document(self, url, document):
+        self._stale.update(self._nodes)
+        self._nodes.clear()
+        self._ids.clear()
+        self.url = url
+        self.document = document
+        self.documents_loaded += 1
+        self.generation = 0
+
+    def navigate(self, url, method='GET', data=None, record=True):
+        """
+        Load a URL into the session, following redirects, as a link, form or WebDriver get would.
+
+        :param url: absolute or relative URL
+        :param method: HTTP method
+        :param data: form fields of a POST, as a list of (name, value)
+        :param record: add the resulting page to the history
+        """
+        url = urljoin(self.url, url)
+        current, fragment = urldefrag(self.url)
+        target, _ = urldefrag(url)
+        if method == 'GET' and target == current and url != self.url and '#' in url:
+            # Fragment navigation scrolls within the document.
+            self.url = url
+            self._record(url, record)
+            return
+        self.load['started'] = time.time() * 1000
+        if urlsplit(url).scheme in ('about', 'data'):
+            self._replace_document(url, parse_html(BLANK_PAGE))
+            self.load.update(ttfb=0.0, duration=0.0, bytes=0)
+        else:
+            started = time.perf_counter()
+            response = self.http.request(method, url, data=data, timeout=30)
+            html = 'html' in response.headers.get('Content-Type', 'text/html')
+            self._replace_document(response.url, parse_html(response.text if html else BLANK_PAGE))
+            self.load.update(ttfb=response.elapsed.total_seconds() * 1000,
+                             duration=(time.perf_counter() - started) * 1000, bytes=len(response.content))
+        self._record(self.url, record)
+
+    def _record(self, url, record):
+        if record:
+            del self.history[self.position + 1:]
+            self.history.append(url)
+            self.position = len(self.history) - 1
+
+    def traverse(self, delta):
+        """
+        Go back (-1) or forward (1) in the history, reloading the page like a browser without a cache.
+        """
+        position = self.position + delta
+        if 0 <= position < len(self.history):
+            self.position = position
+            self.navigate(self.history[position], record=False)
+
+    # --------------------------------------------------------------- Cookies
+
+    def _cookie_matches(self, cookie):
+        host = urlsplit(self.url).hostname or ''
+        domain = cookie.domain.lstrip('.')
+        return host == domain or host.endswith('.' + domain)
+
+    def cookies(self):
+        return [{'name': cookie.name, 'value': cookie.value, 'path': cookie.path, 'domain': cookie.domain,
+                 'secure': bool(cookie.secure), 'httpOnly': cookie.has_nonstandard_attr('HttpOnly'),
+                 **({'expiry': cookie.expires} if cookie.expires else {})}
+                for cookie in self.http.cookies if self._cookie_matches(cookie)]
+
+    def add_cookie(self, cookie):
+        host = urlsplit(self.url).hostname
+        if not host:
+            raise FakeDriverError('invalid cookie domain', f"Cookies cannot be set on {self.url}")
+        self.http.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain') or host,
+                              path=cookie.get('path') or '/', secure=cookie.get('secure', False),
+                              expires=cookie.get('expiry'),
+                              rest={'HttpOnly': None} if cookie.get('httpOnly') else {})
+
+    def delete_cookies(self, name=None):
+        for cookie in list(self.http.cookies):
+            if self._cookie_matches(cookie) and name in (None, cookie.name):
+                self.http.cookies.clear(cookie.domain, cookie.path, cookie.name)
+
+    def origin_storage(self):
+        return self.storage.setdefault(self.origin, {'local': {}, 'session': {}})
+
+    # -------------------------------------------------------------- Interaction
+
+    def interactable(self, node):
+        if not is_visible(node):
+            raise FakeDriverError('element not interactable', f"{node!r} is not visible")
+        return node
+
+    def form_of(self, node):
+        if 'form' in node.attributes:
+            found = self.find('id', node.attributes['form'])
+            return found[0] if found else None
+        return node.closest('form')
+
+    def click(self, node):
+        """
+        Click an element: run the matching CLICK_BEHAVIOURS, then the default action of the
+        element or of its nearest activatable ancestor.
+        """
+        self.interactable(node)
+        self.generation += 1
+        if any(matches(node, selector) and behaviour(self, node)
+               for selector, behaviour in CLICK_BEHAVIOURS):
+            return
+        for target in [node, *node.ancestors()]:
+            if target.kind == 'element' and self.activate(target):
+                return
+
+    def activate(self, node):
+        """
+        Run the default action of an element.
+
+        :return: False if the element has none, so that the click reaches its ancestors
+        """
+        tag, kind = node.tag, node.attributes.get('type', '').lower()
+        if node.disabled:
+            return True
+        if tag == 'a' and 'href' in node.attributes:
+            if not node.attributes['href'].startswith('javascript:'):
+                self.navigate(node.attributes['href'])
+            return True
+        if tag == 'option':
+            select = node.closest('select')
+            if select is not None:
+                self.select_option(select, node)
+            return True
+        if tag == 'label':
+            control = (self.find('id', node.attributes['for']) if 'for' in node.attributes
+                       else [element for element in elements(node) if element.tag in ('input', 'select', 'textarea')])
+            if control:
+                self.activate(control[0])
+            return True
+        if tag == 'input' and kind == 'radio':
+            form = self.form_of(node)
+            for other in elements(form if form is not None else self.document, 'input'):
+                if other.attributes.get('name') == node.attributes.get('name') and other.attributes.get('type') == 'radio':
+                    other.checked = False
+            node.checked = True
+            return True
+        if tag == 'input' and kind == 'checkbox':
+            node.checked = not node.checked
+            return True
+        if (tag == 'input' and kind in SUBMIT_TYPES) or (tag == 'button' and kind in ('', 'submit')):
+            form = self.form_of(node)
+            if form is not None:
+                self.submit(form, node)
+            return True
+        return tag in ('button', 'input', 'select', 'textarea')
+
+    def select_option(self, select, option):
+        self.generation += 1
+        if 'multiple' not in select.attributes:
+            for other in elements(select, 'option'):
+                other.selected = False
+        option.selected = True
+        sync_select(select)
+
+    def send_keys(self, node, text):
+        self.interactable(node)
+        self.generation += 1
+        for character in text:
+            if character in (Keys.ENTER, Keys.RETURN):
+                form = self.form_of(node)
+                if form is not None:
+                    submitter = next((element for element in elements(form) if element.tag in ('button', 'input')
+                                      and element.attributes.get('type', 'submit' if element.tag == 'button' else '')
+                                      in SUBMIT_TYPES), None)
+                    self.submit(form, submitter)
+                return
+            if character == Keys.BACKSPACE and node.value:
+                node.value = node.value[:-1]
+            elif not '\ue000' <= character <= '\uf8ff':
+                if node.tag in ('input', 'textarea'):
+                    node.value = (node.value or '') + character
+
+    def submit(self, form, submitter=None):
+        """
+        Submit a form with the values its controls hold, as the browser's form submission does.
+        """
+        fields = []
+        controls = [element for element in elements(self.document) if self.form_of(element) is form
+                    and element.tag in ('input', 'select', 'textarea', 'button')]
+        for control in controls:
+            name, kind = control.attributes.get('name'), control.attributes.get('type', '').lower()
+            if not name or control.disabled:
+                continue
+            if control.tag == 'button' or (control.tag == 'input' and kind in SUBMIT_TYPES + ('button', 'reset')):
+                if control is submitter:
+                    fields.append((name, control.attributes.get('value', '')))
+            elif control.tag == 'input' and kind in ('radio', 'checkbox'):
+                if control.checked:
+                    fields.append((name, control.attributes.get('value', 'on')))
+            elif control.tag == 'select':
+                fields.extend((name, option_value(option)) for option in elements(control, 'option') if option.selected)
+            elif kind != 'file':
+                fields.append((name, control.value or ''))
+        overrides = submitter.attributes if submitter is not None else {}
+        method = (overrides.get('formmethod') or form.attributes.get('method') or 'get').upper()
+        action = urljoin(self.url, overrides.get('formaction') or form.attributes.get('action') or self.url)
+        if method == 'GET':
+            parts = urlsplit(action)
+            self.navigate(urlunsplit(parts._replace(query=urlencode(fields), fragment='')))
+        else:
+            self.navigate(action, 'POST', fields)
+
+    # ------------------------------------------------------------------ Scripts
+
+    def get_attribute(self, node, name):
+        """
+        What WebElement.get_attribute returns: the property for value, checked and selected,
+        'true' or None for boolean attributes, the attribute otherwise.
+        """
+        name = name.lower() if name != 'innerText' else name
+        if name in ('checked', 'selected'):
+            return 'true' if node.get_property(name) else None
+        if name in ('disabled', 'required', 'readonly', 'multiple', 'hidden'):
+            return 'true' if name in node.attributes else None
+        if name in ('href', 'src') and name in node.attributes:
+            return urljoin(self.url, node.attributes[name])
+        if name == 'value' and node.value is not None:
+            return node.value
+        return node.get_property(name) if name in ('class', 'classname', 'innerText') else node.attributes.get(name)
+
+    def wait(self, by, value, condition, many, timeout):
+        found = [node for node in self.find(by, value)
+                 if condition == 'present' or (is_visible(node) and (condition != 'enabled' or not node.disabled))]
+        if not found:
+            return None
+        return [self.reference(node) for node in found] if many else self.reference(found[0])
+
+    def batch(self, operations, timeout):
+        native = []
+        for index, operation in enumerate(operations):
+            found = self.find(operation['by'], operation['value'])
+            if not found:
+                return {'ok': False, 'index': index, 'error': 'element not found'}
+            node = found[0]
+            kind = operation['op']
+            if kind in ('clear', 'type'):
+                self.generation += 1
+            if kind in ('clear', 'type') and (kind == 'clear' or operation.get('clear')):
+                node.value = ''
+            if operation.get('native'):
+                native.append(self.reference(node))
+            elif kind == 'type':
+                node.value = (node.value or '') + operation['text']
+            elif kind == 'select':
+                option = next((option for option in elements(node, 'option')
+                               if option.text_content.strip() == operation['text']
+                               or option_value(option) == operation['text']), None)
+                if option is None:
+                    return {'ok': False, 'index': index, 'error': f"No option \"{operation['text']}\""}
+                self.select_option(node, option)
+            elif kind == 'click':
+                try:
+                    self.click(node)
+                except FakeDriverError as error:
+                    return {'ok': False, 'index': index, 'error': str(error)}
+        return {'ok': True, 'native': native}
+
+    def snapshot(self, fields):
+        def read(node, attributes):
+            return {'text': inner_text(node), 'visible': is_visible(node),
+                    'attributes': {name: node.get_property(name) for name in attributes}}
+        return {'url': self.url, 'title': self.title,
+                'fields': {field['name']: [read(node, field['attributes']) for node in self.find(field['by'],
+                                                                                                 field['value'])]
+                           for field in fields}}
+
+    def performance(self):
+        load = self.load
+        return {'url': self.url, 'timeOrigin': load['started'], 'ttfb': load['ttfb'], 'dcl': load['duration'],
+                'load': load['duration'], 'ready': load['duration'], 'fp': None, 'fcp': None, 'lcp': None,
+                'requests': 1, 'bytes': load['bytes'], 'resourceBytes': {}}
+
+    def scroll_into_view(self, reference):
+        # Nothing is laid out; only check that the element is still attached.
+        self.element(reference)
+
+    def identity(self):
+        return {'url': self.url, 'token': f"document-{self.documents_loaded}", 'generation': self.generation,
+                'tracked': True}
+
+    def restore_storage(self, local, session):
+        storage = self.origin_storage()
+        storage['local'], storage['session'] = dict(local), dict(session)
+
+    def reset_storage(self):
+        self.storage.pop(self.origin, None)
+
+    @property
+    def title(self):
+        titles = elements(self.document, 'title')
+        return ' '.join(titles[0].text_content.split()) if titles else ''
+
+
+# Python implementations of the scripts the page objects and support modules execute, by script.
+SCRIPT_HANDLERS = {
+    WAIT_SCRIPT: lambda session, by, value, condition, many, timeout, *_: session.wait(by, value, condition, many,
+                                                                                       timeout),
+    BATCH_SCRIPT: lambda session, operations, timeout, *_: session.batch(operations, timeout),
+    SNAPSHOT_SCRIPT: lambda session, fields: session.snapshot(fields),
+    PAGE_LOAD_SCRIPT: lambda session, *_: {'ready': True, 'waited': 0, 'document': session.identity()['token']},
+    PERFORMANCE_SCRIPT: lambda session, *_: session.performance(),
+    CAPTURE_SCRIPT: lambda session: {'url': session.url, 'title': session.title, 'readyState': 'complete',
+                                     'html': serialize(session.document), 'console': []},
+    SCROLL_INTO_VIEW_SCRIPT: lambda session, element: session.scroll_into_view(element),
+    TIME_ORIGIN_SCRIPT: lambda session: session.load['started'],
+    PAGE_IDENTITY_SCRIPT: lambda session: session.identity(),
+    ANCHOR_SCRIPT: lambda session, fragment: session.navigate('#' + fragment),
+    STORAGE_SCRIPT: lambda session: {'url': session.url, 'local': dict(session.origin_storage()['local']),
+                                     'session': dict(session.origin_storage()['session'])},
+    RESTORE_STORAGE_SCRIPT: lambda session, local, stored: session.restore_storage(local, stored),
+    RESET_STORAGE_SCRIPT: lambda session: session.reset_storage(),
+}
+# Atoms selenium's WebElement sends as scripts, recognised by their leading comment.
+ATOM_HANDLERS = {
+    '/* getAttribute */': lambda session, element, name: session.get_attribute(session.element(element), name),
+    '/* isDisplayed */': lambda session, element: is_visible(session.element(element)),
+    '/* submitForm */': lambda session, element: session.submit(session.form_of(session.element(element))),
+}
+
+
+class FakeCommandExecutor:
+    """
+    Stands in for selenium's RemoteConnection and runs every command on a FakeSession.
+    """
+
+    def __init__(self, session=None):
+        self.session = session or FakeSession()
+        self.commands = {
+            Command.NEW_SESSION: self.new_session,
+            Command.QUIT: lambda params: None,
+            Command.GET: lambda params: self.session.navigate(params['url']),
+            Command.GET_CURRENT_URL: lambda params: self.session.url,
+            Command.GET_TITLE: lambda params: self.session.title,
+            Command.GET_PAGE_SOURCE: lambda params: serialize(self.session.document),
+            Command.GO_BACK: lambda params: self.session.traverse(-1),
+            Command.GO_FORWARD: lambda params: self.session.traverse(1),
+            Command.REFRESH: lambda params: self.session.navigate(self.session.url, record=False),
+            Command.FIND_ELEMENT: lambda params: self.find(params, many=False),
+            Command.FIND_ELEMENTS: lambda params: self.find(params, many=True),
+            Command.FIND_CHILD_ELEMENT: lambda params: self.find(params, many=False),
+            Command.FIND_CHILD_ELEMENTS: lambda params: self.find(params, many=True),
+            Command.CLICK_ELEMENT: lambda params: self.session.click(self.element(params)),
+            Command.SEND_KEYS_TO_ELEMENT: lambda params: self.session.send_keys(self.element(params), params['text']),
+            Command.CLEAR_ELEMENT: self.clear,
+            Command.GET_ELEMENT_TEXT: lambda params: inner_text(self.element(params)),
+            Command.GET_ELEMENT_TAG_NAME: lambda params: self.element(params).tag,
+            Command.GET_ELEMENT_ATTRIBUTE: lambda params: self.element(params).attributes.get(params['name']),
+            Command.GET_ELEMENT_PROPERTY: lambda params: self.element(params).get_property(params['name']),
+            Command.GET_ELEMENT_RECT: self.rect,
+            Command.GET_ELEMENT_VALUE_OF_CSS_PROPERTY: lambda params: '',
+            Command.IS_ELEMENT_SELECTED: lambda params: self.element(params).get_property(
+                'checked' if self.element(params).tag == 'input' else 'selected'),
+            Command.IS_ELEMENT_ENABLED: lambda params: not self.element(params).disabled,
+            Command.W3C_EXECUTE_SCRIPT: self.execute_script,
+            Command.W3C_EXECUTE_SCRIPT_ASYNC: self.execute_script,
+            Command.GET_ALL_COOKIES: lambda params: self.session.cookies(),
+            Command.GET_COOKIE: self.cookie,
+            Command.ADD_COOKIE: lambda params: self.session.add_cookie(params['cookie']),
+            Command.DELETE_COOKIE: lambda params: self.session.delete_cookies(params['name']),
+            Command.DELETE_ALL_COOKIES: lambda params: self.session.delete_cookies(),
+            Command.SET_TIMEOUTS: lambda params: None,
+            Command.GET_TIMEOUTS: lambda params: {'implicit': 0, 'pageLoad': 300000, 'script': 30000},
+            Command.SCREENSHOT: lambda params: SCREENSHOT,
+            Command.ELEMENT_SCREENSHOT: lambda params: SCREENSHOT,
+            Command.W3C_GET_CURRENT_WINDOW_HANDLE: lambda params: 'fake-window',
+            Command.W3C_GET_WINDOW_HANDLES: lambda params: ['fake-window'],
+            Command.GET_WINDOW_RECT: lambda params: {'x': 0, 'y': 0, 'width': 1280, 'height': 800},
+            Command.SET_WINDOW_RECT: lambda params: {'x': 0, 'y': 0, 'width': 1280, 'height': 800},
+            Command.W3C_MAXIMIZE_WINDOW: lambda params: {'x': 0, 'y': 0, 'width': 1280, 'height': 800},
+        }
+
+    def execute(self, command, params):
+        """
+        :return: the response dict RemoteConnection.execute would return for the command
+        """
+        handler = self.commands.get(command)
+        try:
+            if handler is None:
+                raise FakeDriverError('unknown command', f"FakeWebDriver does not implement {command}")
+            return {'value': handler(params or {})}
+        except FakeDriverError as error:
+            return {'status': error.error, 'value': {'error': error.error, 'message': str(error), 'stacktrace': ''}}
+        except requests.RequestException as error:
+            return {'status': 'unknown error', 'value': {'error': 'unknown error', 'message': str(error)}}
+
+    def close(self):
+        self.session.http.close()
+
+    @staticmethod
+    def new_session(params):
+        return {'sessionId': f"fake-session-{next(_session_ids)}", 'capabilities': {
+            'browserName': 'fake', 'browserVersion': '1.0', 'platformName': 'any', 'pageLoadStrategy': 'eager',
+            'acceptInsecureCerts': False, 'setWindowRect': False}}
+
+    def element(self, params):
+        return self.session.element(params['id'])
+
+    def find(self, params, many):
+        root = self.element(params) if 'id' in params else None
+        found = self.session.find(params['using'], params['value'], root)
+        if many:
+            return [self.session.reference(node) for node in found]
+        if not found:
+            raise FakeDriverError('no such element', f"No element matches {params['using']}={params['value']!r}")
+        return self.session.reference(found[0])
+
+    def clear(self, params):
+        node = self.session.interactable(self.element(params))
+        self.session.generation += 1
+        if node.tag in ('input', 'textarea'):
+            node.value = ''
+
+    def rect(self, params):
+        visible = is_visible(self.element(params))
+        return {'x': 0, 'y': 0, 'width': 100 if visible else 0, 'height': 20 if visible else 0}
+
+    def cookie(self, params):
+        cookie = next((cookie for cookie in self.session.cookies() if cookie['name'] == params['name']), None)
+        if cookie is None:
+            raise FakeDriverError('no such cookie', f"No cookie named {params['name']!r}")
+        return cookie
+
+    def execute_script(self, params):
+        script, arguments = params['script'], params.get('args', [])
+        handler = SCRIPT_HANDLERS.get(script)
+        if handler is None:
+            handler = next((atom for prefix, atom in ATOM_HANDLERS.items() if script.startswith(prefix)), None)
+        if handler is None:
+            first_line = script.strip().splitlines()[0] if script.strip() else ''
+            raise FakeDriverError('javascript error', f"FakeWebDriver cannot run this script: {first_line[:80]}")
+        return handler(self.session, *arguments)
+
+
+class FakeWebDriver(webdriver.Remote):
+    """
+    Remote WebDriver whose commands run in-process on parsed storefront pages.
+    """
+
+    def __init__(self, adapter=None):
+        """
+        :param adapter: requests HTTPAdapter shared between sessions, or None for a private one
+        """
+        super().__init__(command_executor=FakeCommandExecutor(FakeSession(adapter or HTTPAdapter())),
+                         options=webdriver.ChromeOptions(), file_detector=UselessFileDetector())
+
+    @property
+    def session(self):
+        """
+        :return: FakeSession holding the documents, cookies and storage of this driver
+        """
+        return self.command_executor.session
@@ -0,0 +1,141 @@
+"""
+Forward HTTP proxy that blocks or stubs requests, for browsers without CDP.
+
+Plain HTTP requests are matched on their full URL. HTTPS traffic goes through CONNECT tunnels
+that the proxy cannot look into, so for HTTPS only whole hosts can be blocked: a tunnel is
+refused when a rule matches its origin, e.g. '*google-analytics.com/*'.
+"""
+import logging
+import select
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from features.pages.request_blocking import STUB_RESPONSES, match_rule
+from features.support.storefront_replay import HOP_BY_HOP_HEADERS
+
+logger = logging.getLogger(__name__)
+
+TUNNEL_BUFFER = 64 * 1024
+# requests decodes response bodies, so they are passed on without Content-Encoding and need not be negotiated.
+DROPPED_REQUEST_HEADERS = HOP_BY_HOP_HEADERS | {'proxy-connection', 'accept-encoding'}
+
+
+class FilteringHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, content_type=None, body=b''):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_CONNECT(self):
+        host, _, port = self.path.partition(':')
+        if match_rule(self.server.rules, f"https://{host}/"):
+            self.server.count('blocked')
+            self._reply(403)
+            return
+        try:
+            upstream = socket.create_connection((host, int(port or 443)), timeout=30)
+        except OSError as error:
+            self._reply(502, 'text/plain', str(error).encode('utf-8'))
+            return
+        self.send_response(200, 'Connection Established')
+        self.end_headers()
+        self.close_connection = True
+        sockets = [self.connection, upstream]
+        try:
+            while True:
+                readable, _, failed = select.select(sockets, [], sockets, 60)
+                if failed or not readable:
+                    break
+                for source in readable:
+                    data = source.recv(TUNNEL_BUFFER)
+                    if not data:
+                        return
+                    (upstream if source is self.connection else self.connection).sendall(data)
+        finally:
+            upstream.close()
+
+    def do_GET(self):
+        rule = match_rule(self.server.rules, self.path)
+        if rule:
+            _, stub = rule
+            if stub:
+                self.server.count('stubbed')
+                self._reply(200, *STUB_RESPONSES.get(stub, ('text/plain', b'')))
+            else:
+                self.server.count('blocked')
+                self._reply(204)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {name: value for name, value in self.headers.items() if name.lower() not in DROPPED_REQUEST_HEADERS}
+        try:
+            response = self.server.http.request(self.command, self.path, headers=headers, data=body,
+                                                allow_redirects=False, timeout=60)
+        except requests.RequestException as error:
+            self._reply(502, 'text/plain', str(error).encode('utf-8'))
+            return
+        self.server.count('forwarded')
+        self.send_response(response.status_code)
+        for name, value in response.raw.headers.items():
+            if name.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(name, value)
+        self.send_header('Content-Length', str(len(response.content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(response.content)
+
+    do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_GET
+
+
+class FilteringProxy(ThreadingHTTPServer):
+    """
+    Proxy applying the rules installed by a RequestBlocker to the requests of one browser.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), FilteringHandler)
+        self.rules = ()
+        self.counts = {'blocked': 0, 'stubbed': 0, 'forwarded': 0}
+        self._lock = threading.Lock()
+        self.http = requests.Session()
+        self.http.mount('http://', HTTPAdapter(pool_maxsize=16))
+
+    @property
+    def address(self):
+        """
+        :return: host:port for the proxy capability of a WebDriver session
+        """
+        host, port = self.server_address[:2]
+        return f"{host}:{port}"
+
+    def count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def start(self):
+        """
+        Serve requests from a daemon thread and return immediately.
+        """
+        threading.Thread(target=self.serve_forever, name='FilteringProxy', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
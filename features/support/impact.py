@@ -0,0 +1,568 @@
+"""
+Select the scenarios affected by a change from the page-object code they reach.
+
+The analysis is static. Every scenario step is matched to its step function, and the function
+bodies are walked for what they use: context.<page>.<member> is resolved through the page
+assignments in environment.py, self.<member> through the page class and its bases, and plain
+names through the repo imports. Locator fields are members like any other, so a changed
+selector only affects the steps that read that field. A git diff is then mapped to the
+functions, methods, class attributes and module-level code it touches, and a scenario is
+selected when its dependency set contains any of them. Changes to environment.py, or to any code
+its hooks reach (the session pool, the fake driver, ...), run around every scenario and select
+every scenario; page objects constructed by the hooks only contribute their constructors to
+that set. Changed lines in a feature file select the scenarios they belong to.
+
+The dependency set per step function is cached together with the hashes of the sources it was
+built from, so only a change to the Python code triggers a rebuild:
+
+    python -m features.support.impact --base origin/main
+"""
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+from collections import namedtuple
+
+from behave.matchers import ParseMatcher
+from behave.runner_util import collect_feature_locations, parse_features
+
+logger = logging.getLogger(__name__)
+
+STEP_DECORATORS = ('step', 'given', 'when', 'then')
+HOOKS = tuple(f"{when}_{what}" for when in ('before', 'after') for what in ('all', 'feature', 'scenario', 'step', 'tag'))
+ENVIRONMENT = 'features/environment.py'
+STEPS_DIR = 'features/steps'
+SOURCE_DIRS = ('features',)
+DEFAULT_CACHE = 'reports/impact-graph.json'
+
+Definition = namedtuple('Definition', 'node start end')
+StepFunction = namedtuple('StepFunction', 'node step_type matcher')
+
+
+def module_path(module, package=None, level=0):
+    """
+    Resolve an import to a file of the repo.
+
+    :param module: dotted module name, e.g. 'features.pages.base_page' or 'base_page' for a relative import
+    :param package: directory of the importing module, for relative imports
+    :param level: number of leading dots of a relative import
+    :return: relative path of the module file, or None if it is not part of the repo
+    """
+    if level:
+        base = package
+        for _ in range(level - 1):
+            base = os.path.dirname(base)
+        path = os.path.join(base, *(module or '').split('.'))
+    else:
+        path = os.path.join(*module.split('.'))
+    path = os.path.normpath(path) + '.py'
+    return path if os.path.exists(path) else None
+
+
+class Module:
+    """
+    Top-level definitions and repo imports of one Python file.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.tree = ast.parse(source, path)
+        self.imports = {}
+        self.functions = {}
+        self.classes = {}
+        package = os.path.dirname(path)
+        for node in self.tree.body:
+            if isinstance(node, ast.ImportFrom):
+                target = module_path(node.module, package, node.level)
+                for alias in node.names:
+                    if target:
+                        self.imports[alias.asname or alias.name] = (target, alias.name)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[node.name] = node
+            elif isinstance(node, ast.ClassDef):
+                self.classes[node.name] = node
+
+    def members(self, class_name):
+        """
+        :return: dict of member name to its ast node: methods and class-level assignments
+        """
+        members = {}
+        for node in self.classes[class_name].body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                members[node.name] = node
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                for target in node.targets if isinstance(node, ast.Assign) else [node.target]:
+                    if isinstance(target, ast.Name):
+                        members[target.id] = node
+        return members
+
+    def definitions(self):
+        """
+        :return: Definitions of all nodes of the file, innermost last for every line
+        """
+        found = [Definition(self.path, 1, len(self.tree.body) and self.tree.body[-1].end_lineno)]
+        for name, node in self.functions.items():
+            found.append(Definition(f"{self.path}::{name}", _start(node), node.end_lineno))
+        for name, node in self.classes.items():
+            found.append(Definition(f"{self.path}::{name}", _start(node), node.end_lineno))
+            for member, member_node in self.members(name).items():
+                found.append(Definition(f"{self.path}::{name}.{member}", _start(member_node), member_node.end_lineno))
+        return found
+
+
+def _start(node):
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+
+
+def _is_name(node, name):
+    return isinstance(node, ast.Name) and node.id == name
+
+
+class DependencyGraph:
+    """
+    Static dependency graph of the step functions over the page objects and support code.
+    """
+
+    def __init__(self, root='.'):
+        self.root = root
+        self.modules = {}
+        self.context_classes = {}
+        self._closures = {}
+        # Classes _visit_class only follows to their constructor, see hook_closure.
+        self._constructed = set()
+        self._load_context_classes()
+
+    def module(self, path):
+        if path not in self.modules:
+            with open(os.path.join(self.root, path)) as source:
+                self.modules[path] = Module(path, source.read())
+        return self.modules[path]
+
+    def _load_context_classes(self):
+        # environment.py assigns the page objects to the context: context.cart_page = CartPage(...)
+        environment = self.module(ENVIRONMENT)
+        for node in ast.walk(environment.tree):
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                    and isinstance(node.value.func, ast.Name) and node.value.func.id in environment.imports):
+                for target in node.targets:
+                    if isinstance(target, ast.Attribute) and _is_name(target.value, 'context'):
+                        self.context_classes[target.attr] = environment.imports[node.value.func.id]
+
+    def resolve_class(self, path, name):
+        """
+        Follow imports to the module that defines a class.
+
+        :return: (path, class name), or None if the class is not defined in the repo
+        """
+        module = self.module(path)
+        if name in module.classes:
+            return path, name
+        if name in module.imports:
+            return self.resolve_class(*module.imports[name])
+        return None
+
+    def mro(self, path, name):
+        """
+        :return: (path, class name) of the class and its repo base classes, in lookup order
+        """
+        order = [(path, name)]
+        for base in self.module(path).classes[name].bases:
+            resolved = self.resolve_class(path, base.id) if isinstance(base, ast.Name) else None
+            if resolved:
+                order.extend(entry for entry in self.mro(*resolved) if entry not in order)
+        return order
+
+    def find_member(self, cls, member):
+        """
+        :param cls: (path, class name) of the concrete class
+        :param member: member name; UPPERCASE names also resolve to the Locator field they are set from
+        :return: (path, class name, member) of the defining class, or None
+        """
+        for path, name in self.mro(*cls):
+            members = self.module(path).members(name)
+            for candidate in (member, member.lower()):
+                if candidate in members:
+                    return path, name, candidate
+        return None
+
+    def locator_fields(self, cls):
+        """
+        :return: (path, class name, member) of every Locator field of a class and its bases
+        """
+        fields = []
+        for path, name in self.mro(*cls):
+            for member, node in self.module(path).members(name).items():
+                if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                        and isinstance(node.value.func, ast.Name) and node.value.func.id == 'Locator'):
+                    fields.append((path, name, member))
+        return fields
+
+    def closure(self, path, function):
+        """
+        :param path: module of a step function
+        :param function: name of the step function
+        :return: sorted node ids the step function reaches
+        """
+        key = (path, function)
+        if key not in self._closures:
+            reached = set()
+            self._visit_function(path, self.module(path).functions[function], None, reached)
+            self._closures[key] = sorted(reached)
+        return self._closures[key]
+
+    def _visit_function(self, path, node, cls, reached, owner=None):
+        # cls is the concrete class self is bound to, owner the class defining the function
+        reached.add(path)
+        if owner:
+            self._visit_class(path, owner, reached, members=False)
+        module = self.module(path)
+        for child in ast.walk(node):
+            if isinstance(child, ast.Attribute):
+                if cls and _is_name(child.value, 'self'):
+                    self._visit_member(cls, child.attr, reached)
+                    if child.attr == 'locators':
+                        for field in self.locator_fields(cls):
+                            reached.add(f"{field[0]}::{field[1]}.{field[2]}")
+                elif (isinstance(child.value, ast.Attribute) and _is_name(child.value.value, 'context')
+                      and child.value.attr in self.context_classes):
+                    target = self.resolve_class(*self.context_classes[child.value.attr])
+                    if target:
+                        self._visit_class(target[0], target[1], reached, members=False)
+                        self._visit_member(target, child.attr, reached)
+                elif isinstance(child.value, ast.Name) and self._constructed:
+                    # BasePage.WAIT_STRATEGY = ... only reaches that member of a page class.
+                    target = self.resolve_class(path, child.value.id)
+                    if target in self._constructed:
+                        self._visit_member(target, child.attr, reached)
+            elif isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+                self._visit_name(module, child.id, reached)
+
+    def _visit_member(self, cls, member, reached):
+        found = self.find_member(cls, member)
+        if not found:
+            return
+        path, name, member = found
+        node_id = f"{path}::{name}.{member}"
+        if node_id in reached:
+            return
+        reached.add(node_id)
+        node = self.module(path).members(name)[member]
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self._visit_function(path, node, cls, reached, owner=name)
+        else:
+            self._visit_function(path, node, None, reached, owner=name)
+
+    def _visit_class(self, path, name, reached, members=True):
+        """
+        A class reached by name (constructed, used as a descriptor, ...) depends on all of its code.
+        """
+        if members and (path, name) in self._constructed:
+            for base_path, base in self.mro(path, name):
+                reached.update((f"{base_path}::{base}", base_path))
+                if '__init__' in self.module(base_path).members(base):
+                    self._visit_member((base_path, base), '__init__', reached)
+            return
+        node_id = f"{path}::{name}"
+        if node_id in reached and not members:
+            return
+        reached.add(node_id)
+        reached.add(path)
+        for base_path, base in self.mro(path, name)[1:]:
+            self._visit_class(base_path, base, reached, members)
+        if members:
+            for member in self.module(path).members(name):
+                self._visit_member((path, name), member, reached)
+
+    def _visit_name(self, module, name, reached):
+        if name in module.functions:
+            node_id = f"{module.path}::{name}"
+            if node_id not in reached:
+                reached.add(node_id)
+                self._visit_function(module.path, module.functions[name], None, reached)
+        elif name in module.classes:
+            if f"{module.path}::{name}" not in reached:
+                self._visit_class(module.path, name, reached)
+        elif name in module.imports:
+            target, imported = module.imports[name]
+            # Imported constants are part of the module-level code of their module.
+            reached.add(target)
+            self._visit_name(self.module(target), imported, reached)
+
+    def hook_closure(self):
+        """
+        :return: sorted node ids the hooks of environment.py reach. The page objects the hooks put on
+            the context only contribute their constructors; the members the steps use are in the
+            closures of the step functions.
+        """
+        pages = {self.resolve_class(*target) for target in self.context_classes.values()} - {None}
+        self._constructed = {cls for page in pages for cls in self.mro(*page)}
+        try:
+            reached = {ENVIRONMENT}
+            environment = self.module(ENVIRONMENT)
+            for hook in HOOKS:
+                if hook in environment.functions:
+                    self._visit_name(environment, hook, reached)
+        finally:
+            self._constructed = set()
+        return sorted(reached)
+
+    def step_functions(self):
+        """
+        :return: StepFunctions of every decorated function in the steps directory
+        """
+        functions = []
+        for filename in sorted(os.listdir(os.path.join(self.root, STEPS_DIR))):
+            if not filename.endswith('.py'):
+                continue
+            path = os.path.join(STEPS_DIR, filename)
+            for name, node in self.module(path).functions.items():
+                for decorator in node.decorator_list:
+                    if (isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Name)
+                            and decorator.func.id in STEP_DECORATORS and decorator.args
+                            and isinstance(decorator.args[0], ast.Constant)):
+                        step_type = None if decorator.func.id == 'step' else decorator.func.id
+                        matcher = ParseMatcher(lambda context: None, decorator.args[0].value, step_type)
+                        functions.append(StepFunction(f"{path}::{name}", step_type, matcher))
+        return functions
+
+
+def source_hashes(root='.'):
+    """
+    :return: dict of the sha1 of every Python file under the source directories
+    """
+    hashes = {}
+    for directory in SOURCE_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+            for filename in sorted(filenames):
+                if filename.endswith('.py'):
+                    path = os.path.relpath(os.path.join(dirpath, filename), root)
+                    with open(os.path.join(root, path), 'rb') as source:
+                        hashes[path] = hashlib.sha1(source.read()).hexdigest()
+    return hashes
+
+
+class ImpactIndex:
+    """
+    Dependency sets of the scenarios, backed by a cache of the step function closures.
+    """
+
+    def __init__(self, root='.', cache=DEFAULT_CACHE):
+        self.root = root
+        self.cache = cache
+        self.rebuilt = False
+        self.steps, self.hooks = self._load_steps()
+        # Source and definitions of the files node_source read, parsed once per version of a file.
+        self._definitions = {}
+
+    def _load_steps(self):
+        hashes = source_hashes(self.root)
+        if self.cache and os.path.exists(self.cache):
+            with open(self.cache) as cached:
+                data = json.load(cached)
+            if data.get('sources') == hashes and 'hooks' in data:
+                return [(StepFunction(entry['node'], entry['step_type'],
+                                      ParseMatcher(lambda context: None, entry['pattern'], entry['step_type'])),
+                         entry['closure']) for entry in data['steps']], data['hooks']
+        graph = DependencyGraph(self.root)
+        steps = [(function, graph.closure(*function.node.split('::'))) for function in graph.step_functions()]
+        hooks = graph.hook_closure()
+        self.rebuilt = True
+        if self.cache:
+            os.makedirs(os.path.dirname(self.cache) or '.', exist_ok=True)
+            with open(self.cache, 'w') as cached:
+                json.dump({'sources': hashes, 'hooks': hooks, 'steps': [
+                    {'node': function.node, 'step_type': function.step_type, 'pattern': function.matcher.pattern,
+                     'closure': closure} for function, closure in steps]}, cached, indent=1)
+        return steps, hooks
+
+    def dependencies(self, step):
+        """
+        :param step: behave Step
+        :return: node ids the step reaches; the steps modules as a whole if the step is undefined
+        """
+        for function, closure in self.steps:
+            if function.step_type in (None, step.step_type) and function.matcher.match(step.name):
+                return closure
+        return [os.path.join(STEPS_DIR, filename) for filename in os.listdir(os.path.join(self.root, STEPS_DIR))
+                if filename.endswith('.py')]
+
+    def fingerprint(self, steps):
+        """
+        :param steps: behave Steps
+        :return: sha1 over the source of every node the steps and the hooks reach; it changes whenever
+            a change of the Python code would select a scenario made of these steps
+        """
+        nodes = set(self.hooks)
+        for step in steps:
+            nodes.update(self.dependencies(step))
+        digest = hashlib.sha1()
+        for node in sorted(nodes):
+            digest.update(node.encode('utf-8') + b'\0' + self.node_source(node).encode('utf-8') + b'\0')
+        return digest.hexdigest()
+
+    def node_source(self, node):
+        """
+        :param node: node id, e.g. 'features/pages/cart_page.py::CartPage.load' or a module path
+        :return: source lines of the node, '' if it no longer exists
+        """
+        path = node.split('::')[0]
+        source = _read(os.path.join(self.root, path))
+        if source is None:
+            return ''
+        if path == node:
+            return source
+        cached = self._definitions.get(path)
+        if cached is None or cached[0] != source:
+            try:
+                definitions = {definition.node: definition for definition in Module(path, source).definitions()}
+            except SyntaxError:
+                definitions = None
+            cached = self._definitions[path] = (source, definitions)
+        definitions = cached[1]
+        if definitions is None:
+            return source
+        definition = definitions.get(node)
+        if definition is None:
+            return ''
+        return '\n'.join(source.splitlines()[definition.start - 1:definition.end])
+
+    def scenarios(self, paths=('features',)):
+        """
+        :return: list of (feature, scenario, dependency set) for every scenario of the feature files
+        """
+        result = []
+        for feature in parse_features(collect_feature_locations(list(paths))):
+            for scenario in feature.walk_scenarios():
+                nodes = set()
+                for step in scenario.all_steps:
+                    nodes.update(self.dependencies(step))
+                result.append((feature, scenario, nodes))
+        return result
+
+
+def changed_lines(base, root='.'):
+    """
+    Run git diff against a base revision, including uncommitted changes.
+
+    :return: dict of path to (old line numbers, new line numbers) touched by the diff
+    """
+    diff = subprocess.run(['git', 'diff', '--unified=0', '--no-color', base, '--'], cwd=root, check=True,
+                          capture_output=True, text=True).stdout
+    changes, old_path, path = {}, None, None
+    for line in diff.splitlines():
+        if line.startswith('--- '):
+            old_path = line[6:] if line.startswith('--- a/') else None
+        elif line.startswith('+++ '):
+            path = line[6:] if line.startswith('+++ b/') else old_path
+            changes.setdefault(path, (set(), set(), old_path))
+        elif line.startswith('@@'):
+            match = re.match(r'@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@', line)
+            old_start, old_count, new_start, new_count = (int(group) if group is not None else 1
+                                                          for group in match.groups())
+            old_lines, new_lines, _ = changes[path]
+            # A pure insertion or deletion touches the line next to it on the other side.
+            old_lines.update(range(old_start, old_start + old_count) if old_count else [old_start])
+            new_lines.update(range(new_start, new_start + new_count) if new_count else [new_start])
+    return changes
+
+
+def innermost(definitions, line):
+    candidates = [definition for definition in definitions if definition.start <= line <= definition.end]
+    return max(candidates, key=lambda definition: definition.start).node if candidates else None
+
+
+def changed_nodes(base, root='.'):
+    """
+    Map a git diff to the changed node ids and the changed lines of feature files.
+
+    :return: (set of node ids, dict of feature file to changed line numbers)
+    """
+    nodes, features = set(), {}
+    for path, (old_lines, new_lines, old_path) in changed_lines(base, root).items():
+        if path.endswith('.feature'):
+            features[path] = new_lines
+        elif path.endswith('.py'):
+            sources = [(path, new_lines, _read(os.path.join(root, path)))]
+            if old_path:
+                sources.append((old_path, old_lines, _git_show(base, old_path, root)))
+            for module_path_, lines, source in sources:
+                if source is None:
+                    continue
+                try:
+                    definitions = Module(module_path_, source).definitions()
+                except SyntaxError:
+                    nodes.add(module_path_)
+                    continue
+                nodes.update(innermost(definitions, line) or module_path_ for line in lines)
+    return nodes, features
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as source:
+        return source.read()
+
+
+def _git_show(revision, path, root):
+    shown = subprocess.run(['git', 'show', f"{revision}:{path}"], cwd=root, capture_output=True, text=True)
+    return shown.stdout if shown.returncode == 0 else None
+
+
+def select(index, base, paths=('features',), root='.'):
+    """
+    :param index: ImpactIndex
+    :param base: git revision to diff against
+    :return: list of (feature, scenario, reasons) for the affected scenarios, reasons being node ids or lines
+    """
+    nodes, feature_lines = changed_nodes(base, root)
+    # Code the hooks run affects every scenario.
+    hooks = sorted(node for node in nodes if node in index.hooks or node.startswith(ENVIRONMENT + '::'))
+    selected = []
+    for feature, scenario, dependencies in index.scenarios(paths):
+        reasons = [f"{node} (hooks)" for node in hooks] or sorted(nodes & dependencies)
+        lines = feature_lines.get(os.path.relpath(feature.filename, root), set())
+        if lines and any(scenario_lines(feature, scenario, line) for line in lines):
+            reasons.append(f"{feature.filename} lines changed")
+        if reasons:
+            selected.append((feature, scenario, reasons))
+    return selected
+
+
+def scenario_lines(feature, scenario, line):
+    """
+    :return: True if a changed line belongs to the scenario or to the feature parts shared by all scenarios
+    """
+    starts = sorted(child.line for child in feature.scenarios)
+    if not starts or line < starts[0]:
+        return True
+    # Scenarios of an outline start after the outline itself, on their example row.
+    own = max(start for start in starts if start <= scenario.line)
+    following = [start for start in starts if start > own]
+    return own <= line < (following[0] if following else float('inf'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['features'], help="feature files or directories")
+    parser.add_argument('--base', default='HEAD', help="git revision to diff the working tree against")
+    parser.add_argument('--cache', default=DEFAULT_CACHE, help="dependency graph cache")
+    parser.add_argument('--explain', action='store_true', help="print why each scenario was selected")
+    args = parser.parse_args(argv)
+
+    index = ImpactIndex(cache=args.cache)
+    for feature, scenario, reasons in select(index, args.base, args.paths):
+        print(scenario.location)
+        if args.explain:
+            for reason in reasons:
+                print(f"    {reason}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def locked(path, timeout=10.0):
+    """
+    Hold <path>.lock for the duration of a read-merge-write of a file parallel workers share.
+
+    A lock left behind by a crashed process is taken over once timeout seconds passed.
+
+    :param path: file the lock protects
+    :param timeout: seconds to wait for another holder
+    """
+    lock = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock) or '.', exist_ok=True)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            descriptor = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            if time.monotonic() > deadline:
+                logger.warning("Taking over the stale lock %s", lock)
+                try:
+                    os.remove(lock)
+                except FileNotFoundError:
+                    pass
+                deadline = time.monotonic() + timeout
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        os.close(descriptor)
+        os.remove(lock)
+
+
+def read_json(path, default):
+    """
+    :return: the content of a JSON file, or default if it does not exist
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path) as stored:
+        return json.load(stored)
+
+
+def write_atomic(path, data, **options):
+    """
+    Write a JSON file through a temporary file, so that readers never see it half written.
+
+    :param options: keyword arguments of json.dump, e.g. indent
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'w') as output:
+        json.dump(data, output, **options)
+    os.replace(temporary, path)
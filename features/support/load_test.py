@@ -0,0 +1,304 @@
+"""
+Replay the storefront traffic of a recorded scenario as many concurrent HTTP virtual users.
+
+The request sequence comes from an archive written with -D storefront=record, e.g. of the
+@purchase scenario: product page, subscribe, add to cart, cart, checkout. Every virtual user
+replays it with its own cookie jar over a shared keep-alive connection pool. Values that differ
+per user are correlated from the user's own responses before they are sent: hidden form fields
+such as CSRF tokens by field name, and URLs with numeric ids such as /cart/item/12/remove by
+their shape and position on the page. To try it against the stub storefront:
+
+    behave -D storefront=record -D base_url=http://127.0.0.1:8000 --tags @purchase features/purchase.feature
+    python -m features.support.load_test --stub --tags @purchase --users 20 --iterations 5
+"""
+import argparse
+import asyncio
+import html
+import json
+import logging
+import math
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlencode
+
+import aiohttp
+
+from features.support.storefront_replay import ORIGIN_PLACEHOLDER, StorefrontArchive
+
+logger = logging.getLogger(__name__)
+
+INPUT_TAG = re.compile(r'<input\b[^>]*>', re.IGNORECASE)
+ATTRIBUTE = re.compile(r'([\w:-]+)\s*=\s*"([^"]*)"')
+LINK = re.compile(r'\b(?:action|href)\s*=\s*"([^"]*\d[^"]*)"', re.IGNORECASE)
+DIGITS = re.compile(r'\d+')
+NO_STEP = '(outside steps)'
+
+Request = namedtuple('Request', 'step method path body content_type status path_key fields')
+
+
+def correlation_values(text, origin):
+    """
+    Extract the values a later request may have to repeat from an HTML response.
+
+    :param text: response body
+    :param origin: origin absolute URLs in the body start with, stripped from links
+    :return: dict mapping ('field', name) to the value of a hidden input and ('link', shape, index)
+        to a URL containing digits, shape being the URL with every number replaced by '#'
+    """
+    values = {}
+    for tag in INPUT_TAG.findall(text):
+        attributes = {name.lower(): value for name, value in ATTRIBUTE.findall(tag)}
+        if attributes.get('type', '').lower() == 'hidden' and attributes.get('name'):
+            values[('field', html.unescape(attributes['name']))] = html.unescape(attributes.get('value', ''))
+    occurrences = {}
+    for url in LINK.findall(text):
+        url = html.unescape(url)
+        if url.startswith(origin):
+            url = url[len(origin):] or '/'
+        shape = DIGITS.sub('#', url)
+        index = occurrences[shape] = occurrences.get(shape, -1) + 1
+        values[('link', shape, index)] = url
+    return values
+
+
+def _is_html(headers):
+    return any(name.lower() == 'content-type' and value.startswith('text/html') for name, value in headers)
+
+
+def build_flow(archive, scenarios=None):
+    """
+    Turn the recorded exchanges of some scenarios into a request sequence with correlation rules.
+
+    :param archive: StorefrontArchive recorded with the scenario names
+    :param scenarios: scenario names to include, or None for the whole archive
+    :return: list of Request
+    """
+    placeholder = ORIGIN_PLACEHOLDER.decode()
+    seen = {}
+    flow = []
+    for exchange in archive.exchanges:
+        if scenarios is not None and exchange.get('scenario') not in scenarios:
+            continue
+        body = archive.bodies[exchange['request_body']] if exchange.get('request_body') else None
+        path_key = next((key for key, value in seen.items() if key[0] == 'link' and value == exchange['path']), None)
+        fields = ()
+        if body:
+            try:
+                form = parse_qsl(body.decode('utf-8'), keep_blank_values=True, strict_parsing=True)
+            except (UnicodeDecodeError, ValueError):
+                form = []
+            fields = tuple(name for name, value in form if seen.get(('field', name)) == value and value)
+        flow.append(Request(exchange.get('step') or NO_STEP, exchange['method'], exchange['path'], body,
+                            exchange.get('content_type'), exchange['status'], path_key, fields))
+        if _is_html(exchange['headers']):
+            seen.update(correlation_values(archive.bodies[exchange['body']].decode('utf-8', 'replace'), placeholder))
+    return flow
+
+
+def percentile(values, share):
+    """
+    :param values: sorted list of numbers
+    :param share: percentile between 0 and 100
+    :return: nearest-rank percentile, or None for no values
+    """
+    if not values:
+        return None
+    return values[max(0, math.ceil(share / 100 * len(values)) - 1)]
+
+
+class LoadStats:
+    """
+    Latencies and outcomes per step of all virtual users.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.iterations = 0
+        self.uncorrelated = 0
+        self.started = self.finished = None
+
+    def add(self, step, latency, ok):
+        entry = self.steps.setdefault(step, {'latencies': [], 'errors': 0})
+        entry['latencies'].append(latency)
+        if not ok:
+            entry['errors'] += 1
+
+    def summary(self):
+        """
+        :return: dict with the overall throughput and per step the request count, errors,
+            requests per second and latency percentiles in milliseconds
+        """
+        elapsed = max((self.finished or time.perf_counter()) - self.started, 1e-9)
+        steps = {}
+        for step, entry in self.steps.items():
+            latencies = sorted(entry['latencies'])
+            steps[step] = {'requests': len(latencies), 'errors': entry['errors'],
+                           'throughput': len(latencies) / elapsed}
+            steps[step].update((f"p{share}", percentile(latencies, share) * 1000) for share in (50, 90, 95, 99))
+            steps[step]['max'] = latencies[-1] * 1000
+        requests = sum(step['requests'] for step in steps.values())
+        return {'duration': elapsed, 'iterations': self.iterations, 'requests': requests,
+                'throughput': requests / elapsed, 'flows_per_second': self.iterations / elapsed,
+                'uncorrelated': self.uncorrelated, 'steps': steps}
+
+
+class VirtualUser:
+    """
+    Replays the flow with its own cookies and correlated values.
+    """
+
+    def __init__(self, flow, base_url, connector, stats, think_time=0.0):
+        self.flow = flow
+        self.base_url = base_url
+        self.connector = connector
+        self.stats = stats
+        self.think_time = think_time
+
+    def _prepare(self, request, values):
+        path = request.path
+        if request.path_key:
+            if request.path_key in values:
+                path = values[request.path_key]
+            else:
+                self.stats.uncorrelated += 1
+        body = request.body
+        if request.fields:
+            form = parse_qsl(body.decode('utf-8'), keep_blank_values=True)
+            form = [(name, values.get(('field', name), value) if name in request.fields else value)
+                    for name, value in form]
+            body = urlencode(form).encode('utf-8')
+        return path, body
+
+    async def run(self, iterations, deadline=None):
+        """
+        Replay the flow a number of times, starting each iteration with an empty cookie jar.
+        """
+        for _ in range(iterations):
+            if deadline and time.perf_counter() >= deadline:
+                return
+            jar = aiohttp.CookieJar(unsafe=True)
+            async with aiohttp.ClientSession(connector=self.connector, connector_owner=False,
+                                             cookie_jar=jar) as session:
+                await self._iterate(session)
+            self.stats.iterations += 1
+
+    async def _iterate(self, session):
+        values = {}
+        step = None
+        for request in self.flow:
+            if self.think_time and step is not None and request.step != step:
+                await asyncio.sleep(self.think_time)
+            step = request.step
+            path, body = self._prepare(request, values)
+            headers = {'Content-Type': request.content_type} if body and request.content_type else {}
+            started = time.perf_counter()
+            try:
+                async with session.request(request.method, self.base_url + path, data=body, headers=headers,
+                                           allow_redirects=False) as response:
+                    content = await response.read()
+                    latency = time.perf_counter() - started
+                    ok = response.status == request.status
+                    if response.content_type == 'text/html':
+                        values.update(correlation_values(content.decode('utf-8', 'replace'), self.base_url))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                latency, ok = time.perf_counter() - started, False
+                logger.debug("%s %s failed: %s", request.method, path, error)
+            self.stats.add(step, latency, ok)
+
+
+async def run_load(flow, base_url, users, iterations=1, ramp_up=0.0, duration=None, think_time=0.0,
+                   connections=None):
+    """
+    Replay a flow as concurrent virtual users.
+
+    :param flow: list of Request from build_flow
+    :param base_url: storefront to load, e.g. http://127.0.0.1:8000
+    :param users: number of virtual users
+    :param iterations: flows every user replays
+    :param ramp_up: seconds over which the users are started
+    :param duration: seconds after which no user starts another iteration
+    :param think_time: seconds a user pauses between steps
+    :param connections: size of the shared connection pool, defaults to one per user
+    :return: LoadStats
+    """
+    stats = LoadStats()
+    connector = aiohttp.TCPConnector(limit=connections or users, keepalive_timeout=30)
+    base_url = base_url.rstrip('/')
+
+    async def start(index, user):
+        if ramp_up:
+            await asyncio.sleep(ramp_up * index / users)
+        await user.run(iterations, deadline)
+
+    stats.started = time.perf_counter()
+    deadline = stats.started + duration if duration else None
+    try:
+        await asyncio.gather(*(start(index, VirtualUser(flow, base_url, connector, stats, think_time))
+                               for index in range(users)))
+    finally:
+        stats.finished = time.perf_counter()
+        await connector.close()
+    return stats
+
+
+def print_summary(summary):
+    print(f"{summary['iterations']} flows, {summary['requests']} requests in {summary['duration']:.1f}s: "
+          f"{summary['throughput']:.1f} req/s, {summary['flows_per_second']:.2f} flows/s")
+    if summary['uncorrelated']:
+        print(f"{summary['uncorrelated']} requests could not be correlated and were sent as recorded")
+    print(f"{'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8}  step")
+    for step, entry in summary['steps'].items():
+        print(f"{entry['requests']:>9} {entry['errors']:>7} {entry['throughput']:>8.1f} {entry['p50']:>6.0f}ms "
+              f"{entry['p90']:>6.0f}ms {entry['p95']:>6.0f}ms {entry['p99']:>6.0f}ms  {step}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded scenario as concurrent HTTP virtual users.")
+    parser.add_argument('paths', nargs='*', default=['features'], help="feature files the scenarios are selected from")
+    parser.add_argument('--archive', default='recordings/storefront.zip', help="archive recorded with storefront=record")
+    parser.add_argument('--tags', action='append', default=[], help="behave tag expression selecting the scenarios")
+    parser.add_argument('--base-url', help="storefront to load")
+    parser.add_argument('--stub', action='store_true', help="load a stub storefront started in this process")
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=1, help="flows per virtual user")
+    parser.add_argument('--duration', type=float, help="stop starting new flows after this many seconds")
+    parser.add_argument('--ramp-up', type=float, default=0.0, help="seconds over which the users are started")
+    parser.add_argument('--think-time', type=float, default=0.0, help="seconds a user pauses between steps")
+    parser.add_argument('--connections', type=int, help="connection pool size, defaults to --users")
+    parser.add_argument('--report', help="JSON file to write the summary to")
+    args = parser.parse_args(argv)
+    if not args.base_url and not args.stub:
+        parser.error("one of --base-url or --stub is required")
+
+    scenarios = None
+    if args.tags:
+        from features.support.parallel_runner import expand
+        scenarios = {unit.name for unit in expand(args.paths, args.tags)}
+    flow = build_flow(StorefrontArchive.load(args.archive), scenarios)
+    if not flow:
+        parser.error(f"no recorded requests in {args.archive} for the selected scenarios")
+
+    server = None
+    if args.stub:
+        from features.support.stub_storefront import StubStorefront
+        server = StubStorefront().start()
+    try:
+        stats = asyncio.run(run_load(flow, args.base_url or server.base_url, args.users, args.iterations,
+                                     args.ramp_up, args.duration, args.think_time, args.connections))
+    finally:
+        if server:
+            server.stop()
+    summary = stats.summary()
+    print_summary(summary)
+    if args.report:
+        os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+        with open(args.report, 'w') as report:
+            json.dump(summary, report, indent=2)
+    return 1 if any(entry['errors'] for entry in summary['steps'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Per-run store of the page performance metrics collected by PerformanceMonitor.
+
+Every run appends its navigation records to reports/metrics/<run>.jsonl, one compact JSON object
+per line, keyed by page object, trigger and platform. Runs are compared on the median of each
+timing, e.g. against the run of the last release:
+
+    python -m features.support.metrics_store --baseline release-1.4 --threshold 0.2
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from features.pages.performance import TIMINGS
+
+DEFAULT_DIRECTORY = 'reports/metrics'
+
+
+class MetricsStore:
+    """
+    Appends navigation records to the JSONL file of a run.
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, run=None, shard=None):
+        """
+        :param directory: directory holding one JSONL file per run
+        :param run: name of the run, defaults to the start time, e.g. '20240131-142501'
+        :param shard: name of the worker process of a parallel run; its records go to a file of
+            its own until merge_shards joins them into the run's file
+        """
+        self.directory = directory
+        self.run = run or time.strftime('%Y%m%d-%H%M%S')
+        self.shard = shard
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return shard_path(self.directory, self.run, self.shard)
+
+    def append(self, records):
+        """
+        :param records: navigation records of PerformanceMonitor
+        """
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self.path, 'a') as store:
+            for record in records:
+                store.write(json.dumps(dict(record, run=self.run), separators=(',', ':')) + '\n')
+
+
+def shard_path(directory, run, shard=None):
+    """
+    :return: path of the JSONL file of a run, or of the part a worker writes to
+    """
+    path = os.path.join(directory, f"{run}.jsonl")
+    return f"{path}.{shard}" if shard else path
+
+
+def merge_shards(directory, run):
+    """
+    Append the parts the workers of a parallel run wrote to the run's file and remove them.
+
+    :return: number of parts merged
+    """
+    path = shard_path(directory, run)
+    parts = sorted(glob.glob(glob.escape(path) + '.*'))
+    if not parts:
+        return 0
+    with open(path, 'a') as merged:
+        for part in parts:
+            with open(part) as records:
+                merged.write(records.read())
+            os.remove(part)
+    return len(parts)
+
+
+def runs(directory=DEFAULT_DIRECTORY):
+    """
+    :return: names of the stored runs, oldest first
+    """
+    paths = sorted(glob.glob(os.path.join(directory, '*.jsonl')), key=os.path.getmtime)
+    return [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+
+def load(directory, run):
+    """
+    :return: the navigation records of a run
+    """
+    with open(os.path.join(directory, f"{run}.jsonl")) as store:
+        return [json.loads(line) for line in store if line.strip()]
+
+
+def summarize(records):
+    """
+    :return: dict mapping (page, trigger, platform) to the median of every timing and the load count
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault((record['page'], record['trigger'], record['platform']), []).append(record)
+    summary = {}
+    for key, group in groups.items():
+        entry = {'loads': len(group)}
+        for name in TIMINGS + ('bytes', 'requests'):
+            values = [record[name] for record in group if record.get(name) is not None]
+            entry[name] = statistics.median(values) if values else None
+        summary[key] = entry
+    return summary
+
+
+def compare(baseline, current, threshold=0.2, timings=('ttfb', 'fcp', 'lcp', 'ready')):
+    """
+    Compare the medians of two runs.
+
+    :param baseline: summary of the baseline run
+    :param current: summary of the current run
+    :param threshold: relative slowdown that counts as a regression
+    :param timings: timings to compare
+    :return: list of (key, timing, baseline ms, current ms, relative change, regressed) rows
+    """
+    rows = []
+    for key in sorted(set(baseline) & set(current)):
+        for name in timings:
+            before, after = baseline[key].get(name), current[key].get(name)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            rows.append((key, name, before, after, change, change > threshold))
+    return rows
+
+
+def print_comparison(rows):
+    for (page, trigger, platform), name, before, after, change, regressed in rows:
+        print(f"{'REGRESSED' if regressed else 'ok':>9}  {page} {trigger} [{platform}] {name}: "
+              f"{before:.0f}ms -> {after:.0f}ms ({change:+.0%})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the page performance metrics of two runs.")
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help="directory of the per-run JSONL files")
+    parser.add_argument('--run', help="run to check, defaults to the latest one")
+    parser.add_argument('--baseline', help="run to compare against, defaults to the one before --run")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown that fails the comparison")
+    args = parser.parse_args(argv)
+    names = runs(args.dir)
+    run = args.run or (names[-1] if names else None)
+    if run is None:
+        parser.error(f"no runs in {args.dir}")
+    baseline = args.baseline
+    if baseline is None:
+        earlier = names[:names.index(run)] if run in names else names
+        if not earlier:
+            parser.error(f"no baseline run before '{run}' in {args.dir}")
+        baseline = earlier[-1]
+    rows = compare(summarize(load(args.dir, baseline)), summarize(load(args.dir, run)), args.threshold)
+    print(f"{run} against {baseline}:")
+    print_comparison(rows)
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,326 @@
+"""
+Run behave scenarios in parallel worker processes.
+
+The feature files are expanded into one work unit per scenario (scenario outlines into one
+per example row), filtered with the usual --tags expressions, and dispatched to a pool of
+worker processes. Every worker owns a SessionPool with a single WebDriver session against the
+configured command_executor and reuses it for all scenarios it runs; the session is handed to
+environment.before_all through behave user data. The runner prints its plan first: the scenarios
+packed longest first into one slot per worker according to the duration history of the platform in
+--timings, which is updated after the run. Scenarios are dispatched in the planned order. Results are streamed
+back as each scenario finishes and merged into one behave JSON report. The workers write their
+performance metrics and resource samples to files of their own, which are merged into the files
+of the run afterwards:
+
+    python -m features.support.parallel_runner features --workers 4 --tags @purchase \\
+        -D command_executor=http://localhost:4444/wd/hub
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from multiprocessing.util import Finalize
+
+from behave.configuration import Configuration
+from behave.runner import Runner
+from behave.runner_util import collect_feature_locations, parse_features
+
+from features.environment import create_browser
+from features.support.impact import ImpactIndex, select
+from features.support.metrics_store import (DEFAULT_DIRECTORY as METRICS_DIRECTORY, compare, load, merge_shards,
+                                            print_comparison, shard_path, summarize)
+from features.support.resource_monitor import DEFAULT_DIRECTORY as RESOURCES_DIRECTORY
+from features.support.reruns import PASSING_STATUSES, FailureStore
+from features.support.session_pool import SessionPool
+from features.support.sharding import (TimingStore, current_platform, dispatch_order, load_platforms, print_plan,
+                                      scenario_key)
+
+logger = logging.getLogger(__name__)
+
+WorkUnit = namedtuple('WorkUnit', 'location feature name tags')
+
+_worker = {}
+
+
+def walk_scenarios(paths, tags=()):
+    """
+    Parse feature files and yield the scenarios matching the tag expressions.
+
+    :param paths: feature files or directories
+    :param tags: behave --tags expressions; a scenario must match all of them
+    :return: iterator of (feature, scenario) in file order, scenario outlines expanded
+    """
+    command_args = list(paths)
+    for expression in tags:
+        command_args += ['--tags', expression]
+    config = Configuration(command_args=command_args, load_config=False)
+    for feature in parse_features(collect_feature_locations(config.paths)):
+        for scenario in feature.walk_scenarios():
+            if config.tag_expression.check(scenario.effective_tags):
+                yield feature, scenario
+
+
+def expand(paths, tags=()):
+    """
+    Expand feature files into scenario work units.
+
+    :param paths: feature files or directories
+    :param tags: behave --tags expressions; a scenario must match all of them
+    :return: list of WorkUnit in file order
+    """
+    return [WorkUnit(str(scenario.location), feature.name, scenario.name,
+                     tuple(sorted(str(tag) for tag in scenario.effective_tags)))
+            for feature, scenario in walk_scenarios(paths, tags)]
+
+
+def _init_worker(userdata):
+    if userdata.get('driver') == 'async':
+        # environment.before_scenario starts an AsyncWebDriver session for every scenario instead.
+        return
+    pool = SessionPool(partial(create_browser, userdata), size=1,
+                       max_uses=int(userdata.get('session_max_uses', 20))).start()
+    _worker['pool'] = pool
+    # ProcessPoolExecutor workers exit without running atexit handlers, finalizers do run.
+    Finalize(pool, pool.shutdown, exitpriority=10)
+
+
+def run_unit(unit, behave_args):
+    """
+    Run one scenario in the current worker process with the worker's session pool.
+
+    :param unit: WorkUnit to run
+    :param behave_args: extra behave command line arguments, e.g. ['-D', 'wait_strategy=poll']
+    :return: dict with the unit, its status, duration, worker pid, behave JSON feature and the paths of the
+        failure artifact manifests written with -D artifacts=on
+    """
+    descriptor, report = tempfile.mkstemp(prefix='behave-', suffix='.json')
+    os.close(descriptor)
+    started = time.perf_counter()
+    try:
+        config = Configuration(command_args=[unit.location, '--format', 'json', '--outfile', report,
+                                             '--no-summary'] + list(behave_args))
+        config.userdata['session_pool'] = _worker.get('pool')
+        # Files the per-run stores append to are written per worker and merged by the parent.
+        config.userdata['worker'] = str(os.getpid())
+        manifests = config.userdata['artifact_manifests'] = []
+        Runner(config).run()
+        with open(report) as output:
+            features = json.load(output)
+    finally:
+        os.remove(report)
+    feature = features[0]
+    feature['elements'] = [element for element in feature.get('elements', [])
+                           if element.get('location') == unit.location]
+    status = feature['elements'][0]['status'] if feature['elements'] else 'untested'
+    return {'unit': unit._asdict(), 'scenario': scenario_key(unit), 'status': status,
+            'duration': time.perf_counter() - started, 'worker': os.getpid(), 'feature': feature,
+            'artifacts': manifests}
+
+
+def merge(results):
+    """
+    Merge per-scenario results into one behave JSON report, one entry per feature file.
+
+    :param results: results returned by run_unit, in any order
+    :return: list of behave JSON features with their scenarios in file order
+    """
+    features, statuses = {}, {}
+    for result in sorted(results, key=lambda result: _location_key(result['unit']['location'])):
+        feature = result['feature']
+        filename = feature['location'].rpartition(':')[0] or feature['location']
+        merged = features.setdefault(filename, dict(feature, elements=[]))
+        merged['elements'].extend(dict(element, attempts=result.get('attempt', 1)) for element in feature['elements'])
+        statuses.setdefault(filename, set()).add(result['status'])
+    for filename, merged in features.items():
+        merged['status'] = next((status for status in ('error', 'hook_error', 'failed', 'untested', 'passed')
+                                 if status in statuses[filename]), 'skipped')
+    return list(features.values())
+
+
+def _location_key(location):
+    filename, _, line = location.rpartition(':')
+    return filename, int(line)
+
+
+def run(units, workers, userdata, behave_args=(), retries=0):
+    """
+    Run work units on a pool of worker processes and yield results as they complete.
+
+    A unit that does not pass is submitted again, at the end of the queue, up to retries times.
+
+    :param units: WorkUnits to run
+    :param workers: number of worker processes, each owning one WebDriver session
+    :param userdata: behave user data, used by the workers to create their sessions
+    :param behave_args: extra behave command line arguments passed to every scenario run
+    :param retries: additional attempts for units that do not pass
+    :return: generator of run_unit results with their 'attempt' number and whether they are 'final';
+        a unit whose worker crashed gets the status 'error'
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(userdata,)) as executor:
+        futures = {}
+
+        def submit(unit, attempt):
+            try:
+                futures[executor.submit(run_unit, unit, list(behave_args))] = (unit, attempt)
+                return True
+            except BrokenProcessPool:
+                return False
+
+        for unit in units:
+            submit(unit, 1)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                unit, attempt = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as error:
+                    logger.exception("Scenario %s could not be run", unit.location)
+                    result = {'unit': unit._asdict(), 'scenario': scenario_key(unit), 'status': 'error',
+                              'duration': 0.0, 'worker': None, 'error': repr(error),
+                              'feature': {'keyword': 'Feature', 'name': unit.feature,
+                                          'location': unit.location.rpartition(':')[0] + ':1', 'elements': []}}
+                retry = result['status'] not in PASSING_STATUSES and attempt <= retries
+                result.update(attempt=attempt, final=not (retry and submit(unit, attempt + 1)))
+                yield result
+
+
+def parse_userdata(definitions):
+    """
+    :param definitions: NAME=VALUE strings as given to behave -D
+    :return: dict of user data
+    """
+    userdata = {}
+    for definition in definitions:
+        name, _, value = definition.partition('=')
+        userdata[name] = value or 'true'
+    return userdata
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['features'], help="feature files or directories")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes / WebDriver sessions")
+    parser.add_argument('-t', '--tags', action='append', default=[], help="behave tag expression, may be repeated")
+    parser.add_argument('-D', '--define', action='append', default=[], metavar='NAME=VALUE', help="behave user data")
+    parser.add_argument('--report', default='reports/parallel.json', help="merged behave JSON report")
+    parser.add_argument('--timings', default='reports/timings.json', help="scenario duration history")
+    parser.add_argument('--platform', help="platform name the durations and failures are recorded under, defaults to "
+                                           "-D platform, then the platform of --config the BrowserStack SDK runs for, "
+                                           "then 'local'")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the predicted slots, makespan and utilisation for --platform, "
+                             "or without it for the platforms of --config")
+    parser.add_argument('--config', default='browserstack.yml', help="BrowserStack SDK config")
+    parser.add_argument('--parallels', type=int, help="parallel slots per platform for --dry-run, "
+                                                      "defaults to parallelsPerPlatform")
+    parser.add_argument('--failures', default='reports/failures.json',
+                        help="failed and flaky scenarios per platform, written after every run")
+    parser.add_argument('--rerun', action='store_true',
+                        help="run only the scenarios that failed on --platform in the last run")
+    parser.add_argument('--retries', type=int, default=0, help="extra attempts for a scenario that does not pass")
+    parser.add_argument('--changed-since', metavar='REVISION',
+                        help="run only the scenarios affected by the changes since a git revision")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(name)s: %(message)s")
+
+    userdata = parse_userdata(args.define)
+    platform = args.platform or userdata.get('platform') or current_platform(args.config)
+    if userdata.get('storefront') == 'record':
+        parser.error("storefront=record cannot run in parallel, record with a plain behave run")
+    units = expand(args.paths, args.tags)
+    if args.changed_since:
+        affected = {str(scenario.location) for _, scenario, _ in select(ImpactIndex(), args.changed_since, args.paths)}
+        units = [unit for unit in units if unit.location in affected]
+        if not units:
+            print(f"No scenario is affected by the changes since {args.changed_since}")
+            return 0
+    failures = FailureStore(args.failures)
+    if args.rerun:
+        units = failures.select(units, platform)
+        if not units:
+            print(f"No failed scenario recorded for platform '{platform}' in {args.failures}")
+            return 0
+    if not units:
+        parser.error("no scenario matches the given paths and tags")
+    store = TimingStore(args.timings)
+    workers = min(args.workers, len(units))
+    if args.dry_run:
+        platforms, parallels = load_platforms(args.config)
+        if args.platform:
+            platforms = [args.platform]
+        print_plan(units, platforms, args.parallels or parallels, store, max_parallels=len(units))
+        return 0
+    # Durations are recorded under the platform the plan estimates them for.
+    units = dispatch_order(print_plan(units, [platform], workers, store), store)
+    behave_args = [arg for definition in args.define for arg in ('-D', definition)]
+    if userdata.get('preflight', 'off') == 'on':
+        # Validate once before any worker opens a session; the step modules load in a process of their own.
+        command = [sys.executable, '-m', 'features.support.preflight'] + list(args.paths)
+        for expression in args.tags:
+            command += ['--tags', expression]
+        if subprocess.run(command).returncode:
+            return 1
+        behave_args += ['-D', 'preflight=off']
+    if 'metrics_run' not in userdata:
+        # One run name for all workers, so that their metrics and resource samples end up in one file.
+        userdata['metrics_run'] = time.strftime('%Y%m%d-%H%M%S')
+        behave_args += ['-D', f"metrics_run={userdata['metrics_run']}"]
+
+    started = time.perf_counter()
+    results = []
+    attempts = {}
+    for result in run(units, workers, userdata, behave_args, retries=args.retries):
+        if result['status'] in ('passed', 'failed'):
+            store.update(platform, result['scenario'], result['duration'])
+        if result.get('artifacts'):
+            attempts.setdefault(result['scenario'], []).append(
+                {'attempt': result['attempt'], 'status': result['status'], 'manifests': result['artifacts']})
+        if result['final']:
+            result['attempt_artifacts'] = attempts.pop(result['scenario'], [])
+            results.append(result)
+        retrying = '' if result['final'] else ', retrying'
+        print(f"{result['status']:<8} {result['duration']:>7.2f}s  {result['unit']['location']}  "
+              f"{result['unit']['name']} (attempt {result['attempt']}{retrying})", flush=True)
+    wall = time.perf_counter() - started
+    metrics_dir = userdata.get('metrics_dir', METRICS_DIRECTORY)
+    for directory in (metrics_dir, userdata.get('resources_dir', RESOURCES_DIRECTORY)):
+        merge_shards(directory, userdata['metrics_run'])
+    if userdata.get('metrics_baseline') and os.path.exists(shard_path(metrics_dir, userdata['metrics_run'])):
+        print_comparison(compare(summarize(load(metrics_dir, userdata['metrics_baseline'])),
+                                 summarize(load(metrics_dir, userdata['metrics_run'])),
+                                 float(userdata.get('metrics_threshold', 0.2))))
+    store.save()
+    failures.record(platform, results)
+    failures.save()
+
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as output:
+        json.dump(merge(results), output, indent=2)
+    statuses = Counter(result['status'] for result in results)
+    serial = sum(result['duration'] for result in results)
+    print(f"{len(results)} scenarios: " + ', '.join(f"{count} {status}" for status, count in sorted(statuses.items())))
+    flaky = [result for result in results if result['status'] in PASSING_STATUSES and result['attempt'] > 1]
+    failing = [result for result in results if result['status'] not in PASSING_STATUSES]
+    for label, group in (('Flaky', flaky), ('Failing', failing)):
+        for result in group:
+            print(f"{label}: {result['unit']['location']}  {result['unit']['name']} "
+                  f"({result['status']} after {result['attempt']} attempt(s))")
+            for attempt in result['attempt_artifacts']:
+                for manifest in attempt['manifests']:
+                    print(f"    attempt {attempt['attempt']} artifacts: {manifest}")
+    print(f"Wall time {wall:.1f}s, scenario time {serial:.1f}s, speed-up {serial / wall if wall else 0:.1f}x, "
+          f"report {args.report}, failures {args.failures}")
+    return 0 if set(statuses) <= set(PASSING_STATUSES) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""
+Validate the selected scenarios offline, before a WebDriver session is requested.
+
+Three checks run on the parsed feature files and the source of the steps and page objects:
+
+* every step of a selected scenario matches a step definition;
+* every attribute a matched step function reaches on a page object, as context.<page>.<name> or
+  self.<name> in the page methods it calls, is defined by the page class, its bases or an
+  assignment to self in one of their methods (the dependency walk of features.support.impact);
+* every Locator and locator constant of those page classes is a valid selector for its strategy.
+
+environment.before_all runs it with -D preflight=on and aborts the run on any problem. It can
+also be run on its own:
+
+    python -m features.support.preflight features --tags @purchase
+"""
+import argparse
+import ast
+import importlib
+import inspect
+import logging
+import os
+import sys
+import time
+from collections import namedtuple
+
+from selenium.webdriver.common.by import By
+
+from features.pages.locators import Locator
+from features.pages.locator_syntax import SelectorError, check_locator
+from features.support.impact import STEPS_DIR, DependencyGraph
+
+logger = logging.getLogger(__name__)
+
+Problem = namedtuple('Problem', 'location message')
+
+STRATEGIES = {value for name, value in vars(By).items() if name.isupper() and isinstance(value, str)}
+
+
+class PreflightError(Exception):
+    """
+    Raised by before_all when the suite failed validation.
+    """
+
+
+class MemberChecker(DependencyGraph):
+    """
+    DependencyGraph that records the page-object members it cannot resolve while walking a step function.
+    """
+
+    def __init__(self, root='.'):
+        super().__init__(root)
+        self.missing = []
+        self._assigned = {}
+
+    def page_class(self, cls):
+        """
+        :param cls: (path, class name)
+        :return: the class object, imported from the repo
+        """
+        path, name = cls
+        return getattr(importlib.import_module(os.path.splitext(path)[0].replace(os.sep, '.')), name)
+
+    def assigned(self, cls):
+        """
+        :return: names assigned to self.<name> in any method of the class or its repo bases
+        """
+        if cls not in self._assigned:
+            names = set()
+            for path, name in self.mro(*cls):
+                for node in ast.walk(self.module(path).classes[name]):
+                    targets = (node.targets if isinstance(node, ast.Assign)
+                               else [node.target] if isinstance(node, (ast.AugAssign, ast.AnnAssign)) else [])
+                    names.update(target.attr for target in targets
+                                 if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                                 and target.value.id == 'self')
+            self._assigned[cls] = names
+        return self._assigned[cls]
+
+    def _visit_member(self, cls, member, reached):
+        if (self.find_member(cls, member) is None and member not in self.assigned(cls)
+                and not hasattr(self.page_class(cls), member)):
+            self.missing.append((cls, member))
+        super()._visit_member(cls, member, reached)
+
+    def check(self, path, function):
+        """
+        :param path: module of a step function
+        :param function: name of the step function
+        :return: list of ((path, class name), member) the step function reaches but no class defines
+        """
+        self.missing = []
+        self.closure(path, function)
+        return self.missing
+
+
+def _step_function_node(func, root):
+    path = os.path.relpath(inspect.getsourcefile(func), root)
+    return path, func.__name__
+
+
+def undefined_steps(scenarios, registry):
+    """
+    :param scenarios: behave Scenarios
+    :param registry: behave StepRegistry with the step definitions loaded
+    :return: (list of Problems, dict of step function (path, name) to its first matching step)
+    """
+    problems, functions = [], {}
+    for scenario in scenarios:
+        for step in scenario.all_steps:
+            match = registry.find_match(step)
+            if match is None:
+                problems.append(Problem(str(step.location), f"Undefined step: {step.keyword} {step.name}"))
+            else:
+                functions.setdefault(match.func, step)
+    return problems, functions
+
+
+def missing_members(checker, functions, root='.'):
+    """
+    :param checker: MemberChecker
+    :param functions: dict of step function to a step using it
+    :return: list of Problems, one per missing member
+    """
+    problems, seen = [], set()
+    for func, step in functions.items():
+        path, name = _step_function_node(func, root)
+        if not path.startswith(STEPS_DIR) or name not in checker.module(path).functions:
+            continue
+        for cls, member in checker.check(path, name):
+            if (cls, member) in seen:
+                continue
+            seen.add((cls, member))
+            line = checker.module(path).functions[name].lineno
+            problems.append(Problem(f"{path}:{line}", f"{cls[1]} has no attribute '{member}', "
+                                                      f"reached by {name} for step '{step.name}'"))
+    return problems
+
+
+def invalid_locators(checker):
+    """
+    :param checker: MemberChecker
+    :return: list of Problems for the Locators and locator constants of the page classes the context holds
+    """
+    problems, seen = [], set()
+    for cls in checker.context_classes.values():
+        resolved = checker.resolve_class(*cls)
+        if not resolved:
+            continue
+        for path, name in checker.mro(*resolved):
+            klass = checker.page_class((path, name))
+            for attribute, value in vars(klass).items():
+                # Constants derived from a Locator field are checked with the field.
+                is_constant = (attribute.isupper() and isinstance(value, tuple) and len(value) == 2
+                               and value[0] in STRATEGIES
+                               and not isinstance(vars(klass).get(attribute.lower()), Locator))
+                if (path, name, attribute) in seen or not (is_constant or isinstance(value, Locator)):
+                    continue
+                seen.add((path, name, attribute))
+                try:
+                    check_locator(*value)
+                except SelectorError as error:
+                    node = checker.module(path).members(name).get(attribute)
+                    line = f":{node.lineno}" if node is not None else ''
+                    problems.append(Problem(f"{path}{line}", f"{name}.{attribute}: {error}"))
+    return problems
+
+
+def validate(scenarios, registry, root='.'):
+    """
+    Run all checks.
+
+    :param scenarios: behave Scenarios selected to run
+    :param registry: behave StepRegistry with the step definitions loaded
+    :return: list of Problems, empty if the scenarios can run
+    """
+    problems, functions = undefined_steps(scenarios, registry)
+    checker = MemberChecker(root)
+    problems += missing_members(checker, functions, root)
+    problems += invalid_locators(checker)
+    return problems
+
+
+def run_preflight(context):
+    """
+    Validate the scenarios of a behave run from before_all.
+
+    :raises: PreflightError listing the problems found
+    """
+    started = time.perf_counter()
+    runner = context._runner
+    scenarios = [scenario for feature in runner.features for scenario in feature.walk_scenarios()
+                 if scenario.should_run(context.config)]
+    problems = validate(scenarios, runner.step_registry)
+    logger.info("Preflight checked %d scenarios in %.0f ms", len(scenarios), (time.perf_counter() - started) * 1000)
+    if problems:
+        raise PreflightError(f"{len(problems)} problems found before starting any session:\n"
+                             + '\n'.join(f"  {problem.location}: {problem.message}" for problem in problems))
+
+
+def main(argv=None):
+    from behave.step_registry import registry
+    from features.support.parallel_runner import walk_scenarios
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['features'], help="feature files or directories")
+    parser.add_argument('-t', '--tags', action='append', default=[], help="behave tag expression, may be repeated")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    for filename in sorted(os.listdir(STEPS_DIR)):
+        if filename.endswith('.py'):
+            importlib.import_module(os.path.join(STEPS_DIR, filename[:-3]).replace(os.sep, '.'))
+    scenarios = [scenario for _, scenario in walk_scenarios(args.paths, args.tags)]
+    problems = validate(scenarios, registry)
+    for problem in problems:
+        print(f"{problem.location}: {problem.message}")
+    print(f"{len(scenarios)} scenarios checked in {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Persist the failed (scenario, platform) pairs of a run so that a later run can repeat only those,
+together with the failure artifacts of each of their attempts.
+"""
+from features.support.json_files import read_json, write_atomic
+from features.support.sharding import scenario_key
+
+PASSING_STATUSES = ('passed', 'skipped')
+
+
+def first_error(feature):
+    """
+    :param feature: behave JSON feature holding one scenario
+    :return: error message of the first failing step or hook, or None
+    """
+    for element in feature.get('elements', []):
+        for step in element.get('steps', []):
+            result = step.get('result', {})
+            if result.get('status') not in (None, 'passed', 'skipped', 'untested'):
+                return _text(result.get('error_message'))
+        if element.get('error_message'):
+            return _text(element['error_message'])
+    return None
+
+
+def _text(message):
+    # The behave JSON formatter splits multi-line messages into a list of lines.
+    return '\n'.join(message) if isinstance(message, list) else message
+
+
+class FailureStore:
+    """
+    Failed and flaky scenarios of the last run per platform, kept in a JSON file.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: JSON file the failures are read from and saved to
+        """
+        self.path = path
+        self.platforms = read_json(path, {})
+
+    def failed(self, platform):
+        """
+        :param platform: platform name
+        :return: scenario keys that failed on the platform in the last run
+        """
+        return {entry['scenario'] for entry in self.platforms.get(platform, {}).get('failed', [])}
+
+    def select(self, units, platform):
+        """
+        :param units: WorkUnits of the current feature files
+        :param platform: platform name
+        :return: the units whose scenarios failed on the platform in the last run
+        """
+        failed = self.failed(platform)
+        return [unit for unit in units if scenario_key(unit) in failed]
+
+    def record(self, platform, results):
+        """
+        Replace the entries of the scenarios that ran on a platform with their final outcome.
+
+        Failures of scenarios that were not part of this run are kept.
+
+        :param platform: platform name
+        :param results: final results per scenario as produced by parallel_runner.run, with their attempt count
+            and the failure artifact manifests of every attempt as attempt_artifacts
+        """
+        entries = self.platforms.setdefault(platform, {'failed': [], 'flaky': []})
+        ran = {result['scenario'] for result in results}
+        failed = [entry for entry in entries.get('failed', []) if entry['scenario'] not in ran]
+        flaky = [entry for entry in entries.get('flaky', []) if entry['scenario'] not in ran]
+        for result in results:
+            entry = {'scenario': result['scenario'], 'location': result['unit']['location'],
+                     'status': result['status'], 'attempts': result['attempt'],
+                     'artifacts': result.get('attempt_artifacts', [])}
+            if result['status'] not in PASSING_STATUSES:
+                failed.append(dict(entry, error=result.get('error') or first_error(result['feature'])))
+            elif result['attempt'] > 1:
+                flaky.append(entry)
+        entries['failed'], entries['flaky'] = failed, flaky
+
+    def save(self):
+        write_atomic(self.path, self.platforms, indent=2, sort_keys=True)
+
@@ -0,0 +1,365 @@
+"""
+Host and browser resource monitoring with psutil.
+
+A ResourceMonitor thread samples the CPU and memory of the host and the CPU and resident memory
+of the process tree behind every session of a SessionPool: the driver (chromedriver,
+geckodriver, ...) and the browser it started, found through the session capabilities. It samples
+every interval seconds and right after every scenario and step boundary. Process trees are only
+found for browsers running on this host, e.g. on a local self-hosted grid; other sessions only
+get the host samples.
+
+Samples are labelled with the scenario and step of the leased session and appended to
+reports/resources/<run>.jsonl, one JSON object per line. A ConcurrencyController fed by every
+round of samples lowers the number of sessions the pool keeps while host memory or CPU is above
+its high water mark, and raises it again once both are back below the low water marks. It also
+marks sessions whose process tree outgrew a memory limit, so that they are recycled when they
+are released. The peaks of a run are listed per scenario and step with
+
+    python -m features.support.resource_monitor --run 20240131-142501
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import weakref
+
+import psutil
+
+from features.support.metrics_store import shard_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = 'reports/resources'
+DRIVER_NAMES = ('chromedriver', 'geckodriver', 'msedgedriver', 'safaridriver')
+MB = 2 ** 20
+
+
+def _name(process):
+    try:
+        name = process.name().lower()
+    except psutil.Error:
+        return ''
+    return name[:-4] if name.endswith('.exe') else name
+
+
+def find_session_process(browser):
+    """
+    Find the local process tree of a session: Firefox reports its process id, Chromium-based
+    browsers are found by the remote debugging port in their capabilities.
+
+    :param browser: Selenium WebDriver instance
+    :return: psutil.Process of the driver that started the browser, or of the browser if no driver
+        is its parent; None if the browser does not run on this host
+    """
+    capabilities = browser.capabilities
+    try:
+        if capabilities.get('moz:processID'):
+            process = psutil.Process(capabilities['moz:processID'])
+            if 'firefox' not in _name(process):
+                return None
+        else:
+            address = next((value.get('debuggerAddress') for key, value in capabilities.items()
+                            if key.endswith(('chromeOptions', 'edgeOptions')) and isinstance(value, dict)), None)
+            if not address:
+                return None
+            flag = f"--remote-debugging-port={address.rsplit(':', 1)[-1]}"
+            process = next((candidate for candidate in psutil.process_iter(['cmdline'])
+                            if flag in (candidate.info['cmdline'] or ())), None)
+            if process is None:
+                return None
+        parent = process.parent()
+    except psutil.Error:
+        return None
+    return parent if parent is not None and _name(parent) in DRIVER_NAMES else process
+
+
+class ProcessTree:
+    """
+    CPU and resident memory of a process and its descendants. The psutil.Process objects are
+    kept between samples, so that the CPU percentage covers the time since the previous sample.
+    """
+
+    def __init__(self, root):
+        """
+        :param root: psutil.Process at the root of the tree
+        """
+        self.root = root
+        self._processes = {}
+
+    def sample(self):
+        """
+        :return: dict with cpu (percent of one core), rss_mb and processes, or None once the root has exited
+        """
+        try:
+            members = [self.root] + self.root.children(recursive=True)
+        except psutil.Error:
+            return None
+        cpu, rss, processes = 0.0, 0, {}
+        for member in members:
+            process = self._processes.get(member.pid, member)
+            try:
+                with process.oneshot():
+                    cpu += process.cpu_percent()
+                    rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+            processes[member.pid] = process
+        self._processes = processes
+        return {'cpu': round(cpu, 1), 'rss_mb': round(rss / MB, 1), 'processes': len(processes)}
+
+
+class ConcurrencyController:
+    """
+    Adjusts the number of sessions a SessionPool keeps to the load of the host, one session at a
+    time and at most once per cooldown, and tracks the memory footprint of every session.
+    """
+
+    def __init__(self, pool, session_memory_mb=1024, memory_high=85.0, memory_low=70.0, cpu_high=90.0,
+                 cpu_low=60.0, cooldown=10.0):
+        """
+        :param pool: SessionPool to resize
+        :param session_memory_mb: resident memory of a session's process tree above which it is recycled
+        :param memory_high: host memory use in percent above which a session is given up
+        :param memory_low: host memory use in percent below which a session may be added again
+        :param cpu_high: smoothed host CPU use in percent above which a session is given up
+        :param cpu_low: smoothed host CPU use in percent below which a session may be added again
+        :param cooldown: seconds between two changes of the limit
+        """
+        self.pool = pool
+        self.session_memory_mb = session_memory_mb
+        self.memory_high = memory_high
+        self.memory_low = memory_low
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.cooldown = cooldown
+        self.cpu = None
+        self._changed = 0.0
+        self._footprints = weakref.WeakKeyDictionary()
+
+    def update(self, host, sessions):
+        """
+        Take in one round of samples.
+
+        :param host: host sample with cpu and memory_percent
+        :param sessions: dict of browser to the sample of its process tree
+        :return: list of events, dicts describing a change of the pool's limit
+        """
+        for browser, sample in sessions.items():
+            self._footprints[browser] = sample['rss_mb']
+        # Smooth the CPU use so that a single busy second does not cost a session.
+        self.cpu = host['cpu'] if self.cpu is None else 0.7 * self.cpu + 0.3 * host['cpu']
+        now = time.monotonic()
+        if now - self._changed < self.cooldown:
+            return []
+        limit = self.pool.limit
+        if host['memory_percent'] >= self.memory_high or self.cpu >= self.cpu_high:
+            target = limit - 1
+        elif host['memory_percent'] < self.memory_low and self.cpu < self.cpu_low:
+            target = limit + 1
+        else:
+            return []
+        resized = self.pool.resize(target)
+        if resized == limit:
+            return []
+        self._changed = now
+        logger.log(logging.WARNING if resized < limit else logging.INFO,
+                   "Host memory at %.0f%%, CPU at %.0f%%: keeping %d instead of %d sessions",
+                   host['memory_percent'], self.cpu, resized, limit)
+        return [{'kind': 'limit', 'from': limit, 'to': resized, 'memory_percent': host['memory_percent'],
+                 'cpu': round(self.cpu, 1)}]
+
+    def should_recycle(self, browser):
+        """
+        :return: True if the process tree of a session outgrew session_memory_mb when last sampled
+        """
+        footprint = self._footprints.get(browser)
+        return footprint is not None and footprint > self.session_memory_mb
+
+
+def fold(summary, records):
+    """
+    Add samples to the per-step summary of a run.
+
+    :param summary: dict of (scenario, step) to its entry, updated in place
+    :param records: host and session samples; only those of the leased session count
+    :return: summary
+    """
+    for record in records:
+        if not record.get('scenario') or (record['kind'] == 'session' and not record['leased']):
+            continue
+        entry = summary.setdefault((record['scenario'], record['step'] or ''), {
+            'samples': 0, 'cpu_total': 0.0, 'peak_rss_mb': None, 'peak_processes': 0, 'peak_memory_percent': None})
+        if record['kind'] == 'host':
+            entry['peak_memory_percent'] = max(entry['peak_memory_percent'] or 0, record['memory_percent'])
+        elif record['kind'] == 'session':
+            entry['samples'] += 1
+            entry['cpu_total'] += record['cpu']
+            entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0, record['rss_mb'])
+            entry['peak_processes'] = max(entry['peak_processes'], record['processes'])
+    return summary
+
+
+class ResourceMonitor:
+    """
+    Background thread sampling the host and the sessions of a SessionPool.
+    """
+
+    def __init__(self, pool, directory=DEFAULT_DIRECTORY, run=None, interval=1.0, controller=None, shard=None):
+        """
+        :param pool: SessionPool whose sessions are sampled
+        :param directory: directory holding one JSONL file per run
+        :param run: name of the run, defaults to the start time, e.g. '20240131-142501'
+        :param interval: seconds between two samples
+        :param controller: ConcurrencyController fed with every round of samples, or None
+        :param shard: name of the worker process of a parallel run, see MetricsStore
+        """
+        self.pool = pool
+        self.directory = directory
+        self.run = run or time.strftime('%Y%m%d-%H%M%S')
+        self.shard = shard
+        self.interval = interval
+        self.controller = controller
+        self.summary = {}
+        self._label = (None, None, None)
+        self._trees = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self):
+        return shard_path(self.directory, self.run, self.shard)
+
+    def start(self):
+        """
+        Start sampling from a daemon thread and return immediately.
+        """
+        psutil.cpu_percent()
+        self._thread = threading.Thread(target=self._loop, name='resource-monitor', daemon=True)
+        self._thread.start()
+        return self
+
+    def label(self, browser=None, scenario=None, step=None):
+        """
+        Attribute the following samples of a session to a scenario and step, and sample right away.
+
+        :param browser: leased session, or None between scenarios
+        """
+        self._label = (browser, scenario, step)
+        self._wake.set()
+
+    def _tree(self, browser):
+        if browser not in self._trees:
+            root = find_session_process(browser)
+            self._trees[browser] = ProcessTree(root) if root else None
+        return self._trees[browser]
+
+    def sample(self):
+        """
+        Take one round of samples, feed it to the controller and append it to the run's file.
+
+        :return: list of the records written
+        """
+        leased, scenario, step = self._label
+        timestamp = round(time.time(), 3)
+        host = {'ts': timestamp, 'kind': 'host', 'scenario': scenario, 'step': step, 'cpu': psutil.cpu_percent(),
+                'memory_percent': psutil.virtual_memory().percent}
+        records, sessions = [host], {}
+        for browser in self.pool.sessions():
+            tree = self._tree(browser)
+            usage = tree.sample() if tree else None
+            if usage is None:
+                continue
+            sessions[browser] = usage
+            current = browser is leased
+            records.append(dict(usage, ts=timestamp, kind='session', session=browser.session_id, leased=current,
+                                scenario=scenario if current else None, step=step if current else None))
+        if self.controller:
+            records.extend(dict(event, ts=timestamp) for event in self.controller.update(host, sessions))
+        with self._lock:
+            fold(self.summary, records)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, 'a') as output:
+                for record in records:
+                    output.write(json.dumps(record, separators=(',', ':')) + '\n')
+        return records
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Could not sample resource usage")
+
+    def scenario_peaks(self, scenario):
+        """
+        :return: dict with the samples, mean CPU, peak RSS and peak host memory of a scenario's steps
+        """
+        with self._lock:
+            entries = [entry for (name, _), entry in self.summary.items() if name == scenario]
+        samples = sum(entry['samples'] for entry in entries)
+        return {'samples': samples,
+                'cpu_mean': sum(entry['cpu_total'] for entry in entries) / samples if samples else None,
+                'peak_rss_mb': max((entry['peak_rss_mb'] or 0 for entry in entries), default=0),
+                'peak_memory_percent': max((entry['peak_memory_percent'] or 0 for entry in entries), default=0)}
+
+    def stop(self):
+        """
+        Stop the sampling thread.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+
+def runs(directory=DEFAULT_DIRECTORY):
+    """
+    :return: names of the stored runs, oldest first
+    """
+    paths = sorted(glob.glob(os.path.join(directory, '*.jsonl')), key=os.path.getmtime)
+    return [os.path.splitext(os.path.basename(path))[0] for path in paths]
+
+
+def load(directory, run):
+    """
+    :return: the records of a run
+    """
+    with open(os.path.join(directory, f"{run}.jsonl")) as samples:
+        return [json.loads(line) for line in samples if line.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List the resource peaks of a run per scenario and step.")
+    parser.add_argument('--dir', default=DEFAULT_DIRECTORY, help="directory of the per-run JSONL files")
+    parser.add_argument('--run', help="run to list, defaults to the latest one")
+    args = parser.parse_args(argv)
+    names = runs(args.dir)
+    run = args.run or (names[-1] if names else None)
+    if run is None:
+        parser.error(f"no runs in {args.dir}")
+    records = load(args.dir, run)
+    for record in records:
+        if record['kind'] == 'limit':
+            print(f"{time.strftime('%H:%M:%S', time.localtime(record['ts']))}  session limit {record['from']} -> "
+                  f"{record['to']} (memory {record['memory_percent']:.0f}%, CPU {record['cpu']:.0f}%)")
+    print(f"{'scenario / step':<70} {'samples':>7} {'cpu':>6} {'rss':>9} {'procs':>5} {'host mem':>8}")
+    for (scenario, step), entry in fold({}, records).items():
+        cpu = f"{entry['cpu_total'] / entry['samples']:.0f}%" if entry['samples'] else '-'
+        rss = f"{entry['peak_rss_mb']:.0f}MB" if entry['peak_rss_mb'] is not None else '-'
+        print(f"{(scenario + (' / ' + step if step else ''))[:70]:<70} {entry['samples']:>7} {cpu:>6} {rss:>9} "
+              f"{entry['peak_processes']:>5} {entry['peak_memory_percent'] or 0:>7.0f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
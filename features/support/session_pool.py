@@ -0,0 +1,234 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import WebDriverException
+from features.pages.locators import ElementCache
+
+logger = logging.getLogger(__name__)
+
+RESET_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+class SessionCreationError(WebDriverException):
+    """
+    Raised by SessionPool.lease when the session that would have been leased failed to start.
+    """
+
+
+class SessionPool:
+    """
+    Pool of pre-warmed WebDriver sessions leased to one scenario at a time.
+
+    Sessions are created in background threads so that scenario execution can start as soon
+    as the first one is ready. Between leases a session is reset cheaply (cookies, storage,
+    about:blank) instead of being quit; it is replaced after max_uses leases or when the
+    scenario that held it ended with an error. The number of sessions kept can be lowered below
+    size at runtime with resize(), e.g. while the host runs short of memory.
+    """
+
+    def __init__(self, factory, size=1, max_uses=20):
+        """
+        Initialize the pool without starting any session.
+
+        :param factory: callable returning a new WebDriver session
+        :param size: number of sessions kept warm
+        :param max_uses: number of leases after which a session is replaced
+        """
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.limit = size
+        self._creating = 0
+        self._idle = queue.Queue()
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='session-pool')
+        self._lease_waits = []
+        self._leases = 0
+        self._reused = 0
+        self._created = 0
+        self._recycled = 0
+        self._throttled = 0
+
+    def start(self):
+        """
+        Start warming up the sessions in the background and return immediately.
+        """
+        for _ in range(self.size):
+            self._submit_create()
+        return self
+
+    def _submit_create(self):
+        with self._lock:
+            self._creating += 1
+        self._executor.submit(self._create)
+
+    def _create(self):
+        try:
+            browser = self.factory()
+        except Exception as error:
+            logger.exception("Could not create a WebDriver session")
+            with self._lock:
+                self._creating -= 1
+            self._idle.put(SessionCreationError(f"Could not create a WebDriver session: {error}"))
+            return
+        with self._lock:
+            self._creating -= 1
+            self._uses[browser] = 0
+            self._created += 1
+        self._idle.put(browser)
+
+    def _quit(self, browser):
+        try:
+            browser.quit()
+        except WebDriverException:
+            logger.warning("Could not quit a recycled WebDriver session", exc_info=True)
+
+    def _retire(self, browser):
+        with self._lock:
+            self._uses.pop(browser, None)
+            self._recycled += 1
+            replace = len(self._uses) + self._creating < self.limit
+            if replace:
+                self._creating += 1
+        self._quit(browser)
+        if replace:
+            self._create()
+
+    def _over_limit(self, browser):
+        """
+        Forget a session if the pool holds more than its limit.
+
+        :return: True if the session is to be quit instead of kept
+        """
+        with self._lock:
+            if len(self._uses) + self._creating <= self.limit:
+                return False
+            self._uses.pop(browser, None)
+            self._throttled += 1
+            return True
+
+    def resize(self, limit):
+        """
+        Change the number of sessions the pool keeps, between 1 and size. Idle sessions above the
+        new limit are quit right away, leased ones when they are released.
+
+        :param limit: number of sessions to keep
+        :return: the limit in effect
+        """
+        with self._lock:
+            limit = max(1, min(self.size, limit))
+            missing = limit - len(self._uses) - self._creating
+            self.limit = limit
+        for _ in range(max(0, missing)):
+            self._submit_create()
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(browser, SessionCreationError) or not self._over_limit(browser):
+                self._idle.put(browser)
+                break
+            self._executor.submit(self._quit, browser)
+        return limit
+
+    def sessions(self):
+        """
+        :return: the sessions the pool holds, idle and leased
+        """
+        with self._lock:
+            return list(self._uses)
+
+    def lease(self, timeout=None):
+        """
+        Take a session out of the pool, waiting for one to become available.
+
+        :param timeout: maximum time to wait in seconds, or None to wait indefinitely
+        :return: Selenium WebDriver instance
+        :raises: SessionCreationError if the session could not be started
+        :raises: queue.Empty if no session became available within the timeout
+        """
+        started = time.monotonic()
+        browser = self._idle.get(timeout=timeout)
+        if isinstance(browser, SessionCreationError):
+            self._submit_create()
+            raise browser
+        with self._lock:
+            self._lease_waits.append(time.monotonic() - started)
+            self._leases += 1
+            if self._uses[browser]:
+                self._reused += 1
+            self._uses[browser] += 1
+        return browser
+
+    def release(self, browser, failed=False, recycle=False):
+        """
+        Return a leased session to the pool.
+
+        :param browser: session obtained from lease()
+        :param failed: True if the scenario ended with an error, which recycles the session
+        :param recycle: True to replace the session for other reasons, e.g. its memory use
+        """
+        if self._over_limit(browser):
+            self._executor.submit(self._quit, browser)
+            return
+        if failed or recycle or self._uses.get(browser, 0) >= self.max_uses:
+            self._executor.submit(self._retire, browser)
+            return
+        try:
+            self.reset(browser)
+        except WebDriverException:
+            logger.warning("Could not reset a WebDriver session, recycling it", exc_info=True)
+            self._executor.submit(self._retire, browser)
+            return
+        self._idle.put(browser)
+
+    @staticmethod
+    def reset(browser):
+        """
+        Clear the state a scenario left in a session.
+
+        :param browser: Selenium WebDriver instance
+        """
+        browser.delete_all_cookies()
+        browser.execute_script(RESET_STORAGE_SCRIPT)
+        browser.get("about:blank")
+        ElementCache.for_browser(browser).clear()
+
+    def metrics(self):
+        """
+        :return: dict with lease count, lease wait times, reuse ratio and session counts
+        """
+        with self._lock:
+            waits = sorted(self._lease_waits)
+            return {
+                'leases': self._leases,
+                'lease_wait_mean': sum(waits) / len(waits) if waits else 0.0,
+                'lease_wait_max': waits[-1] if waits else 0.0,
+                'reuse_ratio': self._reused / self._leases if self._leases else 0.0,
+                'sessions_created': self._created,
+                'sessions_recycled': self._recycled,
+                'sessions_throttled': self._throttled,
+                'limit': self.limit,
+            }
+
+    def shutdown(self):
+        """
+        Stop warming up sessions and quit every session the pool created.
+        """
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            browsers = list(self._uses)
+            self._uses.clear()
+        for browser in browsers:
+            try:
+                browser.quit()
+            except WebDriverException:
+                logger.warning("Could not quit a WebDriver session", exc_info=True)
@@ -0,0 +1,223 @@
+"""
+Plan parallel slots from the scenario durations of previous runs.
+
+TimingStore keeps an exponentially weighted mean duration per scenario and platform. The
+planner packs the scenarios of every platform of browserstack.yml into its parallel slots
+longest first (LPT), which keeps a long scenario such as the @cart one from being scheduled
+last and setting the total time on its own.
+"""
+import heapq
+import logging
+import os
+import statistics
+from collections import namedtuple
+
+import yaml
+
+from features.support.json_files import locked, read_json, write_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DURATION = 60.0
+LOCAL_PLATFORM = 'local'
+
+Slot = namedtuple('Slot', 'platform index load units')
+
+
+def scenario_key(unit):
+    """
+    :param unit: WorkUnit
+    :return: key of the scenario in the timing store; unlike the location it survives edits above the scenario
+    """
+    return timing_key(unit.feature, unit.name)
+
+
+def timing_key(feature, scenario):
+    """
+    :param feature: feature name
+    :param scenario: scenario name
+    :return: key of the scenario in the timing store, see scenario_key
+    """
+    return f"{feature} :: {scenario}"
+
+
+def platform_name(platform):
+    """
+    :param platform: platform entry of browserstack.yml
+    :return: readable platform name, e.g. 'iPhone 13 15 Safari'
+    """
+    parts = (platform.get('deviceName') or platform.get('os'), platform.get('osVersion'), platform.get('browserName'),
+             platform.get('browserVersion'))
+    return ' '.join(str(part) for part in parts if part)
+
+
+def load_platforms(path='browserstack.yml'):
+    """
+    Read the platforms and the parallel slots per platform from the BrowserStack SDK config.
+
+    :param path: path of browserstack.yml
+    :return: (platform names, parallelsPerPlatform) tuple
+    """
+    with open(path) as config_file:
+        config = yaml.safe_load(config_file) or {}
+    platforms = [platform_name(platform) for platform in config.get('platforms') or []]
+    return platforms or [LOCAL_PLATFORM], int(config.get('parallelsPerPlatform', 1))
+
+
+def current_platform(path='browserstack.yml'):
+    """
+    :param path: path of browserstack.yml
+    :return: name of the platform the BrowserStack SDK runs this process for, as load_platforms names it,
+        or LOCAL_PLATFORM outside the SDK
+    """
+    index = os.environ.get('BROWSERSTACK_PLATFORM_INDEX')
+    if index is None or not os.path.exists(path):
+        return LOCAL_PLATFORM
+    platforms, _ = load_platforms(path)
+    return platforms[int(index)] if int(index) < len(platforms) else LOCAL_PLATFORM
+
+
+class TimingStore:
+    """
+    Persistent per-scenario, per-platform duration history.
+    """
+
+    def __init__(self, path, alpha=0.3):
+        """
+        :param path: JSON file the history is read from and saved to
+        :param alpha: weight of the newest run in the moving average
+        """
+        self.path = path
+        self.alpha = alpha
+        self.durations = read_json(path, {})
+        self._added = []
+
+    def update(self, platform, scenario, duration):
+        """
+        Fold the duration of a finished run into the moving average.
+
+        :param platform: platform name
+        :param scenario: scenario key
+        :param duration: duration in seconds
+        """
+        self._fold(self.durations, platform, scenario, duration)
+        self._added.append((platform, scenario, duration))
+
+    def _fold(self, durations, platform, scenario, duration):
+        entry = durations.setdefault(platform, {}).get(scenario)
+        if entry is None:
+            entry = {'mean': duration, 'runs': 0}
+        else:
+            entry['mean'] = self.alpha * duration + (1 - self.alpha) * entry['mean']
+        entry['runs'] += 1
+        entry['last'] = duration
+        durations[platform][scenario] = entry
+
+    def estimate(self, platform, scenario):
+        """
+        Predict the duration of a scenario on a platform.
+
+        Falls back to the mean of the scenario on the other platforms, then to the median of
+        all known durations, then to DEFAULT_DURATION.
+
+        :return: duration in seconds
+        """
+        entry = self.durations.get(platform, {}).get(scenario)
+        if entry:
+            return entry['mean']
+        others = [durations[scenario]['mean'] for durations in self.durations.values() if scenario in durations]
+        if others:
+            return statistics.mean(others)
+        known = [entry['mean'] for durations in self.durations.values() for entry in durations.values()]
+        return statistics.median(known) if known else DEFAULT_DURATION
+
+    def save(self):
+        """
+        Fold the durations recorded since the last save into the file, and take in the ones other
+        processes saved meanwhile, e.g. the BrowserStack SDK's process of another platform.
+        """
+        with locked(self.path):
+            durations = read_json(self.path, {})
+            for platform, scenario, duration in self._added:
+                self._fold(durations, platform, scenario, duration)
+            write_atomic(self.path, durations, indent=2, sort_keys=True)
+            self.durations, self._added = durations, []
+
+
+def longest_first(units, store, platform):
+    """
+    :return: units ordered by descending estimated duration, the dispatch order for a dynamic worker pool
+    """
+    return sorted(units, key=lambda unit: store.estimate(platform, scenario_key(unit)), reverse=True)
+
+
+def plan(units, platforms, parallels, store):
+    """
+    Pack the scenarios of every platform into its parallel slots, longest first.
+
+    :param units: WorkUnits to run on every platform
+    :param platforms: platform names
+    :param parallels: parallel slots per platform
+    :param store: TimingStore
+    :return: list of Slot, parallels per platform
+    """
+    slots = []
+    for platform in platforms:
+        heap = [(0.0, index, []) for index in range(parallels)]
+        for unit in longest_first(units, store, platform):
+            load, index, assigned = heapq.heappop(heap)
+            assigned.append(unit)
+            heapq.heappush(heap, (load + store.estimate(platform, scenario_key(unit)), index, assigned))
+        slots.extend(Slot(platform, index, load, assigned) for load, index, assigned in sorted(heap, key=lambda s: s[1]))
+    return slots
+
+
+def dispatch_order(slots, store):
+    """
+    :return: the units of a plan by their planned start, the order in which a pool of one worker per slot
+        takes them up if the estimates hold
+    """
+    starts = []
+    for slot in slots:
+        start = 0.0
+        for unit in slot.units:
+            starts.append((start, slot.index, unit))
+            start += store.estimate(slot.platform, scenario_key(unit))
+    return [unit for _, _, unit in sorted(starts, key=lambda planned: planned[:2])]
+
+
+def makespan(slots):
+    """
+    :return: predicted wall time of a plan in seconds
+    """
+    return max((slot.load for slot in slots), default=0.0)
+
+
+def utilisation(slots):
+    """
+    :return: busy share of the slot time of a plan, between 0 and 1
+    """
+    span = makespan(slots)
+    return sum(slot.load for slot in slots) / (len(slots) * span) if span else 0.0
+
+
+def print_plan(units, platforms, parallels, store, max_parallels=None):
+    """
+    Print the slots of a plan and the predicted makespan and utilisation per parallelism.
+
+    :param max_parallels: also compare 1..max_parallels slots per platform
+    :return: the slots of the plan
+    """
+    slots = plan(units, platforms, parallels, store)
+    for slot in slots:
+        print(f"{slot.platform} #{slot.index + 1}: {slot.load:.1f}s")
+        for unit in slot.units:
+            print(f"    {store.estimate(slot.platform, scenario_key(unit)):>7.1f}s  {unit.location}  {unit.name}")
+    print(f"Predicted makespan {makespan(slots):.1f}s, utilisation {utilisation(slots):.0%} "
+          f"with {parallels} parallel(s) per platform")
+    if max_parallels:
+        print(f"{'parallels':>9} {'makespan':>10} {'utilisation':>12}")
+        for count in range(1, max_parallels + 1):
+            candidate = plan(units, platforms, count, store)
+            print(f"{count:>9} {makespan(candidate):>9.1f}s {utilisation(candidate):>12.0%}")
+    return slots
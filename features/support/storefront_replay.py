@@ -0,0 +1,304 @@
+"""
+Record the storefront traffic of a run and replay it locally.
+
+RecordingProxy is a reverse proxy in front of the real storefront: the page objects are
+pointed at it through base_url, it forwards every request upstream and stores each exchange
+in a StorefrontArchive. ReplayServer serves an archive without any network access.
+
+Both servers give the browser an rr_session cookie and derive a cart state for it from the
+sequence of state-changing requests (form posts) it made, so that e.g. GET /cart/ after an
+add-to-cart post replays the cart with the item in it. Exchanges are looked up by method,
+path, state and request body; CSRF tokens are ignored when matching form posts.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import zipfile
+from http.cookiejar import DefaultCookiePolicy
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+ORIGIN_PLACEHOLDER = b'__STOREFRONT_ORIGIN__'
+SESSION_COOKIE = 'rr_session'
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+                      'transfer-encoding', 'upgrade', 'content-length', 'content-encoding', 'host'}
+TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def request_key(method, body):
+    """
+    Digest of a request body with CSRF tokens removed, so that replayed posts match recorded ones.
+
+    :param method: HTTP method
+    :param body: raw request body as bytes
+    :return: hex digest, or an empty string for bodiless requests
+    """
+    if not body:
+        return ''
+    try:
+        fields = parse_qsl(body.decode('utf-8'), keep_blank_values=True, strict_parsing=True)
+    except ValueError:
+        return digest(body)
+    fields = sorted((name, value) for name, value in fields if not name.endswith(('_token]', '_token')))
+    return digest(f"{method} {urlencode(fields)}".encode('utf-8'))
+
+
+class StorefrontArchive:
+    """
+    Exchanges of a recorded run, stored as a zip with an index and content-addressed bodies.
+    """
+
+    def __init__(self, exchanges=None, bodies=None):
+        self.exchanges = exchanges or []
+        self.bodies = bodies or {}
+        self._lock = threading.Lock()
+
+    def add(self, exchange, body, request_body=b''):
+        """
+        Append an exchange; identical bodies are stored once.
+
+        :param exchange: dict describing the request and response metadata
+        :param body: response body as bytes
+        :param request_body: request body as bytes, kept so that the request can be sent again
+        """
+        with self._lock:
+            exchange['body'] = digest(body)
+            self.bodies.setdefault(exchange['body'], body)
+            if request_body:
+                exchange['request_body'] = digest(request_body)
+                self.bodies.setdefault(exchange['request_body'], request_body)
+            self.exchanges.append(exchange)
+
+    def save(self, path):
+        """
+        Write the archive to disk.
+
+        :param path: path of the zip file
+        """
+        with self._lock, zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('index.json', json.dumps(self.exchanges, separators=(',', ':')))
+            for name, body in self.bodies.items():
+                archive.writestr(f'bodies/{name}', body)
+        logger.info("Saved %d exchanges (%d unique bodies) to %s", len(self.exchanges), len(self.bodies), path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an archive written by save().
+
+        :param path: path of the zip file
+        :return: StorefrontArchive
+        """
+        with zipfile.ZipFile(path) as archive:
+            exchanges = json.loads(archive.read('index.json'))
+            bodies = {name[len('bodies/'):]: archive.read(name)
+                      for name in archive.namelist() if name.startswith('bodies/')}
+        return cls(exchanges, bodies)
+
+
+class SessionStates:
+    """
+    Cart state and per-state request counts of the browser sessions seen by a server.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def observe(self, session, method, path, key):
+        """
+        Register a request and return the state it was made in and its occurrence in that state.
+
+        :return: (state, occurrence) tuple
+        """
+        with self.lock:
+            state = self.states.get(session, '')
+            occurrence_key = (session, state, method, path, key)
+            occurrence = self.counts.get(occurrence_key, 0)
+            self.counts[occurrence_key] = occurrence + 1
+            if method not in SAFE_METHODS:
+                self.states[session] = digest(f"{state} {method} {path} {key}".encode('utf-8'))
+            return state, occurrence
+
+
+class StorefrontHandler(BaseHTTPRequestHandler):
+    """
+    Shared request plumbing of the recording and replay servers.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        if SESSION_COOKIE in cookie:
+            return cookie[SESSION_COOKIE].value, False
+        return digest(f"{id(self)} {time.time()}".encode('utf-8'))[:16], True
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _respond(self, status, headers, body, session, new_session):
+        body = body.replace(ORIGIN_PLACEHOLDER, self.server.origin.encode('utf-8'))
+        self.send_response(status)
+        for name, value in headers:
+            if name.lower() == 'location':
+                value = value.replace(ORIGIN_PLACEHOLDER.decode(), self.server.origin)
+            self.send_header(name, value)
+        if new_session:
+            self.send_header('Set-Cookie', f'{SESSION_COOKIE}={session}; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self.handle_exchange()
+
+    do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = do_GET
+
+
+class RecordingHandler(StorefrontHandler):
+
+    def handle_exchange(self):
+        server = self.server
+        session, new_session = self._session()
+        body = self._body()
+        key = request_key(self.command, body)
+        state, occurrence = server.sessions.observe(session, self.command, self.path, key)
+        headers = {name: value.replace(server.origin, server.upstream)
+                   for name, value in self.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+        headers['Accept-Encoding'] = 'gzip, deflate'
+        response = server.http.request(self.command, server.upstream + self.path, headers=headers, data=body,
+                                       allow_redirects=False, timeout=60)
+        content = response.content
+        content_type = response.headers.get('Content-Type', '')
+        if content_type.startswith(TEXT_TYPES):
+            host = urlsplit(server.upstream).netloc.encode('utf-8')
+            content = content.replace(server.upstream.encode('utf-8'), ORIGIN_PLACEHOLDER)
+            content = content.replace(b'//' + host, ORIGIN_PLACEHOLDER)
+        response_headers = []
+        for name, value in response.raw.headers.items():
+            if name.lower() in HOP_BY_HOP_HEADERS:
+                continue
+            if name.lower() == 'location':
+                value = value.replace(server.upstream, ORIGIN_PLACEHOLDER.decode())
+            if name.lower() == 'set-cookie':
+                value = ';'.join(part for part in value.split(';')
+                                 if part.strip().split('=')[0].lower() not in ('domain', 'secure'))
+            response_headers.append((name, value))
+        server.archive.add({
+            'method': self.command, 'path': self.path, 'request': key, 'state': state, 'occurrence': occurrence,
+            'status': response.status_code, 'headers': response_headers, 'step': server.current_step,
+            'scenario': server.current_scenario, 'content_type': self.headers.get('Content-Type'),
+        }, content, body)
+        self._respond(response.status_code, response_headers, content, session, new_session)
+
+
+class ReplayHandler(StorefrontHandler):
+
+    def handle_exchange(self):
+        session, new_session = self._session()
+        key = request_key(self.command, self._body())
+        state, occurrence = self.server.sessions.observe(session, self.command, self.path, key)
+        exchange = self.server.lookup(self.command, self.path, key, state, occurrence)
+        if exchange is None:
+            logger.warning("No recorded exchange for %s %s", self.command, self.path)
+            self._respond(404, [('Content-Type', 'text/plain')], b'Not recorded', session, new_session)
+            return
+        body = self.server.archive.bodies[exchange['body']]
+        self._respond(exchange['status'], exchange['headers'], body, session, new_session)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, host, port):
+        super().__init__((host, port), handler)
+        self.sessions = SessionStates()
+
+    @property
+    def origin(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """
+        Serve requests from a daemon thread and return immediately.
+        """
+        threading.Thread(target=self.serve_forever, name=type(self).__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class RecordingProxy(_Server):
+    """
+    Reverse proxy to the storefront that records every exchange into an archive.
+    """
+
+    def __init__(self, upstream, archive=None, host='127.0.0.1', port=0):
+        """
+        :param upstream: storefront base URL, e.g. https://aeonstest.info
+        :param archive: StorefrontArchive to record into
+        """
+        super().__init__(RecordingHandler, host, port)
+        self.upstream = upstream.rstrip('/')
+        self.archive = archive or StorefrontArchive()
+        self.current_scenario = None
+        self.current_step = None
+        self.http = requests.Session()
+        # Each browser sends its own storefront cookies; the shared session must not add any.
+        self.http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=()))
+        self.http.mount('http://', HTTPAdapter(pool_maxsize=16))
+        self.http.mount('https://', HTTPAdapter(pool_maxsize=16))
+
+
+class ReplayServer(_Server):
+    """
+    Local server answering requests from a recorded archive.
+    """
+
+    def __init__(self, archive, host='127.0.0.1', port=0):
+        """
+        :param archive: StorefrontArchive to replay
+        """
+        super().__init__(ReplayHandler, host, port)
+        self.archive = archive
+        self.index = {}
+        for exchange in archive.exchanges:
+            self.index.setdefault((exchange['method'], exchange['path'], exchange['request'], exchange['state']),
+                                  []).append(exchange)
+            self.index.setdefault((exchange['method'], exchange['path']), []).append(exchange)
+
+    def lookup(self, method, path, key, state, occurrence):
+        """
+        Find the recorded exchange for a request, preferring one made in the same cart state.
+
+        :return: exchange dict, or None if the request was never recorded
+        """
+        candidates = self.index.get((method, path, key, state))
+        if candidates:
+            return candidates[min(occurrence, len(candidates) - 1)]
+        candidates = self.index.get((method, path))
+        return candidates[-1] if candidates else None
@@ -0,0 +1,356 @@
+"""
+Minimal stand-in for the Sylius storefront the page objects are written against.
+
+It renders the product, cart and checkout pages with the ids and class names the page
+objects use, keeps a cart per PHPSESSID cookie and accepts the same form posts as the real
+site, including CSRF tokens. Run it with:
+
+    python -m features.support.stub_storefront --port 8000
+"""
+import argparse
+import html
+import secrets
+import threading
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PRODUCTS = {
+    'aeons-total-harmony': {'id': 1, 'name': 'Aeons Total Harmony', 'price': 39.95},
+    'natures-gift-bone-broth': {'id': 2, 'name': "Nature's Gift Bone Broth", 'price': 29.99},
+}
+COUPONS = {'VALIDCOUPON': 0.10}
+VARIANTS = ('250ml', '3bottles')
+
+LAYOUT = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title} | Aeons</title></head>
+<body>
+<nav><a href="/">Home</a> <a href="/range">Shop</a> <a href="/cart/">Cart</a></nav>
+{flashes}
+{content}
+<script>
+document.querySelectorAll('.accordion-button').forEach(function (button) {{
+    button.addEventListener('click', function () {{
+        var target = document.querySelector(button.getAttribute('data-bs-target'));
+        var open = target.classList.contains('show');
+        document.querySelectorAll('.accordion-collapse.show').forEach(function (section) {{
+            section.classList.remove('show');
+        }});
+        if (!open) {{ target.classList.add('show'); }}
+    }});
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def price(amount):
+    return f"£{amount:,.2f}"
+
+
+class Cart:
+    """
+    Cart and CSRF token of one storefront session.
+    """
+
+    def __init__(self):
+        self.token = secrets.token_hex(16)
+        self.items = []
+        self.coupon = None
+        self.flashes = []
+        self.next_item_id = 1
+
+    def add(self, product, quantity, variant, purchase_type):
+        for item in self.items:
+            if item['product'] is product and item['variant'] == variant and item['purchase_type'] == purchase_type:
+                item['quantity'] += quantity
+                return
+        self.items.append({'id': self.next_item_id, 'product': product, 'quantity': quantity,
+                           'variant': variant, 'purchase_type': purchase_type})
+        self.next_item_id += 1
+
+    @property
+    def discount(self):
+        subtotal = sum(item['product']['price'] * item['quantity'] for item in self.items)
+        return round(subtotal * COUPONS.get(self.coupon, 0), 2)
+
+
+class StorefrontHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the storefront pages out of StubStorefront.carts.
+    """
+
+    server_version = "StubStorefront/1.0"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session(self):
+        if getattr(self, 'session', None):
+            return self.session
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        session_id = cookie['PHPSESSID'].value if 'PHPSESSID' in cookie else None
+        carts = self.server.carts
+        with self.server.lock:
+            if session_id not in carts:
+                session_id = secrets.token_hex(13)
+                carts[session_id] = Cart()
+            self.session = session_id, carts[session_id]
+            return self.session
+
+    def _send(self, status, body=b'', content_type='text/html; charset=utf-8', headers=()):
+        session_id, _ = self._session()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', f'PHPSESSID={session_id}; Path=/; HttpOnly')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _page(self, title, content, cart, status=200):
+        flashes = ''.join(f'<div class="alert alert-{kind}">{html.escape(message)}</div>'
+                          for kind, message in cart.flashes)
+        cart.flashes = []
+        body = LAYOUT.format(title=html.escape(title), flashes=flashes, content=content)
+        self._send(status, body.encode('utf-8'))
+
+    def _redirect(self, location):
+        self._send(302, headers=[('Location', location)])
+
+    def _form(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        fields = parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True)
+        return {name: values[-1] for name, values in fields.items()}
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        _, cart = self._session()
+        url = urlsplit(self.path)
+        path = url.path
+        if path == '/':
+            self._page('Home', '<h1>Aeons</h1><a class="btn" href="/range">SHOP NOW</a>', cart)
+        elif path == '/range':
+            links = ''.join(f'<li><a href="/products/{slug}">{html.escape(product["name"])}</a></li>'
+                            for slug, product in PRODUCTS.items())
+            self._page('Range', f'<h1>Our range</h1><ul>{links}</ul>', cart)
+        elif path.startswith('/products/') and path[len('/products/'):] in PRODUCTS:
+            self._product(path[len('/products/'):], cart)
+        elif path == '/cart/':
+            self._cart(cart, checkout_error='error' in parse_qs(url.query))
+        elif path == '/checkout/':
+            if not cart.items:
+                self._redirect('/cart/?error=empty')
+            else:
+                self._checkout(cart)
+        elif path == '/favicon.ico':
+            self._send(200, b'', content_type='image/x-icon')
+        else:
+            self._page('Not found', '<h1>Page not found</h1>', cart, status=404)
+
+    def do_POST(self):
+        _, cart = self._session()
+        url = urlsplit(self.path)
+        form = self._form()
+        token = next((value for name, value in form.items() if name.endswith('[_token]') or name == '_token'), None)
+        if token != cart.token:
+            self._page('Forbidden', '<h1>Invalid CSRF token</h1>', cart, status=403)
+            return
+        if url.path == '/cart/add':
+            product_id = int(parse_qs(url.query).get('productId', ['0'])[0])
+            product = next((p for p in PRODUCTS.values() if p['id'] == product_id), None)
+            if product is None:
+                self._page('Not found', '<h1>Product not found</h1>', cart, status=404)
+                return
+            quantity = max(1, int(form.get('sylius_add_to_cart[cartItem][quantity]') or 1))
+            variant = form.get('sylius_add_to_cart[cartItem][variant]', VARIANTS[0])
+            purchase_type = form.get('sylius_add_to_cart[purchaseType]', 'one-time')
+            cart.add(product, quantity, variant, purchase_type)
+            cart.flashes.append(('success', 'Item has been added to cart'))
+            self._redirect('/cart/')
+        elif url.path == '/cart/':
+            for index, item in enumerate(cart.items):
+                quantity = form.get(f'sylius_cart[items][{index}][quantity]')
+                if quantity:
+                    item['quantity'] = max(1, int(quantity))
+            coupon = form.get('sylius_cart[promotionCoupon]', '').strip()
+            if coupon:
+                if coupon in COUPONS:
+                    cart.coupon = coupon
+                    cart.flashes.append(('success', 'Your promotion code has been applied'))
+                else:
+                    cart.flashes.append(('danger', 'Coupon code is invalid'))
+            self._redirect('/cart/')
+        elif url.path.startswith('/cart/item/') and url.path.endswith('/remove'):
+            item_id = int(url.path.split('/')[3])
+            cart.items = [item for item in cart.items if item['id'] != item_id]
+            if not cart.items:
+                cart.coupon = None
+            self._redirect('/cart/')
+        elif url.path == '/checkout/':
+            cart.items, cart.coupon = [], None
+            self._page('Thank you', '<h1>Thank you for your purchase!</h1>', cart)
+        else:
+            self._page('Not found', '<h1>Page not found</h1>', cart, status=404)
+
+    def _product(self, slug, cart):
+        product = PRODUCTS[slug]
+        related = ''.join(f'<li><a href="/products/{other}">{html.escape(p["name"])}</a></li>'
+                          for other, p in PRODUCTS.items() if other != slug)
+        variants = ''.join(
+            f'<input type="radio" id="sylius_add_to_cart_cartItem_variant_{index}" '
+            f'name="sylius_add_to_cart[cartItem][variant]" value="{variant}"{" checked" if index == 0 else ""}>'
+            f'<label for="sylius_add_to_cart_cartItem_variant_{index}">{variant}</label>'
+            for index, variant in enumerate(VARIANTS))
+        faq = ''.join(
+            f'<div class="accordion-item"><h3><button class="accordion-button" type="button" '
+            f'data-bs-target="#faq-{index}">{question}</button></h3>'
+            f'<div id="faq-{index}" class="accordion-collapse collapse"><p>{answer}</p></div></div>'
+            for index, (question, answer) in enumerate([
+                ('How do I take it?', 'Mix one serving with water.'),
+                ('Is it gluten free?', 'Yes.'),
+                ('Can I cancel my subscription?', 'At any time.'),
+            ]))
+        content = f"""
+<h1 class="product-title">{html.escape(product['name'])}</h1>
+<span class="product-price">{price(product['price'])}</span>
+<form name="sylius_add_to_cart" method="post" action="/cart/add?productId={product['id']}">
+  <div class="variants">{variants}</div>
+  <label class="purchase-option" data-variant-option-subscription="no">
+    <input type="radio" name="sylius_add_to_cart[purchaseType]" value="one-time" checked> One-time purchase</label>
+  <label class="purchase-option" data-variant-option-subscription="yes">
+    <input type="radio" name="sylius_add_to_cart[purchaseType]" value="subscription"> Subscribe &amp; Save</label>
+  <input type="number" id="sylius_add_to_cart_cartItem_quantity" name="sylius_add_to_cart[cartItem][quantity]" value="1">
+  <input type="hidden" name="sylius_add_to_cart[_token]" value="{cart.token}">
+  <button type="submit" class="btn add-to-cart">Add to cart</button>
+</form>
+<ul class="related-products">{related}</ul>
+<section class="faq"><p class="h1">Frequently Asked Questions</p><div class="accordion">{faq}</div></section>
+"""
+        self._page(product['name'], content, cart)
+
+    def _cart(self, cart, checkout_error=False):
+        error = '<div class="checkout-error-message">Your cart is empty</div>' if checkout_error else ''
+        if not cart.items:
+            content = f"""
+<div class="cart-title"><h1>Your Shopping Cart</h1></div>{error}
+<p class="empty-cart-message">Your cart is empty</p>
+<a class="checkout-btn btn" href="/checkout/">Checkout</a>
+"""
+            self._page('Cart', content, cart)
+            return
+        rows, removes = [], []
+        for index, item in enumerate(cart.items):
+            product = item['product']
+            purchase_type = 'Subscribe &amp; Save' if item['purchase_type'] == 'subscription' else 'One-time purchase'
+            rows.append(f"""
+<tr class="cart-item">
+  <td class="product-image-and-description"><img src="/media/{item['id']}.png" alt="">
+    <div class="product-description"><h3>{html.escape(product['name'])}</h3></div></td>
+  <td class="numbers"><span>{price(product['price'])}</span></td>
+  <td><input type="number" id="sylius_cart_items_{index}_quantity" name="sylius_cart[items][{index}][quantity]" value="{item['quantity']}"></td>
+  <td class="numbers">{price(product['price'] * item['quantity'])}</td>
+</tr>
+<tr><td>Purchase type:</td><td>{purchase_type}</td></tr>""")
+            removes.append(f"""
+<form method="post" action="/cart/item/{item['id']}/remove">
+  <input type="hidden" name="_method" value="DELETE"><input type="hidden" name="_token" value="{cart.token}">
+  <button type="submit" class="remove-item-button">Remove</button>
+</form>""")
+        discount = f'<p>Discount: <span class="discount-amount">-{price(cart.discount)}</span></p>' if cart.coupon else ''
+        content = f"""
+<div class="cart-title"><h1>Your Shopping Cart</h1></div>{error}
+<form name="sylius_cart" method="post" action="/cart/">
+  <input type="hidden" name="_method" value="PATCH">
+  <table>{''.join(rows)}</table>
+  <div class="coupon-section">
+    <input type="text" id="sylius_cart_promotionCoupon" name="sylius_cart[promotionCoupon]" value="">
+    <button type="submit" class="btn">Apply coupon</button>
+  </div>
+  <input type="hidden" name="sylius_cart[_token]" value="{cart.token}">
+  <button type="submit" class="update-cart-button">Update cart</button>
+</form>
+{''.join(removes)}{discount}
+<a class="checkout-btn btn" href="/checkout/">Checkout</a>
+"""
+        self._page('Cart', content, cart)
+
+    def _checkout(self, cart):
+        fields = [('customer_email', 'Email'), ('billingAddress_firstName', 'First name'),
+                  ('billingAddress_lastName', 'Last name'), ('billingAddress_phoneNumber', 'Phone'),
+                  ('billingAddress_street', 'Street'), ('billingAddress_city', 'City'),
+                  ('billingAddress_postcode', 'Postcode')]
+        inputs = ''.join(
+            f'<label>{label}<input type="text" id="app_one_page_checkout_{field}" '
+            f'name="app_one_page_checkout[{field.replace("_", "][", 1)}]"></label>'
+            for field, label in fields)
+        content = f"""
+<h1 class="checkout-title">Checkout</h1>
+<form name="app_one_page_checkout" method="post" action="/checkout/">
+  {inputs}
+  <select id="app_one_page_checkout_billingAddress_countryCode" name="app_one_page_checkout[billingAddress][countryCode]">
+    <option value="GB">United Kingdom</option><option value="US">United States</option>
+  </select>
+  <input type="hidden" name="app_one_page_checkout[_token]" value="{cart.token}">
+  <button type="submit" class="btn place-order">Place order</button>
+</form>
+"""
+        self._page('Checkout', content, cart)
+
+
+class StubStorefront(ThreadingHTTPServer):
+    """
+    Threaded HTTP server running the stub storefront, optionally in a background thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), StorefrontHandler)
+        self.carts = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def origin(self):
+        # Same name as on the recording and replay servers.
+        return self.base_url
+
+    def start(self):
+        """
+        Serve requests from a daemon thread and return immediately.
+        """
+        threading.Thread(target=self.serve_forever, name='stub-storefront', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    server = StubStorefront(args.host, args.port)
+    print(f"Stub storefront listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
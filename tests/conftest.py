@@ -0,0 +1,24 @@
+import pytest
+
+from features.support.fake_webdriver import FakeWebDriver
+from features.support.stub_storefront import StubStorefront
+
+
+@pytest.fixture
+def storefront():
+    """
+    The stub storefront, serving on a free local port.
+    """
+    storefront = StubStorefront().start()
+    yield storefront
+    storefront.stop()
+
+
+@pytest.fixture
+def browser():
+    """
+    An in-process FakeWebDriver session.
+    """
+    browser = FakeWebDriver()
+    yield browser
+    browser.quit()
@@ -0,0 +1,100 @@
+import base64
+import gzip
+import json
+import os
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from features.support.artifacts import ArtifactPipeline, slug
+
+PAGE = {'url': 'http://shop.test/cart/', 'title': 'Cart', 'readyState': 'complete', 'html': '<html></html>',
+        'console': [{'level': 'SEVERE', 'message': 'boom'}]}
+SCREENSHOT = base64.b64encode(b'\x89PNG screenshot').decode()
+
+
+class BrokenBrowser:
+
+    def get_screenshot_as_base64(self):
+        raise WebDriverException("session deleted")
+
+    def execute_script(self, script, *args):
+        raise WebDriverException("session deleted")
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    pipelines = []
+
+    def start(**options):
+        pipelines.append(ArtifactPipeline(str(tmp_path), **options))
+        return pipelines[-1]
+    yield start
+    for started in pipelines:
+        started.close()
+
+
+def read(pipeline, manifest, part):
+    with open(os.path.join(pipeline.directory, manifest['objects'][part]), 'rb') as stored:
+        data = stored.read()
+    return gzip.decompress(data) if manifest['objects'][part].endswith('.gz') else data
+
+
+def test_a_capture_of_the_browser_is_written_with_its_manifest(pipeline, storefront, browser):
+    artifacts = pipeline()
+    browser.get(storefront.origin + '/cart/')
+
+    assert artifacts.capture(browser, 'Empty cart/I proceed to checkout', {'error': 'Assertion Failed'})
+    artifacts.drain()
+
+    [path] = artifacts.manifests
+    assert os.path.dirname(os.path.dirname(path)).endswith(os.path.join('Empty_cart', 'I_proceed_to_checkout'))
+    with open(path) as source:
+        manifest = json.load(source)
+    assert (manifest['url'], manifest['details']) == (storefront.origin + '/cart/', {'error': 'Assertion Failed'})
+    assert read(artifacts, manifest, 'screenshot').startswith(b'\x89PNG')
+    assert b'Your Shopping Cart' in read(artifacts, manifest, 'page_source')
+
+
+def test_identical_parts_are_stored_once(pipeline):
+    artifacts = pipeline()
+    for name in ('Purchase/first', 'Purchase/second'):
+        artifacts.submit(name, {'screenshot': SCREENSHOT, 'page': PAGE})
+    artifacts.drain()
+
+    manifests = []
+    for path in artifacts.manifests:
+        with open(path) as source:
+            manifests.append(json.load(source))
+    assert manifests[0]['objects'] == manifests[1]['objects']
+    assert json.loads(read(artifacts, manifests[0], 'console')) == PAGE['console']
+    assert (artifacts.stats['written'], artifacts.stats['deduplicated']) == (3, 3)
+
+
+def test_a_capture_without_any_part_is_not_queued(pipeline):
+    artifacts = pipeline()
+
+    assert not artifacts.capture(BrokenBrowser(), 'Purchase/step')
+    assert artifacts.stats['captured'] == 0
+
+
+def test_captures_are_dropped_when_the_queue_is_full(pipeline):
+    artifacts = pipeline(workers=0, max_queue=1, wait_timeout=0.05)
+
+    assert artifacts.submit('Purchase/first', {'page': PAGE})
+    assert not artifacts.submit('Purchase/second', {'page': PAGE})
+    assert artifacts.stats['dropped'] == 1
+    assert artifacts.pending_bytes == len(PAGE['html'])
+
+
+def test_captures_are_dropped_when_the_memory_cap_is_reached(pipeline):
+    artifacts = pipeline(workers=0, max_bytes=len(SCREENSHOT) + 1, wait_timeout=0.05)
+
+    assert artifacts.submit('Purchase/first', {'screenshot': SCREENSHOT})
+    assert not artifacts.submit('Purchase/second', {'screenshot': SCREENSHOT})
+    assert artifacts.stats['dropped'] == 1
+
+
+def test_names_are_reduced_to_file_names():
+    assert slug("Add product to cart: 'Nature's Gift' / 3") == 'Add_product_to_cart_Nature_s_Gift_3'
+    assert slug('???') == 'artifact'
@@ -0,0 +1,40 @@
+import pytest
+
+from features.pages.cart_page import CartPage
+from features.support.cart_seeder import CartSeeder, SeedingError
+
+
+def test_the_seeded_cart_is_the_browsers_after_inject(storefront, browser):
+    seeder = CartSeeder(storefront.origin)
+    seeder.add_item("Nature's Gift Bone Broth").set_quantity(3).apply_coupon('VALIDCOUPON').inject(browser)
+
+    page = CartPage(browser, storefront.origin)
+    page.load()
+    cart = page.snapshot()
+    assert cart.product_name == "Nature's Gift Bone Broth"
+    assert cart.quantity == 3
+    assert cart.total_price == 89.97
+    assert cart.discount_applied
+
+
+def test_adopt_continues_with_the_cart_the_browser_has(storefront, browser):
+    CartSeeder(storefront.origin).add_item().inject(browser)
+    CartSeeder(storefront.origin).adopt(browser).add_item("Nature's Gift Bone Broth", 2).inject(browser)
+
+    [cart] = [cart for cart in storefront.carts.values() if cart.items]
+    assert [(item['product']['name'], item['quantity']) for item in cart.items] == \
+        [('Aeons Total Harmony', 1), ("Nature's Gift Bone Broth", 2)]
+
+
+def test_clear_removes_every_item(storefront, browser):
+    CartSeeder(storefront.origin).add_item().add_item("Nature's Gift Bone Broth").inject(browser)
+    CartSeeder(storefront.origin).adopt(browser).clear().inject(browser)
+
+    page = CartPage(browser, storefront.origin)
+    page.load()
+    assert page.is_cart_empty()
+
+
+def test_an_unknown_product_is_reported(storefront):
+    with pytest.raises(SeedingError, match="No link to product 'Unknown'"):
+        CartSeeder(storefront.origin).add_item('Unknown')
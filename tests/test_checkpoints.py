@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from features.pages.cart_page import CartPage
+from features.support.cart_seeder import CartSeeder
+from features.support.checkpoints import CheckpointStore, capture_state, checkpoint_length, restore_state
+from features.support.fake_webdriver import FakeWebDriver
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FEATURE = """Feature: Cart checkpoints
+        @checkpoint=2
+        Scenario: Proceed to checkout
+            Given the cart contains 1 x "Nature's Gift Bone Broth"
+              And user is on the cart page
+             When user proceeds to checkout
+             Then user should be on the checkout page
+
+        @checkpoint=2
+        Scenario: Apply a coupon
+            Given the cart contains 1 x "Nature's Gift Bone Broth"
+              And user is on the cart page
+             When user applies a valid coupon code "VALIDCOUPON"
+             Then the discount should be applied
+"""
+
+
+class Index:
+    """
+    Stands in for the ImpactIndex with a fingerprint the test changes.
+    """
+
+    def __init__(self):
+        self.version = 1
+
+    def fingerprint(self, steps):
+        return f"v{self.version}"
+
+
+def step(name):
+    return SimpleNamespace(step_type='given', name=name, text=None, table=None, duration=1.5)
+
+
+STEPS = [step('the cart contains 1 x "Bone Broth"'), step('user is on the cart page')]
+STATE = {'url': 'http://shop.test/cart/', 'cookies': [], 'local': {}, 'session': {}}
+
+
+def test_the_prefix_length_comes_from_the_tag():
+    assert checkpoint_length(SimpleNamespace(effective_tags=['cart', 'checkpoint=2'])) == 2
+    assert checkpoint_length(SimpleNamespace(effective_tags=['cart'])) is None
+
+
+def test_checkpoints_are_kept_per_prefix_platform_and_storefront():
+    key = CheckpointStore.key(STEPS, 'local', 'http://shop.test/')
+
+    assert key == CheckpointStore.key(list(STEPS), 'local', 'http://shop.test/')
+    assert key != CheckpointStore.key(STEPS[:1], 'local', 'http://shop.test/')
+    assert key != CheckpointStore.key(STEPS, 'iPhone 13 15 Safari', 'http://shop.test/')
+    assert key != CheckpointStore.key(STEPS, 'local', 'http://127.0.0.1:8000/')
+
+
+def test_a_saved_checkpoint_is_loaded_until_its_code_changes(tmp_path):
+    index = Index()
+    store = CheckpointStore(str(tmp_path), index)
+    store.save(STEPS, 'local', 'http://shop.test/', STATE)
+
+    checkpoint = store.load(STEPS, 'local', 'http://shop.test/')
+    assert checkpoint['state'] == STATE
+    store.restored(checkpoint, 1)
+    index.version = 2
+    assert store.load(STEPS, 'local', 'http://shop.test/') is None
+    assert os.listdir(tmp_path) == []
+    assert store.stats == {'saved': 1, 'restored': 1, 'invalidated': 1, 'steps_skipped': 1, 'seconds_skipped': 1.5}
+
+
+def test_an_expired_checkpoint_is_discarded(tmp_path):
+    store = CheckpointStore(str(tmp_path), max_age=0)
+    store.save(STEPS, 'local', 'http://shop.test/', STATE)
+
+    assert store.load(STEPS, 'local', 'http://shop.test/') is None
+    assert store.stats['invalidated'] == 1
+
+
+def test_a_restored_state_has_the_cart_of_the_captured_one(storefront, browser):
+    CartSeeder(storefront.origin).add_item("Nature's Gift Bone Broth", 2).inject(browser)
+    browser.get(storefront.origin + '/cart/')
+    state = capture_state(browser)
+
+    other = FakeWebDriver()
+    try:
+        restore_state(other, state)
+        page = CartPage(other, storefront.origin)
+        assert other.current_url == storefront.origin + '/cart/'
+        assert (page.snapshot().product_name, page.snapshot().quantity) == ("Nature's Gift Bone Broth", 2)
+    finally:
+        other.quit()
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    shutil.copytree(os.path.join(REPO, 'features'), tmp_path / 'features',
+                    ignore=shutil.ignore_patterns('__pycache__', '*.feature'))
+    (tmp_path / 'features' / 'checkpoints.feature').write_text(FEATURE)
+    return tmp_path
+
+
+def test_a_scenario_with_a_saved_prefix_skips_its_steps(checkout):
+    run = subprocess.run([sys.executable, '-m', 'behave', '-D', 'driver=fake', '-D', 'checkpoints=on',
+                          '-D', f'checkpoints_dir={checkout / "checkpoints"}', '--format', 'json',
+                          '--outfile', 'report.json', 'features/checkpoints.feature'],
+                         cwd=checkout, capture_output=True, text=True, timeout=300)
+
+    assert run.returncode == 0, run.stdout + run.stderr
+    [feature] = json.loads((checkout / 'report.json').read_text())
+    assert [(scenario['status'], len(scenario['steps'])) for scenario in feature['elements']] == [
+        ('passed', 4), ('passed', 2),
+    ]
+    assert len(os.listdir(checkout / 'checkpoints')) == 1
@@ -0,0 +1,131 @@
+import pytest
+from selenium.webdriver.common.by import By
+
+from features.pages.locator_syntax import SelectorError
+from features.support.dom import (elements, evaluate_xpath, inner_text, is_visible, locate, parse_html, serialize,
+                                  sync_select)
+
+CART = """
+<html><head><title>Cart</title><style>.x { color: red }</style></head>
+<body>
+<div class="cart-title"><h1>Your Shopping Cart</h1></div>
+<table>
+  <tr class="item"><td class="numbers">$29.99<td><input type="number" name="qty" value="3"></tr>
+  <tr class="item"><td class="numbers">$9.99<td><input type="number" name="qty" value="1" hidden></tr>
+</table>
+<ul><li>First<li>Second</ul>
+<p>One<p>Two
+<form><select name="country"><option value="US">United States<option value="DE">Germany</select></form>
+<div class="collapse" id="faq-1"><p>Hidden answer</p></div>
+<div class="collapse show" id="faq-2"><p>Shown answer</p></div>
+<span style="display: none">Invisible</span>
+<a href="/cart/">  View   cart </a>
+</div></span>
+</body></html>
+"""
+
+
+@pytest.fixture
+def document():
+    return parse_html(CART)
+
+
+def texts(nodes):
+    return [node.text_content.strip() for node in nodes]
+
+
+def test_void_elements_take_no_children(document):
+    [quantity, _] = locate(document, By.NAME, 'qty')
+
+    assert quantity.children == []
+    assert quantity.parent.tag == 'td'
+    assert serialize(quantity) == '<input type="number" name="qty" value="3">'
+
+
+def test_unclosed_elements_are_closed_by_their_siblings(document):
+    assert texts(elements(document, 'li')) == ['First', 'Second']
+    assert texts(elements(document, 'p'))[:2] == ['One', 'Two']
+    assert elements(document, 'form')[0].parent.tag == 'body'
+    assert [len(elements(row, 'td')) for row in locate(document, By.CLASS_NAME, 'item')] == [2, 2]
+    assert [option.parent.tag for option in elements(document, 'option')] == ['select', 'select']
+
+
+def test_stray_end_tags_are_ignored(document):
+    assert serialize(parse_html('<p>a</b></p>')) == '<!DOCTYPE html><p>a</p>'
+    assert [node.tag for node in elements(document, 'body')[0].children if node.kind == 'element'][-1] == 'a'
+
+
+def test_form_controls_get_their_initial_state(document):
+    [select] = locate(document, By.NAME, 'country')
+
+    assert select.value == 'US'
+    assert locate(document, By.NAME, 'qty')[0].value == '3'
+
+
+def test_a_select_takes_the_value_of_its_selected_option(document):
+    [select] = locate(document, By.NAME, 'country')
+    first, second = elements(select, 'option')
+    first.selected, second.selected = False, True
+    sync_select(select)
+    assert select.value == 'DE'
+
+    second.selected = False
+    sync_select(select)
+    assert (select.value, first.selected) == ('US', True)
+
+
+@pytest.mark.parametrize('by, value, expected', [
+    (By.ID, 'faq-2', ['Shown answer']),
+    (By.CLASS_NAME, 'numbers', ['$29.99', '$9.99']),
+    (By.TAG_NAME, 'H1', ['Your Shopping Cart']),
+    (By.CSS_SELECTOR, 'tr.item:nth-child(2) td.numbers', ['$9.99']),
+    (By.CSS_SELECTOR, '.collapse:not(.show) p, .cart-title > h1', ['Your Shopping Cart', 'Hidden answer']),
+    (By.CSS_SELECTOR, 'li:last-child', ['Second']),
+    (By.XPATH, "//td[contains(text(), '29')]", ['$29.99']),
+    (By.XPATH, "//div[@class='cart-title']/following-sibling::table//td[1]", ['$29.99', '$9.99']),
+    (By.LINK_TEXT, 'View cart', ['View   cart']),
+    (By.PARTIAL_LINK_TEXT, 'View', ['View   cart']),
+])
+def test_locators_match_in_document_order(document, by, value, expected):
+    assert texts(locate(document, by, value)) == expected
+
+
+def test_xpath_values_and_invalid_locators(document):
+    assert evaluate_xpath("count(//tr)", document) == 2.0
+    assert evaluate_xpath("string(//h1)", document) == 'Your Shopping Cart'
+    with pytest.raises(SelectorError, match="is not a set of elements"):
+        locate(document, By.XPATH, "//h1/text()")
+    with pytest.raises(SelectorError):
+        locate(document, By.CSS_SELECTOR, "div:hovered")
+
+
+@pytest.mark.parametrize('selector, visible', [
+    ('h1', True),
+    ('#faq-1 p', False),
+    ('#faq-2 p', True),
+    ('span', False),
+    ('input[name=qty][hidden]', False),
+    ('title', False),
+])
+def test_visibility_follows_the_hiding_rules(document, selector, visible):
+    assert is_visible(locate(document, By.CSS_SELECTOR, selector)[0]) is visible
+
+
+def test_a_detached_element_is_not_visible(document):
+    [heading] = elements(document, 'h1')
+    heading.parent.children.remove(heading)
+    heading.parent = None
+
+    assert not is_visible(heading)
+
+
+def test_inner_text_collapses_whitespace_and_skips_hidden_elements(document):
+    [body] = elements(document, 'body')
+    text = inner_text(body)
+
+    assert inner_text(locate(document, By.TAG_NAME, 'a')[0]) == 'View cart'
+    assert 'Your Shopping Cart\n$29.99' in text
+    assert 'Shown answer' in text
+    assert 'Hidden answer' not in text
+    assert 'Invisible' not in text
+    assert inner_text(locate(document, By.ID, 'faq-1')[0]) == ''
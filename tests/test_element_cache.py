@@ -0,0 +1,52 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+
+from features.pages.locators import ElementCache
+from features.pages.product_page import ProductPage
+from features.support.dom import select
+
+
+@pytest.fixture
+def page(storefront, browser):
+    page = ProductPage(browser, storefront.origin)
+    page.load()
+    return page
+
+
+def test_an_element_is_looked_up_once_per_page_load(page):
+    button = page.add_to_cart_button
+
+    assert page.add_to_cart_button is button
+    assert ElementCache.for_browser(page.browser).stats() == {'hits': 1, 'misses': 1, 'stale': 0}
+    page.open(page.URL)
+    assert page.add_to_cart_button is not button
+    assert ElementCache.for_browser(page.browser).stats() == {'hits': 1, 'misses': 2, 'stale': 0}
+
+
+def test_a_stale_element_is_looked_up_again(page):
+    button = page.add_to_cart_button
+    stale_id = button.id
+    # A reload behind the page object's back leaves the cached element stale.
+    page.browser.refresh()
+
+    assert button.tag_name == 'button'
+    assert button.id != stale_id
+    assert page.add_to_cart_button is button
+    assert ElementCache.for_browser(page.browser).stats() == {'hits': 1, 'misses': 1, 'stale': 1}
+
+
+def test_an_element_of_a_shrunk_list_is_reported_stale(page):
+    buttons = page.accordion_buttons
+    page.browser.refresh()
+    last = select(page.browser.session.document, '.accordion-button')[-1]
+    last.parent.children.remove(last)
+
+    with pytest.raises(StaleElementReferenceException, match=f"element {len(buttons) - 1} is gone"):
+        buttons[-1].tag_name
+
+
+def test_a_click_that_navigates_drops_the_cached_elements(page):
+    page.add_to_cart_button.click()
+    page.wait_for_page_to_load()
+
+    assert ElementCache.for_browser(page.browser).elements == {}
@@ -0,0 +1,19 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_the_purchase_feature_passes_on_the_fake_driver(tmp_path):
+    report = tmp_path / 'report.json'
+    run = subprocess.run([sys.executable, '-m', 'behave', '-D', 'driver=fake', '-D', 'storefront=stub',
+                          '--no-capture', '--format', 'json', '--outfile', str(report),
+                          'features/purchase.feature'], cwd=REPO, capture_output=True, text=True, timeout=300)
+
+    [feature] = json.loads(report.read_text())
+    scenarios = {element['name']: element['status'] for element in feature['elements']
+                 if element['type'] == 'scenario'}
+    assert scenarios and set(scenarios.values()) == {'passed'}, run.stdout + run.stderr
+    assert run.returncode == 0, run.stdout + run.stderr
@@ -0,0 +1,63 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from features.support.impact import ImpactIndex, select
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def checkout(tmp_path, monkeypatch):
+    """
+    A git repository holding a copy of the features directory, as the working directory.
+    """
+    shutil.copytree(os.path.join(REPO, 'features'), tmp_path / 'features',
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    for command in (['init', '-q'], ['add', '.'],
+                    ['-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-qm', 'base']):
+        subprocess.run(['git', *command], cwd=tmp_path, check=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def edit(path, old, new):
+    with open(path) as source:
+        text = source.read()
+    assert old in text
+    with open(path, 'w') as source:
+        source.write(text.replace(old, new, 1))
+
+
+def selected():
+    index = ImpactIndex(cache=None)
+    return index, {scenario.name: reasons for _, scenario, reasons in select(index, 'HEAD', ['features/purchase.feature'])}
+
+
+def test_change_to_code_only_the_hooks_reach_selects_every_scenario(checkout):
+    edit('features/support/session_pool.py', 'browser.delete_all_cookies()', 'browser.delete_all_cookies()  # edited')
+
+    index, scenarios = selected()
+
+    assert 'features/support/session_pool.py::SessionPool.reset' in index.hooks
+    assert scenarios and len(scenarios) == len(index.scenarios(['features/purchase.feature']))
+    assert all(reasons == ['features/support/session_pool.py::SessionPool.reset (hooks)']
+               for reasons in scenarios.values())
+
+
+def test_change_to_a_page_method_selects_the_scenarios_using_it(checkout):
+    edit('features/pages/cart_page.py', 'def remove_item(self):', 'def remove_item(self):  # edited')
+
+    _, scenarios = selected()
+
+    assert scenarios == {'Verify Cart Functionality': ['features/pages/cart_page.py::CartPage.remove_item']}
+
+
+def test_fingerprint_covers_code_the_hooks_reach(checkout):
+    steps = ImpactIndex(cache=None).scenarios(['features/purchase.feature'])[0][1].all_steps
+    before = ImpactIndex(cache=None).fingerprint(steps)
+    edit('features/support/session_pool.py', 'browser.delete_all_cookies()', 'browser.delete_all_cookies()  # edited')
+
+    assert ImpactIndex(cache=None).fingerprint(steps) != before
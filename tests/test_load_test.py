@@ -0,0 +1,92 @@
+import asyncio
+import re
+
+import pytest
+import requests
+
+from features.support.load_test import LoadStats, VirtualUser, build_flow, correlation_values, percentile, run_load
+from features.support.storefront_replay import RecordingProxy
+
+PAGE = """
+<form method="post" action="http://shop.test/cart/item/12/remove">
+  <input type="hidden" name="_method" value="DELETE"><input name="_token" type="hidden" value="a&amp;b">
+</form>
+<form method="post" action="/cart/item/15/remove"><input type="text" name="coupon" value="X"></form>
+<a href="/products/aeons-total-harmony">Harmony</a> <a href="/media/3.png">Image</a>
+"""
+
+
+def add_and_remove(origin):
+    """
+    Add both products to the cart and remove the second, as a new visitor.
+    """
+    session = requests.Session()
+    for product_id, slug in ((1, 'aeons-total-harmony'), (2, 'natures-gift-bone-broth')):
+        page = session.get(f'{origin}/products/{slug}').text
+        token = re.search(r'name="sylius_add_to_cart\[_token\]" value="(\w+)"', page).group(1)
+        cart = session.post(f'{origin}/cart/add?productId={product_id}', data={'sylius_add_to_cart[_token]': token})
+    token = re.search(r'name="_token" value="(\w+)"', cart.text).group(1)
+    session.post(f'{origin}/cart/item/2/remove', data={'_method': 'DELETE', '_token': token})
+
+
+@pytest.fixture
+def flow(storefront):
+    proxy = RecordingProxy(storefront.origin).start()
+    proxy.current_scenario, proxy.current_step = 'Remove an item', 'the cart has two items'
+    try:
+        add_and_remove(proxy.origin)
+    finally:
+        proxy.stop()
+    return build_flow(proxy.archive, {'Remove an item'})
+
+
+def test_hidden_fields_and_numbered_links_are_extracted():
+    assert correlation_values(PAGE, 'http://shop.test') == {
+        ('field', '_method'): 'DELETE',
+        ('field', '_token'): 'a&b',
+        ('link', '/cart/item/#/remove', 0): '/cart/item/12/remove',
+        ('link', '/cart/item/#/remove', 1): '/cart/item/15/remove',
+        ('link', '/media/#.png', 0): '/media/3.png',
+    }
+
+
+def test_the_flow_correlates_tokens_and_item_links(flow):
+    posts = [request for request in flow if request.method == 'POST']
+
+    assert [request.fields for request in posts] == [('sylius_add_to_cart[_token]',)] * 2 + [('_method', '_token')]
+    assert posts[-1].path_key == ('link', '/cart/item/#/remove', 1)
+    assert {request.step for request in flow} == {'the cart has two items'}
+
+
+def test_a_user_sends_the_values_of_its_own_responses(flow):
+    remove = [request for request in flow if request.method == 'POST'][-1]
+    user = VirtualUser(flow, 'http://shop.test', None, LoadStats())
+    values = {remove.path_key: '/cart/item/7/remove', ('field', '_token'): 'mine', ('field', '_method'): 'DELETE'}
+
+    assert user._prepare(remove, values) == ('/cart/item/7/remove', b'_method=DELETE&_token=mine')
+    assert user._prepare(remove, {})[0] == '/cart/item/2/remove'
+    assert user.stats.uncorrelated == 1
+
+
+def test_virtual_users_replay_the_flow_without_errors(flow, storefront):
+    summary = asyncio.run(run_load(flow, storefront.base_url, users=4, iterations=2)).summary()
+
+    assert summary['iterations'] == 8
+    assert summary['requests'] == 8 * len(flow)
+    assert summary['uncorrelated'] == 0
+    assert [entry['errors'] for entry in summary['steps'].values()] == [0]
+    assert sum(len(cart.items) == 1 for cart in storefront.carts.values()) == 8 + 1
+
+
+def test_stale_tokens_are_rejected_by_the_storefront(flow, storefront):
+    uncorrelated = [request._replace(fields=()) for request in flow]
+    summary = asyncio.run(run_load(uncorrelated, storefront.base_url, users=2)).summary()
+
+    assert summary['steps']['the cart has two items']['errors'] == 2 * 3
+
+
+def test_percentiles_are_nearest_rank():
+    latencies = [0.1 * value for value in range(1, 11)]
+
+    assert [percentile(latencies, share) for share in (50, 90, 99)] == [latencies[4], latencies[8], latencies[9]]
+    assert percentile([], 50) is None
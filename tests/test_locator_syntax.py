@@ -0,0 +1,137 @@
+import pytest
+from selenium.webdriver.common.by import By
+
+from features.pages.locator_syntax import SelectorError, check_locator, parse_css, parse_xpath
+
+
+def test_a_compound_selector_is_split_into_its_parts():
+    assert parse_css("td.numbers:nth-child(4)") == [[(None, {
+        'tag': 'td', 'ids': [], 'classes': ['numbers'], 'attributes': [], 'pseudos': [('nth-child', (0, 4, None))]
+    })]]
+
+
+def test_combinators_and_selector_lists():
+    first, second = parse_css(".cart-title > h1 + p ~ span a, #main")
+
+    assert [combinator for combinator, _ in first] == [None, '>', '+', '~', ' ']
+    assert second == [(None, {'tag': None, 'ids': ['main'], 'classes': [], 'attributes': [], 'pseudos': []})]
+
+
+@pytest.mark.parametrize('selector, attribute', [
+    ('[disabled]', ('disabled', None, None, None)),
+    ('[type="submit"]', ('type', '=', 'submit', None)),
+    ("[name^='sylius_cart' i]", ('name', '^=', 'sylius_cart', 'i')),
+    ('[class~=btn]', ('class', '~=', 'btn', None)),
+    ('[data-id|=item]', ('data-id', '|=', 'item', None)),
+])
+def test_attribute_selectors(selector, attribute):
+    assert parse_css(selector)[0][0][1]['attributes'] == [attribute]
+
+
+@pytest.mark.parametrize('argument, expected', [
+    ('odd', (2, 1, None)),
+    ('even', (2, 0, None)),
+    ('2n+1', (2, 1, None)),
+    ('-n + 3', (-1, 3, None)),
+    ('n', (1, 0, None)),
+    ('5', (0, 5, None)),
+])
+def test_nth_arguments(argument, expected):
+    assert parse_css(f"li:nth-child({argument})")[0][0][1]['pseudos'] == [('nth-child', expected)]
+
+
+def test_selector_arguments_and_pseudo_elements():
+    pseudos = parse_css("div:not(.hidden, [aria-hidden]):has(img)::before")[0][0][1]['pseudos']
+
+    assert [name for name, _ in pseudos] == ['not', 'has', '::before']
+    assert len(pseudos[0][1]) == 2
+    assert pseudos[1][1] == [[(None, {'tag': 'img', 'ids': [], 'classes': [], 'attributes': [], 'pseudos': []})]]
+
+
+def test_escapes_are_resolved():
+    assert parse_css(r"#a\:b .\31 23")[0][0][1]['ids'] == ['a:b']
+    assert parse_css(r"#a\:b .\31 23")[0][1][1]['classes'] == ['123']
+
+
+@pytest.mark.parametrize('selector, message', [
+    ('', "Expected a selector but found end of selector"),
+    ('div >', "Expected a selector but found end of selector"),
+    ('div,', "Expected a selector but found end of selector"),
+    ('.', "Expected ident but found end of selector"),
+    ('[type=]', "Expected an attribute value"),
+    ('[type="submit"', "Expected ] but found end of selector"),
+    ('div:hovered', "Unknown pseudo-class ':hovered'"),
+    ('p::first', "Unknown pseudo-element '::first'"),
+    ('li:nth-child(foo)', "Expected an\\+b, odd or even"),
+    ('div:contains("x")', "Unknown functional pseudo-class ':contains\\(\\)'"),
+    ('div { color: red }', "Unexpected '{' at 4"),
+])
+def test_invalid_css_is_rejected(selector, message):
+    with pytest.raises(SelectorError, match=message):
+        parse_css(selector)
+
+
+def test_an_xpath_location_path_becomes_steps():
+    assert parse_xpath("//td[@class='numbers']/span") == ('path', True, [
+        ('step', 'descendant-or-self', ('type', 'node'), []),
+        ('step', 'child', ('name', 'td'), [
+            ('binary', '=', ('path', False, [('step', 'attribute', ('name', 'class'), [])]), ('literal', 'numbers')),
+        ]),
+        ('step', 'child', ('name', 'span'), []),
+    ])
+
+
+def test_xpath_operators_axes_and_functions():
+    tree = parse_xpath("//td[contains(text(), 'Purchase type:')]//following-sibling::td[1] | //*[2 * 3 div 2 > -1]")
+
+    assert tree[0] == 'union'
+    following = tree[1][0][2][3]
+    assert following[:3] == ('step', 'following-sibling', ('name', 'td'))
+    assert following[3] == [('number', 1.0)]
+    assert tree[1][1][2][1][3] == [('binary', '>', ('binary', 'div', ('binary', '*', ('number', 2.0), ('number', 3.0)),
+                                                    ('number', 2.0)), ('negate', ('number', 1.0)))]
+
+
+def test_names_that_are_operators_only_after_an_operand():
+    assert parse_xpath("//div[div and mod]")[2][1][3] == [(
+        'binary', 'and', ('path', False, [('step', 'child', ('name', 'div'), [])]),
+        ('path', False, [('step', 'child', ('name', 'mod'), [])]),
+    )]
+
+
+@pytest.mark.parametrize('expression, message', [
+    ('', "Expected a node test but found end of expression"),
+    ('//div[', "Expected a node test but found end of expression"),
+    ('//div]', "Expected end of expression but found ']'"),
+    ('//sibling::div', "Unknown axis 'sibling'"),
+    ('//div[matches(., "x")]', "Unknown function 'matches\\(\\)'"),
+    ('//div[contains(.)]', "Wrong number of arguments to 'contains\\(\\)'"),
+    ('//div[@id="a" ~ 1]', "Unexpected '~'"),
+])
+def test_invalid_xpath_is_rejected(expression, message):
+    with pytest.raises(SelectorError, match=message):
+        parse_xpath(expression)
+
+
+@pytest.mark.parametrize('by, value', [
+    (By.ID, 'main'),
+    (By.NAME, 'sylius_cart[promotionCoupon]'),
+    (By.CLASS_NAME, 'checkout-btn'),
+    (By.TAG_NAME, 'h1'),
+    (By.LINK_TEXT, 'Checkout'),
+    (By.CSS_SELECTOR, '.cart-title h1'),
+    (By.XPATH, '//h1'),
+])
+def test_valid_locators_pass(by, value):
+    check_locator(by, value)
+
+
+@pytest.mark.parametrize('by, value, message', [
+    (By.ID, '', "Empty id locator"),
+    (By.CLASS_NAME, 'btn checkout-btn', "Compound class name"),
+    (By.TAG_NAME, 'h1.title', "Invalid tag name"),
+    ('sizzle', 'div', "Unknown locator strategy 'sizzle'"),
+])
+def test_invalid_locators_are_rejected(by, value, message):
+    with pytest.raises(SelectorError, match=message):
+        check_locator(by, value)
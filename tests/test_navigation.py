@@ -0,0 +1,34 @@
+import pytest
+
+from features.pages.navigation import NavigationPlanner
+
+CART = 'https://shop.test/cart/'
+PRODUCT = 'https://shop.test/products/aeons-total-harmony'
+
+
+class Browser:
+    """
+    Answers the planner's identity script with the document the test put it on.
+    """
+
+    def __init__(self):
+        self.document = None
+
+    def visit(self, url, token):
+        self.document = {'url': url, 'token': token, 'generation': 0, 'tracked': True}
+
+    def execute_script(self, script, *args):
+        return dict(self.document)
+
+
+@pytest.mark.parametrize('history, transition', [(True, 'history'), (False, 'get')])
+def test_going_back_is_only_planned_where_history_is_allowed(history, transition):
+    browser = Browser()
+    planner = NavigationPlanner(browser)
+    browser.visit(CART, 'cart')
+    planner.loaded()
+    assert planner.plan(PRODUCT) == 'get'
+    browser.visit(PRODUCT, 'product')
+    planner.loaded()
+
+    assert planner.plan(CART, history=history) == transition
@@ -0,0 +1,32 @@
+from features.support.parallel_runner import WorkUnit
+from features.support.reruns import FailureStore
+from features.support.sharding import scenario_key
+
+UNIT = WorkUnit('features/purchase.feature:25', 'features/purchase.feature', 'Verify Cart Functionality', ['cart'])
+
+
+def result(status, attempt, attempt_artifacts):
+    return {'unit': UNIT._asdict(), 'scenario': scenario_key(UNIT), 'status': status, 'attempt': attempt,
+            'attempt_artifacts': attempt_artifacts, 'feature': {'elements': []}, 'error': 'Timeout'}
+
+
+def test_the_artifacts_of_every_attempt_are_kept_with_the_failure(tmp_path):
+    path = str(tmp_path / 'failures.json')
+    attempts = [{'attempt': 1, 'status': 'error', 'manifests': ['reports/artifacts/a/manifest.json']},
+                {'attempt': 2, 'status': 'error', 'manifests': ['reports/artifacts/b/manifest.json']}]
+    store = FailureStore(path)
+    store.record('local', [result('error', 2, attempts)])
+    store.save()
+
+    [entry] = FailureStore(path).platforms['local']['failed']
+    assert entry['artifacts'] == attempts
+    assert entry['attempts'] == 2
+
+
+def test_a_flaky_scenario_keeps_the_artifacts_of_its_failed_attempt(tmp_path):
+    attempts = [{'attempt': 1, 'status': 'failed', 'manifests': ['reports/artifacts/a/manifest.json']}]
+    store = FailureStore(str(tmp_path / 'failures.json'))
+    store.record('local', [result('passed', 2, attempts)])
+
+    assert store.failed('local') == set()
+    assert store.platforms['local']['flaky'][0]['artifacts'] == attempts
@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+import time
+
+import psutil
+import pytest
+
+from features.support.resource_monitor import (ConcurrencyController, ProcessTree, ResourceMonitor,
+                                               find_session_process, load, main)
+
+# A stand-in for a browser started with a debugging port, with one child process.
+BROWSER = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); " \
+          "time.sleep(60)"
+
+
+class Browser:
+
+    def __init__(self, capabilities=None, session_id='abc'):
+        self.capabilities = capabilities or {}
+        self.session_id = session_id
+
+
+class Pool:
+    """
+    Keeps the limit of a SessionPool and hands out fixed sessions.
+    """
+
+    def __init__(self, browsers=(), limit=2, size=4):
+        self.browsers = list(browsers)
+        self.limit = limit
+        self.size = size
+
+    def resize(self, limit):
+        self.limit = max(1, min(self.size, limit))
+        return self.limit
+
+    def sessions(self):
+        return self.browsers
+
+
+@pytest.fixture
+def chrome():
+    """
+    A session whose capabilities point at a local process tree by its debugging port.
+    """
+    port = 20000 + os.getpid() % 20000
+    process = subprocess.Popen([sys.executable, '-c', BROWSER, f'--remote-debugging-port={port}'])
+    root = psutil.Process(process.pid)
+    deadline = time.monotonic() + 10
+    while not root.children() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    members = root.children(recursive=True) + [root]
+    browser = Browser({'goog:chromeOptions': {'debuggerAddress': f'localhost:{port}'}})
+    browser.process = root
+    yield browser
+    for member in members:
+        try:
+            member.kill()
+        except psutil.NoSuchProcess:
+            pass
+    process.wait()
+
+
+def host(memory_percent, cpu=10.0):
+    return {'cpu': cpu, 'memory_percent': memory_percent}
+
+
+def test_the_limit_follows_host_memory_one_session_at_a_time():
+    pool = Pool()
+    controller = ConcurrencyController(pool, cooldown=0)
+
+    assert controller.update(host(90.0), {}) == [{'kind': 'limit', 'from': 2, 'to': 1, 'memory_percent': 90.0,
+                                                  'cpu': 10.0}]
+    assert controller.update(host(90.0), {}) == []
+    assert controller.update(host(75.0), {}) == []
+    assert [event['to'] for event in controller.update(host(50.0), {})] == [2]
+    assert pool.limit == 2
+
+
+def test_the_limit_changes_at_most_once_per_cooldown():
+    pool = Pool(limit=3)
+    controller = ConcurrencyController(pool, cooldown=60)
+
+    controller.update(host(90.0), {})
+    assert controller.update(host(95.0), {}) == []
+    assert pool.limit == 2
+
+
+def test_a_single_busy_sample_does_not_cost_a_session():
+    controller = ConcurrencyController(Pool(), cooldown=0)
+
+    controller.update(host(75.0, cpu=50.0), {})
+    assert controller.update(host(75.0, cpu=100.0), {}) == []
+    assert controller.cpu == pytest.approx(65.0)
+
+
+def test_sessions_above_the_memory_limit_are_recycled():
+    big, small = Browser(), Browser()
+    controller = ConcurrencyController(Pool(), session_memory_mb=512)
+    controller.update(host(75.0), {big: {'rss_mb': 600.0}, small: {'rss_mb': 200.0}})
+
+    assert controller.should_recycle(big)
+    assert not controller.should_recycle(small)
+    assert not controller.should_recycle(Browser())
+
+
+def test_a_chromium_session_is_found_by_its_debugging_port(chrome):
+    assert find_session_process(chrome).pid == chrome.process.pid
+    assert find_session_process(Browser({'browserName': 'safari'})) is None
+    assert find_session_process(Browser({'moz:processID': os.getpid()})) is None
+
+
+def test_a_process_tree_is_sampled_until_its_root_exits(chrome):
+    tree = ProcessTree(chrome.process)
+
+    assert tree.sample()['processes'] == 2
+    assert tree.sample()['rss_mb'] > 0
+    chrome.process.kill()
+    chrome.process.wait()
+    assert tree.sample() is None
+
+
+def test_samples_are_labelled_with_the_leased_sessions_step(chrome, tmp_path, capsys):
+    monitor = ResourceMonitor(Pool([chrome]), str(tmp_path), run='run')
+    monitor.label(chrome, 'Add product to cart', 'user adds the product to the cart')
+    monitor.sample()
+    monitor.label()
+    monitor.sample()
+
+    records = load(str(tmp_path), 'run')
+    assert [(record['kind'], record['scenario']) for record in records] == [
+        ('host', 'Add product to cart'), ('session', 'Add product to cart'), ('host', None), ('session', None),
+    ]
+    assert [record['leased'] for record in records if record['kind'] == 'session'] == [True, False]
+    assert monitor.scenario_peaks('Add product to cart')['samples'] == 1
+    assert main(['--dir', str(tmp_path)]) == 0
+    assert 'Add product to cart / user adds the product to the cart' in capsys.readouterr().out
@@ -0,0 +1,117 @@
+import itertools
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from features.support.session_pool import SessionCreationError, SessionPool
+
+
+class Browser:
+    """
+    Records the commands the pool sends to reset and quit a session.
+    """
+
+    ids = itertools.count(1)
+
+    def __init__(self, reset_fails=False):
+        self.id = next(self.ids)
+        self.reset_fails = reset_fails
+        self.commands = []
+
+    def delete_all_cookies(self):
+        if self.reset_fails:
+            raise WebDriverException("session deleted")
+        self.commands.append('delete_all_cookies')
+
+    def execute_script(self, script, *args):
+        self.commands.append('execute_script')
+
+    def get(self, url):
+        self.commands.append(f'get {url}')
+
+    def quit(self):
+        self.commands.append('quit')
+
+
+@pytest.fixture
+def pool():
+    pools = []
+
+    def start(factory=Browser, **options):
+        pools.append(SessionPool(factory, **options).start())
+        return pools[-1]
+    yield start
+    for started in pools:
+        started.shutdown()
+
+
+def test_a_released_session_is_reset_and_leased_again(pool):
+    sessions = pool()
+    browser = sessions.lease(timeout=5)
+    sessions.release(browser)
+
+    assert sessions.lease(timeout=5) is browser
+    assert browser.commands == ['delete_all_cookies', 'execute_script', 'get about:blank']
+    assert sessions.metrics()['reuse_ratio'] == 0.5
+
+
+@pytest.mark.parametrize('release', [{'failed': True}, {'recycle': True}])
+def test_a_failed_or_recycled_session_is_replaced(pool, release):
+    sessions = pool()
+    browser = sessions.lease(timeout=5)
+    sessions.release(browser, **release)
+
+    assert sessions.lease(timeout=5) is not browser
+    assert browser.commands == ['quit']
+    assert sessions.metrics()['sessions_recycled'] == 1
+    assert sessions.metrics()['sessions_created'] == 2
+
+
+def test_a_session_is_replaced_after_max_uses(pool):
+    sessions = pool(max_uses=2)
+    first = sessions.lease(timeout=5)
+    sessions.release(first)
+    assert sessions.lease(timeout=5) is first
+    sessions.release(first)
+
+    assert sessions.lease(timeout=5) is not first
+    assert first.commands[-1] == 'quit'
+
+
+def test_a_session_that_cannot_be_reset_is_replaced(pool):
+    sessions = pool(factory=lambda: Browser(reset_fails=True))
+    browser = sessions.lease(timeout=5)
+    sessions.release(browser)
+
+    assert sessions.lease(timeout=5) is not browser
+    assert browser.commands == ['quit']
+
+
+def test_a_session_that_failed_to_start_is_reported_and_retried(pool):
+    attempts = []
+
+    def factory():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise WebDriverException("grid unavailable")
+        return Browser()
+    sessions = pool(factory=factory)
+
+    with pytest.raises(SessionCreationError, match="grid unavailable"):
+        sessions.lease(timeout=5)
+    assert isinstance(sessions.lease(timeout=5), Browser)
+    assert len(attempts) == 2
+
+
+def test_shrinking_quits_the_sessions_above_the_limit(pool):
+    sessions = pool(size=3)
+    leased = [sessions.lease(timeout=5) for _ in range(3)]
+    sessions.release(leased[0])
+
+    assert sessions.resize(1) == 1
+    sessions.release(leased[1])
+    sessions.release(leased[2])
+    sessions.shutdown()
+
+    assert [browser.commands.count('quit') for browser in leased] == [1, 1, 1]
+    assert sessions.metrics()['sessions_throttled'] == 2
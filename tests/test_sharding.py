@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from features.support.parallel_runner import WorkUnit
+from features.support.sharding import (DEFAULT_DURATION, LOCAL_PLATFORM, TimingStore, current_platform,
+                                       dispatch_order, load_platforms, makespan, plan, scenario_key)
+
+CONFIG = """
+platforms:
+  - deviceName: Samsung Galaxy S23 Ultra
+    osVersion: 13.0
+    browserName: chrome
+  - os: Windows
+    osVersion: 11
+    browserName: edge
+    browserVersion: latest
+parallelsPerPlatform: 2
+"""
+
+
+def unit(name):
+    return WorkUnit(f'features/purchase.feature:{len(name)}', 'Purchase a product', name, ())
+
+
+def store_with(tmp_path, platform, durations):
+    store = TimingStore(str(tmp_path / 'timings.json'))
+    for name, duration in durations.items():
+        store.update(platform, scenario_key(unit(name)), duration)
+    return store
+
+
+def record(path, platform, name, duration):
+    store = TimingStore(path)
+    store.update(platform, scenario_key(unit(name)), duration)
+    store.save()
+
+
+def test_durations_are_a_moving_average_per_platform(tmp_path):
+    store = store_with(tmp_path, 'local', {'cart': 10.0})
+    store.update('local', scenario_key(unit('cart')), 20.0)
+
+    assert store.estimate('local', scenario_key(unit('cart'))) == pytest.approx(13.0)
+    assert store.durations['local'][scenario_key(unit('cart'))]['runs'] == 2
+
+
+def test_estimates_fall_back_to_other_platforms_then_the_median(tmp_path):
+    store = store_with(tmp_path, 'local', {'cart': 10.0, 'faq': 30.0, 'purchase': 40.0})
+
+    assert store.estimate('iPhone 13 15 Safari', scenario_key(unit('cart'))) == 10.0
+    assert store.estimate('local', scenario_key(unit('new'))) == 30.0
+    assert TimingStore(str(tmp_path / 'empty.json')).estimate('local', 'any') == DEFAULT_DURATION
+
+
+def test_parallel_saves_keep_every_duration(tmp_path):
+    path = str(tmp_path / 'timings.json')
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(record, [path] * 4, ['android', 'iphone'] * 2, ['cart', 'cart', 'faq', 'faq'],
+                          [1.0, 2.0, 3.0, 4.0]))
+
+    durations = TimingStore(path).durations
+    assert {platform: sorted(entries) for platform, entries in durations.items()} == {
+        'android': [scenario_key(unit('cart')), scenario_key(unit('faq'))],
+        'iphone': [scenario_key(unit('cart')), scenario_key(unit('faq'))],
+    }
+
+
+def test_the_plan_packs_the_longest_scenarios_first(tmp_path):
+    store = store_with(tmp_path, 'local', {'a': 8.0, 'b': 5.0, 'c': 4.0, 'd': 3.0})
+    slots = plan([unit(name) for name in 'abcd'], ['local'], 2, store)
+
+    assert [[unit.name for unit in slot.units] for slot in slots] == [['a', 'd'], ['b', 'c']]
+    assert makespan(slots) == 11.0
+    assert [unit.name for unit in dispatch_order(slots, store)] == ['a', 'b', 'c', 'd']
+
+
+def test_units_are_dispatched_by_their_planned_start(tmp_path):
+    store = store_with(tmp_path, 'local', {'a': 6.0, 'b': 5.0, 'c': 4.0, 'd': 2.0, 'e': 2.0})
+    slots = plan([unit(name) for name in 'abcde'], ['local'], 2, store)
+
+    assert [[unit.name for unit in slot.units] for slot in slots] == [['a', 'd', 'e'], ['b', 'c']]
+    assert [unit.name for unit in dispatch_order(slots, store)] == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_platforms_are_named_as_in_the_plan(tmp_path, monkeypatch):
+    config = tmp_path / 'browserstack.yml'
+    config.write_text(CONFIG)
+
+    assert load_platforms(str(config)) == (['Samsung Galaxy S23 Ultra 13.0 chrome', 'Windows 11 edge latest'], 2)
+    monkeypatch.delenv('BROWSERSTACK_PLATFORM_INDEX', raising=False)
+    assert current_platform(str(config)) == LOCAL_PLATFORM
+    monkeypatch.setenv('BROWSERSTACK_PLATFORM_INDEX', '1')
+    assert current_platform(str(config)) == 'Windows 11 edge latest'
@@ -0,0 +1,64 @@
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from features.pages.request_blocking import LoadBaseline
+from features.pages.wait_stats import LocatorTimings
+from features.support.metrics_store import MetricsStore, load, merge_shards
+
+
+def record_waits(path, worker, waits):
+    timings = LocatorTimings(path)
+    for wait in range(waits):
+        timings.add('chrome', 'CartPage', 'cart_title', ('css selector', '.cart-title'), 'visible',
+                    worker + wait / 1000, found=wait % 10 != 0)
+    timings.save()
+
+
+def record_loads(path, size, loads):
+    baseline = LoadBaseline(path)
+    for _ in range(loads):
+        baseline.add({'page': 'CartPage', 'bytes': size, 'duration': 1.0})
+    baseline.save()
+
+
+def test_parallel_saves_of_the_wait_statistics_keep_every_wait(tmp_path):
+    path = str(tmp_path / 'wait-stats.json')
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(record_waits, [path] * 8, range(8), [10] * 8))
+
+    [entry] = json.loads((tmp_path / 'wait-stats.json').read_text())
+    assert len(entry['samples']) == 72
+    assert entry['timeouts'] == 8
+    assert not list(tmp_path.glob('*.lock')) and not list(tmp_path.glob('*.tmp'))
+
+
+def test_save_takes_in_the_waits_other_processes_saved(tmp_path):
+    path = str(tmp_path / 'wait-stats.json')
+    timings = LocatorTimings(path)
+    timings.add('chrome', 'CartPage', 'cart_title', ('css selector', '.cart-title'), 'visible', 0.1, found=True)
+    record_waits(path, 1, 3)
+
+    timings.save()
+
+    assert len(timings.samples('chrome', 'CartPage', ('css selector', '.cart-title'), 'visible')) == 3
+
+
+def test_parallel_saves_of_the_load_baseline_weigh_every_load(tmp_path):
+    path = str(tmp_path / 'load-baseline.json')
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(record_loads, [path] * 4, [1000, 2000, 3000, 4000], [1, 1, 1, 5]))
+
+    entry = json.loads((tmp_path / 'load-baseline.json').read_text())['CartPage']
+    assert entry['loads'] == 8
+    assert entry['bytes'] == pytest.approx((1000 + 2000 + 3000 + 5 * 4000) / 8)
+
+
+def test_worker_files_are_merged_into_the_run(tmp_path):
+    for worker in ('101', '102'):
+        MetricsStore(str(tmp_path), 'run', shard=worker).append([{'page': 'CartPage', 'worker': worker}])
+
+    assert merge_shards(str(tmp_path), 'run') == 2
+    assert sorted(record['worker'] for record in load(str(tmp_path), 'run')) == ['101', '102']
+    assert [path.name for path in tmp_path.iterdir()] == ['run.jsonl']
@@ -0,0 +1,97 @@
+import re
+
+import pytest
+import requests
+
+from features.support.storefront_replay import (ORIGIN_PLACEHOLDER, RecordingProxy, ReplayServer, StorefrontArchive,
+                                                request_key)
+
+
+def buy(origin, product_id=2, slug='natures-gift-bone-broth'):
+    """
+    Load the cart, add a product from its page and load the cart again, as a new visitor.
+
+    :return: the empty cart page and the cart page with the product in it
+    """
+    session = requests.Session()
+    empty = session.get(f'{origin}/cart/').text
+    page = session.get(f'{origin}/products/{slug}').text
+    token = re.search(r'name="sylius_add_to_cart\[_token\]" value="(\w+)"', page).group(1)
+    cart = session.post(f'{origin}/cart/add?productId={product_id}', data={
+        'sylius_add_to_cart[cartItem][quantity]': '2', 'sylius_add_to_cart[_token]': token,
+    })
+    return empty, cart.text
+
+
+@pytest.fixture
+def archive(storefront, tmp_path):
+    """
+    Path of an archive recorded through the proxy while two visitors buy a product from the stub storefront.
+    """
+    proxy = RecordingProxy(storefront.origin).start()
+    try:
+        buy(proxy.origin)
+        buy(proxy.origin)
+    finally:
+        proxy.stop()
+    path = str(tmp_path / 'storefront.zip')
+    proxy.archive.save(path)
+    return path
+
+
+@pytest.fixture
+def replay(archive):
+    server = ReplayServer(StorefrontArchive.load(archive)).start()
+    yield server
+    server.stop()
+
+
+def test_csrf_tokens_do_not_change_the_request_key():
+    first = request_key('POST', b'sylius_cart[promotionCoupon]=X&sylius_cart[_token]=abc')
+    second = request_key('POST', b'sylius_cart[_token]=def&sylius_cart[promotionCoupon]=X')
+
+    assert first == second
+    assert first != request_key('POST', b'sylius_cart[promotionCoupon]=Y&sylius_cart[_token]=abc')
+    assert request_key('GET', b'') == ''
+
+
+def test_identical_bodies_are_stored_once(archive):
+    recorded = StorefrontArchive.load(archive)
+
+    assert [(exchange['method'], exchange['path']) for exchange in recorded.exchanges] == [
+        ('GET', '/cart/'), ('GET', '/products/natures-gift-bone-broth'), ('POST', '/cart/add?productId=2'),
+        ('GET', '/cart/'),
+    ] * 2
+    first, second = recorded.exchanges[:4], recorded.exchanges[4:]
+    assert [exchange['body'] == other['body'] for exchange, other in zip(first, second)] == [True, False, True, False]
+    assert set(recorded.bodies) == {exchange[name] for exchange in recorded.exchanges
+                                    for name in ('body', 'request_body') if name in exchange}
+
+
+def test_the_cart_is_replayed_in_the_state_the_posts_left_it(replay):
+    empty, cart = buy(replay.origin)
+
+    assert 'Your cart is empty' in empty
+    assert "Nature&#x27;s Gift Bone Broth" in cart
+    assert 'value="2"' in cart
+    assert 'Your cart is empty' in requests.get(f'{replay.origin}/cart/').text
+
+
+def test_unrecorded_requests_are_not_found(replay):
+    assert requests.get(f'{replay.origin}/checkout/').status_code == 404
+
+
+def test_the_recorded_origin_is_replaced_by_the_servers():
+    archive = StorefrontArchive()
+    archive.add({'method': 'GET', 'path': '/', 'request': '', 'state': '', 'occurrence': 0, 'status': 302,
+                 'headers': [('Location', ORIGIN_PLACEHOLDER.decode() + '/cart/')]}, b'')
+    archive.add({'method': 'GET', 'path': '/cart/', 'request': '', 'state': '', 'occurrence': 0, 'status': 200,
+                 'headers': [('Content-Type', 'text/html')]}, b'<a href="' + ORIGIN_PLACEHOLDER + b'/">Home</a>')
+    server = ReplayServer(archive).start()
+    try:
+        response = requests.get(f'{server.origin}/')
+    finally:
+        server.stop()
+
+    assert response.url == f'{server.origin}/cart/'
+    assert response.text == f'<a href="{server.origin}/">Home</a>'
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+from features.pages.base_page import BasePage
+
+
+class Element:
+
+    def __init__(self, displayed=True, enabled=True):
+        self.displayed = displayed
+        self.enabled = enabled
+
+    def is_displayed(self):
+        return self.displayed
+
+    def is_enabled(self):
+        return self.enabled
+
+
+class Browser:
+    """
+    Answers the few WebDriver calls the waits make and records the script timeouts set.
+    """
+
+    def __init__(self, elements=(), result=None):
+        self.elements = list(elements)
+        self.result = result
+        self.timeouts = SimpleNamespace(script=30)
+        self.script_timeouts = []
+
+    def find_elements(self, by, value):
+        return self.elements
+
+    def execute_script(self, script, *args):
+        return None
+
+    def execute_async_script(self, script, *args):
+        return self.result
+
+    def set_script_timeout(self, seconds):
+        self.script_timeouts.append(seconds)
+        self.timeouts.script = seconds
+
+
+@pytest.fixture
+def poll():
+    BasePage.WAIT_STRATEGY = 'poll'
+    yield
+    BasePage.WAIT_STRATEGY = 'event'
+
+
+@pytest.mark.parametrize('condition', ['enabled', 'stable'])
+def test_polling_for_many_elements_returns_the_matching_ones(poll, condition):
+    matching = Element()
+    browser = Browser([Element(displayed=False), matching])
+
+    assert BasePage(browser).wait_for_element(('css selector', '.button'), condition, timeout=1, many=True) == [matching]
+
+
+def test_polling_for_an_unknown_condition_fails_clearly(poll):
+    with pytest.raises(ValueError, match="Unsupported wait condition 'clickable'"):
+        BasePage(Browser([Element()])).wait_for_element(('css selector', '.button'), 'clickable', timeout=1)
+
+
+def test_long_waits_restore_the_script_timeout():
+    browser = Browser(result={'ready': True})
+    page = BasePage(browser)
+
+    page.wait_for_page_to_load(timeout=60)
+    browser.result = None
+    with pytest.raises(TimeoutException):
+        page.wait_for_element(('css selector', '.cart-title'), timeout=45)
+
+    assert browser.script_timeouts == [61, 30, 46, 30]
+    assert browser.timeouts.script == 30